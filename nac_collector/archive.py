@@ -0,0 +1,416 @@
+"""Helpers for writing collected data into the output archive."""
+
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from types import TracebackType
+from typing import IO, Any
+
+from nac_collector import json_codec
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Encoded JSON is buffered up to this many characters before being written to the archive
+WRITE_BUFFER_SIZE = 1024 * 1024
+# Index of the members of a sharded archive
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+# zstd level used for tar output
+ZSTD_LEVEL = 3
+ZSTD_AVAILABLE = zstandard is not None
+# Size above which members encoded ahead of writing (tar members, members encoded by
+# the pool of an ArchiveWriter) are spooled to disk
+SPOOL_SIZE = 64 * 1024 * 1024
+
+
+class ArchiveLayout(str, Enum):
+    """Supported archive layouts."""
+
+    # One <solution>.json member holding every endpoint
+    SINGLE = "single"
+    # One <solution>/<endpoint>.json member per endpoint plus manifest.json
+    SHARDED = "sharded"
+
+
+class Compression(str, Enum):
+    """Supported archive compression codecs."""
+
+    STORED = "stored"
+    DEFLATE = "deflate"
+    DEFLATE_1 = "deflate-1"
+    DEFLATE_2 = "deflate-2"
+    DEFLATE_3 = "deflate-3"
+    DEFLATE_4 = "deflate-4"
+    DEFLATE_5 = "deflate-5"
+    DEFLATE_6 = "deflate-6"
+    DEFLATE_7 = "deflate-7"
+    DEFLATE_8 = "deflate-8"
+    DEFLATE_9 = "deflate-9"
+    BZIP2 = "bzip2"
+    LZMA = "lzma"
+    # tar archive compressed with zstandard instead of ZIP (requires the zstandard package)
+    ZSTD = "zstd"
+
+    @property
+    def zip_method(self) -> tuple[int, int | None]:
+        """ZIP compression method and level of the codec (None for the default level)."""
+        if self == Compression.STORED:
+            return zipfile.ZIP_STORED, None
+        if self == Compression.BZIP2:
+            return zipfile.ZIP_BZIP2, None
+        if self == Compression.LZMA:
+            return zipfile.ZIP_LZMA, None
+        if self == Compression.ZSTD:
+            raise ValueError("zstd output is a tar archive, not a ZIP archive")
+        _, _, level = self.value.partition("-")
+        return zipfile.ZIP_DEFLATED, int(level) if level else None
+
+
+def iter_json_chunks(data: Any, indent: int = 4) -> Iterator[bytes]:
+    """
+    Encode data as JSON incrementally, yielding UTF-8 chunks of about WRITE_BUFFER_SIZE.
+
+    The concatenated chunks have the layout of json.dumps(data, indent=indent); see
+    json_codec.iter_encode.
+
+    Parameters:
+        data (Any): JSON-serializable data.
+        indent (int): Indentation passed to the JSON encoder.
+    """
+    yield from json_codec.iter_encode(data, indent, WRITE_BUFFER_SIZE)
+
+
+def write_json_member(
+    zip_file: zipfile.ZipFile, filename: str, data: Any, indent: int = 4
+) -> None:
+    """
+    Encode data as JSON straight into a new member of an open ZIP archive.
+
+    The document is encoded incrementally and flushed to the member in buffered chunks, so
+    the complete JSON string is never held in memory. The member content has the layout of
+    json.dumps(data, indent=indent).
+
+    Parameters:
+        zip_file (zipfile.ZipFile): Archive opened for writing.
+        filename (str): Name of the member to create.
+        data (Any): JSON-serializable data.
+        indent (int): Indentation passed to the JSON encoder.
+    """
+    # The size is unknown up front; allow members larger than 2 GiB
+    with zip_file.open(filename, "w", force_zip64=True) as member:
+        for chunk in iter_json_chunks(data, indent):
+            member.write(chunk)
+
+
+def _spool_json(data: Any) -> IO[bytes]:
+    """
+    Encode data as JSON (indent=4) into a temporary file, spooled to disk above SPOOL_SIZE.
+
+    Parameters:
+        data (Any): JSON-serializable data.
+
+    Returns:
+        IO[bytes]: The file, rewound; the caller closes it.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)  # noqa: SIM115
+    try:
+        for chunk in iter_json_chunks(data):
+            spool.write(chunk)
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+class ArchiveWriter:
+    """
+    Write JSON members to a ZIP archive, or to a zstd-compressed tar archive.
+
+    ZIP members are written by zipfile, streamed as they are encoded. With more than one
+    worker, members are instead encoded on a thread pool into temporary files (spooled to
+    disk above SPOOL_SIZE), several members ahead, and streamed from there into the
+    archive on the calling thread. Encoding the next members then overlaps with
+    compressing the current one, as zlib, bz2 and lzma release the GIL. Members are
+    appended in the order they were written. This only helps archives of many members;
+    a single-file archive is written with one worker.
+
+    Parameters:
+        output (str): Archive filename.
+        compression (Compression): Codec. Defaults to Compression.DEFLATE.
+        workers (int, optional): Encoding threads for ZIP archives, compression threads
+            for zstd. Defaults to 1 for ZIP archives and to the number of CPUs for zstd.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        compression: Compression = Compression.DEFLATE,
+        workers: int | None = None,
+    ) -> None:
+        self.output = output
+        self.compression = Compression(compression)
+        if workers is None:
+            workers = os.cpu_count() or 1 if self.compression == Compression.ZSTD else 1
+        self.workers = max(1, workers)
+        # Uncompressed and compressed size of every member written (compressed is None in tar)
+        self.sizes: dict[str, tuple[int, int | None]] = {}
+
+        self._zip_file: zipfile.ZipFile | None = None
+        self._tar_file: tarfile.TarFile | None = None
+        self._tar_stream: Any = None
+        self._output_file: IO[bytes] | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: deque[tuple[str, Future[IO[bytes]]]] = deque()
+
+    def __enter__(self) -> "ArchiveWriter":
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """Create the archive file."""
+        if self.compression == Compression.ZSTD:
+            if zstandard is None:
+                raise RuntimeError(
+                    "zstd compression requires the zstandard package "
+                    "(pip install nac-collector[zstd])"
+                )
+            self._output_file = open(self.output, "wb")  # noqa: SIM115
+            compressor = zstandard.ZstdCompressor(
+                level=ZSTD_LEVEL, threads=-1 if self.workers > 1 else 0
+            )
+            self._tar_stream = compressor.stream_writer(
+                self._output_file, closefd=False
+            )
+            self._tar_file = tarfile.open(fileobj=self._tar_stream, mode="w|")
+            return
+
+        compress_type, level = self.compression.zip_method
+        self._zip_file = zipfile.ZipFile(
+            self.output, "w", compress_type, compresslevel=level
+        )
+        if self.workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def close(self) -> None:
+        """Write the members still being encoded and close the archive."""
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+            # Left over when writing failed
+            while self._pending:
+                _, future = self._pending.popleft()
+                if not future.cancelled() and future.exception() is None:
+                    future.result().close()
+            if self._zip_file is not None:
+                self._zip_file.close()
+                self._zip_file = None
+            if self._tar_file is not None:
+                self._tar_file.close()
+                self._tar_stream.close()
+                self._tar_file = None
+            if self._output_file is not None:
+                self._output_file.close()
+                self._output_file = None
+
+    def write_json(self, filename: str, data: Any) -> None:
+        """
+        Add data encoded as JSON (indent=4) as a new member.
+
+        With an encoding pool the member may still be in progress when this returns; it
+        is written before any later member and at the latest by flush() or close(). data
+        must not be modified until then.
+
+        Parameters:
+            filename (str): Name of the member.
+            data (Any): JSON-serializable data.
+        """
+        if self._tar_file is not None:
+            self._add_tar_member(filename, data)
+            return
+        if self._zip_file is None:
+            raise RuntimeError("ArchiveWriter is not open")
+        if self._executor is None:
+            write_json_member(self._zip_file, filename, data)
+            self._record_size(filename)
+            return
+
+        self._pending.append((filename, self._executor.submit(_spool_json, data)))
+        # Keep the pool busy while bounding the members held in temporary files
+        while self._pending and (
+            len(self._pending) > 2 * self.workers or self._pending[0][1].done()
+        ):
+            self._write_next()
+
+    def flush(self) -> None:
+        """Wait for every pending member and write it to the archive."""
+        while self._pending:
+            self._write_next()
+
+    def _write_next(self) -> None:
+        if self._zip_file is None:
+            raise RuntimeError("ArchiveWriter is not open")
+        filename, future = self._pending.popleft()
+        with future.result() as spool:
+            # The size is unknown up front; allow members larger than 2 GiB
+            with self._zip_file.open(filename, "w", force_zip64=True) as member:
+                shutil.copyfileobj(spool, member, WRITE_BUFFER_SIZE)
+        self._record_size(filename)
+
+    def _record_size(self, filename: str) -> None:
+        if self._zip_file is None:
+            raise RuntimeError("ArchiveWriter is not open")
+        info = self._zip_file.getinfo(filename)
+        self.sizes[filename] = (info.file_size, info.compress_size)
+
+    def _add_tar_member(self, filename: str, data: Any) -> None:
+        if self._tar_file is None:
+            raise RuntimeError("ArchiveWriter is not open")
+        with _spool_json(data) as spool:
+            size = spool.seek(0, os.SEEK_END)
+            spool.seek(0)
+            info = tarfile.TarInfo(filename)
+            info.size = size
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self._tar_file.addfile(info, spool)
+        self.sizes[filename] = (size, None)
+
+
+def _count_items(data: Any) -> int:
+    if isinstance(data, list):
+        return len(data)
+    return 0 if data is None else 1
+
+
+def _member_stem(name: str) -> str:
+    """Turn an endpoint name into a safe archive member name."""
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("._")
+    return stem or "endpoint"
+
+
+class ShardedArchiveWriter:
+    """
+    Write collected data as one archive member per endpoint plus an index manifest.
+
+    Each endpoint is stored as <technology>/<endpoint>.json, encoded like the single-file
+    layout (json.dumps(..., indent=4)). manifest.json at the archive root lists every
+    member with its endpoint name, item count and uncompressed and compressed sizes, so
+    readers can pick the members they need without touching the others.
+
+    Endpoints can be written as soon as they are collected, after which the caller no
+    longer needs to keep them in memory.
+
+    Parameters:
+        output (str): Archive filename.
+        technology (str): Technology name, used as the member directory.
+        compression (Compression): Codec. Defaults to Compression.DEFLATE.
+        workers (int, optional): Encoding threads, see ArchiveWriter.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        technology: str,
+        compression: Compression = Compression.DEFLATE,
+        workers: int | None = None,
+    ) -> None:
+        self.technology = technology
+        self.archive = ArchiveWriter(output, compression, workers)
+        self.members: list[dict[str, Any]] = []
+        self._names: set[str] = set()
+
+    def __enter__(self) -> "ShardedArchiveWriter":
+        self.archive.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        try:
+            if exc_type is None:
+                self.write_manifest()
+        finally:
+            self.archive.close()
+
+    def _unique_filename(self, endpoint: str) -> str:
+        stem = _member_stem(endpoint)
+        filename = f"{self.technology}/{stem}.json"
+        suffix = 1
+        while filename in self._names:
+            suffix += 1
+            filename = f"{self.technology}/{stem}_{suffix}.json"
+        self._names.add(filename)
+        return filename
+
+    def write_endpoint(self, endpoint: str, data: Any) -> str:
+        """
+        Write the data of one endpoint to its own member.
+
+        Parameters:
+            endpoint (str): Endpoint name (top-level key of the collected data).
+            data (Any): JSON-serializable endpoint data.
+
+        Returns:
+            str: Name of the member written.
+        """
+        filename = self._unique_filename(endpoint)
+        self.archive.write_json(filename, data)
+        self.members.append(
+            {"endpoint": endpoint, "file": filename, "items": _count_items(data)}
+        )
+        return filename
+
+    def write_manifest(self) -> None:
+        """Write manifest.json listing the members written so far."""
+        self.archive.flush()
+        for member in self.members:
+            member["size"], member["compressed_size"] = self.archive.sizes[
+                member["file"]
+            ]
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "solution": self.technology,
+            "layout": ArchiveLayout.SHARDED.value,
+            "compression": self.archive.compression.value,
+            "members": self.members,
+        }
+        self.archive.write_json(MANIFEST_FILENAME, manifest)
+
+
+def read_manifest(zip_file: zipfile.ZipFile) -> dict[str, Any] | None:
+    """
+    Return the manifest of a sharded archive, or None for a single-file archive.
+
+    Parameters:
+        zip_file (zipfile.ZipFile): Archive opened for reading.
+    """
+    if MANIFEST_FILENAME not in zip_file.namelist():
+        return None
+    manifest: dict[str, Any] = json_codec.loads(zip_file.read(MANIFEST_FILENAME))
+    return manifest
@@ -1,27 +1,26 @@
 import logging
+import os
 import time
+from collections.abc import MutableMapping
 from enum import Enum
-from typing import Annotated
+from typing import Annotated, Any
 
 import typer
 from rich.logging import RichHandler
 
 import nac_collector
+from nac_collector.archive import ZSTD_AVAILABLE, ArchiveLayout, Compression
 from nac_collector.cli import console
-from nac_collector.constants import MAX_RETRIES, RETRY_AFTER, TIMEOUT
-from nac_collector.controller.base import CiscoClientController
-from nac_collector.controller.catalystcenter import CiscoClientCATALYSTCENTER
-from nac_collector.controller.fmc import CiscoClientFMC
-from nac_collector.controller.ise import CiscoClientISE
-from nac_collector.controller.meraki import CiscoClientMERAKI
-from nac_collector.controller.ndfc import CiscoClientNDFC
-from nac_collector.controller.ndo import CiscoClientNDO
-from nac_collector.controller.sdwan import CiscoClientSDWAN
-from nac_collector.device.iosxe import CiscoClientIOSXE
-from nac_collector.device.iosxr import CiscoClientIOSXR
-from nac_collector.device.nxos import CiscoClientNXOS
+from nac_collector.constants import MAX_CONCURRENCY, MAX_RETRIES, RETRY_AFTER, TIMEOUT
+from nac_collector.controller.base import HTTP2_AVAILABLE, CiscoClientController
+from nac_collector.controller.results import ResultStore
 from nac_collector.device_inventory import load_devices_from_file
 from nac_collector.endpoint_resolver import EndpointResolver
+from nac_collector.metrics import MetricsRecorder
+from nac_collector.profiling import Profiler
+from nac_collector.recording import INDEX_FILENAME, Recording
+from nac_collector.registry import CLIENTS, load_client, solutions
+from nac_collector.tracing import TraceFormat
 
 logger = logging.getLogger("main")
 error_occurred = False
@@ -48,7 +47,7 @@ class ErrorTrackingHandler(logging.Handler):
 
 
 class Solution(str, Enum):
-    """Supported solutions."""
+    """Built-in solutions; more are added by plugins, see registry.solutions()."""
 
     SDWAN = "SDWAN"
     ISE = "ISE"
@@ -63,6 +62,69 @@ class Solution(str, Enum):
     NXOS = "NXOS"
 
 
+def parse_solution(value: str) -> str:
+    """
+    Validate the --solution option against the built-in and plugin solutions.
+
+    Parameters:
+        value (str): Solution name, in any case.
+
+    Returns:
+        str: The solution name in upper case.
+    """
+    solution = value.upper()
+    if solution not in solutions():
+        raise typer.BadParameter(
+            f"'{value}' is not one of {', '.join(map(repr, solutions()))}."
+        )
+    return solution
+
+
+def parse_client_options(values: list[str], declared: dict[str, Any]) -> dict[str, Any]:
+    """
+    Parse --client-option KEY=VALUE pairs against the options a client declares.
+
+    Values are converted to the type of the declared default when it is a bool,
+    int or float.
+
+    Parameters:
+        values (list[str]): The KEY=VALUE pairs.
+        declared (dict): CLI_OPTIONS of the client, option name -> default.
+
+    Returns:
+        dict: Option name -> value.
+
+    Raises:
+        typer.BadParameter: A pair is malformed, names an option the client does
+            not declare, or has a value of the wrong type.
+    """
+    options: dict[str, Any] = {}
+    for pair in values:
+        name, separator, value = pair.partition("=")
+        if not separator:
+            raise typer.BadParameter(f"'{pair}' is not KEY=VALUE")
+        if name not in declared:
+            supported = ", ".join(declared) or "none"
+            raise typer.BadParameter(
+                f"Unknown client option '{name}' (supported: {supported})"
+            )
+        default = declared[name]
+        try:
+            if isinstance(default, bool):
+                if value.lower() not in ("true", "false", "1", "0", "yes", "no"):
+                    raise ValueError(value)
+                options[name] = value.lower() in ("true", "1", "yes")
+            elif isinstance(default, (int, float)):
+                options[name] = type(default)(value)
+            else:
+                options[name] = value
+        except ValueError:
+            raise typer.BadParameter(
+                f"Client option '{name}' expects {type(default).__name__}, got '{value}'"
+            ) from None
+    return options
+
+
 def configure_logging(level: LogLevel) -> None:
     """Configure logging with Rich handler."""
     global error_occurred
@@ -102,11 +164,15 @@ def version_callback(value: bool) -> None:
 
 def main(
     solution: Annotated[
-        Solution,
+        str,
         typer.Option(
             "-s",
             "--solution",
-            help="Choose a solution",
+            parser=parse_solution,
+            metavar="SOLUTION",
+            # Plugins are only looked up when the option is validated, so that
+            # starting the CLI does not scan the installed entry points
+            help=f"Choose a solution: {', '.join(CLIENTS)}, or one added by a plugin",
         ),
     ],
     username: Annotated[
@@ -171,10 +237,150 @@ def main(
         int,
         typer.Option("-t", "--timeout", help="Request timeout in seconds"),
     ] = TIMEOUT,
+    max_concurrency: Annotated[
+        int,
+        typer.Option(
+            "-c",
+            "--max-concurrency",
+            min=1,
+            help="Maximum number of concurrent requests per controller (1 disables concurrent fetching)",
+        ),
+    ] = MAX_CONCURRENCY,
+    rate_limit: Annotated[
+        float | None,
+        typer.Option(
+            "--rate-limit",
+            min=0,
+            help="Client-side request rate limit in requests per second (overrides the solution default, 0 disables)",
+        ),
+    ] = None,
+    cache_dir: Annotated[
+        str | None,
+        typer.Option(
+            "--cache-dir",
+            help="Directory of the HTTP response cache; cached responses are revalidated with conditional GETs on later runs",
+        ),
+    ] = None,
+    http2: Annotated[
+        bool,
+        typer.Option(
+            "--http2",
+            help="Negotiate HTTP/2 with the controller, multiplexing concurrent requests on one connection (requires httpx[http2])",
+        ),
+    ] = False,
+    keepalive: Annotated[
+        bool,
+        typer.Option(
+            "--keepalive/--no-keepalive",
+            help="Keep idle connections open for reuse",
+        ),
+    ] = True,
+    max_connections: Annotated[
+        int | None,
+        typer.Option(
+            "--max-connections",
+            min=1,
+            help="Connection pool size per controller (defaults to --max-concurrency)",
+        ),
+    ] = None,
+    max_keepalive_connections: Annotated[
+        int | None,
+        typer.Option(
+            "--max-keepalive",
+            min=0,
+            help="Idle connections kept open per controller (defaults to --max-connections)",
+        ),
+    ] = None,
+    since: Annotated[
+        str | None,
+        typer.Option(
+            "--since",
+            help="Archive of a previous run: collect incrementally, reusing the children of objects unchanged since then, and add a delta.json change summary",
+        ),
+    ] = None,
+    metrics_prometheus: Annotated[
+        str | None,
+        typer.Option(
+            "--metrics-prometheus",
+            help="Also write the request metrics to this Prometheus textfile (e.g. for the node_exporter textfile collector)",
+        ),
+    ] = None,
+    trace: Annotated[
+        str | None,
+        typer.Option(
+            "--trace",
+            help="Write a span per endpoint, child fan-out, pagination and HTTP request to this file",
+        ),
+    ] = None,
+    trace_format: Annotated[
+        TraceFormat,
+        typer.Option(
+            "--trace-format",
+            help="Trace file format: Chrome trace events (Perfetto, chrome://tracing) or OTLP/JSON",
+        ),
+    ] = TraceFormat.CHROME,
+    profile: Annotated[
+        bool,
+        typer.Option(
+            "--profile",
+            help="Sample the collector's CPU time and trace its allocations per endpoint; writes <solution>-profile.folded (flamegraph) and <solution>-profile.txt next to the output archive",
+        ),
+    ] = False,
+    record: Annotated[
+        str | None,
+        typer.Option(
+            "--record",
+            help="Save every request/response pair (and SSH command output) to this directory for --replay; responses, session tokens included, are stored as received",
+        ),
+    ] = None,
+    replay: Annotated[
+        str | None,
+        typer.Option(
+            "--replay",
+            help="Serve the requests from a directory saved with --record instead of the network",
+        ),
+    ] = None,
+    memory_budget: Annotated[
+        int | None,
+        typer.Option(
+            "--memory-budget",
+            min=1,
+            help="Keep at most this many MiB of collected data in memory, spilling the rest to temporary files until the archive is written (controller-based solutions)",
+        ),
+    ] = None,
+    client_option: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--client-option",
+            help="KEY=VALUE option of the client, for options it declares in CLI_OPTIONS (e.g. collector plugins); repeatable",
+        ),
+    ] = None,
     output: Annotated[
         str | None,
         typer.Option("-o", "--output", help="Path to the output ZIP archive"),
     ] = None,
+    archive_workers: Annotated[
+        int,
+        typer.Option(
+            "--archive-workers",
+            min=1,
+            help="Threads encoding the archive members of sharded and device archives ahead of compression, or compressing zstd archives; 1 streams each member through zipfile. The single layout is always written serially",
+        ),
+    ] = 1,
+    layout: Annotated[
+        ArchiveLayout,
+        typer.Option(
+            "--layout",
+            help="Archive layout: a single <solution>.json, or one member per endpoint plus manifest.json",
+        ),
+    ] = ArchiveLayout.SINGLE,
+    compression: Annotated[
+        Compression,
+        typer.Option(
+            "--compression",
+            help="Archive compression codec; zstd writes a .tar.zst archive (requires the zstandard package)",
+        ),
+    ] = Compression.DEFLATE,
     devices_file: Annotated[
         str | None,
         typer.Option(
@@ -197,6 +403,9 @@ def main(
 
     configure_logging(verbosity)
 
+    # Also accepts Solution members when called directly
+    solution = parse_solution(solution)
+
     # Define device-based solutions
     DEVICE_BASED_SOLUTIONS = [Solution.IOSXE, Solution.IOSXR, Solution.NXOS]
 
@@ -207,47 +416,110 @@ def main(
         )
         raise typer.Exit(1)
 
-    output_file = output or "nac-collector.zip"
+    if compression == Compression.ZSTD and not ZSTD_AVAILABLE:
+        console.print(
+            "[red]--compression zstd requires the zstandard package (pip install nac-collector[zstd])[/red]"
+        )
+        raise typer.Exit(1)
 
-    # Handle device-based solutions
-    if solution in DEVICE_BASED_SOLUTIONS:
-        # Validate devices file is provided
-        if not devices_file:
-            console.print(
-                f"[red]--devices-file is required for {solution.value} solution[/red]"
-            )
-            raise typer.Exit(1)
+    if http2 and not HTTP2_AVAILABLE:
+        console.print(
+            "[red]--http2 requires the h2 package (pip install nac-collector[http2])[/red]"
+        )
+        raise typer.Exit(1)
 
-        # Load devices
-        devices = load_devices_from_file(devices_file)
-        if not devices:
-            console.print(
-                "[red]Failed to load devices from file or no devices found[/red]"
-            )
-            raise typer.Exit(1)
+    if since is not None and not os.path.isfile(since):
+        console.print(f"[red]--since archive not found: {since}[/red]")
+        raise typer.Exit(1)
 
-        # Device-based solutions don't need endpoints file
-        if endpoints_file:
-            console.print(
-                f"[yellow]Warning: --endpoints-file is ignored for {solution.value} "
-                f"(device-based solutions use built-in endpoints)[/yellow]"
-            )
+    if record and replay:
+        console.print("[red]--record and --replay cannot be used together[/red]")
+        raise typer.Exit(1)
 
-        # Create appropriate client based on solution
-        if solution == Solution.IOSXE:
-            iosxe_client = CiscoClientIOSXE(
-                devices=devices,
-                default_username=username or "",
-                default_password=password or "",
-                max_retries=MAX_RETRIES,
-                retry_after=RETRY_AFTER,
-                timeout=timeout,
-                ssl_verify=False,
-            )
-            # Collect from all devices and write to archive
-            iosxe_client.collect_and_write_to_archive(output_file)
-        elif solution == Solution.IOSXR:
-            iosxr_client = CiscoClientIOSXR(
+    if replay is not None and not os.path.isfile(os.path.join(replay, INDEX_FILENAME)):
+        console.print(f"[red]--replay recording not found: {replay}[/red]")
+        raise typer.Exit(1)
+
+    if (record or replay) and solution == Solution.MERAKI:
+        console.print(
+            "[red]--record and --replay are not supported with MERAKI (requests are sent by the Meraki SDK)[/red]"
+        )
+        raise typer.Exit(1)
+
+    recording: Recording | None = None
+    if record:
+        recording = Recording(record)
+    elif replay:
+        recording = Recording(replay, replay=True)
+
+    budget_bytes = memory_budget * 1024 * 1024 if memory_budget else None
+
+    profiler: Profiler | None = None
+    if profile:
+        profiler = Profiler()
+        profiler.start()
+
+    output_file = output or (
+        "nac-collector.tar.zst"
+        if compression == Compression.ZSTD
+        else "nac-collector.zip"
+    )
+
+    try:
+        # Request metrics of the client that ran, for the Prometheus export
+        metrics: MetricsRecorder | None = None
+
+        # Handle device-based solutions
+        if solution in DEVICE_BASED_SOLUTIONS:
+            # Validate devices file is provided
+            if not devices_file:
+                console.print(
+                    f"[red]--devices-file is required for {solution} solution[/red]"
+                )
+                raise typer.Exit(1)
+
+            # Load devices
+            devices = load_devices_from_file(devices_file)
+            if not devices:
+                console.print(
+                    "[red]Failed to load devices from file or no devices found[/red]"
+                )
+                raise typer.Exit(1)
+
+            if trace:
+                console.print(
+                    f"[yellow]Warning: --trace is ignored for {solution} "
+                    f"(only controller-based solutions are traced)[/yellow]"
+                )
+
+            if memory_budget:
+                console.print(
+                    f"[yellow]Warning: --memory-budget is ignored for {solution} "
+                    f"(device-based solutions write each device as it is collected)[/yellow]"
+                )
+
+            if client_option:
+                console.print(
+                    f"[yellow]Warning: --client-option is ignored for {solution} "
+                    f"(device-based solutions take no client options)[/yellow]"
+                )
+
+            if since:
+                console.print(
+                    f"[yellow]Warning: --since is ignored for {solution} "
+                    f"(device-based solutions are always collected in full)[/yellow]"
+                )
+
+            # Device-based solutions don't need endpoints file
+            if endpoints_file:
+                console.print(
+                    f"[yellow]Warning: --endpoints-file is ignored for {solution} "
+                    f"(device-based solutions use built-in endpoints)[/yellow]"
+                )
+
+            # Create the client of the solution, collect from all devices and write to
+            # the archive
+            device_client = load_client(solution)(
                 devices=devices,
                 default_username=username or "",
                 default_password=password or "",
@@ -255,149 +527,157 @@ def main(
                 retry_after=RETRY_AFTER,
                 timeout=timeout,
                 ssl_verify=False,
+                recording=recording,
+                archive_workers=archive_workers,
             )
-            # Collect from all devices and write to archive
-            iosxr_client.collect_and_write_to_archive(output_file)
-        elif solution == Solution.NXOS:
-            nxos_client = CiscoClientNXOS(
-                devices=devices,
-                default_username=username or "",
-                default_password=password or "",
-                max_retries=MAX_RETRIES,
-                retry_after=RETRY_AFTER,
-                timeout=timeout,
-                ssl_verify=False,
+            device_client.collect_and_write_to_archive(output_file, compression)
+            metrics = device_client.metrics
+
+        # Handle existing controller-based solutions
+        else:
+            # Resolve endpoint data using centralized resolver
+            endpoints_data = EndpointResolver.resolve_endpoint_data(
+                solution=solution.lower(),
+                explicit_file=endpoints_file,
+                use_git_provider=fetch_latest,
             )
-            # Collect from all devices and write to archive
-            nxos_client.collect_and_write_to_archive(output_file)
 
-    # Handle existing controller-based solutions
-    else:
-        # Resolve endpoint data using centralized resolver
-        endpoints_data = EndpointResolver.resolve_endpoint_data(
-            solution=solution.value.lower(),
-            explicit_file=endpoints_file,
-            use_git_provider=fetch_latest,
-        )
+            if endpoints_data is None:
+                console.print(
+                    f"[red]No endpoint data found for solution: {solution}[/red]"
+                )
+                console.print("[yellow]Available options:[/yellow]")
+                console.print("1. Use --endpoints-file to specify a custom file")
+                console.print("2. Use --fetch-latest to fetch from upstream sources")
+                console.print("3. Ensure packaged resources are available")
+                raise typer.Exit(1)
 
-        if endpoints_data is None:
-            console.print(
-                f"[red]No endpoint data found for solution: {solution.value}[/red]"
-            )
-            console.print("[yellow]Available options:[/yellow]")
-            console.print("1. Use --endpoints-file to specify a custom file")
-            console.print("2. Use --fetch-latest to fetch from upstream sources")
-            console.print("3. Ensure packaged resources are available")
-            raise typer.Exit(1)
-
-        cisco_client_class: type[CiscoClientController] | None = None
-        if solution == Solution.SDWAN:
-            cisco_client_class = CiscoClientSDWAN
-        elif solution == Solution.ISE:
-            cisco_client_class = CiscoClientISE
-        elif solution == Solution.NDO:
-            cisco_client_class = CiscoClientNDO
-        elif solution == Solution.FMC:
-            cisco_client_class = CiscoClientFMC
-        elif solution == Solution.CDFMC:
-            cisco_client_class = CiscoClientFMC
-        elif solution == Solution.CATALYSTCENTER:
-            cisco_client_class = CiscoClientCATALYSTCENTER
-        elif solution == Solution.MERAKI:
-            cisco_client_class = CiscoClientMERAKI
-        elif solution == Solution.NDFC:
-            cisco_client_class = CiscoClientNDFC
-
-        # Validate that api_token is only used with SDWAN
-        if api_token and solution != Solution.SDWAN:
-            console.print(
-                "[red]--api-token is only supported for SDWAN solution (20.18+)[/red]"
-            )
-            raise typer.Exit(1)
-
-        # Validate required credentials for controller-based solutions
-        # Either api_token (SDWAN only) OR (username AND password) must be provided
-        if not api_token and not (username and password):
-            console.print(
-                "[red]Either --api-token (NAC_API_TOKEN) [SDWAN 20.18+ only] or both --username (NAC_USERNAME) "
-                "and --password (NAC_PASSWORD) must be provided[/red]"
-            )
-            raise typer.Exit(1)
-        if not url:
-            console.print("[red]URL is required for controller-based solutions[/red]")
-            raise typer.Exit(1)
-
-        if cisco_client_class:
-            client: CiscoClientController
-            if solution == Solution.NDO:
-                # For NDO, handle domain parameter directly (default to "DefaultAuth" if not provided)
-                effective_domain = domain if domain is not None else "DefaultAuth"
-                client = CiscoClientNDO(
-                    username=username or "",
-                    password=password or "",
-                    domain=effective_domain,
-                    base_url=url,
-                    max_retries=MAX_RETRIES,
-                    retry_after=RETRY_AFTER,
-                    timeout=timeout,
-                    ssl_verify=False,
+            cisco_client_class = load_client(solution)
+
+            # Validate that api_token is only used by clients supporting it (SDWAN)
+            if api_token and "api_token" not in cisco_client_class.CLI_OPTIONS:
+                console.print(
+                    f"[red]--api-token is not supported for {solution} (only for SDWAN 20.18+)[/red]"
                 )
-            if solution == Solution.CDFMC:
-                # For CDFMC, use FMC client but set cdfmc=True to adjust behavior
-                # Username is not used for CDFMC authentication
-                client = CiscoClientFMC(
-                    username="ignored_for_cdfmc",
-                    password=password or "",
-                    base_url=url,
-                    max_retries=MAX_RETRIES,
-                    retry_after=RETRY_AFTER,
-                    timeout=timeout,
-                    ssl_verify=False,
-                    cdfmc=True,
+                raise typer.Exit(1)
+
+            # Validate required credentials for controller-based solutions
+            # Either api_token (SDWAN only) OR (username AND password) must be provided
+            if not api_token and not (username and password):
+                console.print(
+                    "[red]Either --api-token (NAC_API_TOKEN) [SDWAN 20.18+ only] or both --username (NAC_USERNAME) "
+                    "and --password (NAC_PASSWORD) must be provided[/red]"
                 )
-            elif solution == Solution.SDWAN:
-                # SDWAN supports api_token authentication (20.18+)
-                client = CiscoClientSDWAN(
-                    username=username or "",
-                    password=password or "",
-                    base_url=url,
-                    max_retries=MAX_RETRIES,
-                    retry_after=RETRY_AFTER,
-                    timeout=timeout,
-                    ssl_verify=False,
-                    api_token=api_token or "",
+                raise typer.Exit(1)
+            if not url:
+                console.print(
+                    "[red]URL is required for controller-based solutions[/red]"
                 )
-            elif solution == Solution.NDFC:
-                client = CiscoClientNDFC(
-                    username=username,
-                    password=password,
-                    base_url=url,
-                    max_retries=MAX_RETRIES,
-                    retry_after=RETRY_AFTER,
-                    timeout=timeout,
-                    ssl_verify=False,
-                    domain=domain or "local",
+                raise typer.Exit(1)
+
+            # Options declared by the client besides the common ones (e.g. the NDO
+            # domain), set to their defaults when not given, or empty for those in
+            # CLI_EMPTY_AS_DEFAULT
+            try:
+                given = parse_client_options(
+                    client_option or [], cisco_client_class.CLI_OPTIONS
                 )
-            else:
-                # For other solutions, no api_token support
-                client = cisco_client_class(
-                    username=username or "",
-                    password=password or "",
-                    base_url=url,
-                    max_retries=MAX_RETRIES,
-                    retry_after=RETRY_AFTER,
-                    timeout=timeout,
-                    ssl_verify=False,
+            except typer.BadParameter as e:
+                console.print(f"[red]--client-option: {e}[/red]")
+                raise typer.Exit(1) from None
+            given.setdefault("domain", domain)
+            given.setdefault("api_token", api_token)
+            client_options = {
+                option: default
+                if given.get(option) is None
+                or (
+                    option in cisco_client_class.CLI_EMPTY_AS_DEFAULT
+                    and not given[option]
                 )
+                else given[option]
+                for option, default in cisco_client_class.CLI_OPTIONS.items()
+            }
+            client: CiscoClientController = cisco_client_class(
+                username=username or "",
+                password=password or "",
+                base_url=url,
+                max_retries=MAX_RETRIES,
+                retry_after=RETRY_AFTER,
+                timeout=timeout,
+                ssl_verify=False,
+                max_concurrency=max_concurrency,
+                rate_limit=rate_limit,
+                cache_dir=cache_dir,
+                since=since,
+                http2=http2,
+                keepalive=keepalive,
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                trace=trace is not None,
+                recording=recording,
+                memory_budget=budget_bytes,
+                archive_workers=archive_workers,
+                **client_options,
+            )
 
-            # Authenticate
-            if not client.authenticate():
-                console.print("[red]Authentication failed. Exiting...[/red]")
-                raise typer.Exit(1)
+            if profiler is not None:
+                client.tracer.add_listener(profiler)
+
+            final_dict: MutableMapping[str, Any] | None = None
+            try:
+                with client.tracer.span(solution.lower(), "collection"):
+                    # Authenticate
+                    with client.tracer.span("authenticate", "authentication"):
+                        authenticated = client.authenticate()
+                    if not authenticated:
+                        console.print("[red]Authentication failed. Exiting...[/red]")
+                        raise typer.Exit(1)
+
+                    # Use resolved endpoint data
+                    final_dict = client.get_from_endpoints_data(endpoints_data)
+                    with client.tracer.span("write_to_archive", "archive"):
+                        client.write_to_archive(
+                            final_dict,
+                            output_file,
+                            solution.lower(),
+                            layout,
+                            compression,
+                        )
+            finally:
+                # Event loops and connection pools kept for the whole run
+                client.close()
+                if isinstance(final_dict, ResultStore):
+                    logger.debug(f"Result store: {final_dict.snapshot()}")
+                    final_dict.close()
+            if trace:
+                client.tracer.write(trace, trace_format)
+                critical_path = " > ".join(
+                    f"{span.name} ({span.duration / 1e9:.2f}s)"
+                    for span in client.tracer.critical_path()
+                )
+                logger.info(f"Critical path: {critical_path}")
+            for host, stats in client.limiter_stats().items():
+                logger.debug(f"Concurrency limiter for {host}: {stats}")
+            for prefix, stats in client.rate_limiter_stats().items():
+                logger.debug(f"Rate limiter for '{prefix or '/'}': {stats}")
+            cache_stats = client.cache_stats()
+            if cache_stats is not None:
+                logger.debug(f"Response cache: {cache_stats}")
+            metrics = client.metrics
+
+        if recording is not None:
+            recording.close()
+            logger.info(f"Recording {record or replay}: {recording.snapshot()}")
+    finally:
+        # Written even when the collection failed, when the profile is most needed
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(
+                os.path.dirname(os.path.abspath(output_file)), solution.lower()
+            )
 
-            # Use resolved endpoint data
-            final_dict = client.get_from_endpoints_data(endpoints_data)
-            client.write_to_archive(final_dict, output_file, solution.value.lower())
+    if metrics_prometheus and metrics is not None:
+        metrics.write_prometheus(metrics_prometheus, solution.lower())
 
     # Record the stop time
     stop_time = time.time()
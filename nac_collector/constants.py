@@ -12,9 +12,55 @@ GIT_TMP = Path("./tmp")
 MAX_RETRIES = 5
 RETRY_AFTER = 60
 TIMEOUT = 30
+# Retry policy: jittered exponential backoff bounds in seconds, and the number
+# of retries allowed across a whole run before failing fast
+RETRY_BACKOFF_BASE = 1.0
+RETRY_BACKOFF_MAX = 30.0
+RETRY_BUDGET = 100
+# Maximum number of requests kept in flight by the asynchronous engine
+MAX_CONCURRENCY = 10
+# Number of independent endpoints collected in parallel by the endpoint scheduler
+# (capped by --max-concurrency)
+ENDPOINT_WORKERS = 4
+# Adaptive (AIMD) concurrency limiter: starting window, multiplicative decrease
+# applied on 429/503/timeouts, and the smoothed/baseline latency ratio treated
+# as congestion
+ADAPTIVE_INITIAL_LIMIT = 4
+ADAPTIVE_DECREASE_FACTOR = 0.5
+ADAPTIVE_LATENCY_TOLERANCE = 2.0
+# Seconds an idle keep-alive connection stays in the pool
+HTTP_KEEPALIVE_EXPIRY = 5.0
+# Upper bound in bytes of the on-disk HTTP response cache (--cache-dir)
+HTTP_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# Seconds between two stack samples of the profiler (--profile)
+PROFILE_INTERVAL = 0.005
+
+# Upper bounds in seconds of the request latency histogram buckets (metrics.json and
+# the Prometheus textfile export)
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
 
 # ISE-specific constants
 # ISE ERS API pagination size parameter
 # Using a page size of 100 reduces API calls significantly for large deployments
 # (e.g., from 500+ to 100 calls for 10,000 endpoints vs default size of 20)
 ISE_ERS_PAGE_SIZE = 100
+
+# Client-side request rate limits in requests per second, RATE_LIMIT_MARGIN of the
+# limits published for each controller: its window is not aligned with ours, and
+# other API clients may use the same allowance
+RATE_LIMIT_MARGIN = 0.9
+# FMC allows 120 requests per minute per client
+FMC_RATE_LIMIT = 120 / 60 * RATE_LIMIT_MARGIN
+# Meraki allows 10 requests per second per organization
+MERAKI_RATE_LIMIT = 10.0 * RATE_LIMIT_MARGIN
+# Catalyst Center limits the rate-limited Intent APIs to 100 requests per minute
+# each, so every API gets a bucket of its own; other APIs are not paced
+CATALYSTCENTER_API_RATE_LIMIT = 100 / 60 * RATE_LIMIT_MARGIN
+CATALYSTCENTER_RATE_LIMITS = {
+    "/dna/intent/api/v1/network-device": CATALYSTCENTER_API_RATE_LIMIT,
+    "/dna/intent/api/v1/device-detail": CATALYSTCENTER_API_RATE_LIMIT,
+    "/dna/intent/api/v1/sites": CATALYSTCENTER_API_RATE_LIMIT,
+    "/dna/intent/api/v2/site": CATALYSTCENTER_API_RATE_LIMIT,
+    "/dna/intent/api/v1/tag": CATALYSTCENTER_API_RATE_LIMIT,
+}
@@ -1,12 +1,94 @@
-import json
+import asyncio
+import functools
+import inspect
 import logging
+import ssl
+import threading
 import time
-import zipfile
 from abc import ABC, abstractmethod
-from typing import Any
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    MutableMapping,
+)
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import httpx
-from ruamel.yaml import YAML
+
+from nac_collector.archive import (
+    MANIFEST_FILENAME,
+    ArchiveLayout,
+    ArchiveWriter,
+    Compression,
+    ShardedArchiveWriter,
+)
+from nac_collector.constants import (
+    ENDPOINT_WORKERS,
+    HTTP_KEEPALIVE_EXPIRY,
+    MAX_CONCURRENCY,
+    RETRY_BUDGET,
+)
+from nac_collector.controller.cache import ResponseCache
+from nac_collector.controller.delta import (
+    DELTA_FILENAME,
+    DeltaTracker,
+    change_marker,
+    item_key,
+)
+from nac_collector.controller.limiter import AdaptiveConcurrencyLimiter, TokenBucket
+from nac_collector.controller.results import ResultStore
+from nac_collector.controller.scheduler import EndpointScheduler
+from nac_collector.json_codec import response_json
+from nac_collector.metrics import METRICS_FILENAME, MetricsRecorder, endpoint_label
+from nac_collector.recording import Recording
+from nac_collector.retry import RetryBudget, RetryPolicy, classify_error
+from nac_collector.tracing import ENDPOINT_CATEGORY, HTTP_CATEGORY, Tracer
+
+if TYPE_CHECKING:
+    from ruamel.yaml import YAML
+
+try:
+    import h2
+except ImportError:
+    h2 = None  # type: ignore[assignment]
+
+# HTTP/2 support in httpx requires the h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = h2 is not None
+
+T = TypeVar("T")
+
+
+class _Next:
+    """What a request loop does after an attempt, see _after_error() and _after_response()."""
+
+    __slots__ = ("retry", "response", "delay", "reauthenticate")
+
+    def __init__(
+        self,
+        retry: bool,
+        response: httpx.Response | None = None,
+        delay: float = 0.0,
+        reauthenticate: bool = False,
+    ) -> None:
+        # Send the request again, after waiting delay seconds and logging in again if
+        # reauthenticate; otherwise return response
+        self.retry = retry
+        self.response = response
+        self.delay = delay
+        self.reauthenticate = reauthenticate
+
+
+def _cancel_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """Cancel the tasks left on an event loop and wait for them, as asyncio.run() does."""
+    tasks = asyncio.all_tasks(loop)
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
 
 
 class CiscoClientController(ABC):
@@ -19,11 +101,60 @@ class CiscoClientController(ABC):
         password (str): The password for authentication.
         base_url (str): The base URL of the API endpoint.
         ssl_verify (bool, optional): Whether to verify SSL certificates for HTTPS requests. Defaults to False.
-        max_retries (int): The maximum number of times to retry the request if the status code is 429.
-        retry_after (int): The number of seconds to wait before retrying the request if the status code is 429.
+        max_retries (int): The maximum number of attempts per request.
+        retry_after (int): The number of seconds to wait before retrying the request if the status code is 429
+            and the response carries no Retry-After header.
         timeout (int): The number of seconds to wait for the server to send data before giving up.
+        max_concurrency (int, optional): The maximum number of requests kept in flight per host by
+            the asynchronous engine. The actual window adapts below this ceiling (see
+            AdaptiveConcurrencyLimiter). A value of 1 disables concurrent fan-out.
+            Defaults to MAX_CONCURRENCY.
+        rate_limit (float, optional): Client-side rate limit in requests per second for the whole
+            controller, overriding the solution default in RATE_LIMITS. 0 disables client-side
+            rate limiting. Defaults to None (use RATE_LIMITS).
+        retry_budget (int, optional): Number of retries allowed across all requests of the run
+            before failing fast. Defaults to RETRY_BUDGET.
+        cache_dir (str, optional): Directory of the on-disk response cache. GET requests for
+            cached URLs are sent with their validators and 304 responses are served from
+            the cache. Defaults to None (no cache).
+        since (str, optional): Archive of a previous run to collect incrementally against.
+            Children of parents whose change marker is unchanged are carried forward from it
+            instead of being fetched, and the archive gains a delta.json summary (see
+            DeltaTracker). Defaults to None (full collection).
+        http2 (bool, optional): Negotiate HTTP/2, multiplexing concurrent requests on one
+            connection. Requires the h2 package; falls back to HTTP/1.1 without it.
+            Defaults to False.
+        keepalive (bool, optional): Keep idle connections open for reuse. Defaults to True.
+        max_connections (int, optional): Connection pool size. Defaults to None
+            (max_concurrency).
+        max_keepalive_connections (int, optional): Idle connections kept open. Defaults to
+            None (max_connections).
+        trace (bool, optional): Record a span per endpoint, child fan-out, pagination and
+            HTTP request in self.tracer. Defaults to False.
+        recording (Recording, optional): Record every request and response to it, or
+            replay them from it without touching the network. Defaults to None.
+        memory_budget (int, optional): Bytes of collected data kept in memory; endpoints
+            collected beyond it are spilled to temporary files until the archive is
+            written (see ResultStore). Defaults to None (everything kept in memory).
+        archive_workers (int, optional): Threads encoding the members of a sharded
+            archive ahead of writing, see ArchiveWriter. Defaults to 1 (written by
+            zipfile as they are encoded).
     """
 
+    # Client-side rate limits in requests per second, keyed by URL path prefix.
+    # The empty prefix applies to every request; the longest matching prefix wins.
+    RATE_LIMITS: dict[str, float] = {}
+    # Page size of endpoints paginated with the "offset" parameter
+    PAGINATION_LIMIT = 500
+    # Endpoint names mapped to the endpoints whose data they need, see collect_endpoints()
+    ENDPOINT_DEPENDENCIES: dict[str, list[str]] = {}
+    # CLI options passed to the constructor besides the common ones, with the value
+    # used when the option is not given, e.g. {"domain": "local"}
+    CLI_OPTIONS: dict[str, Any] = {}
+    # CLI_OPTIONS given an empty value that still get their default, e.g. an empty
+    # --domain for a client that cannot log in to an unnamed domain
+    CLI_EMPTY_AS_DEFAULT: frozenset[str] = frozenset()
+
     def __init__(
         self,
         username: str,
@@ -33,18 +164,78 @@ class CiscoClientController(ABC):
         retry_after: int,
         timeout: int,
         ssl_verify: bool = False,
+        max_concurrency: int = MAX_CONCURRENCY,
+        rate_limit: float | None = None,
+        retry_budget: int = RETRY_BUDGET,
+        cache_dir: str | None = None,
+        since: str | None = None,
+        http2: bool = False,
+        keepalive: bool = True,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        trace: bool = False,
+        recording: Recording | None = None,
+        memory_budget: int | None = None,
+        archive_workers: int = 1,
     ) -> None:
         self.username = username
         self.password = password
         self.base_url = base_url
         self.max_retries = max_retries
         self.retry_after = retry_after
+        self.retry_policy = RetryPolicy(max_retries, budget=RetryBudget(retry_budget))
         self.timeout = timeout
         self.ssl_verify = ssl_verify
+        self.max_concurrency = max(1, max_concurrency)
         self.client: httpx.Client | None = None
-        # Create an instance of the YAML class
-        self.yaml = YAML(typ="safe", pure=True)
+        # Clients replaced by a new login; closed by close() because other threads
+        # may still be sending through them
+        self._replaced_clients: list[httpx.Client] = []
+        # Serializes re-authentication, see _reauthenticate()
+        self._auth_lock = threading.Lock()
+        self._last_login: float | None = None
+        # Asynchronous engine state, only populated inside async_session().
+        # Kept per thread because every thread runs its own event loop.
+        self._async_state = threading.local()
+        # Event loops of run_async() not running a call, each with the asynchronous
+        # client kept open on it; taken by the next call from any thread and closed
+        # by close(). There are never more than the most calls running at once.
+        self._idle_loops: list[
+            tuple[asyncio.AbstractEventLoop, httpx.AsyncClient | None]
+        ] = []
+        self._idle_loops_lock = threading.Lock()
+        # Adaptive concurrency limiters, one per host, shared by all threads
+        self.limiters: dict[str, AdaptiveConcurrencyLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        # Token buckets pacing requests, one per RATE_LIMITS prefix
+        self.rate_limits = dict(self.RATE_LIMITS)
+        if rate_limit is not None:
+            self.rate_limits = {"": rate_limit} if rate_limit > 0 else {}
+        self.rate_buckets: dict[str, TokenBucket] = {}
+        self.cache = (
+            ResponseCache(cache_dir, scope=f"{username}@{base_url}")
+            if cache_dir
+            else None
+        )
+        self.delta = DeltaTracker.from_archive(since) if since else None
+        # Request metrics, written to the archive as metrics.json
+        self.metrics = MetricsRecorder()
+        # Spans of the endpoint -> children -> request call tree, see Tracer
+        self.tracer = Tracer(enabled=trace)
+        self.recording = recording
+        self.memory_budget = memory_budget
+        self.archive_workers = archive_workers
         self.logger = logging.getLogger(__name__)
+        if http2 and not HTTP2_AVAILABLE:
+            self.logger.warning(
+                "HTTP/2 requires the h2 package (pip install httpx[http2]), using HTTP/1.1."
+            )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.keepalive = keepalive
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        # Built on first use and shared by every client, so certificates are loaded once
+        self._ssl_context: ssl.SSLContext | None = None
 
     @abstractmethod
     def authenticate(self) -> bool:
@@ -61,7 +252,7 @@ class CiscoClientController(ABC):
     @abstractmethod
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Abstract method to get data from endpoints provided as a data structure.
 
@@ -71,12 +262,24 @@ class CiscoClientController(ABC):
             endpoints_data (list[dict[str, Any]]): List of endpoint definitions with name and endpoint keys.
 
         Returns:
-            This method should return the data obtained from the endpoints.
+            This method should return the data obtained from the endpoints, collected
+            into create_result_store().
 
         Raises:
             NotImplementedError: If this method is not overridden in a concrete subclass.
         """
 
+    def create_result_store(self) -> MutableMapping[str, Any]:
+        """
+        Return the mapping the data of the endpoints is collected into.
+
+        Returns:
+            MutableMapping: A dict, or a ResultStore spilling to disk beyond memory_budget.
+        """
+        if self.memory_budget is None:
+            return {}
+        return ResultStore(self.memory_budget)
+
     def get_request(self, url: str) -> httpx.Response | None:
         """
         Send a GET request to a specific URL and handle a 429 status code.
@@ -88,74 +291,236 @@ class CiscoClientController(ABC):
             response (httpx.Response): The response from the GET request.
         """
         response = None
-        for _ in range(self.max_retries):
+        reauthenticated = False
+        for attempt in range(self.max_retries):
+            # Send a GET request to the URL
+            if self.client is None:
+                self.logger.error("Client not initialized")
+                return None
+            self.throttle(url)
+            sent = time.monotonic()
             try:
-                # Send a GET request to the URL
-                if self.client is None:
-                    self.logger.error("Client not initialized")
-                    return None
-                response = self.client.get(url)
-
-            except httpx.TimeoutException:
-                self.logger.error(
-                    "GET %s timed out after %s seconds.", url, self.timeout
-                )
-                continue
+                response = self._send_get(self.client, url)
             except httpx.TransportError as e:
-                self.logger.error("GET %s transport error (%s), retrying...", url, e)
-                time.sleep(self.retry_after)
-                try:
-                    if not self.authenticate():
-                        self.logger.warning("GET %s re-authentication failed.", url)
-                except httpx.TransportError as auth_err:
-                    self.logger.warning(
-                        "GET %s re-authentication also failed: %s", url, auth_err
-                    )
-                continue
-
-            if response.status_code == 429:
-                # If the status code is 429 (Too Many Requests), wait for a certain amount of time before retrying
-                self.retry_after = int(
-                    response.headers.get("Retry-After", self.retry_after)
-                )  # Default to retry_after if 'Retry-After' header is not present
-                self.logger.info(
-                    "GET %s rate limited. Retrying in %s seconds.",
-                    url,
-                    self.retry_after,
+                after = self._after_error(
+                    "GET", url, attempt, e, response, reauthenticated
                 )
-                time.sleep(self.retry_after)
-
-            elif response.status_code == 401:
-                self.logger.info("token outdated, getting new")
-                self.authenticate()
-
-            elif response.status_code == 200:
-                # If the status code is 200 (OK), return the response
-                return response
-            elif response.status_code == 404:
-                if response.content:
-                    self.logger.debug(
-                        "GET %s returned 404 — resource not available.", url
-                    )
-                else:
-                    self.logger.warning(
-                        "GET %s returned 404 with no body — endpoint may not be"
-                        " supported on this platform version.",
-                        url,
-                    )
-                return None
+                reauthenticated = reauthenticated or after.reauthenticate
             else:
-                # If the status code is neither 429, 200, nor 404, log an error and continue to the next iteration
-                self.logger.error(
-                    "GET %s returned an unexpected status code: %s",
-                    url,
-                    response.status_code,
-                )
-                return None
+                after = self._after_response("GET", url, attempt, response)
+            if not after.retry:
+                return after.response
+            if after.delay:
+                time.sleep(after.delay)
+            if after.reauthenticate:
+                self._reauthenticate("GET", url, sent)
         # If the status code is 429 after max_retries attempts,
         # or if no successful response was received, return the last response
         return response
 
+    def _send_get(self, client: httpx.Client, url: str) -> httpx.Response:
+        """Send a GET request, revalidating the cached copy of the URL if there is one."""
+        if self.cache is None:
+            return self._timed("GET", url, lambda: client.get(url))
+        headers = self.cache.request_headers(url)
+        response = self._timed("GET", url, lambda: client.get(url, headers=headers))
+        resolved = self.cache.resolve(url, response)
+        if resolved is None:
+            response = self._timed("GET", url, lambda: client.get(url))
+            resolved = self.cache.resolve(url, response)
+        return resolved or response
+
+    def _send_post(self, client: httpx.Client, url: str, data: Any) -> httpx.Response:
+        """Send a POST request, recording it in the metrics."""
+        return self._timed("POST", url, lambda: client.post(url, data=data))
+
+    def _timed(
+        self, method: str, url: str, send: Callable[[], httpx.Response]
+    ) -> httpx.Response:
+        """
+        Send one request inside its span, recording it in the metrics.
+
+        The number of requests in flight to the host, from every thread, is governed by
+        its adaptive limiter as in _async_send().
+        """
+        label = endpoint_label(url)
+        limiter = self.get_limiter(url)
+        limiter.acquire_blocking()
+        with self.tracer.span(
+            f"{method} {label}", HTTP_CATEGORY, method=method, url=url
+        ) as span:
+            start = time.monotonic()
+            try:
+                response = self.metrics.time_request(label, send)
+            except httpx.TimeoutException:
+                limiter.release(timed_out=True)
+                raise
+            except BaseException:
+                limiter.release()
+                raise
+            limiter.release(
+                time.monotonic() - start, response.status_code, endpoint=label
+            )
+            span.set("status", response.status_code)
+            return response
+
+    @functools.cached_property
+    def yaml(self) -> "YAML":
+        """Safe, pure-Python YAML parser, created on first use."""
+        # Imported here: YAML files are usually loaded from yaml_cache
+        from ruamel.yaml import YAML
+
+        return YAML(typ="safe", pure=True)
+
+    def cache_stats(self) -> dict[str, Any] | None:
+        """
+        Return the counters of the response cache.
+
+        Returns:
+            dict | None: Cache snapshot, or None if the cache is disabled.
+        """
+        return self.cache.snapshot() if self.cache is not None else None
+
+    @staticmethod
+    def index_entries(
+        entries: list[dict[str, Any]], key: Callable[[dict[str, Any]], Any]
+    ) -> dict[Any, list[dict[str, Any]]]:
+        """
+        Index parent entries by id, so children are attached without scanning the parents.
+
+        Parameters:
+            entries (list[dict]): Parent entries ({"data": ..., "endpoint": ...}).
+            key (Callable): Returns the id of an entry, or None for entries without one.
+
+        Returns:
+            dict: {id: entries carrying it}, in the order of the input.
+        """
+        index: dict[Any, list[dict[str, Any]]] = {}
+        for entry in entries:
+            value = key(entry)
+            if value is not None:
+                index.setdefault(value, []).append(entry)
+        return index
+
+    def fan_out_children(
+        self,
+        index: dict[Any, list[dict[str, Any]]],
+        parent_ids: list[Any],
+        children_endpoint: dict[str, Any],
+        endpoints: list[str],
+        process: Callable[
+            [dict[str, Any], Any, dict[str, Any] | list[Any] | None], Any
+        ],
+        paginated: bool = False,
+    ) -> list[tuple[dict[str, Any], str]]:
+        """
+        Fetch one child endpoint for every parent id and attach the results to the parents.
+
+        Children are fetched concurrently through fetch_many(), within the limits of the
+        asynchronous engine, and attached through the index in constant time each, under
+        entry["children"][children_endpoint["name"]].
+
+        Parameters:
+            index (dict): Parent entries by id, see index_entries().
+            parent_ids (list): Ids of the parents to fetch children for.
+            children_endpoint (dict): Child endpoint definition with a name key.
+            endpoints (list[str]): The child endpoint of every parent id.
+            process (Callable): Turns the child endpoint definition, a parent id and the
+                data fetched for it into the children to attach.
+            paginated (bool): Fetch with fetch_data_pagination().
+
+        Returns:
+            list: (parent entry, child endpoint) for every attachment, in parent id order.
+        """
+        if paginated:
+            children_data = self.fetch_many(endpoints, paginated=True)
+        else:
+            children_data = self.fetch_many(endpoints)
+
+        attached = []
+        for parent_id, endpoint, data in zip(
+            parent_ids, endpoints, children_data, strict=True
+        ):
+            children = process(children_endpoint, parent_id, data)
+            for entry in index.get(parent_id, []):
+                entry.setdefault("children", {})[children_endpoint["name"]] = children
+                attached.append((entry, endpoint))
+        return attached
+
+    def reuse_children(self, endpoint: dict[str, Any], item: dict[str, Any]) -> bool:
+        """
+        Carry the children of an unchanged parent forward from the previous archive.
+
+        Does nothing unless collecting with since. The parent is recorded with its change
+        marker either way, so the next run can compare against it.
+
+        Parameters:
+            endpoint (dict): Parent endpoint definition, with its "children".
+            item (dict): Parent item collected by this run.
+
+        Returns:
+            bool: True if item["children"] was filled from the previous archive and the
+                children need not be fetched.
+        """
+        if self.delta is None:
+            return False
+        key = item_key(item)
+        marker = change_marker(item.get("data"))
+        self.delta.record(endpoint["name"], key, marker, [item])
+        previous = self.delta.lookup(endpoint["name"], key, marker)
+        if not previous:
+            return False
+        children = previous[0].get("children", {})
+        if not all(child["name"] in children for child in endpoint["children"]):
+            return False
+        item["children"] = children
+        return True
+
+    def reuse_details(
+        self, endpoint_name: str, key: str, summary: dict[str, Any]
+    ) -> list[dict[str, Any]] | None:
+        """
+        Return the items collected by the previous run from an unchanged listed object.
+
+        For endpoints listing summaries whose details are fetched one by one, keyed by the
+        detail URL. Details are only reused when the previous archive holds a delta.json
+        index, i.e. from the second incremental run on.
+
+        Parameters:
+            endpoint_name (str): Endpoint the items belong to.
+            key (str): Key of the listed object, e.g. its detail endpoint.
+            summary (dict): The object as listed, carrying its change marker.
+
+        Returns:
+            list | None: Items to carry forward, or None if the details must be fetched.
+        """
+        if self.delta is None:
+            return None
+        marker = change_marker(summary)
+        previous = self.delta.lookup(endpoint_name, key, marker)
+        if previous is not None:
+            self.delta.record(endpoint_name, key, marker, previous)
+        return previous
+
+    def record_details(
+        self,
+        endpoint_name: str,
+        key: str,
+        summary: dict[str, Any],
+        items: list[dict[str, Any]],
+    ) -> None:
+        """
+        Record the items fetched for a listed object, for reuse_details() in the next run.
+
+        Parameters:
+            endpoint_name (str): Endpoint the items belong to.
+            key (str): Key of the listed object, as passed to reuse_details().
+            summary (dict): The object as listed, carrying its change marker.
+            items (list): Items collected from its details.
+        """
+        if self.delta is not None:
+            self.delta.record(endpoint_name, key, change_marker(summary), items)
+
     def post_request(self, url: str, data: Any) -> httpx.Response | None:
         """
         Send a POST request to a specific URL and handle a 429 status code.
@@ -168,56 +533,149 @@ class CiscoClientController(ABC):
             response (httpx.Response): The response from the POST request.
         """
         response = None
-        for _ in range(self.max_retries):
+        reauthenticated = False
+        for attempt in range(self.max_retries):
+            # Send a POST request to the URL
+            if self.client is None:
+                self.logger.error("Client not initialized")
+                return None
+            self.throttle(url)
+            sent = time.monotonic()
             try:
-                # Send a POST request to the URL
-                if self.client is None:
-                    self.logger.error("Client not initialized")
-                    return None
-                response = self.client.post(url, data=data)
-            except httpx.TimeoutException:
-                self.logger.error(
-                    "POST %s timed out after %s seconds.", url, self.timeout
-                )
-                continue
+                response = self._send_post(self.client, url, data)
             except httpx.TransportError as e:
-                self.logger.error("POST %s transport error (%s), retrying...", url, e)
-                time.sleep(self.retry_after)
-                try:
-                    if not self.authenticate():
-                        self.logger.warning("POST %s re-authentication failed.", url)
-                except httpx.TransportError as auth_err:
-                    self.logger.warning(
-                        "POST %s re-authentication also failed: %s", url, auth_err
-                    )
-                continue
-
-            if response.status_code == 429:
-                # If the status code is 429 (Too Many Requests), wait for a certain amount of time before retrying
-                self.retry_after = int(
-                    response.headers.get("Retry-After", self.retry_after)
-                )  # Default to retry_after if 'Retry-After' header is not present
-                self.logger.info(
-                    "POST %s rate limited. Retrying in %s seconds.",
-                    url,
-                    self.retry_after,
+                after = self._after_error(
+                    "POST", url, attempt, e, response, reauthenticated
                 )
-                time.sleep(self.retry_after)
-            elif 200 <= response.status_code < 300:
-                # If the status code is 2XX (success), return the response
-                return response
+                reauthenticated = reauthenticated or after.reauthenticate
             else:
-                # If the status code is neither 429 nor 200, log an error and continue to the next iteration
-                self.logger.error(
-                    "POST %s returned an unexpected status code: %s",
-                    url,
-                    response.status_code,
-                )
-
+                after = self._after_response("POST", url, attempt, response)
+            if not after.retry:
+                return after.response
+            if after.delay:
+                time.sleep(after.delay)
+            if after.reauthenticate:
+                self._reauthenticate("POST", url, sent)
         # If the status code is 429 after max_retries attempts,
         # or if no successful response was received, return the last response
         return response
 
+    def _after_error(
+        self,
+        method: str,
+        url: str,
+        attempt: int,
+        error: httpx.TransportError,
+        response: httpx.Response | None,
+        reauthenticated: bool,
+    ) -> _Next:
+        """
+        Decide what a request loop does after an attempt that raised.
+
+        Timeouts and transport errors are retried as the retry policy allows; POST is not
+        idempotent, so it is only retried if it did not reach the server.
+
+        Parameters:
+            method (str): "GET" or "POST".
+            url (str): Request URL.
+            attempt (int): Index of the attempt that failed.
+            error (httpx.TransportError): The exception raised by the attempt.
+            response (httpx.Response, optional): Response of the previous attempt, returned
+                when giving up.
+            reauthenticated (bool): Whether an earlier transport error of the request
+                already led to a login.
+
+        Returns:
+            _Next: The decision.
+        """
+        kind = classify_error(error)
+        if isinstance(error, httpx.TimeoutException):
+            self.logger.error(
+                "%s %s timed out (%s) after %s seconds.",
+                method,
+                url,
+                kind,
+                self.timeout,
+            )
+        else:
+            self.logger.error(
+                "%s %s transport error (%s), retrying...", method, url, error
+            )
+        delay = self.retry_policy.next_delay(
+            attempt, error, idempotent=method != "POST"
+        )
+        if delay is None:
+            return _Next(False, response)
+        self.metrics.record_retry(endpoint_label(url), kind, delay)
+        # The session may have been dropped with the connection; log in again once per
+        # request rather than on every retry
+        return _Next(
+            True,
+            delay=delay,
+            reauthenticate=not reauthenticated
+            and not isinstance(error, httpx.TimeoutException),
+        )
+
+    def _after_response(
+        self, method: str, url: str, attempt: int, response: httpx.Response
+    ) -> _Next:
+        """
+        Decide what a request loop does with the response of an attempt.
+
+        A 429 is retried after its Retry-After, a 401 after logging in again (GET only).
+        GET returns a 200 response and None for any other status; POST returns a 2XX
+        response and sends again on any other status.
+
+        Parameters:
+            method (str): "GET" or "POST".
+            url (str): Request URL.
+            attempt (int): Index of the attempt.
+            response (httpx.Response): The response of the attempt.
+
+        Returns:
+            _Next: The decision.
+        """
+        status = response.status_code
+        if status == 429:
+            # Honour Retry-After for this request only, the next 429 starts again from
+            # the configured default
+            retry_after = int(response.headers.get("Retry-After", self.retry_after))
+            delay = self.retry_policy.next_delay(attempt, retry_after=retry_after)
+            if delay is None:
+                return _Next(False, response)
+            self.logger.info(
+                "%s %s rate limited. Retrying in %s seconds.", method, url, retry_after
+            )
+            self.metrics.record_retry(endpoint_label(url), "429", delay)
+            return _Next(True, delay=delay)
+        if method == "POST":
+            if 200 <= status < 300:
+                return _Next(False, response)
+            self.logger.error(
+                "POST %s returned an unexpected status code: %s", url, status
+            )
+            return _Next(True)
+        if status == 401:
+            self.logger.info("token outdated, getting new")
+            self.metrics.record_retry(endpoint_label(url), "401")
+            return _Next(True, reauthenticate=True)
+        if status == 200:
+            return _Next(False, response)
+        if status == 404:
+            if response.content:
+                self.logger.debug("GET %s returned 404 — resource not available.", url)
+            else:
+                self.logger.warning(
+                    "GET %s returned 404 with no body — endpoint may not be"
+                    " supported on this platform version.",
+                    url,
+                )
+        else:
+            self.logger.error(
+                "GET %s returned an unexpected status code: %s", url, status
+            )
+        return _Next(False)
+
     def log_response(self, endpoint: str, response: httpx.Response) -> None:
         """
         Logs the response from a GET request.
@@ -239,55 +697,108 @@ class CiscoClientController(ABC):
                 response.status_code,
             )
 
+    def _paginated_endpoint(self, endpoint: str, offset: int) -> str:
+        """Append the offset to the endpoint URL as a query parameter."""
+        connector = "?" if "?" not in endpoint else "&"
+        return f"{endpoint}{connector}offset={offset}"
+
+    def _parse_page(
+        self, response: httpx.Response, paginated_endpoint: str
+    ) -> tuple[list[Any], bool] | None:
+        """
+        Extract the items of one page returned by an offset-paginated endpoint.
+
+        Parameters:
+            response (httpx.Response): The response of the page request.
+            paginated_endpoint (str): Endpoint URL including the offset, for logging.
+
+        Returns:
+            tuple | None: The page items and whether they were wrapped in "response",
+                or None if the body is not valid JSON.
+        """
+        try:
+            # Get the JSON content of the response
+            response_data = response_json(response)
+        except ValueError:
+            self.logger.error(
+                "Failed to decode JSON from response for endpoint: %s",
+                paginated_endpoint,
+            )
+            return None
+
+        in_response = False
+        if "response" in response_data:
+            current_response = response_data.get("response", [])
+            in_response = True
+        else:
+            current_response = response_data
+
+        # Log and collect the current batch of data
+        self.logger.info(
+            "GET %s succeeded with status code %s, fetched %d items",
+            paginated_endpoint,
+            response.status_code,
+            len(current_response),
+        )
+        if type(current_response) is not list:
+            current_response = [current_response]
+        return current_response, in_response
+
+    def pagination_count_endpoint(self, endpoint: str) -> str | None:
+        """
+        Return the endpoint that reports the total number of items of a paginated endpoint.
+
+        Subclasses override this for APIs that offer count endpoints; knowing the total lets
+        fetch_data_pagination() request every remaining page at once.
+
+        Parameters:
+            endpoint (str): Endpoint URL relative to base_url.
+
+        Returns:
+            str | None: Count endpoint relative to base_url, or None if there is none.
+        """
+        return None
+
     def fetch_data_pagination(self, endpoint: str) -> dict[str, Any] | list[Any] | None:
         """
         Fetch all data from a specified endpoint, handling pagination via the "offset" parameter.
 
+        When concurrent fetching is enabled the pages after the first are requested in
+        parallel (see async_fetch_data_pagination()), otherwise one after another.
+
         Parameters:
             endpoint (str): Endpoint URL.
 
         Returns:
             data (dict): The combined JSON content of all responses or None if an error occurred.
         """
-        offset = 1  # Start with an offset of 1
-        limit = 500  # The hidden limit per request
-        all_responses = []  # To collect all response data
+        if self._can_fan_out(2) and self.async_client is None:
+            return self.run_async(lambda: self.async_fetch_data_pagination(endpoint))
 
-        while True:
-            # Append the offset to the endpoint URL as a query parameter
-            connector = "?" if "?" not in endpoint else "&"
-            paginated_endpoint = f"{endpoint}{connector}offset={offset}"
+        with self.tracer.span(endpoint, "pagination") as span:
+            offset = 1  # Start with an offset of 1
+            limit = self.PAGINATION_LIMIT
+            all_responses = []  # To collect all response data
+            in_response = False
+            pages = 0
 
-            # Make the request to the given endpoint
-            response = self.get_request(self.base_url + paginated_endpoint)
-            if not response:
-                self.logger.debug(
-                    "No valid response received for endpoint: %s", paginated_endpoint
-                )
-                return None
+            while True:
+                paginated_endpoint = self._paginated_endpoint(endpoint, offset)
+                pages += 1
 
-            try:
-                # Get the JSON content of the response
-                response_data = response.json()
-                in_response = False
-                if "response" in response_data:
-                    current_response = response_data.get("response", [])
-                    in_response = True
-                else:
-                    current_response = response_data
-
-                # Log and collect the current batch of data
-                self.logger.info(
-                    "GET %s succeeded with status code %s, fetched %d items",
-                    paginated_endpoint,
-                    response.status_code,
-                    len(current_response),
-                )
-                current_response = (
-                    current_response
-                    if type(current_response) is list
-                    else [current_response]
-                )
+                # Make the request to the given endpoint
+                response = self.get_request(self.base_url + paginated_endpoint)
+                if response is None or not response.is_success:
+                    self.logger.debug(
+                        "No valid response received for endpoint: %s",
+                        paginated_endpoint,
+                    )
+                    return None
+
+                page = self._parse_page(response, paginated_endpoint)
+                if page is None:
+                    return None
+                current_response, in_response = page
                 all_responses.extend(current_response)
 
                 # Check if the current response has fewer items than the limit, meaning no more data
@@ -296,16 +807,12 @@ class CiscoClientController(ABC):
 
                 # Increment the offset for the next request
                 offset += limit
-            except ValueError:
-                self.logger.error(
-                    "Failed to decode JSON from response for endpoint: %s",
-                    paginated_endpoint,
-                )
-                return None
 
-        # Combine all the collected data into the desired format
-        data = {"response": all_responses} if in_response else all_responses
-        return data
+            self.metrics.record_pages(endpoint_label(self.base_url + endpoint), pages)
+            span.set("pages", pages)
+            # Combine all the collected data into the desired format
+            data = {"response": all_responses} if in_response else all_responses
+            return data
 
     def fetch_data(self, endpoint: str) -> dict[str, Any] | list[Any] | None:
         """
@@ -319,10 +826,10 @@ class CiscoClientController(ABC):
         """
         # Make the request to the given endpoint
         response = self.get_request(self.base_url + endpoint)
-        if response:
+        if response is not None and response.is_success:
             try:
                 # Get the JSON content of the response
-                data = response.json()
+                data = response_json(response)
                 self.logger.info(
                     "GET %s succeeded with status code %s",
                     endpoint,
@@ -340,22 +847,834 @@ class CiscoClientController(ABC):
             self.logger.debug("No valid response received for endpoint: %s", endpoint)
             return None
 
+    @property
+    def async_client(self) -> httpx.AsyncClient | None:
+        """The asynchronous client of the current thread's async_session(), if any."""
+        client: httpx.AsyncClient | None = getattr(self._async_state, "client", None)
+        return client
+
+    @async_client.setter
+    def async_client(self, client: httpx.AsyncClient | None) -> None:
+        self._async_state.client = client
+
+    def client_options(self) -> dict[str, Any]:
+        """
+        Return the transport options shared by every client of the controller.
+
+        Returns:
+            dict: verify, timeout, http2 and limits keyword arguments for httpx clients.
+        """
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context(verify=self.ssl_verify)
+        max_connections = self.max_connections or self.max_concurrency
+        if not self.keepalive:
+            max_keepalive = 0
+        elif self.max_keepalive_connections is not None:
+            max_keepalive = self.max_keepalive_connections
+        else:
+            max_keepalive = max_connections
+        return {
+            "verify": self._ssl_context,
+            "timeout": self.timeout,
+            "http2": self.http2,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    def create_client(self, **kwargs: Any) -> httpx.Client:
+        """
+        Create the synchronous client of the controller.
+
+        Controllers create it before authenticating and send the login requests through
+        it, so authentication and collection share one connection pool and TLS session.
+
+        Parameters:
+            **kwargs: Extra httpx.Client arguments, e.g. auth or headers.
+
+        Returns:
+            httpx.Client: A new client using client_options().
+        """
+        options = self.client_options()
+        if self.recording is not None:
+            options["transport"] = self.recording.transport(
+                options["verify"], options["http2"], options["limits"]
+            )
+        return httpx.Client(**options, **kwargs)
+
+    def create_async_client(self) -> httpx.AsyncClient:
+        """
+        Create an httpx.AsyncClient that mirrors the authenticated synchronous client.
+
+        Headers, cookies and auth established by authenticate() are copied over so the
+        asynchronous engine talks to the controller with the same session. The pool is
+        bound to the event loop, so it cannot be shared with the synchronous client; the
+        transport options and SSL context are.
+
+        Returns:
+            httpx.AsyncClient: A new asynchronous client.
+        """
+        options = self.client_options()
+        if self.recording is not None:
+            options["transport"] = self.recording.async_transport(
+                options["verify"], options["http2"], options["limits"]
+            )
+        return httpx.AsyncClient(
+            headers=self.client.headers if self.client else None,
+            cookies=self.client.cookies if self.client else None,
+            auth=self.client.auth if self.client else None,
+            **options,
+        )
+
+    def get_limiter(self, url: str) -> AdaptiveConcurrencyLimiter:
+        """
+        Return the adaptive concurrency limiter for the host of a URL, creating it on first use.
+
+        Parameters:
+            url (str): Request URL.
+
+        Returns:
+            AdaptiveConcurrencyLimiter: The limiter shared by all requests to that host.
+        """
+        host = httpx.URL(url).netloc.decode("ascii")
+        with self._limiters_lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                limiter = AdaptiveConcurrencyLimiter(max_limit=self.max_concurrency)
+                self.limiters[host] = limiter
+            return limiter
+
+    def get_rate_limiter(self, url: str) -> TokenBucket | None:
+        """
+        Return the token bucket pacing requests to a URL, creating it on first use.
+
+        Parameters:
+            url (str): Request URL.
+
+        Returns:
+            TokenBucket | None: The bucket of the longest matching RATE_LIMITS prefix,
+                or None if the URL is not rate limited.
+        """
+        if not self.rate_limits:
+            return None
+        path = httpx.URL(url).path
+        prefixes = [prefix for prefix in self.rate_limits if path.startswith(prefix)]
+        if not prefixes:
+            return None
+        prefix = max(prefixes, key=len)
+        with self._limiters_lock:
+            bucket = self.rate_buckets.get(prefix)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_limits[prefix])
+                self.rate_buckets[prefix] = bucket
+            return bucket
+
+    def throttle(self, url: str) -> None:
+        """Block until the rate limit for a URL allows another request."""
+        bucket = self.get_rate_limiter(url)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def async_throttle(self, url: str) -> None:
+        """Wait until the rate limit for a URL allows another request."""
+        bucket = self.get_rate_limiter(url)
+        if bucket is not None:
+            await bucket.async_acquire()
+
+    def rate_limiter_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Return the rate and counters of every token bucket.
+
+        Returns:
+            dict: Bucket snapshot keyed by path prefix ("" for the whole controller).
+        """
+        with self._limiters_lock:
+            buckets = dict(self.rate_buckets)
+        return {prefix: bucket.snapshot() for prefix, bucket in buckets.items()}
+
+    def limiter_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Return the current window and counters of every per-host limiter.
+
+        Returns:
+            dict: Limiter snapshot keyed by host.
+        """
+        with self._limiters_lock:
+            limiters = dict(self.limiters)
+        return {host: limiter.snapshot() for host, limiter in limiters.items()}
+
+    @asynccontextmanager
+    async def async_session(self) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Open the asynchronous engine for the duration of the context.
+
+        Nested sessions reuse the already open client.
+
+        Yields:
+            httpx.AsyncClient: The asynchronous client used by the async_* methods.
+        """
+        if self.async_client is not None:
+            yield self.async_client
+            return
+
+        # On the event loop of run_async() the client outlives the session, so its
+        # connections are reused by the next one; elsewhere it is closed on exit
+        kept = getattr(self._async_state, "loop", None) is asyncio.get_running_loop()
+        client = self._async_state.loop_client if kept else None
+        if client is None:
+            client = self.create_async_client()
+            if kept:
+                self._async_state.loop_client = client
+        # The synchronous client may have logged in again since the last session
+        self._mirror_client(client)
+
+        self._async_state.auth_lock = asyncio.Lock()
+        self.async_client = client
+        try:
+            yield client
+        finally:
+            if not kept:
+                await client.aclose()
+            self.async_client = None
+            self._async_state.auth_lock = None
+
+    def _mirror_client(self, client: httpx.AsyncClient) -> None:
+        """Copy the session of the synchronous client to an asynchronous client."""
+        if self.client is None:
+            return
+        client.headers.update(self.client.headers)
+        client.cookies.update(self.client.cookies)
+        if self.client.auth is not None:
+            client.auth = self.client.auth
+
+    def _reauthenticate(self, method: str, url: str, sent: float | None = None) -> None:
+        """
+        Re-run authenticate() after a request failed with a 401 or a transport error.
+
+        Callers in every thread are serialized so a burst of failures triggers a single
+        login at a time, and a caller whose request was sent before the last login
+        completed retries with that session instead of logging in again.
+
+        Parameters:
+            method (str): HTTP method of the failed request, for logging.
+            url (str): URL of the failed request, for logging.
+            sent (float, optional): time.monotonic() when the failed request was sent.
+        """
+        with self._auth_lock:
+            last_login = self._last_login
+            if sent is not None and last_login is not None and last_login > sent:
+                return
+            try:
+                if not self.authenticate():
+                    self.logger.warning("%s %s re-authentication failed.", method, url)
+            except httpx.TransportError as auth_err:
+                self.logger.warning(
+                    "%s %s re-authentication also failed: %s", method, url, auth_err
+                )
+                return
+            self._last_login = time.monotonic()
+
+    def replace_client(self, client: httpx.Client) -> None:
+        """
+        Make a newly logged-in client the synchronous client of the controller.
+
+        The previous client is closed by close() rather than here, as other threads may
+        still be sending requests through it.
+
+        Parameters:
+            client (httpx.Client): The new client.
+        """
+        if self.client is not None and self.client is not client:
+            self._replaced_clients.append(self.client)
+        self.client = client
+
+    async def _async_reauthenticate(
+        self, method: str, url: str, sent: float | None = None
+    ) -> None:
+        """
+        Re-authenticate like _reauthenticate() and refresh the asynchronous client.
+
+        Parameters:
+            method (str): HTTP method of the failed request, for logging.
+            url (str): URL of the failed request, for logging.
+            sent (float, optional): time.monotonic() when the failed request was sent.
+        """
+        auth_lock: asyncio.Lock | None = getattr(self._async_state, "auth_lock", None)
+        if auth_lock is None:
+            return
+        # The asyncio lock keeps the tasks of this event loop from each taking a
+        # thread to wait for the login
+        async with auth_lock:
+            await asyncio.to_thread(self._reauthenticate, method, url, sent)
+            if self.async_client is not None:
+                self._mirror_client(self.async_client)
+
+    async def _async_send(
+        self, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response | None:
+        """
+        Send a single request through the asynchronous client.
+
+        Requests are paced by the client-side rate limit, and the number in flight to the
+        host is governed by its adaptive limiter, which is fed with the latency and outcome
+        of every request.
+        """
+        client = self.async_client
+        if client is None:
+            self.logger.error("Async client not initialized")
+            return None
+
+        # Wait for a token before taking a concurrency slot so paced requests
+        # do not hold the window
+        await self.async_throttle(url)
+        limiter = self.get_limiter(url)
+        await limiter.acquire()
+        label = endpoint_label(url)
+        with self.tracer.span(
+            f"{method} {label}", HTTP_CATEGORY, method=method, url=url
+        ) as span:
+            start = time.monotonic()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TimeoutException as e:
+                limiter.release(timed_out=True)
+                self.metrics.record_request(
+                    label, time.monotonic() - start, error=classify_error(e)
+                )
+                raise
+            except httpx.TransportError as e:
+                limiter.release()
+                self.metrics.record_request(
+                    label, time.monotonic() - start, error=classify_error(e)
+                )
+                raise
+            except BaseException:
+                limiter.release()
+                raise
+            latency = time.monotonic() - start
+            limiter.release(latency, response.status_code, endpoint=label)
+            self.metrics.record_response(label, latency, response)
+            span.set("status", response.status_code)
+            return response
+
+    async def _async_send_get(self, url: str) -> httpx.Response | None:
+        """Asynchronous counterpart of _send_get()."""
+        if self.cache is None:
+            return await self._async_send("GET", url)
+        cache = self.cache
+        headers = await asyncio.to_thread(cache.request_headers, url)
+        response = await self._async_send("GET", url, headers=headers)
+        if response is None:
+            return None
+        resolved = await asyncio.to_thread(cache.resolve, url, response)
+        if resolved is None:
+            response = await self._async_send("GET", url)
+            if response is None:
+                return None
+            resolved = await asyncio.to_thread(cache.resolve, url, response)
+        return resolved or response
+
+    async def async_get_request(self, url: str) -> httpx.Response | None:
+        """
+        Asynchronous counterpart of get_request(). Must be awaited inside async_session().
+
+        Parameters:
+            url (str): The URL to send the GET request to.
+
+        Returns:
+            response (httpx.Response): The response from the GET request.
+        """
+        response = None
+        reauthenticated = False
+        for attempt in range(self.max_retries):
+            if self.async_client is None:
+                self.logger.error("Async client not initialized")
+                return None
+            sent = time.monotonic()
+            try:
+                response = await self._async_send_get(url)
+            except httpx.TransportError as e:
+                after = self._after_error(
+                    "GET", url, attempt, e, response, reauthenticated
+                )
+                reauthenticated = reauthenticated or after.reauthenticate
+            else:
+                if response is None:
+                    return None
+                after = self._after_response("GET", url, attempt, response)
+            if not after.retry:
+                return after.response
+            if after.delay:
+                await asyncio.sleep(after.delay)
+            if after.reauthenticate:
+                await self._async_reauthenticate("GET", url, sent)
+        return response
+
+    async def async_post_request(self, url: str, data: Any) -> httpx.Response | None:
+        """
+        Asynchronous counterpart of post_request(). Must be awaited inside async_session().
+
+        Parameters:
+            url (str): The URL to send the POST request to.
+            data (Any): The data to send in the body of the POST request.
+
+        Returns:
+            response (httpx.Response): The response from the POST request.
+        """
+        body = {"content": data} if isinstance(data, str | bytes) else {"data": data}
+        response = None
+        reauthenticated = False
+        for attempt in range(self.max_retries):
+            if self.async_client is None:
+                self.logger.error("Async client not initialized")
+                return None
+            sent = time.monotonic()
+            try:
+                response = await self._async_send("POST", url, **body)
+            except httpx.TransportError as e:
+                after = self._after_error(
+                    "POST", url, attempt, e, response, reauthenticated
+                )
+                reauthenticated = reauthenticated or after.reauthenticate
+            else:
+                if response is None:
+                    return None
+                after = self._after_response("POST", url, attempt, response)
+            if not after.retry:
+                return after.response
+            if after.delay:
+                await asyncio.sleep(after.delay)
+            if after.reauthenticate:
+                await self._async_reauthenticate("POST", url, sent)
+        return response
+
+    async def async_fetch_data(
+        self, endpoint: str
+    ) -> dict[str, Any] | list[Any] | None:
+        """
+        Asynchronous counterpart of fetch_data().
+
+        Parameters:
+            endpoint (str): Endpoint URL.
+
+        Returns:
+            data (dict | list): The JSON content of the response or None if an error occurred.
+        """
+        response = await self.async_get_request(self.base_url + endpoint)
+        if response is None or not response.is_success:
+            self.logger.debug("No valid response received for endpoint: %s", endpoint)
+            return None
+        try:
+            data = response_json(response)
+        except ValueError:
+            self.logger.error(
+                "Failed to decode JSON from response for endpoint: %s", endpoint
+            )
+            return None
+        self.logger.info(
+            "GET %s succeeded with status code %s", endpoint, response.status_code
+        )
+        return data if isinstance(data, dict | list) else None
+
+    async def _async_fetch_page(
+        self, endpoint: str, offset: int
+    ) -> tuple[list[Any], bool] | None:
+        """Fetch and parse the page of an offset-paginated endpoint starting at offset."""
+        paginated_endpoint = self._paginated_endpoint(endpoint, offset)
+        response = await self.async_get_request(self.base_url + paginated_endpoint)
+        if response is None or not response.is_success:
+            self.logger.debug(
+                "No valid response received for endpoint: %s", paginated_endpoint
+            )
+            return None
+        return self._parse_page(response, paginated_endpoint)
+
+    async def _async_fetch_count(self, endpoint: str) -> int | None:
+        """Return the total number of items of a paginated endpoint, if it can be counted."""
+        count_endpoint = self.pagination_count_endpoint(endpoint)
+        if count_endpoint is None:
+            return None
+        response = await self.async_get_request(self.base_url + count_endpoint)
+        if response is None or not response.is_success:
+            return None
+        try:
+            count = response_json(response)
+        except ValueError:
+            return None
+        if isinstance(count, dict):
+            count = count.get("response")
+        return count if isinstance(count, int) else None
+
+    async def async_fetch_data_pagination(
+        self, endpoint: str
+    ) -> dict[str, Any] | list[Any] | None:
+        """
+        Asynchronous counterpart of fetch_data_pagination() that fetches pages in parallel.
+
+        The first page is fetched on its own. If it is full, the total is taken from the count
+        endpoint when there is one and all remaining offsets are requested at once; otherwise
+        the following pages are requested in waves that double in size up to max_concurrency,
+        stopping at the first short page. Pages are stitched back together in offset order.
+
+        Parameters:
+            endpoint (str): Endpoint URL.
+
+        Returns:
+            data (dict): The combined JSON content of all responses or None if an error occurred.
+        """
+        with self.tracer.span(endpoint, "pagination") as span:
+            limit = self.PAGINATION_LIMIT
+            first_page = await self._async_fetch_page(endpoint, 1)
+            if first_page is None:
+                return None
+            items, in_response = first_page
+            pages = [items]
+
+            if len(items) >= limit:
+                offset = 1 + limit
+                total = await self._async_fetch_count(endpoint)
+                wave = 2
+                while True:
+                    if total is not None and offset <= total:
+                        offsets = list(range(offset, total + 1, limit))
+                    else:
+                        offsets = [offset + i * limit for i in range(wave)]
+                        wave = min(wave * 2, self.max_concurrency)
+                    # A stale count only covers part of the data, probe the rest in waves
+                    total = None
+
+                    results = await self.gather_bounded(
+                        [self._async_fetch_page(endpoint, o) for o in offsets]
+                    )
+                    last_page_full = True
+                    for result in results:
+                        if result is None:
+                            return None
+                        page, page_in_response = result
+                        in_response = in_response or page_in_response
+                        pages.append(page)
+                        if len(page) < limit:
+                            # Pages past the end are empty or missing, ignore them
+                            last_page_full = False
+                            break
+                    if not last_page_full:
+                        break
+                    offset = offsets[-1] + limit
+
+            self.metrics.record_pages(
+                endpoint_label(self.base_url + endpoint), len(pages)
+            )
+            span.set("pages", len(pages))
+            all_responses = [item for page in pages for item in page]
+            data = {"response": all_responses} if in_response else all_responses
+            return data
+
+    def _can_fan_out(self, count: int) -> bool:
+        """
+        Check whether a batch of requests should go through the asynchronous engine.
+
+        Fan-out needs an authenticated synchronous client to mirror and more than one
+        request to be worth an event loop; otherwise the sequential path is used.
+        """
+        return (
+            self.max_concurrency > 1
+            and count > 1
+            and isinstance(self.client, httpx.Client)
+        )
+
+    def run_async(self, factory: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """
+        Run a coroutine inside an async_session() from synchronous code.
+
+        The call runs on an idle event loop of an earlier call, from whichever thread,
+        or on a new one. The loop and its asynchronous client are kept open for the next
+        call until close(), so connections and TLS sessions are reused across calls
+        instead of being set up again for each batch, while short-lived threads leave
+        no loop behind.
+
+        Parameters:
+            factory (Callable): Zero-argument callable returning the coroutine to run.
+
+        Returns:
+            The coroutine's result.
+        """
+
+        async def _runner() -> T:
+            async with self.async_session():
+                return await factory()
+
+        with self._idle_loops_lock:
+            loop, client = self._idle_loops.pop() if self._idle_loops else (None, None)
+        if loop is None:
+            loop = asyncio.new_event_loop()
+        self._async_state.loop = loop
+        self._async_state.loop_client = client
+        try:
+            return loop.run_until_complete(_runner())
+        finally:
+            _cancel_tasks(loop)
+            client = self._async_state.loop_client
+            self._async_state.loop = None
+            self._async_state.loop_client = None
+            with self._idle_loops_lock:
+                self._idle_loops.append((loop, client))
+
+    def close(self) -> None:
+        """
+        Close the event loops and asynchronous clients kept by run_async(), and the
+        synchronous clients.
+
+        Must not be called while a collection is running; the controller can be used
+        again afterwards, run_async() opening new event loops.
+        """
+        with self._idle_loops_lock:
+            idle_loops = list(self._idle_loops)
+            self._idle_loops.clear()
+        for loop, client in idle_loops:
+            try:
+                if client is not None:
+                    loop.run_until_complete(client.aclose())
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.run_until_complete(loop.shutdown_default_executor())
+            finally:
+                loop.close()
+        for replaced in self._replaced_clients:
+            replaced.close()
+        self._replaced_clients.clear()
+        if isinstance(self.client, httpx.Client):
+            self.client.close()
+
+    async def gather_bounded(self, awaitables: list[Awaitable[T]]) -> list[T]:
+        """
+        Await all awaitables, at most max_concurrency at a time, preserving input order.
+
+        Workers take the awaitables in order, so a large batch is not started at once and
+        nested calls each get their own workers instead of waiting on a shared bound. If
+        one fails, the others are cancelled and the error is raised.
+
+        Parameters:
+            awaitables (list[Awaitable]): Awaitables to run, typically coroutines.
+
+        Returns:
+            list: The result of every awaitable, in the same order as the input.
+        """
+        results: list[Any] = [None] * len(awaitables)
+        pending = iter(enumerate(awaitables))
+
+        async def worker() -> None:
+            for index, awaitable in pending:
+                results[index] = await awaitable
+
+        workers = [
+            asyncio.ensure_future(worker())
+            for _ in range(min(self.max_concurrency, len(awaitables)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            # Close the coroutines no worker started, so they are not reported as
+            # never awaited
+            for _, awaitable in pending:
+                if inspect.iscoroutine(awaitable):
+                    awaitable.close()
+            raise
+        return results
+
+    def fetch_many(
+        self, endpoints: list[str], paginated: bool = False
+    ) -> list[dict[str, Any] | list[Any] | None]:
+        """
+        Fetch several endpoints, concurrently when possible.
+
+        Parameters:
+            endpoints (list[str]): Endpoint URLs relative to base_url.
+            paginated (bool): Use fetch_data_pagination() instead of fetch_data().
+
+        Returns:
+            list: One result per endpoint, in the same order as the input.
+        """
+        with self.tracer.span(
+            f"fetch_many {endpoint_label(endpoints[0]) if endpoints else ''}",
+            "fan-out",
+            requests=len(endpoints),
+        ):
+            if not self._can_fan_out(len(endpoints)):
+                fetch = self.fetch_data_pagination if paginated else self.fetch_data
+                return [fetch(endpoint) for endpoint in endpoints]
+
+            async_fetch = (
+                self.async_fetch_data_pagination if paginated else self.async_fetch_data
+            )
+            return self.run_async(
+                lambda: self.gather_bounded([async_fetch(e) for e in endpoints])
+            )
+
+    def get_many(self, urls: list[str]) -> list[httpx.Response | None]:
+        """
+        Send GET requests to several absolute URLs, concurrently when possible.
+
+        Parameters:
+            urls (list[str]): Absolute URLs.
+
+        Returns:
+            list: One response (or None) per URL, in the same order as the input.
+        """
+        with self.tracer.span(
+            f"get_many {endpoint_label(urls[0]) if urls else ''}",
+            "fan-out",
+            requests=len(urls),
+        ):
+            if not self._can_fan_out(len(urls)):
+                return [self.get_request(url) for url in urls]
+
+            return self.run_async(
+                lambda: self.gather_bounded([self.async_get_request(u) for u in urls])
+            )
+
+    def collect_endpoints(
+        self,
+        endpoints: list[dict[str, Any]],
+        fetch: Callable[[dict[str, Any], dict[str, Any]], T],
+        depends_on: Callable[[dict[str, Any]], list[str]] | None = None,
+        parallel: bool = True,
+        on_done: Callable[[], None] | None = None,
+        on_result: Callable[[T], None] | None = None,
+    ) -> list[T]:
+        """
+        Collect endpoints as a DAG of fetch tasks (see EndpointScheduler).
+
+        Each endpoint is fetched once the endpoints it depends on are done, with their
+        results; independent endpoints are fetched by ENDPOINT_WORKERS threads, capped by
+        max_concurrency. Dependencies come from ENDPOINT_DEPENDENCIES (ignoring endpoints
+        that are not collected) and from depends_on.
+
+        Parameters:
+            endpoints (list[dict]): Endpoint definitions with name and endpoint keys.
+            fetch (Callable): Called with an endpoint and {dependency name: result}.
+            depends_on (Callable, optional): Names of the endpoints an endpoint needs.
+            parallel (bool): Fetch independent endpoints concurrently. Controllers that
+                keep per-endpoint state on the instance run the DAG on one thread.
+            on_done (Callable, optional): Called after every endpoint, e.g. to advance
+                a progress bar.
+            on_result (Callable, optional): Called with every fetch result, in the order
+                of the input, as soon as the endpoints before it are done; results are
+                then released rather than returned, e.g. to collect them into a
+                ResultStore as they come.
+
+        Returns:
+            list: One fetch result per endpoint, in the same order as the input; empty
+                with on_result.
+
+        Raises:
+            ValueError: An endpoint depends on a missing endpoint, or on itself through
+                a cycle.
+        """
+        # Endpoint names are resolved to the first endpoint carrying them
+        index_of: dict[str, int] = {}
+        for index, endpoint in enumerate(endpoints):
+            index_of.setdefault(endpoint.get("name", ""), index)
+
+        workers = min(ENDPOINT_WORKERS, self.max_concurrency) if parallel else 1
+        scheduler = EndpointScheduler(workers)
+        for index, endpoint in enumerate(endpoints):
+            names = [
+                name
+                for name in self.ENDPOINT_DEPENDENCIES.get(endpoint.get("name", ""), [])
+                if name in index_of
+            ]
+            if depends_on is not None:
+                names += depends_on(endpoint)
+            missing = [name for name in names if name not in index_of]
+            if missing:
+                raise ValueError(
+                    f"Endpoint {endpoint.get('name')!r} depends on unknown endpoints {missing}"
+                )
+            run = self.tracer.wrap(
+                lambda results, endpoint=endpoint, names=names: fetch(
+                    endpoint, {name: results[index_of[name]] for name in names}
+                ),
+                str(endpoint.get("name")),
+                ENDPOINT_CATEGORY,
+                endpoint=endpoint.get("endpoint"),
+            )
+            scheduler.add(index, run, [index_of[name] for name in names])
+
+        results = scheduler.run(
+            None if on_done is None else lambda _: on_done(),
+            None if on_result is None else lambda _, result: on_result(result),
+        )
+        if on_result is not None:
+            return []
+        return [results[index] for index in range(len(endpoints))]
+
     def write_to_archive(
-        self, final_dict: dict[str, Any], output: str, technology: str
+        self,
+        final_dict: MutableMapping[str, Any],
+        output: str,
+        technology: str,
+        layout: ArchiveLayout = ArchiveLayout.SINGLE,
+        compression: Compression = Compression.DEFLATE,
     ) -> None:
         """
-        Writes the final dictionary to a ZIP archive containing a JSON file named after the technology.
+        Writes the final dictionary to an archive containing a JSON file named after the technology.
+
+        The JSON is streamed into the archive member as it is encoded rather than built as one
+        string first; the member has the layout of json.dumps(final_dict, indent=4).
+
+        With the sharded layout every top-level endpoint key becomes its own member
+        (<technology>/<endpoint>.json) and manifest.json indexes them. Endpoints are removed
+        from final_dict as soon as they are written so their memory can be released.
+        A ResultStore is read back one endpoint at a time with either layout.
+
+        When collecting with since, a delta.json member summarizes the changes. Request
+        metrics recorded during the run go to metrics.json (see MetricsRecorder).
 
         Parameters:
-            final_dict (dict): The final dictionary to write to the archive.
+            final_dict (MutableMapping): The final dictionary or ResultStore to write to
+                the archive.
             output (str): ZIP archive filename
             technology (str): Technology name for the JSON file inside the archive
+            layout (ArchiveLayout): Single JSON file or one member per endpoint.
+            compression (Compression): Archive codec. Sharded members are encoded on
+                archive_workers threads; see ArchiveWriter.
         """
+        # Compared before sharding empties final_dict
+        delta = self.delta.summary(final_dict) if self.delta is not None else None
+
+        if layout == ArchiveLayout.SHARDED:
+            with ShardedArchiveWriter(
+                output, technology, compression, self.archive_workers
+            ) as writer:
+                while final_dict:
+                    endpoint = next(iter(final_dict))
+                    writer.write_endpoint(endpoint, final_dict.pop(endpoint))
+                if delta is not None:
+                    writer.archive.write_json(DELTA_FILENAME, delta)
+                if not self.metrics.empty:
+                    writer.archive.write_json(METRICS_FILENAME, self.metrics.snapshot())
+            self.logger.info(
+                "Data written to %s (%s endpoint members and %s)",
+                output,
+                len(writer.members),
+                MANIFEST_FILENAME,
+            )
+            return
+
         json_filename = f"{technology}.json"
 
-        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            json_content = json.dumps(final_dict, indent=4)
-            zip_file.writestr(json_filename, json_content)
+        # The single layout is written serially: its one large member cannot be encoded
+        # alongside others. zstd still compresses it on archive_workers threads
+        workers = self.archive_workers if compression == Compression.ZSTD else 1
+        with ArchiveWriter(output, compression, workers) as archive:
+            archive.write_json(json_filename, final_dict)
+            if delta is not None:
+                archive.write_json(DELTA_FILENAME, delta)
+            if not self.metrics.empty:
+                archive.write_json(METRICS_FILENAME, self.metrics.snapshot())
 
         self.logger.info("Data written to %s (containing %s)", output, json_filename)
 
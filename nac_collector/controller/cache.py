@@ -0,0 +1,275 @@
+"""On-disk cache of GET responses, revalidated with conditional requests."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import httpx
+
+from nac_collector.constants import HTTP_CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a cached body and replayed when it is served
+STORED_HEADERS = ("content-type", "etag", "last-modified")
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of GET response bodies keyed by URL, stored on disk.
+
+    Only 200 responses carrying an ETag or Last-Modified validator are cached. Before a
+    request is sent, request_headers() returns the matching If-None-Match and
+    If-Modified-Since headers; when the controller answers 304 Not Modified, resolve()
+    turns the response into a 200 carrying the cached body, so callers see no difference.
+
+    Every entry is a <key>.body file and a <key>.json metadata file holding the validators
+    and the SHA-256 of the body, which is checked whenever the body is served. Entries are
+    evicted least recently used first once the cache grows beyond max_size; recency
+    survives between runs through the modification time of the files.
+
+    The cache is safe to share between threads.
+
+    Parameters:
+        directory (str): Directory holding the cache, created if missing.
+        scope (str): Namespace of the keys, e.g. user and base URL, so controllers or
+            accounts sharing a directory never see each other's responses.
+        max_size (int): Upper bound in bytes of the cache on disk.
+    """
+
+    def __init__(
+        self, directory: str, scope: str = "", max_size: int = HTTP_CACHE_MAX_SIZE
+    ) -> None:
+        self.directory = directory
+        self.scope = scope
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        # Bytes on disk per key, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Index the entries already on disk, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            if extension != ".json":
+                continue
+            try:
+                meta_stat = os.stat(self._path(key, ".json"))
+                body_stat = os.stat(self._path(key, ".body"))
+            except OSError:
+                continue
+            found.append(
+                (body_stat.st_mtime, key, meta_stat.st_size + body_stat.st_size)
+            )
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, key + extension)
+
+    def key(self, url: str) -> str:
+        """Return the cache key of a URL."""
+        return hashlib.sha256(f"{self.scope}\0{url}".encode()).hexdigest()
+
+    def _read_meta(self, key: str) -> dict[str, Any] | None:
+        try:
+            with open(self._path(key, ".json"), encoding="utf-8") as f:
+                meta: dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def request_headers(self, url: str) -> dict[str, str]:
+        """
+        Return the conditional request headers validating the cached copy of a URL.
+
+        Parameters:
+            url (str): Request URL.
+
+        Returns:
+            dict: If-None-Match and/or If-Modified-Since, empty if the URL is not cached.
+        """
+        key = self.key(url)
+        with self._lock:
+            if key not in self._entries:
+                return {}
+        meta = self._read_meta(key)
+        if meta is None:
+            return {}
+        headers = {}
+        if meta["headers"].get("etag"):
+            headers["If-None-Match"] = meta["headers"]["etag"]
+        if meta["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+        return headers
+
+    def resolve(self, url: str, response: httpx.Response) -> httpx.Response | None:
+        """
+        Serve a 304 from the cache, or store a cacheable 200.
+
+        Parameters:
+            url (str): Request URL.
+            response (httpx.Response): Response to a request sent with request_headers().
+
+        Returns:
+            httpx.Response | None: A 200 with the cached body for a 304, the response itself
+                otherwise, or None for a 304 whose cached copy is gone or corrupt, in which
+                case the request must be sent again without validators.
+        """
+        if response.status_code == 304:
+            cached = self._load(url, response)
+            if cached is None:
+                logger.warning("GET %s: cached copy lost, fetching it again.", url)
+                return None
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += len(cached.content)
+            logger.debug("GET %s not modified, served from the cache.", url)
+            return cached
+        if response.status_code == 200:
+            with self._lock:
+                self.misses += 1
+            self.store(url, response)
+        return response
+
+    def _load(self, url: str, response: httpx.Response) -> httpx.Response | None:
+        key = self.key(url)
+        meta = self._read_meta(key)
+        try:
+            with open(self._path(key, ".body"), "rb") as f:
+                body = f.read()
+        except OSError:
+            body = None
+        if (
+            meta is None
+            or body is None
+            or hashlib.sha256(body).hexdigest() != meta["sha256"]
+        ):
+            self._remove(key)
+            return None
+        # Refresh recency, on disk too so it carries over to the next run
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(self._path(key, ".body"))
+        except OSError:
+            pass
+        # Validators sent back with the 304 supersede the stored ones
+        headers = dict(meta["headers"])
+        for name in STORED_HEADERS:
+            if name in response.headers:
+                headers[name] = response.headers[name]
+        return httpx.Response(
+            200, headers=headers, content=body, request=response.request
+        )
+
+    def store(self, url: str, response: httpx.Response) -> bool:
+        """
+        Store the body of a 200 response if it carries validators.
+
+        Parameters:
+            url (str): Request URL.
+            response (httpx.Response): A 200 response whose body has been read.
+
+        Returns:
+            bool: True if the response was stored.
+        """
+        headers = {
+            name: response.headers[name]
+            for name in STORED_HEADERS
+            if name in response.headers
+        }
+        if "etag" not in headers and "last-modified" not in headers:
+            return False
+        if "no-store" in response.headers.get("cache-control", "").lower():
+            return False
+
+        body = response.content
+        key = self.key(url)
+        meta = json.dumps(
+            {
+                "url": url,
+                "headers": headers,
+                "sha256": hashlib.sha256(body).hexdigest(),
+            }
+        ).encode("utf-8")
+        size = len(body) + len(meta)
+        if size > self.max_size:
+            return False
+        try:
+            # The metadata file marks a complete entry, so it is written last
+            self._write(self._path(key, ".body"), body)
+            self._write(self._path(key, ".json"), meta)
+        except OSError as e:
+            logger.warning("Could not write %s to the response cache: %s", url, e)
+            self._remove(key)
+            return False
+
+        with self._lock:
+            self._size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.stores += 1
+            evicted = []
+            while self._size > self.max_size and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                self.evictions += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._delete_files(old_key)
+        return True
+
+    def _write(self, path: str, data: bytes) -> None:
+        """Write a file atomically, so readers never see it half written."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+        self._delete_files(key)
+
+    def _delete_files(self, key: str) -> None:
+        for extension in (".json", ".body"):
+            try:
+                os.unlink(self._path(key, extension))
+            except OSError:
+                pass
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the counters and current size of the cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "bytes_saved": self.bytes_saved,
+            }
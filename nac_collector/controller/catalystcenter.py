@@ -1,12 +1,13 @@
 import concurrent.futures
 import datetime
+import functools
 import logging
 import os
 import re
 import threading
+from collections.abc import MutableMapping
 from typing import Any
 
-import httpx
 from rich.progress import (
     BarColumn,
     Progress,
@@ -16,8 +17,10 @@ from rich.progress import (
 )
 from tinydb import Query, TinyDB
 
+from nac_collector.constants import CATALYSTCENTER_RATE_LIMITS
 from nac_collector.controller.base import CiscoClientController
 from nac_collector.resource_manager import ResourceManager
+from nac_collector.tracing import ENDPOINT_CATEGORY
 
 logger = logging.getLogger("main")
 
@@ -32,7 +35,22 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
 
     DNAC_AUTH_ENDPOINT = "/dna/system/api/v1/auth/token"
     SOLUTION = "catalystcenter"
+    # Catalyst Center publishes limits per API rather than for the controller
+    RATE_LIMITS = CATALYSTCENTER_RATE_LIMITS
     SKIP_TMPS = os.environ.get("NAC_SKIP_TMP", "").lower()
+    # Paginated endpoints that have a "<endpoint>/count" sibling accepting the same filters
+    COUNT_ENDPOINTS = (
+        "/dna/intent/api/v1/network-device",
+        "/dna/intent/api/v1/sites",
+        "/dna/intent/api/v2/site",
+        "/dna/intent/api/v1/tag",
+        "/dna/intent/api/v1/sda/fabricDevices",
+        "/dna/intent/api/v1/sda/fabricSites",
+        "/dna/intent/api/v1/sda/provisionDevices",
+        "/dna/intent/api/v1/sda/anycastGateways",
+        "/dna/intent/api/v1/sda/layer2VirtualNetworks",
+        "/dna/intent/api/v1/sda/layer3VirtualNetworks",
+    )
 
     global_site_id: str | None = None
 
@@ -52,7 +70,9 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
     # Lookups are essential because some endpoint IDs required in Catalyst Center do not follow simple child URL patterns.
     # Instead, they have a fixed structure that cannot be inferred directly from the provider file.
     # As a result, a lookup file is necessary to retrieve the correct IDs.
+    # The lookup file is parsed on first use rather than when the module is imported.
     @staticmethod
+    @functools.cache
     def _load_id_lookup() -> dict[str, Any]:
         """Load and convert the YAML list format to dictionary format for internal use."""
         yaml_data = ResourceManager.get_packaged_lookup_content("catalystcenter")
@@ -70,7 +90,10 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
 
         return lookup_dict
 
-    id_lookup = _load_id_lookup()
+    @property
+    def id_lookup(self) -> dict[str, Any]:
+        """Lookup entries by endpoint, see _load_id_lookup()."""
+        return self._load_id_lookup()
 
     def __init__(
         self,
@@ -81,13 +104,21 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
         retry_after: int,
         timeout: int,
         ssl_verify: bool,
+        **kwargs: Any,
     ) -> None:
         self.db = TinyDB("./tmp_db.json")
         self.job = Query()
         self.start_time = datetime.datetime.now().isoformat()
         self.lock = threading.Lock()
         super().__init__(
-            username, password, base_url, max_retries, retry_after, timeout, ssl_verify
+            username,
+            password,
+            base_url,
+            max_retries,
+            retry_after,
+            timeout,
+            ssl_verify,
+            **kwargs,
         )
         with self.lock:
             existing = self.db.get(self.job.url == self.base_url)
@@ -120,39 +151,39 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
             "Authorization": "application/json",
         }
 
-        # Create httpx session (retry logic handled by base class)
-        session = httpx.Client(
-            verify=self.ssl_verify,
-            timeout=self.timeout,
-        )
-
-        response = session.post(
-            auth_url,
-            auth=(self.username, self.password),
-            headers=headers,
-        )
+        # Authentication and collection share one connection pool (retry logic handled
+        # by base class). The login uses a new client, so a failed login leaves the
+        # current one in place
+        client = self.create_client()
+        try:
+            response = client.post(
+                auth_url,
+                auth=(self.username, self.password),
+                headers=headers,
+            )
 
-        if response and response.status_code == 200:
-            logger.info("Authentication Successful for URL: %s", auth_url)
+            if response and response.status_code == 200:
+                logger.info("Authentication Successful for URL: %s", auth_url)
 
-            token = response.json()["Token"]
+                token = response.json()["Token"]
 
-            self.client = httpx.Client(
-                verify=self.ssl_verify,
-                timeout=self.timeout,
-            )
-            self.client.headers.update(
-                {
-                    "Content-Type": "application/json",
-                    "x-auth-token": token,
-                }
-            )
-            return True
+                client.headers.update(
+                    {
+                        "Content-Type": "application/json",
+                        "x-auth-token": token,
+                    }
+                )
+                self.replace_client(client)
+                return True
+        except BaseException:
+            client.close()
+            raise
 
         logger.error(
             "Authentication failed with status code: %s",
             response.status_code,
         )
+        client.close()
         return False
 
     def process_endpoint_data(
@@ -271,13 +302,17 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
             ]
         else:
             id_list = []
+        sanitized_ids = [self._sanitize_id(str(id_)) for id_ in id_list]
+        lookup_endpoints = [
+            self.id_lookup[endpoint_key]["target_endpoint"].replace("%v", id_)
+            for id_ in sanitized_ids
+        ]
         data_list = []
-        for id_ in id_list:
-            id_ = self._sanitize_id(str(id_))
-            lookup_endpoint = self.id_lookup[endpoint_key]["target_endpoint"].replace(
-                "%v", id_
-            )
-            data = self.fetch_data_pagination(lookup_endpoint)
+        for id_, data in zip(
+            sanitized_ids,
+            self.fetch_many(lookup_endpoints, paginated=True),
+            strict=True,
+        ):
             if isinstance(data, dict) and data.get("response"):
                 data = data["response"]
             if isinstance(data, dict):
@@ -293,7 +328,7 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
 
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Retrieve data from a list of endpoint definitions provided as data structure.
 
@@ -304,8 +339,7 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
             dict: The final dictionary containing the data retrieved from the endpoints.
         """
         endpoints = endpoints_data
-        # Initialize an empty dictionary
-        final_dict = {}
+        final_dict = self.create_result_store()
 
         # Iterate over all endpoints
         with Progress(
@@ -317,17 +351,24 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
         ) as progress:
             task = progress.add_task("Processing endpoints", total=len(endpoints))
             with concurrent.futures.ThreadPoolExecutor() as executor:
-                results = []
                 futures = [
-                    executor.submit(self.process_endpoint, endpoint)
+                    executor.submit(
+                        self.tracer.wrap(
+                            self.process_endpoint,
+                            endpoint["name"],
+                            ENDPOINT_CATEGORY,
+                            endpoint=endpoint.get("endpoint"),
+                        ),
+                        endpoint,
+                    )
                     for endpoint in endpoints
                 ]
+                # Stored as they complete, so a ResultStore can spill them early
                 for future in concurrent.futures.as_completed(futures):
-                    results.append(future.result())
+                    result = future.result()
+                    if result is not None:
+                        final_dict.update(result)
                     progress.advance(task)
-            for r in results:
-                if r is not None:
-                    final_dict.update(r)
             return final_dict
 
     @staticmethod
@@ -348,6 +389,21 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
                 return CiscoClientCATALYSTCENTER._sanitize_id(str(x))
         return None
 
+    def pagination_count_endpoint(self, endpoint: str) -> str | None:
+        """
+        Return the "/count" endpoint of a paginated endpoint, keeping its query filters.
+
+        Parameters:
+            endpoint (str): Endpoint URL relative to base_url.
+
+        Returns:
+            str | None: Count endpoint, or None if the endpoint has no known count endpoint.
+        """
+        path, separator, query = endpoint.partition("?")
+        if path not in self.COUNT_ENDPOINTS:
+            return None
+        return f"{path}/count{separator}{query}"
+
     @staticmethod
     def _sanitize_id(value: str) -> str:
         """
@@ -411,13 +467,29 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
                 except KeyError:
                     continue
 
-            lock = threading.Lock()
+            # Entries holding a list of parents collect the children of every parent,
+            # the others are matched to their parent by id.
+            parents = self.index_entries(
+                endpoint_dict[endpoint["name"]],
+                lambda entry: (
+                    entry["data"].get("id")
+                    if isinstance(entry.get("data"), dict)
+                    else None
+                ),
+            )
+            list_entries = [
+                entry
+                for entry in endpoint_dict[endpoint["name"]]
+                if isinstance(entry.get("data"), list) and entry["data"]
+            ]
 
             def _process_child(children_endpoint: dict[str, Any]) -> None:
                 """
                 Process a single children_endpoint for all parent IDs.
-                Runs sequentially for the given child, but in parallel
-                with other children.
+                Parent IDs are fetched concurrently through fetch_many(),
+                and children run in parallel with each other. Each child
+                endpoint writes its own key of the entries' children, so
+                they need no lock.
                 """
                 log_msg = "{}/%v{}".format(
                     endpoint["endpoint"],
@@ -431,41 +503,38 @@ class CiscoClientCATALYSTCENTER(CiscoClientController):
                 ):  # bandaid - This child endpoint only has data for global site, so we skip every other site
                     parent_ids = [self.global_site_id]
 
-                for parent_id in parent_ids:
-                    sanitized_parent_id = self._sanitize_id(str(parent_id))
-                    child_dict = CiscoClientController.create_endpoint_dict(
-                        children_endpoint
-                    )
+                joined_endpoints = [
+                    f"{endpoint['endpoint']}/{self._sanitize_id(str(parent_id))}{children_endpoint['endpoint']}"
+                    for parent_id in parent_ids
+                ]
+                self.fan_out_children(
+                    parents,
+                    parent_ids,
+                    children_endpoint,
+                    joined_endpoints,
+                    _process_child_data,
+                    paginated=True,
+                )
 
-                    joined_endpoint = f"{endpoint['endpoint']}/{sanitized_parent_id}{children_endpoint['endpoint']}"
-                    data = self.fetch_data_pagination(joined_endpoint)
-                    child_dict = self.process_endpoint_data(
-                        children_endpoint, child_dict, data, parent_id
-                    )
-                    if len(child_dict.get(children_endpoint["name"], [])) > 0:
-                        child_dict[children_endpoint["name"]][0]["id"] = parent_id
-                    with lock:
-                        for _idx, entry in enumerate(endpoint_dict[endpoint["name"]]):
-                            if isinstance(entry.get("data"), list):
-                                for _ in entry["data"]:
-                                    current = entry.setdefault("children", {}).get(
-                                        children_endpoint["name"]
-                                    )
-                                    if current is None:
-                                        entry["children"][children_endpoint["name"]] = [
-                                            child_dict[children_endpoint["name"]]
-                                        ]
-                                    else:
-                                        current.append(
-                                            child_dict[children_endpoint["name"]]
-                                        )
-                                    break
-
-                            else:
-                                if entry.get("data", {}).get("id") == parent_id:
-                                    entry.setdefault("children", {})[
-                                        children_endpoint["name"]
-                                    ] = child_dict[children_endpoint["name"]]
+            def _process_child_data(
+                children_endpoint: dict[str, Any],
+                parent_id: Any,
+                data: dict[str, Any] | list[Any] | None,
+            ) -> list[Any]:
+                child_dict = CiscoClientController.create_endpoint_dict(
+                    children_endpoint
+                )
+                child_dict = self.process_endpoint_data(
+                    children_endpoint, child_dict, data, parent_id
+                )
+                children: list[Any] = child_dict[children_endpoint["name"]]
+                if len(children) > 0:
+                    children[0]["id"] = parent_id
+                for entry in list_entries:
+                    entry.setdefault("children", {}).setdefault(
+                        children_endpoint["name"], []
+                    ).append(children)
+                return children
 
             with concurrent.futures.ThreadPoolExecutor() as executor:
                 list(executor.map(_process_child, endpoint["children"]))
@@ -0,0 +1,428 @@
+"""Incremental collection against the archive of a previous run (--since)."""
+
+import hashlib
+import io
+import json
+import logging
+import tarfile
+import threading
+import zipfile
+from collections.abc import Container, Iterator, Mapping
+from typing import Any
+
+from nac_collector import json_codec
+from nac_collector.archive import MANIFEST_FILENAME, zstandard
+from nac_collector.metrics import METRICS_FILENAME
+
+logger = logging.getLogger(__name__)
+
+# Archive member holding the summary of a delta run and the change markers it saw
+DELTA_FILENAME = "delta.json"
+DELTA_VERSION = 1
+
+# Fields whose value changes whenever the object is modified, top level and under "metadata"
+CHANGE_MARKER_FIELDS = ("lastUpdated", "lastUpdatedOn", "lastModified")
+METADATA_MARKER_FIELDS = ("timestamp",)
+# Only part of the marker when a timestamp is present: on its own it does not identify a change
+METADATA_CONTEXT_FIELDS = ("lastUser",)
+
+# Fields identifying an item within the items sharing an endpoint path
+ITEM_ID_FIELDS = ("id", "uuid", "templateId", "definitionId", "policyId", "name")
+
+
+def change_marker(data: Any) -> str | None:
+    """
+    Return the change marker of an object, if the API exposes one.
+
+    Parameters:
+        data (Any): Object as returned by the API.
+
+    Returns:
+        str | None: A string that differs whenever the object was modified, or None if the
+            object carries no timestamp to tell.
+    """
+    if not isinstance(data, dict):
+        return None
+    values = {field: data[field] for field in CHANGE_MARKER_FIELDS if field in data}
+    metadata = data.get("metadata")
+    if isinstance(metadata, dict):
+        for field in METADATA_MARKER_FIELDS:
+            if field in metadata:
+                values[f"metadata.{field}"] = metadata[field]
+        if values:
+            for field in METADATA_CONTEXT_FIELDS:
+                if field in metadata:
+                    values[f"metadata.{field}"] = metadata[field]
+    if not values:
+        return None
+    return json_codec.dumps(dict(sorted(values.items())))
+
+
+def item_key(item: dict[str, Any]) -> str:
+    """
+    Return the key identifying a collected item across runs.
+
+    Parameters:
+        item (dict): Item of an endpoint list, with "endpoint" and "data".
+
+    Returns:
+        str: The endpoint path of the item, qualified by its id when the data has one.
+    """
+    endpoint = str(item.get("endpoint", ""))
+    data = item.get("data")
+    if isinstance(data, dict):
+        for field in ITEM_ID_FIELDS:
+            if field in data:
+                return f"{endpoint}#{data[field]}"
+    return endpoint
+
+
+def item_digest(item: Any) -> str:
+    """
+    Return a digest of the content of a collected item, equal for equal items.
+
+    Parameters:
+        item (Any): Item of an endpoint list.
+
+    Returns:
+        str: Hex digest of the item encoded with sorted keys.
+    """
+    encoded = json.dumps(item, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def item_states(items: Any) -> dict[str, tuple[str | None, str]]:
+    """
+    Return the change marker and digest of every item of an endpoint, keyed by item_key().
+
+    Parameters:
+        items (Any): Data of an endpoint; only lists of items are tracked.
+
+    Returns:
+        dict: (marker, digest) by item key, empty for data that is not a list.
+    """
+    if not isinstance(items, list):
+        return {}
+    return {
+        item_key(item): (change_marker(item.get("data")), item_digest(item))
+        for item in items
+        if isinstance(item, dict)
+    }
+
+
+def _iter_archive_members(
+    path: str, wanted: Container[str] | None = None
+) -> Iterator[tuple[str, bytes]]:
+    """
+    Yield the name and content of the members of a ZIP or tar.zst archive.
+
+    Parameters:
+        path (str): Archive.
+        wanted (Container, optional): Names of the members to read; all by default.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zip_file:
+            for name in zip_file.namelist():
+                if wanted is None or name in wanted:
+                    yield name, zip_file.read(name)
+        return
+    if zstandard is None:
+        raise ValueError(
+            f"{path} is not a ZIP archive; reading tar.zst archives requires the "
+            "zstandard package"
+        )
+    with open(path, "rb") as fh:
+        reader = zstandard.ZstdDecompressor().stream_reader(fh)
+        with tarfile.open(fileobj=io.BufferedReader(reader), mode="r|") as tar:
+            for member in tar:
+                if wanted is not None and member.name not in wanted:
+                    continue
+                extracted = tar.extractfile(member)
+                if extracted is not None:
+                    yield member.name, extracted.read()
+
+
+class PreviousArchive:
+    """
+    Index of the items collected by a previous run, read from its archive.
+
+    The archive is read one member at a time, keeping only the key, change marker and
+    digest of every item. The data of an endpoint is read again by load() when its items
+    are needed.
+
+    Both layouts are supported: the endpoints of a sharded archive are gathered from its
+    members, those of a single-file archive from its <solution>.json member. Memory
+    stays bounded by the largest endpoint only for sharded archives; the single member
+    of a single-file archive holds every endpoint and is parsed whole, both when indexing
+    and by every load().
+
+    Parameters:
+        path (str): ZIP or tar.zst archive written by nac-collector.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # (marker, digest) by item key, by endpoint name
+        self.items: dict[str, dict[str, tuple[str | None, str]]] = {}
+        # Content of delta.json, None if the archive was not written by a delta run
+        self.delta: dict[str, Any] | None = None
+        # Member holding each endpoint
+        self._members: dict[str, str] = {}
+        self._sharded = False
+        self._scan()
+
+    def _scan(self) -> None:
+        # The manifest comes last in a tar stream: members are indexed both as the
+        # data of one endpoint and as a dict of endpoints until it is known
+        by_member: dict[str, dict[str, Any]] = {}
+        manifest = None
+        for name, content in _iter_archive_members(self.path):
+            if name == DELTA_FILENAME:
+                self.delta = json_codec.loads(content)
+            elif name == MANIFEST_FILENAME:
+                manifest = json_codec.loads(content)
+            elif name == METRICS_FILENAME:
+                # Written next to the endpoints, not collected data
+                continue
+            elif name.endswith(".json"):
+                data = json_codec.loads(content)
+                by_member[name] = {
+                    "items": item_states(data),
+                    "endpoints": {
+                        endpoint: item_states(items) for endpoint, items in data.items()
+                    }
+                    if isinstance(data, dict)
+                    else {},
+                }
+                del data
+
+        if manifest is not None:
+            self._sharded = True
+            for member in manifest["members"]:
+                if member["file"] in by_member:
+                    self.items[member["endpoint"]] = by_member[member["file"]]["items"]
+                    self._members[member["endpoint"]] = member["file"]
+            return
+        for name, indexed in by_member.items():
+            for endpoint, states in indexed["endpoints"].items():
+                self.items[endpoint] = states
+                self._members[endpoint] = name
+
+    def load(self, endpoint: str) -> Any:
+        """
+        Read the data collected for one endpoint.
+
+        Parameters:
+            endpoint (str): Endpoint name.
+
+        Returns:
+            Any: The endpoint data, None if the archive does not hold the endpoint.
+        """
+        member = self._members.get(endpoint)
+        if member is None:
+            return None
+        for _, content in _iter_archive_members(self.path, {member}):
+            data = json_codec.loads(content)
+            return data if self._sharded else data.get(endpoint)
+        return None
+
+
+class DeltaTracker:
+    """
+    Compare a collection with the archive of a previous run to skip unchanged objects.
+
+    Controllers look up every listed parent object by its key and change marker (see
+    change_marker()). When the marker is the one seen by the previous run, the details and
+    children collected then are reused instead of being fetched again. Markers come from
+    the delta.json index of the previous archive or, failing that, from the data of the
+    previous items themselves. Objects without a marker are always fetched.
+
+    Only the keys, markers and digests of the previous items are kept; the previous data
+    of an endpoint is read from the archive the first time one of its items is reused.
+
+    summary() produces the delta.json of the new archive: the items added, changed and
+    removed since the previous run, and the markers seen, for the next run.
+
+    The tracker is safe to share between threads.
+
+    Parameters:
+        previous (Mapping | PreviousArchive): Data collected by the previous run, keyed by
+            endpoint name, or the archive it was written to.
+        previous_delta (dict, optional): delta.json of the previous archive.
+        source (str): Path of the previous archive, for the summary.
+    """
+
+    def __init__(
+        self,
+        previous: "Mapping[str, Any] | PreviousArchive",
+        previous_delta: dict[str, Any] | None = None,
+        source: str = "",
+    ) -> None:
+        self.source = source
+        self.previous_archive: PreviousArchive | None = None
+        # Previous items by item key, by endpoint name; endpoints of an archive are only
+        # read once needed
+        self._previous_items: dict[str, dict[str, dict[str, Any]]] = {}
+        if isinstance(previous, PreviousArchive):
+            self.previous_archive = previous
+            self.previous_states = previous.items
+        else:
+            self.previous_states = {
+                name: item_states(items) for name, items in previous.items()
+            }
+            self._previous_items = {
+                name: {item_key(item): item for item in items if isinstance(item, dict)}
+                for name, items in previous.items()
+                if isinstance(items, list)
+            }
+        self.previous_index: dict[str, dict[str, dict[str, Any]]] = (
+            previous_delta.get("index", {}) if previous_delta else {}
+        )
+        self.index: dict[str, dict[str, dict[str, Any]]] = {}
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @classmethod
+    def from_archive(cls, path: str) -> "DeltaTracker":
+        """
+        Create a tracker comparing against an archive written by a previous run.
+
+        Parameters:
+            path (str): ZIP or tar.zst archive.
+        """
+        previous = PreviousArchive(path)
+        logger.info(
+            "Collecting incrementally since %s (%s endpoints).",
+            path,
+            len(previous.items),
+        )
+        return cls(previous, previous.delta, source=path)
+
+    def _previous_endpoint(self, endpoint_name: str) -> dict[str, dict[str, Any]]:
+        """Return the previous items of an endpoint by key, reading them if needed."""
+        with self._load_lock:
+            items = self._previous_items.get(endpoint_name)
+            if items is None:
+                data = (
+                    self.previous_archive.load(endpoint_name)
+                    if self.previous_archive is not None
+                    else None
+                )
+                items = {
+                    item_key(item): item
+                    for item in (data if isinstance(data, list) else [])
+                    if isinstance(item, dict)
+                }
+                self._previous_items[endpoint_name] = items
+            return items
+
+    def record(
+        self, endpoint_name: str, key: str, marker: str | None, items: list[Any]
+    ) -> None:
+        """
+        Remember the marker of a source object and the items collected from it.
+
+        Parameters:
+            endpoint_name (str): Endpoint the items belong to.
+            key (str): Key of the source object (listed parent or summary).
+            marker (str, optional): Its change marker; nothing is recorded without one.
+            items (list): Items collected for it.
+        """
+        if marker is None:
+            return
+        with self._lock:
+            self.index.setdefault(endpoint_name, {})[key] = {
+                "marker": marker,
+                "items": [item_key(item) for item in items],
+            }
+
+    def lookup(
+        self, endpoint_name: str, key: str, marker: str | None
+    ) -> list[dict[str, Any]] | None:
+        """
+        Return the items the previous run collected for an unchanged source object.
+
+        Parameters:
+            endpoint_name (str): Endpoint the items belong to.
+            key (str): Key of the source object.
+            marker (str, optional): Its current change marker.
+
+        Returns:
+            list | None: The previous items, or None if the object changed, is new, has no
+                marker or its items are missing from the previous archive.
+        """
+        if marker is None:
+            return None
+        states = self.previous_states.get(endpoint_name, {})
+        entry = self.previous_index.get(endpoint_name, {}).get(key)
+        if entry is not None:
+            if entry.get("marker") != marker:
+                return None
+            keys = entry.get("items", [])
+        else:
+            # Archive without an index: compare with the marker of the item itself
+            state = states.get(key)
+            if state is None or state[0] != marker:
+                return None
+            keys = [key]
+        if not keys or any(item not in states for item in keys):
+            return None
+        previous_items = self._previous_endpoint(endpoint_name)
+        items = [previous_items.get(item) for item in keys]
+        if not items or any(item is None for item in items):
+            return None
+        with self._lock:
+            self.reused += 1
+        return [item for item in items if item is not None]
+
+    def summary(self, final_dict: Mapping[str, Any]) -> dict[str, Any]:
+        """
+        Compare the new collection with the previous one.
+
+        Parameters:
+            final_dict (Mapping): Data collected by this run, keyed by endpoint name.
+
+        Returns:
+            dict: Content of delta.json.
+        """
+        endpoints: dict[str, dict[str, list[str]]] = {}
+        totals = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        for name in sorted(set(final_dict) | set(self.previous_states)):
+            current = item_states(final_dict.get(name))
+            previous = self.previous_states.get(name, {})
+            changes = {
+                "added": [key for key in current if key not in previous],
+                "changed": [
+                    key
+                    for key, state in current.items()
+                    if key in previous and previous[key][1] != state[1]
+                ],
+                "removed": [key for key in previous if key not in current],
+            }
+            for kind, keys in changes.items():
+                totals[kind] += len(keys)
+            totals["unchanged"] += sum(
+                1
+                for key, state in current.items()
+                if key in previous and previous[key][1] == state[1]
+            )
+            if any(changes.values()):
+                endpoints[name] = changes
+
+        logger.info(
+            "Changes since %s: %s added, %s changed, %s removed; %s unchanged objects "
+            "reused without fetching their details.",
+            self.source,
+            totals["added"],
+            totals["changed"],
+            totals["removed"],
+            self.reused,
+        )
+        return {
+            "version": DELTA_VERSION,
+            "since": self.source,
+            "totals": {**totals, "reused": self.reused},
+            "endpoints": endpoints,
+            "index": self.index,
+        }
@@ -2,6 +2,7 @@ import copy
 import json
 import logging
 import re
+from collections.abc import MutableMapping
 from typing import Any
 
 import httpx
@@ -13,6 +14,7 @@ from rich.progress import (
     TextColumn,
 )
 
+from nac_collector.constants import FMC_RATE_LIMIT
 from nac_collector.controller.base import CiscoClientController
 
 logger = logging.getLogger("main")
@@ -29,6 +31,7 @@ class CiscoClientFMC(CiscoClientController):
 
     FMC_AUTH_ENDPOINT = "/api/fmc_platform/v1/auth/generatetoken"
     SOLUTION = "fmc"
+    RATE_LIMITS = {"": FMC_RATE_LIMIT}
 
     def __init__(
         self,
@@ -40,9 +43,17 @@ class CiscoClientFMC(CiscoClientController):
         timeout: int,
         ssl_verify: bool,
         cdfmc: bool = False,
+        **kwargs: Any,
     ) -> None:
         super().__init__(
-            username, password, base_url, max_retries, retry_after, timeout, ssl_verify
+            username,
+            password,
+            base_url,
+            max_retries,
+            retry_after,
+            timeout,
+            ssl_verify,
+            **kwargs,
         )
         self.x_auth_refresh_token: str | None = None
         self.cdfmc = cdfmc
@@ -63,25 +74,43 @@ class CiscoClientFMC(CiscoClientController):
             "Accept": "application/json",
         }
 
-        self.client = httpx.Client(
-            verify=self.ssl_verify,
-            timeout=self.timeout,
-        )
+        # Authentication and collection share one connection pool. The login uses a new
+        # client, so a failed login leaves the current one in place
+        client = self.create_client()
+        try:
+            if self._login(client, headers):
+                self.replace_client(client)
+                return True
+        except BaseException:
+            client.close()
+            raise
+
+        client.close()
+        return False
 
+    def _login(self, client: httpx.Client, headers: dict[str, str]) -> bool:
+        """
+        Log in through a client and set it up for collection.
+
+        Parameters:
+            client (httpx.Client): The new client to log in on.
+            headers (dict): Headers of the login request.
+
+        Returns:
+            bool: True if authentication is successful, False otherwise.
+        """
         if self.cdfmc:
             # CDFMC doesn't require authentication - password is used as token.
             # Check if API is reachable and collect domain information
             headers.update({"Authorization": f"Bearer {self.password}"})
-            response = httpx.get(
+            response = client.get(
                 url=f"{self.base_url}/api/fmc_platform/v1/info/domain",
                 headers=headers,
-                verify=self.ssl_verify,
-                timeout=self.timeout,
             )
 
             if response and response.status_code == 200:
                 logger.info("Successfully connected to CDFMC API")
-                self.client.headers.update(
+                client.headers.update(
                     {
                         "Content-Type": "application/json",
                         "Accept": "application/json",
@@ -97,17 +126,15 @@ class CiscoClientFMC(CiscoClientController):
         else:
             auth_url = f"{self.base_url}{self.FMC_AUTH_ENDPOINT}"
 
-            response = httpx.post(
+            response = client.post(
                 url=auth_url,
                 auth=(self.username, self.password),
                 headers=headers,
-                verify=self.ssl_verify,
-                timeout=self.timeout,
             )
 
             if response and response.status_code == 204:
                 logger.info("Authentication Successful for URL: %s", auth_url)
-                self.client.headers.update(
+                client.headers.update(
                     {
                         "Content-Type": "application/json",
                         "Accept": "application/json",
@@ -271,7 +298,7 @@ class CiscoClientFMC(CiscoClientController):
 
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Retrieve data from a list of endpoint definitions provided as data structure.
 
@@ -281,8 +308,7 @@ class CiscoClientFMC(CiscoClientController):
         Returns:
             dict: The final dictionary containing the data retrieved from the endpoints.
         """
-        # Initialize an empty dictionary
-        final_dict = {}
+        final_dict = self.create_result_store()
 
         # Recreate endpoints per-domain
         endpoints = self.resolve_domains(endpoints_data, self.domains)
@@ -296,7 +322,7 @@ class CiscoClientFMC(CiscoClientController):
             console=None,
         ) as progress:
             task = progress.add_task("Processing endpoints", total=len(endpoints))
-            for endpoint in endpoints:
+            for endpoint in self.tracer.each_endpoint(endpoints):
                 progress.advance(task)
                 logger.info("Processing endpoint: %s", endpoint)
 
@@ -312,10 +338,13 @@ class CiscoClientFMC(CiscoClientController):
 
                 # Save results to dictionary
                 # Due to domain expansion, it may happen that same endpoint["name"] will occur multiple times
+                # Reassigned rather than extended in place: a ResultStore hands out copies
                 if endpoint["name"] not in final_dict:
                     final_dict.update(endpoint_dict)
                 else:
-                    final_dict[endpoint["name"]].extend(endpoint_dict[endpoint["name"]])
+                    final_dict[endpoint["name"]] = (
+                        final_dict[endpoint["name"]] + endpoint_dict[endpoint["name"]]
+                    )
 
         return final_dict
 
@@ -331,55 +360,74 @@ class CiscoClientFMC(CiscoClientController):
         parent_endpoint_ids = []
 
         for item in endpoint_dict[endpoint["name"]]:
+            # Top-level parents unchanged since the previous run keep their children
+            if parent_full_endpoint == "" and self.reuse_children(endpoint, item):
+                continue
             # Add the item's id to the list
             try:
                 parent_endpoint_ids.append(item["data"]["id"])
             except KeyError:
                 continue
 
+        parents = self.index_entries(
+            endpoint_dict[endpoint["name"]],
+            lambda entry: (entry.get("data") or {}).get("id"),
+        )
         for children_endpoint in endpoint["children"]:
             logger.info(
                 "Processing children endpoint: %s",
                 endpoint["endpoint"] + "/%v" + children_endpoint["endpoint"],
             )
 
-            for id_ in parent_endpoint_ids:
-                children_endpoint_dict = CiscoClientController.create_endpoint_dict(
-                    children_endpoint
-                )
+            # Build the full endpoint path
+            # Use parent_full_endpoint if provided (for nested children), otherwise use endpoint["endpoint"]
+            base_endpoint = (
+                parent_full_endpoint
+                if parent_full_endpoint != ""
+                else endpoint["endpoint"]
+            )
+            children_joined_endpoints = [
+                base_endpoint + "/" + id_ + children_endpoint["endpoint"]
+                for id_ in parent_endpoint_ids
+            ]
+            attached = self.fan_out_children(
+                parents,
+                parent_endpoint_ids,
+                children_endpoint,
+                children_joined_endpoints,
+                self.process_children_data,
+            )
 
-                # Build the full endpoint path
-                # Use parent_full_endpoint if provided (for nested children), otherwise use endpoint["endpoint"]
-                base_endpoint = (
-                    parent_full_endpoint
-                    if parent_full_endpoint != ""
-                    else endpoint["endpoint"]
-                )
-                children_joined_endpoint = (
-                    base_endpoint + "/" + id_ + children_endpoint["endpoint"]
+            for entry, children_joined_endpoint in attached:
+                # Pass the full accumulated path for nested children
+                self.process_children(
+                    children_endpoint, entry["children"], children_joined_endpoint
                 )
 
-                data = self.fetch_data(children_joined_endpoint)
+    def process_children_data(
+        self,
+        children_endpoint: dict[str, Any],
+        parent_id: str,
+        data: dict[str, Any] | list[Any] | None,
+    ) -> list[Any]:
+        """
+        Process the data fetched for a child endpoint of one parent.
 
-                # Process the children endpoint data and get the updated dictionary
-                children_endpoint_dict = self.process_endpoint_data(
-                    children_endpoint, children_endpoint_dict, data
-                )
+        Parameters:
+            children_endpoint (dict): The child endpoint configuration.
+            parent_id (str): Id of the parent the data was fetched for.
+            data (dict or list): The data fetched from the child endpoint.
 
-                for index, value in enumerate(endpoint_dict[endpoint["name"]]):
-                    if value.get("data").get("id") == id_:
-                        endpoint_dict[endpoint["name"]][index].setdefault(
-                            "children", {}
-                        )[children_endpoint["name"]] = children_endpoint_dict[
-                            children_endpoint["name"]
-                        ]
-
-                        # Pass the full accumulated path for nested children
-                        self.process_children(
-                            children_endpoint,
-                            endpoint_dict[endpoint["name"]][index]["children"],
-                            children_joined_endpoint,
-                        )
+        Returns:
+            list: The child items to attach to the parent.
+        """
+        children_endpoint_dict = CiscoClientController.create_endpoint_dict(
+            children_endpoint
+        )
+        children_endpoint_dict = self.process_endpoint_data(
+            children_endpoint, children_endpoint_dict, data
+        )
+        return children_endpoint_dict[children_endpoint["name"]]  # type: ignore[no-any-return]
 
     @staticmethod
     def get_id_value(i: dict[str, Any]) -> str | None:
@@ -438,6 +486,22 @@ class CiscoClientFMC(CiscoClientController):
                 if "next" not in data["paging"]:
                     break
 
+        return self._filter_by_domain(output, endpoint)
+
+    @staticmethod
+    def _filter_by_domain(output: dict[str, Any], endpoint: str) -> dict[str, Any]:
+        """
+        Keep only objects that belong to the domain referenced in the endpoint.
+
+        Child domains will include objects from parent domain, which we need to exclude.
+
+        Parameters:
+            output (dict): Merged dict with all objects
+            endpoint (str): Endpoint the objects were collected from
+
+        Returns:
+            dict: Filtered dict, or output as is if it carries no domain information
+        """
         # Check if returned data structure has domain information
         try:
             output["items"][0]["metadata"]["domain"]["id"]
@@ -447,7 +511,6 @@ class CiscoClientFMC(CiscoClientController):
 
         # If returned data structure has domain information
         # Filter output by the domain
-        # Child domains will include objects from parent domain, which we need to exclude
         filtered = {
             "items": [
                 x for x in output["items"] if x["metadata"]["domain"]["id"] in endpoint
@@ -456,6 +519,43 @@ class CiscoClientFMC(CiscoClientController):
 
         return filtered
 
+    async def async_fetch_data(
+        self, endpoint: str, expanded: bool = True, limit: int = 1000
+    ) -> dict[str, Any] | None:
+        """
+        Asynchronous counterpart of fetch_data() (supports paging)
+
+        Parameters:
+            endpoint (str): Endpoint to collect data from
+            expanded (bool): Download objects in expanded form
+            limit (int): Maximum number of items obtained via single call (<=1000)
+
+        Returns:
+            dict: Merged dict with all objects
+        """
+
+        endpoint_url = f"{endpoint}?expanded={expanded}&limit={limit}"
+        output = await super().async_fetch_data(endpoint_url)
+
+        if not output or not isinstance(output, dict):
+            return None
+
+        if "paging" in output and "next" in output["paging"]:
+            data = {"paging": output["paging"]}
+            while True:
+                next_url_params = data["paging"]["next"][0].split("?")[1]
+                next_data = await super().async_fetch_data(
+                    endpoint + "?" + next_url_params
+                )
+                if next_data is None or not isinstance(next_data, dict):
+                    break
+                data = next_data
+                output["items"].extend(data["items"])
+                if "next" not in data["paging"]:
+                    break
+
+        return self._filter_by_domain(output, endpoint)
+
     def resolve_domains(
         self, endpoints: list[dict[str, Any]], domains: list[str]
     ) -> list[dict[str, Any]]:
@@ -484,3 +584,13 @@ class CiscoClientFMC(CiscoClientController):
                 new_endpoints.append(copy.deepcopy(endpoint))
 
         return new_endpoints
+
+
+class CiscoClientCDFMC(CiscoClientFMC):
+    """
+    Client of the cloud-delivered FMC: the FMC client with the password used as
+    the API token, so the username is not used.
+    """
+
+    def __init__(self, username: str, password: str, **kwargs: Any) -> None:
+        super().__init__("ignored_for_cdfmc", password, cdfmc=True, **kwargs)
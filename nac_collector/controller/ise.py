@@ -1,8 +1,9 @@
 import logging
+from collections.abc import MutableMapping
+from functools import partial
 from typing import Any
 from urllib.parse import quote
 
-import httpx
 from rich.progress import (
     BarColumn,
     Progress,
@@ -13,6 +14,7 @@ from rich.progress import (
 
 from nac_collector.constants import ISE_ERS_PAGE_SIZE
 from nac_collector.controller.base import CiscoClientController
+from nac_collector.json_codec import response_json
 
 logger = logging.getLogger("main")
 
@@ -40,9 +42,17 @@ class CiscoClientISE(CiscoClientController):
         retry_after: int,
         timeout: int,
         ssl_verify: bool,
+        **kwargs: Any,
     ) -> None:
         super().__init__(
-            username, password, base_url, max_retries, retry_after, timeout, ssl_verify
+            username,
+            password,
+            base_url,
+            max_retries,
+            retry_after,
+            timeout,
+            ssl_verify,
+            **kwargs,
         )
 
     def reconstruct_url_with_base(self, href: str) -> str:
@@ -94,50 +104,55 @@ class CiscoClientISE(CiscoClientController):
             bool: True if authentication is successful, False otherwise.
         """
 
-        for api in self.ISE_AUTH_ENDPOINTS:
-            auth_url = f"{self.base_url}{api}"
-
-            # Set headers based on auth_url
-            # If it's ERS API, then set up content-type and accept as application/xml
-            if "API/NetworkAccessConfig/ERS" in auth_url:
-                headers = {
-                    "Content-Type": "application/xml",
-                    "Accept": "application/xml",
-                }
-            else:
-                headers = {
-                    "Content-Type": "application/json",
-                    "Accept": "application/json",
-                }
-
-            response = httpx.get(
-                auth_url,
-                auth=(self.username, self.password),
-                headers=headers,
-                verify=self.ssl_verify,
-                timeout=self.timeout,
-            )
+        # Authentication and collection share one connection pool. The login uses a new
+        # client, so a failed login leaves the current one in place
+        client = self.create_client()
+        try:
+            for api in self.ISE_AUTH_ENDPOINTS:
+                auth_url = f"{self.base_url}{api}"
+
+                # Set headers based on auth_url
+                # If it's ERS API, then set up content-type and accept as application/xml
+                if "API/NetworkAccessConfig/ERS" in auth_url:
+                    headers = {
+                        "Content-Type": "application/xml",
+                        "Accept": "application/xml",
+                    }
+                else:
+                    headers = {
+                        "Content-Type": "application/json",
+                        "Accept": "application/json",
+                    }
 
-            if response and response.status_code == 200:
-                logger.info("Authentication Successful for URL: %s", auth_url)
-                # Create a client after successful authentication
-                self.client = httpx.Client(
+                response = client.get(
+                    auth_url,
                     auth=(self.username, self.password),
-                    verify=self.ssl_verify,
-                    timeout=self.timeout,
+                    headers=headers,
                 )
-                self.client.headers.update(headers)
-                self.client.headers.update(
-                    {"Content-Type": "application/json", "Accept": "application/json"}
-                )
-                return True
 
-            logger.error(
-                "Authentication failed with status code: %s",
-                response.status_code,
-            )
+                if response and response.status_code == 200:
+                    logger.info("Authentication Successful for URL: %s", auth_url)
+                    client.auth = (self.username, self.password)
+                    client.headers.update(headers)
+                    client.headers.update(
+                        {
+                            "Content-Type": "application/json",
+                            "Accept": "application/json",
+                        }
+                    )
+                    self.replace_client(client)
+                    return True
+
+                logger.error(
+                    "Authentication failed with status code: %s",
+                    response.status_code,
+                )
+        except BaseException:
+            client.close()
+            raise
 
         # If all authentication endpoints failed
+        client.close()
         return False
 
     def process_endpoint_data(
@@ -191,21 +206,16 @@ class CiscoClientISE(CiscoClientController):
 
         # Pagination for ERS API results
         elif data.get("SearchResult"):
-            ers_data = self.process_ers_api_results(data)
+            ers_data = self.process_ers_api_results(data, endpoint)
 
             for i in ers_data:
-                endpoint_dict[endpoint["name"]].append(
-                    {
-                        "data": i,
-                        "endpoint": endpoint["endpoint"] + "/" + self.get_id_value(i),
-                    }
-                )
+                endpoint_dict[endpoint["name"]].append(self._ers_item(endpoint, i))
 
         return endpoint_dict  # Return the processed endpoint dictionary
 
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Retrieve data from a list of endpoint definitions provided as data structure.
 
@@ -215,8 +225,7 @@ class CiscoClientISE(CiscoClientController):
         Returns:
             dict: The final dictionary containing the data retrieved from the endpoints.
         """
-        # Initialize an empty dictionary
-        final_dict = {}
+        final_dict = self.create_result_store()
 
         # Iterate over all endpoints
         with Progress(
@@ -227,7 +236,7 @@ class CiscoClientISE(CiscoClientController):
             console=None,
         ) as progress:
             task = progress.add_task("Processing endpoints", total=len(endpoints_data))
-            for endpoint in endpoints_data:
+            for endpoint in self.tracer.each_endpoint(endpoints_data):
                 progress.advance(task)
                 logger.info("Processing endpoint: %s", endpoint["name"])
 
@@ -259,11 +268,18 @@ class CiscoClientISE(CiscoClientController):
 
                     id_field = endpoint.get("id_field")
                     for item in endpoint_dict[endpoint["name"]]:
+                        # Parents unchanged since the previous run keep their children
+                        if self.reuse_children(endpoint, item):
+                            continue
                         data = item.get("data", {})
                         id_value = self._resolve_id(data, id_field)
                         if id_value is not None:
                             parent_endpoint_ids.append(id_value)
 
+                    parents = self.index_entries(
+                        endpoint_dict[endpoint["name"]],
+                        partial(self._resolve_entry_id, id_field=id_field),
+                    )
                     for children_endpoint in endpoint["children"]:
                         logger.info(
                             "Processing children endpoint: %s",
@@ -272,56 +288,73 @@ class CiscoClientISE(CiscoClientController):
                             + children_endpoint["endpoint"],
                         )
 
-                        # Iterate over the parent endpoint ids
-                        for id_ in parent_endpoint_ids:
-                            children_endpoint_dict = (
-                                CiscoClientController.create_endpoint_dict(
-                                    children_endpoint
-                                )
-                            )
-
-                            # Replace '%v' in the endpoint with the id.
-                            # Percent-encode the id segment: when id_field is a
-                            # name (not a UUID) it may contain spaces or other
-                            # characters that are invalid in a URL path.
-                            children_joined_endpoint = (
-                                endpoint["endpoint"]
-                                + "/"
-                                + quote(id_, safe="")
-                                + children_endpoint["endpoint"]
-                            )
-
-                            data = self.fetch_data(children_joined_endpoint)
-
-                            # Process the children endpoint data and get the updated dictionary
-                            children_endpoint_dict = self.process_endpoint_data(
-                                children_endpoint, children_endpoint_dict, data
-                            )
-
-                            for index, value in enumerate(
-                                endpoint_dict[endpoint["name"]]
-                            ):
-                                item_data = value.get("data", {})
-                                match_value = self._resolve_id(item_data, id_field)
-                                if match_value == id_:
-                                    endpoint_dict[endpoint["name"]][index].setdefault(
-                                        "children", {}
-                                    )[
-                                        children_endpoint["name"]
-                                    ] = children_endpoint_dict[
-                                        children_endpoint["name"]
-                                    ]
+                        # Build one URL per parent id and fetch them concurrently.
+                        # Percent-encode the id segment: when id_field is a
+                        # name (not a UUID) it may contain spaces or other
+                        # characters that are invalid in a URL path.
+                        children_joined_endpoints = [
+                            endpoint["endpoint"]
+                            + "/"
+                            + quote(id_, safe="")
+                            + children_endpoint["endpoint"]
+                            for id_ in parent_endpoint_ids
+                        ]
+                        self.fan_out_children(
+                            parents,
+                            parent_endpoint_ids,
+                            children_endpoint,
+                            children_joined_endpoints,
+                            self.process_children_data,
+                        )
 
                 # Save results to dictionary
                 final_dict.update(endpoint_dict)
         return final_dict
 
-    def process_ers_api_results(self, data: dict[str, Any]) -> list[Any]:
+    def process_children_data(
+        self,
+        children_endpoint: dict[str, Any],
+        parent_id: str,
+        data: dict[str, Any] | list[Any] | None,
+    ) -> list[Any]:
+        """
+        Process the data fetched for a child endpoint of one parent.
+
+        Parameters:
+            children_endpoint (dict): The child endpoint configuration.
+            parent_id (str): Id of the parent the data was fetched for.
+            data (dict or list): The data fetched from the child endpoint.
+
+        Returns:
+            list: The child items to attach to the parent.
+        """
+        children_endpoint_dict = CiscoClientController.create_endpoint_dict(
+            children_endpoint
+        )
+        children_endpoint_dict = self.process_endpoint_data(
+            children_endpoint, children_endpoint_dict, data
+        )
+        return children_endpoint_dict[children_endpoint["name"]]  # type: ignore[no-any-return]
+
+    def _ers_item(self, endpoint: dict[str, Any], value: Any) -> dict[str, Any]:
+        """Wrap the details of an ERS resource as an item of its endpoint."""
+        return {
+            "data": value,
+            "endpoint": endpoint["endpoint"] + "/" + self.get_id_value(value),
+        }
+
+    def process_ers_api_results(
+        self, data: dict[str, Any], endpoint: dict[str, Any] | None = None
+    ) -> list[Any]:
         """
         Process ERS API results and handle pagination.
 
+        When collecting with since, the details of resources listed unchanged since the
+        previous run are reused instead of being fetched again (see reuse_details()).
+
         Parameters:
             data (dict): The data received from the ERS API.
+            endpoint (dict, optional): The endpoint configuration, to reuse details.
 
         Returns:
             ers_data (list): The processed data.
@@ -336,27 +369,54 @@ class CiscoClientISE(CiscoClientController):
             url = self.reconstruct_url_with_base(href)
             # Send a GET request to the URL
             response = self.get_request(url)
-            if response is None:
+            # A page still rate limited after the last retry ends the pagination
+            if response is None or response.status_code != 200:
                 break
             # Get the JSON content of the response
-            data = response.json()
+            data = response_json(response)
             paginated_data.extend(data["SearchResult"]["resources"])
 
         # For ERS API retrieve details querying all elements from paginated_data
-        ers_data = []
-        for element in paginated_data:
-            # Reconstruct URL using base_url to support proxy scenarios
-            # ISE may return internal IP addresses in href that aren't reachable via proxy
-            href = element["link"]["href"]
-            url = self.reconstruct_url_with_base(href)
-            response = self.get_request(url)
-            if response is None:
+        # Reconstruct URLs using base_url to support proxy scenarios
+        # ISE may return internal IP addresses in href that aren't reachable via proxy
+        urls = [
+            self.reconstruct_url_with_base(element["link"]["href"])
+            for element in paginated_data
+        ]
+        # Details unchanged since the previous run are not fetched again
+        keys = [url.removeprefix(self.base_url) for url in urls]
+        reused = [
+            self.reuse_details(endpoint["name"], key, element)
+            if endpoint is not None
+            else None
+            for key, element in zip(keys, paginated_data, strict=True)
+        ]
+        fetched = iter(
+            self.get_many(
+                [url for url, items in zip(urls, reused, strict=True) if items is None]
+            )
+        )
+        ers_data: list[Any] = []
+        for key, element, items in zip(keys, paginated_data, reused, strict=True):
+            if items is not None:
+                ers_data.extend(item["data"] for item in items)
+                continue
+            response = next(fetched)
+            # Details still rate limited after the last retry are left out
+            if response is None or response.status_code != 200:
                 continue
             # Get the JSON content of the response
-            data = response.json()
-
-            for _, value in data.items():
-                ers_data.append(value)
+            data = response_json(response)
+
+            values = list(data.values())
+            ers_data.extend(values)
+            if endpoint is not None:
+                self.record_details(
+                    endpoint["name"],
+                    key,
+                    element,
+                    [self._ers_item(endpoint, value) for value in values],
+                )
 
         return ers_data
 
@@ -367,6 +427,10 @@ class CiscoClientISE(CiscoClientController):
             return str(value) if value else None
         return CiscoClientISE.get_id_value(data)
 
+    @staticmethod
+    def _resolve_entry_id(entry: dict[str, Any], id_field: str | None) -> str | None:
+        return CiscoClientISE._resolve_id(entry.get("data", {}), id_field)
+
     @staticmethod
     def get_id_value(i: dict[str, Any]) -> str | None:
         """
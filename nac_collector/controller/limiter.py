@@ -0,0 +1,297 @@
+"""Client-side flow control used by the controller request engine."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from nac_collector.constants import (
+    ADAPTIVE_DECREASE_FACTOR,
+    ADAPTIVE_INITIAL_LIMIT,
+    ADAPTIVE_LATENCY_TOLERANCE,
+)
+
+# Status codes that signal the controller is overloaded
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Additive-increase/multiplicative-decrease (AIMD) limit on in-flight requests to one host.
+
+    The window grows by roughly one request per window's worth of successful responses while
+    latency stays close to the best latency observed, and is cut multiplicatively when the
+    host answers 429/503, a request times out, or smoothed latency rises above
+    latency_tolerance times the baseline. After a cut, further cuts are ignored until a full
+    window of responses has completed, so a burst of 429s already in flight only counts once.
+
+    Baseline and smoothed latency are kept per endpoint, as endpoints of the same host can
+    answer at very different speeds: a slow endpoint is compared with its own best latency,
+    not with that of a faster one.
+
+    The limiter is safe to share between threads, whether they run their own event loop
+    (acquire()) or send requests synchronously (acquire_blocking()).
+
+    Parameters:
+        max_limit (int): Upper bound for the window.
+        min_limit (int): Lower bound for the window.
+        initial_limit (int): Window to start with.
+        decrease_factor (float): Multiplier applied to the window on congestion.
+        latency_tolerance (float): Ratio of smoothed to baseline latency considered congestion.
+        smoothing (float): Weight of the newest sample in the smoothed latency.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: int = ADAPTIVE_INITIAL_LIMIT,
+        decrease_factor: float = ADAPTIVE_DECREASE_FACTOR,
+        latency_tolerance: float = ADAPTIVE_LATENCY_TOLERANCE,
+        smoothing: float = 0.2,
+    ) -> None:
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.overloads = 0
+        self.latency_backoffs = 0
+        self.decreases = 0
+        self.peak_limit = self.limit
+        # Latencies in seconds, keyed by endpoint
+        self.baseline_latency: dict[str, float] = {}
+        self.smoothed_latency: dict[str, float] = {}
+
+        self._completed_since_decrease = 0
+        self._lock = threading.Lock()
+        self._waiters: deque[asyncio.Future[None] | threading.Event] = deque()
+
+    @property
+    def window(self) -> int:
+        """Current number of requests allowed in flight."""
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> None:
+        """Wait until a slot in the current window is free and take it."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self.in_flight < self.window:
+                    self.in_flight += 1
+                    self.requests += 1
+                    return
+                waiter: asyncio.Future[None] = loop.create_future()
+                self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    else:
+                        # Already woken: hand the wake-up to the next waiter
+                        self._wake_waiters()
+                raise
+
+    def acquire_blocking(self) -> None:
+        """Block the calling thread until a slot in the current window is free and take it."""
+        while True:
+            with self._lock:
+                if self.in_flight < self.window:
+                    self.in_flight += 1
+                    self.requests += 1
+                    return
+                waiter = threading.Event()
+                self._waiters.append(waiter)
+            waiter.wait()
+
+    def release(
+        self,
+        latency: float | None = None,
+        status_code: int | None = None,
+        timed_out: bool = False,
+        endpoint: str = "",
+    ) -> None:
+        """
+        Free a slot and feed the outcome of the request into the window.
+
+        Parameters:
+            latency (float, optional): Seconds the request took, None if it failed.
+            status_code (int, optional): HTTP status code of the response.
+            timed_out (bool): Whether the request timed out.
+            endpoint (str, optional): Endpoint of the request, whose own latencies the
+                latency is compared with.
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._completed_since_decrease += 1
+
+            if timed_out or status_code in OVERLOAD_STATUS_CODES:
+                self.overloads += 1
+                self._decrease()
+            elif latency is not None:
+                self.successes += 1
+                self._observe_latency(endpoint, latency)
+
+            self._wake_waiters()
+
+    def _observe_latency(self, endpoint: str, latency: float) -> None:
+        baseline = min(latency, self.baseline_latency.get(endpoint, latency))
+        self.baseline_latency[endpoint] = baseline
+        smoothed = self.smoothed_latency.get(endpoint)
+        if smoothed is None:
+            smoothed = latency
+        else:
+            smoothed += self.smoothing * (latency - smoothed)
+        self.smoothed_latency[endpoint] = smoothed
+
+        if smoothed > baseline * self.latency_tolerance:
+            if self._decrease():
+                self.latency_backoffs += 1
+            return
+
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self.peak_limit = max(self.peak_limit, self.limit)
+
+    def _decrease(self) -> bool:
+        if self._completed_since_decrease < self.window:
+            return False
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self._completed_since_decrease = 0
+        self.decreases += 1
+        # Re-learn the smoothed latencies at the new window size
+        self.smoothed_latency.clear()
+        return True
+
+    def _wake_waiters(self) -> None:
+        free = self.window - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            elif waiter.done():
+                continue
+            else:
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+            free -= 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Return the current window and counters.
+
+        Returns:
+            dict: Window, bounds, counters and latencies (in milliseconds) by endpoint.
+        """
+        with self._lock:
+            return {
+                "window": self.window,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "peak_window": int(self.peak_limit),
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "successes": self.successes,
+                "overloads": self.overloads,
+                "latency_backoffs": self.latency_backoffs,
+                "decreases": self.decreases,
+                "baseline_latency_ms": _to_ms(self.baseline_latency),
+                "smoothed_latency_ms": _to_ms(self.smoothed_latency),
+            }
+
+
+def _resolve(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _to_ms(latencies: dict[str, float]) -> dict[str, float]:
+    return {
+        endpoint: round(seconds * 1000, 3) for endpoint, seconds in latencies.items()
+    }
+
+
+class TokenBucket:
+    """
+    Token-bucket limit on the rate of requests sent to a controller.
+
+    Tokens are added at `rate` per second up to `capacity`; every request takes one. A request
+    that finds the bucket empty reserves the next token and sleeps until it is due, so callers
+    from several threads and event loops are paced in arrival order.
+
+    Parameters:
+        rate (float): Sustained requests per second.
+        capacity (float, optional): Burst size. Defaults to 1, spacing requests evenly:
+            a burst at the start of the controller's window could exceed its limit.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.requests = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how many seconds the caller must wait before using it.
+
+        Returns:
+            float: Delay in seconds, 0 if a token was available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self.tokens -= 1
+            self.requests += 1
+            if self.tokens >= 0:
+                return 0.0
+            delay = -self.tokens / self.rate
+            self.delayed += 1
+            self.total_wait += delay
+            return delay
+
+    def acquire(self) -> float:
+        """Block the calling thread until a token is available. Returns the delay."""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def async_acquire(self) -> float:
+        """Wait without blocking the event loop until a token is available. Returns the delay."""
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Return the configured rate and counters.
+
+        Returns:
+            dict: Rate, capacity, number of requests, how many were delayed and total wait.
+        """
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "requests": self.requests,
+                "delayed": self.delayed,
+                "total_wait_s": round(self.total_wait, 3),
+            }
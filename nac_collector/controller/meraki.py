@@ -1,7 +1,9 @@
 import asyncio
 import logging
 import os
+from collections.abc import MutableMapping
 from typing import Any
+from urllib.parse import urlsplit
 
 from meraki.aio.rest_session import AsyncRestSession
 from meraki.exceptions import AsyncAPIError
@@ -18,6 +20,7 @@ from rich.progress import (
 )
 
 from nac_collector.cli import console
+from nac_collector.constants import MERAKI_RATE_LIMIT
 from nac_collector.controller.base import CiscoClientController
 
 logger = logging.getLogger("main")
@@ -35,6 +38,9 @@ class CiscoClientMERAKI(CiscoClientController):
     """
 
     SOLUTION = "meraki"
+    RATE_LIMITS = {"": MERAKI_RATE_LIMIT}
+    # Path of the API on the host of base_url, as in the SDK's default base URL
+    API_PATH = "/api/v1"
 
     def __init__(
         self,
@@ -45,6 +51,7 @@ class CiscoClientMERAKI(CiscoClientController):
         retry_after: int,
         timeout: int,
         ssl_verify: bool,
+        **kwargs: Any,
     ) -> None:
         super().__init__(
             username,
@@ -54,6 +61,7 @@ class CiscoClientMERAKI(CiscoClientController):
             retry_after,
             timeout,
             ssl_verify,
+            **kwargs,
         )
 
         self.allowed_org_ids: list[str] | None = None
@@ -87,12 +95,20 @@ class CiscoClientMERAKI(CiscoClientController):
         Create an async Meraki SDK Rest session.
         """
 
+        # The SDK talks to base_url rather than its default api.meraki.com, so --url
+        # selects the host (e.g. another Meraki region or a test server). A URL without
+        # a path, which the SDK used to ignore, gets the API path
+        base_url = self.base_url.rstrip("/")
+        if not urlsplit(base_url).path:
+            base_url += self.API_PATH
+
         # TODO Use self.ssl_verify, self.timeout?
         self.session = AsyncRestSession(
-            logger, self.password, caller="NacCollector netascode"
+            logger,
+            self.password,
+            base_url=base_url,
+            caller="NacCollector netascode",
         )
-        self.request_throttle_semaphore = asyncio.Semaphore(1)
-        self.request_throttle_delay = 0.1  # 10 requests per second rate limit
         self.total_requests = 0
         logger.info("Created Meraki REST session successful with API key.")
 
@@ -213,7 +229,7 @@ class CiscoClientMERAKI(CiscoClientController):
 
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Retrieve data from a list of endpoint definitions provided as data structure.
 
@@ -228,15 +244,14 @@ class CiscoClientMERAKI(CiscoClientController):
 
     async def async_get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Asynchronously retrieve data from a list of endpoint definitions provided as data structure.
         """
 
         await self.init_session()
 
-        # Initialize an empty dictionary
-        final_dict = {}
+        final_dict = self.create_result_store()
 
         # Iterate over all endpoints
         with Progress(
@@ -254,7 +269,7 @@ class CiscoClientMERAKI(CiscoClientController):
         ) as progress:
             progress_task = progress.add_task("Fetching Meraki endpoints:", start=False)
             # Note: there is only one top-level endpoint: organization
-            for endpoint in endpoints_data:
+            for endpoint in self.tracer.each_endpoint(endpoints_data):
                 endpoint_dict = CiscoClientController.create_endpoint_dict(endpoint)
 
                 data, err_data = await self.fetch_data_with_error(
@@ -464,10 +479,8 @@ class CiscoClientMERAKI(CiscoClientController):
                 "tags": ["no tag"],
                 "operation": "no operation",
             }
-            # Ensure only 10 requests are started per second.
-            # This honors the rate limit (without taking into account the burst allowance).
-            async with self.request_throttle_semaphore:
-                await asyncio.sleep(self.request_throttle_delay)
+            # Pace requests just under the organization rate limit
+            await self.async_throttle(uri)
             data = await self.session.get_pages(metadata, uri)
             return data, None
         except AsyncAPIError as e:
@@ -7,10 +7,10 @@ with MSD fabric support using only YAML-defined endpoints.
 import json
 import logging
 import os
+from collections.abc import MutableMapping
 from typing import Any, cast
 
-import httpx
-
+from nac_collector import json_codec, yaml_cache
 from nac_collector.controller.base import CiscoClientController
 
 logger = logging.getLogger(__name__)
@@ -60,6 +60,14 @@ class CiscoClientNDFC(CiscoClientController):
         "Default_Network_Extension_Universal",
     ]
 
+    # Endpoints whose processing reads the data of other endpoints. They are
+    # collected after them regardless of their order in the YAML.
+    ENDPOINT_DEPENDENCIES: dict[str, list[str]] = {
+        "Policies": ["Discovered_Switches"],
+    }
+    CLI_OPTIONS = {"domain": "local"}
+    CLI_EMPTY_AS_DEFAULT = frozenset({"domain"})
+
     def __init__(self, **kwargs: Any) -> None:
         """
         Initialize NDFC Controller client.
@@ -110,11 +118,8 @@ class CiscoClientNDFC(CiscoClientController):
             logger.error("Username and password are required for NDFC authentication")
             return False
 
-        # Initialize HTTP client
-        self.client = httpx.Client(
-            verify=self.ssl_verify,
-            timeout=self.timeout,
-        )
+        # Log in on a new client, so a failed login leaves the current one in place
+        client = self.create_client()
 
         # This is the ONLY hardcoded endpoint - authentication endpoint
         auth_endpoint = "/login"
@@ -138,7 +143,7 @@ class CiscoClientNDFC(CiscoClientController):
         )
 
         try:
-            response = self.client.post(auth_url, json=auth_data)
+            response = client.post(auth_url, json=auth_data)
 
             if response.status_code == 200:
                 response_data = response.json()
@@ -154,10 +159,11 @@ class CiscoClientNDFC(CiscoClientController):
                 if not token:
                     logger.error("No valid token found in authentication response")
                     logger.debug("Available keys: %s", list(response_data.keys()))
+                    client.close()
                     return False
 
                 # Update client headers with authentication token
-                self.client.headers.update(
+                client.headers.update(
                     {
                         "Authorization": f"Bearer {token}",
                         "Content-Type": "application/json",
@@ -171,11 +177,12 @@ class CiscoClientNDFC(CiscoClientController):
                     for cookie in set_cookie_header.split(","):
                         if "AuthCookie=" in cookie:
                             auth_cookie = cookie.split("AuthCookie=")[1].split(";")[0]
-                            self.client.cookies.set("AuthCookie", auth_cookie)
+                            client.cookies.set("AuthCookie", auth_cookie)
                             logger.debug("Stored AuthCookie for session persistence")
                             break
 
                 logger.info("NDFC authentication successful")
+                self.replace_client(client)
                 return True
 
             else:
@@ -184,15 +191,17 @@ class CiscoClientNDFC(CiscoClientController):
                 )
                 if hasattr(response, "text"):
                     logger.debug("Authentication error: %s", response.text)
+                client.close()
                 return False
 
         except Exception as e:
             logger.error("Authentication error: %s", str(e))
+            client.close()
             return False
 
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Process endpoints data from YAML.
 
@@ -218,42 +227,76 @@ class CiscoClientNDFC(CiscoClientController):
         # First pass: Process Fabric_Configuration to extract fabric ID
         self._extract_fabric_id_from_endpoints(endpoints_list, result)
 
-        # Process each endpoint from YAML
-        for endpoint in endpoints_list:
-            endpoint_name = endpoint.get("name")
-            if not endpoint_name:
-                logger.warning("Skipping endpoint without name: %s", endpoint)
-                continue
+        # Endpoints are processed into the working result, then moved to the store.
+        # Those read by later endpoints stay in the working result as well:
+        # Fabric_Configuration for the fabric IDs, and the ENDPOINT_DEPENDENCIES.
+        referenced = {"Fabric_Configuration"}.union(
+            *self.ENDPOINT_DEPENDENCIES.values()
+        )
+        final_dict = self.create_result_store()
+        if "Fabric_Configuration" in result:
+            final_dict["Fabric_Configuration"] = result["Fabric_Configuration"]
+
+        def collect(endpoint: dict[str, Any]) -> None:
+            self._process_endpoint(endpoint, result)
+            name = endpoint.get("name")
+            if name in result:
+                final_dict[name] = (
+                    result[name] if name in referenced else result.pop(name)
+                )
 
-            # Skip Fabric_Configuration if already processed
-            if endpoint_name == "Fabric_Configuration" and endpoint_name in result:
-                continue
+        # Process each endpoint from YAML. Endpoints switch the fabric context of the
+        # client (MSD), so they are collected one at a time.
+        self.collect_endpoints(
+            endpoints_list,
+            lambda endpoint, _: collect(endpoint),
+            parallel=False,
+        )
 
-            result[endpoint_name] = []
+        logger.info("Completed NDFC data collection")
+        return final_dict
 
-            try:
-                if self.is_msd_fabric and endpoint_name == "MSD_Fabric_Associations":
-                    # Process MSD associations first
-                    self._process_msd_endpoint(endpoint, result)
-                elif self.is_msd_fabric and endpoint_name != "MSD_Fabric_Associations":
-                    # Process endpoint for each member fabric
-                    self._process_endpoint_for_msd_fabrics(endpoint, result)
-                else:
-                    # Process single-site endpoint
-                    self._process_endpoint_single_site(endpoint, result)
+    def _process_endpoint(
+        self, endpoint: dict[str, Any], result: dict[str, Any]
+    ) -> None:
+        """
+        Process one endpoint from YAML.
 
-            except Exception as e:
-                logger.error("Error processing endpoint %s: %s", endpoint_name, str(e))
-                result[endpoint_name].append(
-                    {
-                        "data": {},
-                        "endpoint": endpoint.get("endpoint", ""),
-                        "error": str(e),
-                    }
-                )
+        Args:
+            endpoint: Endpoint configuration from YAML
+            result: Result dictionary to append data to
+        """
+        endpoint_name = endpoint.get("name")
+        if not endpoint_name:
+            logger.warning("Skipping endpoint without name: %s", endpoint)
+            return
 
-        logger.info("Completed NDFC data collection")
-        return result
+        # Skip Fabric_Configuration if already processed
+        if endpoint_name == "Fabric_Configuration" and endpoint_name in result:
+            return
+
+        result[endpoint_name] = []
+
+        try:
+            if self.is_msd_fabric and endpoint_name == "MSD_Fabric_Associations":
+                # Process MSD associations first
+                self._process_msd_endpoint(endpoint, result)
+            elif self.is_msd_fabric and endpoint_name != "MSD_Fabric_Associations":
+                # Process endpoint for each member fabric
+                self._process_endpoint_for_msd_fabrics(endpoint, result)
+            else:
+                # Process single-site endpoint
+                self._process_endpoint_single_site(endpoint, result)
+
+        except Exception as e:
+            logger.error("Error processing endpoint %s: %s", endpoint_name, str(e))
+            result[endpoint_name].append(
+                {
+                    "data": {},
+                    "endpoint": endpoint.get("endpoint", ""),
+                    "error": str(e),
+                }
+            )
 
     def _detect_msd_fabric_from_endpoints(
         self, endpoints_data: list[dict[str, Any]]
@@ -769,7 +812,7 @@ class CiscoClientNDFC(CiscoClientController):
                 "Cannot process Policies endpoint: Discovered_Switches data not available"
             )
             logger.error(
-                "Make sure Discovered_Switches endpoint is defined before Policies endpoint"
+                "Make sure Discovered_Switches endpoint is defined in the endpoints YAML"
             )
             endpoint_dict[endpoint_name].append(
                 {
@@ -1138,7 +1181,7 @@ class CiscoClientNDFC(CiscoClientController):
                 ):
                     try:
                         # Parse the escaped JSON string into a proper object
-                        parsed_json = json.loads(value)
+                        parsed_json = json_codec.loads(value)
                         data[key] = parsed_json
                         logger.debug("Fixed escaped JSON in %s field", key)
                         self._fix_escaped_json_in_data(parsed_json)
@@ -1151,7 +1194,7 @@ class CiscoClientNDFC(CiscoClientController):
                     if stripped_value and stripped_value[0] in "{[":
                         try:
                             # Decode escaped DHCP servers payloads within network template config
-                            parsed_json = json.loads(stripped_value)
+                            parsed_json = json_codec.loads(stripped_value)
                             data[key] = parsed_json
                             logger.debug("Fixed escaped JSON in dhcpServers field")
                             self._fix_escaped_json_in_data(parsed_json)
@@ -1501,6 +1544,10 @@ class CiscoClientNDFC(CiscoClientController):
             logger.warning("VRF_Attachments child endpoint not found")
             return
 
+        # Collect attachment URLs for every deployed vrf first so that they can
+        # be fetched concurrently
+        pending: list[tuple[dict[str, Any], str, str]] = []
+
         # Process each VRF_Configuration entry
         for _config_index, config_entry in enumerate(endpoint_dict[parent_name]):
             if not config_entry.get("data"):
@@ -1518,7 +1565,8 @@ class CiscoClientNDFC(CiscoClientController):
 
                 if vrf_status == "DEPLOYED" and vrf_name:
                     logger.info(
-                        "Processing VRF_Attachments for deployed vrf: %s", vrf_name
+                        "Processing VRF_Attachments for deployed vrf: %s",
+                        vrf_name,
                     )
 
                     # Build the attachment endpoint URL
@@ -1534,45 +1582,7 @@ class CiscoClientNDFC(CiscoClientController):
                         )
 
                     logger.debug("Fetching vrf attachments from: %s", attachment_url)
-
-                    try:
-                        # Fetch the attachment data
-                        attachment_data = self.fetch_data(attachment_url)
-
-                        if attachment_data is not None:
-                            logger.debug(
-                                "Successfully retrieved vrf attachments for: %s",
-                                vrf_name,
-                            )
-
-                            # Process the attachment data
-                            processed_attachments = self._process_attachment_data(
-                                attachment_data
-                            )
-
-                            # Add the vrf_attach_group to the vrf
-                            vrf["vrf_attach_group"] = processed_attachments
-
-                            logger.info(
-                                "Added %d vrf attachments for vrf: %s",
-                                len(processed_attachments)
-                                if isinstance(processed_attachments, list)
-                                else 1,
-                                vrf_name,
-                            )
-                        else:
-                            logger.warning(
-                                "Failed to fetch vrf attachments for: %s", vrf_name
-                            )
-                            vrf["vrf_attach_group"] = []
-
-                    except Exception as e:
-                        logger.error(
-                            "Error fetching vrf attachments for %s: %s",
-                            vrf_name,
-                            str(e),
-                        )
-                        vrf["vrf_attach_group"] = []
+                    pending.append((vrf, vrf_name, attachment_url))
                 else:
                     if vrf_status != "DEPLOYED":
                         logger.debug(
@@ -1583,6 +1593,45 @@ class CiscoClientNDFC(CiscoClientController):
                     else:
                         logger.debug("Skipping vrf with missing vrfName")
 
+        attachments = self.fetch_many([url for _, _, url in pending])
+
+        for (vrf, vrf_name, _), attachment_data in zip(
+            pending, attachments, strict=True
+        ):
+            try:
+                if attachment_data is not None:
+                    logger.debug(
+                        "Successfully retrieved vrf attachments for: %s",
+                        vrf_name,
+                    )
+
+                    # Process the attachment data
+                    processed_attachments = self._process_attachment_data(
+                        attachment_data
+                    )
+
+                    # Add the vrf_attach_group to the vrf
+                    vrf["vrf_attach_group"] = processed_attachments
+
+                    logger.info(
+                        "Added %d vrf attachments for vrf: %s",
+                        len(processed_attachments)
+                        if isinstance(processed_attachments, list)
+                        else 1,
+                        vrf_name,
+                    )
+                else:
+                    logger.warning("Failed to fetch vrf attachments for: %s", vrf_name)
+                    vrf["vrf_attach_group"] = []
+
+            except Exception as e:
+                logger.error(
+                    "Error processing vrf attachments for %s: %s",
+                    vrf_name,
+                    str(e),
+                )
+                vrf["vrf_attach_group"] = []
+
     def _process_network_attachments(
         self, parent_endpoint: dict[str, Any], endpoint_dict: dict[str, Any]
     ) -> None:
@@ -1609,6 +1658,10 @@ class CiscoClientNDFC(CiscoClientController):
             logger.warning("Network_Attachments child endpoint not found")
             return
 
+        # Collect attachment URLs for every deployed network first so that they can
+        # be fetched concurrently
+        pending: list[tuple[dict[str, Any], str, str]] = []
+
         # Process each Network_Configuration entry
         for _config_index, config_entry in enumerate(endpoint_dict[parent_name]):
             if not config_entry.get("data"):
@@ -1645,46 +1698,7 @@ class CiscoClientNDFC(CiscoClientController):
                     logger.debug(
                         "Fetching network attachments from: %s", attachment_url
                     )
-
-                    try:
-                        # Fetch the attachment data
-                        attachment_data = self.fetch_data(attachment_url)
-
-                        if attachment_data is not None:
-                            logger.debug(
-                                "Successfully retrieved network attachments for: %s",
-                                network_name,
-                            )
-
-                            # Process the attachment data
-                            processed_attachments = self._process_attachment_data(
-                                attachment_data
-                            )
-
-                            # Add the network_attach_group to the network
-                            network["network_attach_group"] = processed_attachments
-
-                            logger.info(
-                                "Added %d network attachments for network: %s",
-                                len(processed_attachments)
-                                if isinstance(processed_attachments, list)
-                                else 1,
-                                network_name,
-                            )
-                        else:
-                            logger.warning(
-                                "Failed to fetch network attachments for: %s",
-                                network_name,
-                            )
-                            network["network_attach_group"] = []
-
-                    except Exception as e:
-                        logger.error(
-                            "Error fetching network attachments for %s: %s",
-                            network_name,
-                            str(e),
-                        )
-                        network["network_attach_group"] = []
+                    pending.append((network, network_name, attachment_url))
                 else:
                     if network_status != "DEPLOYED":
                         logger.debug(
@@ -1695,6 +1709,47 @@ class CiscoClientNDFC(CiscoClientController):
                     else:
                         logger.debug("Skipping network with missing networkName")
 
+        attachments = self.fetch_many([url for _, _, url in pending])
+
+        for (network, network_name, _), attachment_data in zip(
+            pending, attachments, strict=True
+        ):
+            try:
+                if attachment_data is not None:
+                    logger.debug(
+                        "Successfully retrieved network attachments for: %s",
+                        network_name,
+                    )
+
+                    # Process the attachment data
+                    processed_attachments = self._process_attachment_data(
+                        attachment_data
+                    )
+
+                    # Add the network_attach_group to the network
+                    network["network_attach_group"] = processed_attachments
+
+                    logger.info(
+                        "Added %d network attachments for network: %s",
+                        len(processed_attachments)
+                        if isinstance(processed_attachments, list)
+                        else 1,
+                        network_name,
+                    )
+                else:
+                    logger.warning(
+                        "Failed to fetch network attachments for: %s", network_name
+                    )
+                    network["network_attach_group"] = []
+
+            except Exception as e:
+                logger.error(
+                    "Error processing network attachments for %s: %s",
+                    network_name,
+                    str(e),
+                )
+                network["network_attach_group"] = []
+
     def _process_vpc_pairs_children(
         self, parent_endpoint: dict[str, Any], endpoint_dict: dict[str, Any]
     ) -> None:
@@ -2040,21 +2095,20 @@ class CiscoClientNDFC(CiscoClientController):
             List[Dict[str, Any]]: List of endpoint configurations
         """
         try:
-            with open(endpoints_file, encoding="utf-8") as f:
-                yaml_data = self.yaml.load(f)
-                if isinstance(yaml_data, dict):
-                    endpoints = yaml_data.get("endpoints", [])
-                    if isinstance(endpoints, list):
-                        return cast(
-                            list[dict[str, Any]],
-                            [
-                                endpoint
-                                for endpoint in endpoints
-                                if isinstance(endpoint, dict)
-                            ],
-                        )
-                logger.error("Invalid endpoints file format: %s", type(yaml_data))
-                return []
+            yaml_data = yaml_cache.load_file(endpoints_file, pure=True)
+            if isinstance(yaml_data, dict):
+                endpoints = yaml_data.get("endpoints", [])
+                if isinstance(endpoints, list):
+                    return cast(
+                        list[dict[str, Any]],
+                        [
+                            endpoint
+                            for endpoint in endpoints
+                            if isinstance(endpoint, dict)
+                        ],
+                    )
+            logger.error("Invalid endpoints file format: %s", type(yaml_data))
+            return []
         except FileNotFoundError:
             logger.error("Endpoints file not found: %s", endpoints_file)
             return []
@@ -1,7 +1,7 @@
 import logging
+from collections.abc import MutableMapping
 from typing import Any
 
-import httpx
 from rich.progress import (
     BarColumn,
     Progress,
@@ -11,6 +11,7 @@ from rich.progress import (
 )
 
 from nac_collector.controller.base import CiscoClientController
+from nac_collector.json_codec import response_json
 
 logger = logging.getLogger("main")
 
@@ -18,6 +19,7 @@ logger = logging.getLogger("main")
 class CiscoClientNDO(CiscoClientController):
     NDO_AUTH_ENDPOINT = "/login"
     SOLUTION = "ndo"
+    CLI_OPTIONS = {"domain": "DefaultAuth"}
 
     def __init__(
         self,
@@ -29,10 +31,18 @@ class CiscoClientNDO(CiscoClientController):
         retry_after: int,
         timeout: int,
         ssl_verify: bool,
+        **kwargs: Any,
     ) -> None:
         self.domain = domain
         super().__init__(
-            username, password, base_url, max_retries, retry_after, timeout, ssl_verify
+            username,
+            password,
+            base_url,
+            max_retries,
+            retry_after,
+            timeout,
+            ssl_verify,
+            **kwargs,
         )
 
     def authenticate(self) -> bool:
@@ -50,24 +60,27 @@ class CiscoClientNDO(CiscoClientController):
             "domain": self.domain,
         }
 
-        self.client = httpx.Client(
-            verify=self.ssl_verify,
-            timeout=self.timeout,
-        )
-
-        response = self.client.post(auth_url, json=data)
+        # Log in on a new client, so a failed login leaves the current one in place
+        client = self.create_client()
+        try:
+            response = client.post(auth_url, json=data)
+        except BaseException:
+            client.close()
+            raise
 
         if response.status_code != 200:
             logger.error(
                 "Authentication failed with status code: %s",
                 response.status_code,
             )
+            client.close()
             return False
+        self.replace_client(client)
         return True
 
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Retrieve data from a list of endpoint definitions provided as data structure.
 
@@ -78,9 +91,10 @@ class CiscoClientNDO(CiscoClientController):
             dict: The final dictionary containing the data retrieved from the endpoints.
         """
         endpoints = endpoints_data
-        final_dict = {}
+        final_dict = self.create_result_store()
 
-        # Iterate over all endpoints
+        # Templates are fetched once the endpoint listing them is done;
+        # every other endpoint is independent
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -89,60 +103,94 @@ class CiscoClientNDO(CiscoClientController):
             console=None,
         ) as progress:
             task = progress.add_task("Processing endpoints", total=len(endpoints_data))
-            for endpoint in endpoints:
-                progress.advance(task)
-                if all(x not in endpoint.get("endpoint", "") for x in ["%v", "%i"]):  # noqa
-                    endpoint_dict = CiscoClientController.create_endpoint_dict(endpoint)
-                    response = self.get_request(self.base_url + endpoint["endpoint"])  # noqa
-                    if response is None:
-                        continue
-                    data = response.json()
-                    key = endpoint["name"]
-
-                    if isinstance(data, dict):
-                        next_key = next(iter(data))
-                        if key == next_key:
-                            data = data[next_key]
-
-                    endpoint_dict[key] = data if isinstance(data, list) else data
-
-                    final_dict.update(endpoint_dict)
-
-                else:
-                    parent_endpoint: dict[str, Any] | str = ""
-                    parent_path = "/".join(endpoint.get("endpoint", "").split("/")[:-1])  # noqa
-                    for e in endpoints:
-                        if parent_path in e.get("endpoint", "") and e != endpoint:
-                            parent_endpoint = e
-                            break
-                    if (
-                        isinstance(parent_endpoint, dict)
-                        and parent_endpoint.get("name") in final_dict
-                    ):  # noqa
-                        endpoint_dict = CiscoClientController.create_endpoint_dict(
-                            endpoint
-                        )
-
-                        r = []
-
-                        parent_data = final_dict.get(parent_endpoint["name"])
-                        if not isinstance(parent_data, list | tuple):
-                            continue
-
-                        for tmpl in parent_data:
-                            if isinstance(tmpl, dict) and "templateId" in tmpl:
-                                response_inner = self.get_request(
-                                    self.base_url
-                                    + endpoint["endpoint"].replace(
-                                        "%v", tmpl.get("templateId", "")
-                                    )
-                                )  # noqa
-                                if response_inner is None:
-                                    continue
-                                data = response_inner.json()
-                            else:
-                                continue
-                            r.append(data)
-
-                        final_dict.update({endpoint["name"]: r})
+            self.collect_endpoints(
+                endpoints,
+                self.fetch_endpoint,
+                depends_on=lambda endpoint: self.parent_endpoint_names(
+                    endpoint, endpoints
+                ),
+                on_done=lambda: progress.advance(task),
+                on_result=lambda result: final_dict.update(result or {}),
+            )
         return final_dict
+
+    @staticmethod
+    def parent_endpoint_names(
+        endpoint: dict[str, Any], endpoints: list[dict[str, Any]]
+    ) -> list[str]:
+        """
+        Return the endpoint whose items an endpoint with a %v placeholder is fetched for.
+
+        Parameters:
+            endpoint (dict): The endpoint definition.
+            endpoints (list[dict]): All endpoint definitions.
+
+        Another template is only a parent if it is listed before the endpoint, as when
+        endpoints were collected in order, so two templates matching each other's path
+        never depend on each other.
+
+        Returns:
+            list[str]: The name of the parent endpoint, or nothing for top-level endpoints
+                and templates without a parent.
+        """
+        if all(x not in endpoint.get("endpoint", "") for x in ["%v", "%i"]):
+            return []
+        parent_path = "/".join(endpoint.get("endpoint", "").split("/")[:-1])
+        position = endpoints.index(endpoint)
+        for index, e in enumerate(endpoints):
+            if parent_path not in e.get("endpoint", "") or e == endpoint:
+                continue
+            templated = any(x in e.get("endpoint", "") for x in ["%v", "%i"])
+            if templated and index > position:
+                continue
+            return [e["name"]]
+        return []
+
+    def fetch_endpoint(
+        self, endpoint: dict[str, Any], parents: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        """
+        Fetch one endpoint.
+
+        Parameters:
+            endpoint (dict): The endpoint definition.
+            parents (dict): {parent endpoint name: its fetch result}.
+
+        Returns:
+            dict | None: {endpoint name: data}, or None if nothing was collected.
+        """
+        if all(x not in endpoint.get("endpoint", "") for x in ["%v", "%i"]):  # noqa
+            response = self.get_request(self.base_url + endpoint["endpoint"])  # noqa
+            if response is None:
+                return None
+            data = response_json(response)
+            key = endpoint["name"]
+
+            if isinstance(data, dict):
+                next_key = next(iter(data))
+                if key == next_key:
+                    data = data[next_key]
+
+            return {key: data}
+
+        # Templates without a parent, or whose parent collected nothing, are skipped
+        parent_name = next(iter(parents), None)
+        parent = parents.get(parent_name) if parent_name is not None else None
+        if parent is None:
+            return None
+        parent_data = parent.get(parent_name)
+        if not isinstance(parent_data, list | tuple):
+            return None
+
+        urls = [
+            self.base_url
+            + endpoint["endpoint"].replace("%v", tmpl.get("templateId", ""))
+            for tmpl in parent_data
+            if isinstance(tmpl, dict) and "templateId" in tmpl
+        ]
+        r = [
+            response_json(response_inner)
+            for response_inner in self.get_many(urls)
+            if response_inner is not None
+        ]
+        return {endpoint["name"]: r}
@@ -0,0 +1,150 @@
+"""Collected endpoint data kept in memory up to a budget, and spilled to disk beyond it."""
+
+import logging
+import os
+import pickle  # nosec B403 - only reads back files this process wrote
+import tempfile
+import threading
+from collections.abc import Iterator, MutableMapping
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class _Spilled:
+    """Marker of a value written to disk."""
+
+    __slots__ = ("path", "size")
+
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = size
+
+
+class ResultStore(MutableMapping[str, Any]):
+    """
+    Mapping of endpoint names to their collected data, holding at most memory_budget
+    bytes of it in memory.
+
+    Controllers add every endpoint to the store as soon as it is collected, children
+    included. Values are measured by their pickled size; while they fit in the budget
+    they are kept as they are, and once it is full every further value is written to a
+    temporary file instead. Reading a spilled value loads a copy of it from disk without
+    keeping it in memory, so write_to_archive() streams the store back one endpoint at a
+    time. Changing a value therefore takes an assignment: a value read back is a copy.
+
+    Pickled sizes understate the memory taken by the Python objects, typically by a
+    factor of two to four, which the budget should allow for. Keys keep the order they
+    were first added in, as in a dict.
+
+    The store is safe to share between threads. Temporary files are removed by close(),
+    or when the store is garbage collected.
+
+    Parameters:
+        memory_budget (int): Bytes of pickled data kept in memory.
+        directory (str, optional): Parent directory of the temporary files. Defaults to
+            the system temporary directory.
+    """
+
+    def __init__(self, memory_budget: int, directory: str | None = None) -> None:
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self.resident_bytes = 0
+        self.spilled_bytes = 0
+        self.spills = 0
+        self._entries: dict[str, Any] = {}
+        self._sizes: dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._tmpdir: tempfile.TemporaryDirectory[str] | None = None
+        self._counter = 0
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._release(key)
+            if self.resident_bytes + len(data) <= self.memory_budget:
+                self._entries[key] = value
+                self._sizes[key] = len(data)
+                self.resident_bytes += len(data)
+                return
+            path = self._spill_path()
+            with open(path, "wb") as f:
+                f.write(data)
+            self._entries[key] = _Spilled(path, len(data))
+            self.spilled_bytes += len(data)
+            self.spills += 1
+        logger.debug("Spilled %s (%s bytes) to %s", key, len(data), path)
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            value = self._entries[key]
+            if isinstance(value, _Spilled):
+                with open(value.path, "rb") as f:
+                    return pickle.load(f)  # nosec B301
+        return value
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            if key not in self._entries:
+                raise KeyError(key)
+            self._release(key)
+            del self._entries[key]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            keys = list(self._entries)
+        return iter(keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def _release(self, key: str) -> None:
+        """Release the memory or file taken by the value of a key, if it has one."""
+        value = self._entries.get(key)
+        if isinstance(value, _Spilled):
+            self.spilled_bytes -= value.size
+            try:
+                os.unlink(value.path)
+            except OSError:
+                pass
+        elif key in self._sizes:
+            self.resident_bytes -= self._sizes.pop(key)
+
+    def _spill_path(self) -> str:
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.TemporaryDirectory(
+                prefix="nac-collector-", dir=self.directory
+            )
+        self._counter += 1
+        return os.path.join(self._tmpdir.name, f"{self._counter}.pickle")
+
+    def close(self) -> None:
+        """Drop every value and remove the temporary files."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.resident_bytes = 0
+            self.spilled_bytes = 0
+            if self._tmpdir is not None:
+                self._tmpdir.cleanup()
+                self._tmpdir = None
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Return the memory and disk usage of the store.
+
+        Returns:
+            dict: Budget, bytes in memory, bytes and values spilled to disk.
+        """
+        with self._lock:
+            return {
+                "memory_budget": self.memory_budget,
+                "resident_bytes": self.resident_bytes,
+                "spilled_bytes": self.spilled_bytes,
+                "spills": self.spills,
+            }
@@ -0,0 +1,190 @@
+"""Dependency-aware execution of endpoint fetch tasks."""
+
+import concurrent.futures
+import heapq
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+
+class EndpointScheduler:
+    """
+    Run fetch tasks as a DAG: every task starts once the tasks it depends on are done,
+    and independent tasks run concurrently on a worker pool.
+
+    Each task is called with the results of its dependencies, keyed like the tasks
+    themselves. Among the tasks that are ready, the one added first starts first, so with
+    a single worker the tasks run in the order they were added wherever the dependencies
+    allow it. A single worker runs the tasks on the calling thread.
+
+    If a task raises, no further tasks are started and the exception is re-raised once
+    the tasks already running have finished.
+
+    Parameters:
+        max_workers (int): Number of tasks run at the same time. Defaults to 1.
+    """
+
+    def __init__(self, max_workers: int = 1) -> None:
+        self.max_workers = max(1, max_workers)
+        self._tasks: dict[Hashable, Callable[[dict[Hashable, Any]], Any]] = {}
+        self._depends_on: dict[Hashable, list[Hashable]] = {}
+
+    def add(
+        self,
+        key: Hashable,
+        run: Callable[[dict[Hashable, Any]], Any],
+        depends_on: Iterable[Hashable] = (),
+    ) -> None:
+        """
+        Add a task.
+
+        Parameters:
+            key (Hashable): Unique key of the task.
+            run (Callable): Called with {dependency key: result}; returns the task result.
+            depends_on (Iterable): Keys of the tasks that must be done first.
+        """
+        if key in self._tasks:
+            raise ValueError(f"Duplicate task: {key!r}")
+        self._tasks[key] = run
+        self._depends_on[key] = list(dict.fromkeys(depends_on))
+
+    def _dependents(self) -> dict[Hashable, list[Hashable]]:
+        """Return {task key: keys of the tasks depending on it}, checking the dependencies."""
+        dependents: dict[Hashable, list[Hashable]] = {key: [] for key in self._tasks}
+        for key, depends_on in self._depends_on.items():
+            for dependency in depends_on:
+                if dependency not in self._tasks:
+                    raise ValueError(
+                        f"Task {key!r} depends on unknown task {dependency!r}"
+                    )
+                dependents[dependency].append(key)
+        return dependents
+
+    def order(self) -> list[Hashable]:
+        """
+        Return the order a single worker runs the tasks in.
+
+        Returns:
+            list: Task keys, each after its dependencies.
+
+        Raises:
+            ValueError: A dependency is not a task, or the dependencies form a cycle.
+        """
+        dependents = self._dependents()
+        keys = list(self._tasks)
+        position = {key: index for index, key in enumerate(keys)}
+        waiting = {key: len(depends_on) for key, depends_on in self._depends_on.items()}
+        ready = [position[key] for key, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            key = keys[heapq.heappop(ready)]
+            order.append(key)
+            for dependent in dependents[key]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, position[dependent])
+
+        if len(order) != len(keys):
+            cycle = [key for key in keys if waiting[key] > 0]
+            raise ValueError(f"Dependency cycle between tasks: {cycle!r}")
+        return order
+
+    def run(
+        self,
+        on_done: Callable[[Hashable], None] | None = None,
+        on_result: Callable[[Hashable, Any], None] | None = None,
+    ) -> dict[Hashable, Any]:
+        """
+        Run every task.
+
+        Parameters:
+            on_done (Callable, optional): Called with the key of every finished task.
+            on_result (Callable, optional): Called with the key and result of every task,
+                in the order the tasks were added, as soon as the tasks added before it
+                are done. The scheduler then drops the result once every task depending
+                on it has started, so results are not all held until the end.
+
+        Returns:
+            dict: {task key: result}, in the order the tasks were added; empty when the
+                results are handed to on_result.
+
+        Raises:
+            ValueError: A dependency is not a task, or the dependencies form a cycle.
+        """
+        order = self.order()
+        dependents = self._dependents()
+        keys = list(self._tasks)
+        position = {key: index for index, key in enumerate(keys)}
+        results: dict[Hashable, Any] = {}
+        done: set[Hashable] = set()
+        # Dependents of every task that have not started yet
+        unstarted = {key: len(dependents[key]) for key in keys}
+        emitted = 0
+
+        def release(key: Hashable) -> None:
+            # Handed to on_result and needed by no task still to start
+            if on_result is not None and position[key] < emitted and not unstarted[key]:
+                results.pop(key, None)
+
+        def arguments(key: Hashable) -> dict[Hashable, Any]:
+            # Dependencies are done, their results no longer change
+            dependencies = {d: results[d] for d in self._depends_on[key]}
+            for dependency in self._depends_on[key]:
+                unstarted[dependency] -= 1
+                release(dependency)
+            return dependencies
+
+        def finished(key: Hashable) -> None:
+            nonlocal emitted
+            done.add(key)
+            if on_done is not None:
+                on_done(key)
+            if on_result is None:
+                return
+            while emitted < len(keys) and keys[emitted] in done:
+                next_key = keys[emitted]
+                emitted += 1
+                on_result(next_key, results[next_key])
+                release(next_key)
+
+        if self.max_workers == 1 or len(order) < 2:
+            for key in order:
+                results[key] = self._tasks[key](arguments(key))
+                finished(key)
+            return {} if on_result is not None else {key: results[key] for key in keys}
+
+        waiting = {key: len(depends_on) for key, depends_on in self._depends_on.items()}
+        ready = [position[key] for key, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        error: BaseException | None = None
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as executor:
+            running: dict[concurrent.futures.Future[Any], Hashable] = {}
+            while ready or running:
+                while ready and error is None and len(running) < self.max_workers:
+                    key = keys[heapq.heappop(ready)]
+                    running[executor.submit(self._tasks[key], arguments(key))] = key
+                if not running:
+                    break
+                done_futures, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done_futures:
+                    key = running.pop(future)
+                    try:
+                        results[key] = future.result()
+                    except BaseException as e:
+                        # Let the running tasks finish, start no new ones
+                        error = error or e
+                        continue
+                    finished(key)
+                    for dependent in dependents[key]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            heapq.heappush(ready, position[dependent])
+
+        if error is not None:
+            raise error
+        return {} if on_result is not None else {key: results[key] for key in keys}
@@ -2,6 +2,7 @@ import base64
 import binascii
 import json
 import logging
+from collections.abc import MutableMapping
 from typing import Any
 
 import httpx
@@ -14,6 +15,7 @@ from rich.progress import (
 )
 
 from nac_collector.controller.base import CiscoClientController
+from nac_collector.json_codec import response_json
 
 logger = logging.getLogger("main")
 
@@ -26,7 +28,11 @@ class CiscoClientSDWAN(CiscoClientController):
     """
 
     SDWAN_AUTH_ENDPOINT = "/j_security_check"
+    # Prefix of the REST API, appended to base_url by a successful login
+    DATASERVICE = "/dataservice"
     SOLUTION = "sdwan"
+    # API token authentication, supported from 20.18
+    CLI_OPTIONS = {"api_token": ""}
 
     def __init__(
         self,
@@ -38,10 +44,18 @@ class CiscoClientSDWAN(CiscoClientController):
         timeout: int,
         ssl_verify: bool,
         api_token: str = "",  # nosec B107 - not a hardcoded password, empty means no token
+        **kwargs: Any,
     ) -> None:
         self.api_token = api_token
         super().__init__(
-            username, password, base_url, max_retries, retry_after, timeout, ssl_verify
+            username,
+            password,
+            base_url,
+            max_retries,
+            retry_after,
+            timeout,
+            ssl_verify,
+            **kwargs,
         )
 
     def authenticate(self) -> bool:
@@ -59,6 +73,16 @@ class CiscoClientSDWAN(CiscoClientController):
             return self._authenticate_token()
         return self._authenticate_session()
 
+    @property
+    def manager_url(self) -> str:
+        """URL of the Manager, base_url without the REST API prefix added by a login."""
+        return self.base_url.removesuffix(self.DATASERVICE)
+
+    def _logged_in(self, client: httpx.Client) -> None:
+        """Start collecting through a client that has just logged in."""
+        self.replace_client(client)
+        self.base_url = self.manager_url + self.DATASERVICE
+
     def _authenticate_token(self) -> bool:
         """
         Perform API token authentication (supported in 20.18+).
@@ -91,26 +115,25 @@ class CiscoClientSDWAN(CiscoClientController):
             )
             return False
 
-        self.client = httpx.Client(
-            verify=self.ssl_verify,
-            timeout=self.timeout,
-        )
+        # Logged in on a new client, so a failed login leaves the current one in place
+        client = self.create_client()
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_token}",
             "X-XSRF-TOKEN": csrf_token,
         }
-        self.client.headers.update(headers)
+        client.headers.update(headers)
 
         # Verify token by making a test request
-        test_url = self.base_url + "/dataservice/client/server"
+        test_url = self.manager_url + self.DATASERVICE + "/client/server"
         try:
-            response = self.client.get(test_url)
+            response = client.get(test_url)
             if response.status_code == 200:
                 logger.info(
-                    "API token authentication successful for URL: %s", self.base_url
+                    "API token authentication successful for URL: %s",
+                    self.manager_url,
                 )
-                self.base_url = self.base_url + "/dataservice"
+                self._logged_in(client)
                 return True
             logger.error(
                 "API token authentication failed with status code: %s",
@@ -119,6 +142,7 @@ class CiscoClientSDWAN(CiscoClientController):
         except httpx.RequestError as e:
             logger.error("API token authentication request failed: %s", e)
 
+        client.close()
         return False
 
     def _authenticate_session(self) -> bool:
@@ -129,54 +153,55 @@ class CiscoClientSDWAN(CiscoClientController):
             bool: True if authentication is successful, False otherwise.
         """
 
-        auth_url = f"{self.base_url}{self.SDWAN_AUTH_ENDPOINT}"
+        auth_url = f"{self.manager_url}{self.SDWAN_AUTH_ENDPOINT}"
 
         data = {"j_username": self.username, "j_password": self.password}
 
-        response = httpx.post(
-            auth_url, data=data, verify=self.ssl_verify, timeout=self.timeout
-        )
-
+        # Authentication and collection share one connection pool. The login uses a new
+        # client, so a failed login leaves the current one in place
+        client = self.create_client()
         try:
-            cookies = response.headers["Set-Cookie"]
-            jsessionid = cookies.split(";")[0]
-        except (KeyError, IndexError):
-            logger.error("No valid JSESSION ID returned")
-            jsessionid = None
-
-        headers = {"Cookie": jsessionid} if jsessionid else {}
-        url = self.base_url + "/dataservice/client/token"
-        response = httpx.get(
-            url=url, headers=headers, verify=self.ssl_verify, timeout=self.timeout
-        )
+            response = client.post(auth_url, data=data)
+
+            try:
+                cookies = response.headers["Set-Cookie"]
+                jsessionid = cookies.split(";")[0]
+            except (KeyError, IndexError):
+                logger.error("No valid JSESSION ID returned")
+                jsessionid = None
+
+            # The session is carried by the Cookie header set below, not the cookie jar
+            client.cookies.clear()
+            headers = {"Cookie": jsessionid} if jsessionid else {}
+            url = self.manager_url + self.DATASERVICE + "/client/token"
+            response = client.get(url=url, headers=headers)
+        except BaseException:
+            client.close()
+            raise
 
         if response and response.status_code == 200:
             logger.info("Authentication Successful for URL: %s", auth_url)
 
-            # Create a client after successful authentication
-            self.client = httpx.Client(
-                verify=self.ssl_verify,
-                timeout=self.timeout,
-            )
-            self.client.headers.update(
+            client.headers.update(
                 {
                     "Content-Type": "application/json",
                     "Cookie": jsessionid or "",
                     "X-XSRF-TOKEN": response.text,
                 }
             )
-            self.base_url = self.base_url + "/dataservice"
+            self._logged_in(client)
             return True
 
         logger.error(
             "Authentication failed with status code: %s",
             response.status_code,
         )
+        client.close()
         return False
 
     def get_from_endpoints_data(
         self, endpoints_data: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+    ) -> MutableMapping[str, Any]:
         """
         Retrieve data from a list of endpoint definitions provided as data structure.
 
@@ -189,8 +214,7 @@ class CiscoClientSDWAN(CiscoClientController):
         # Merge URL list endpoints for SD-WAN (otherwise we get duplicate entries)
         endpoints_data = self._merge_url_list_endpoints(endpoints_data)
 
-        # Initialize an empty dictionary
-        final_dict = {}
+        final_dict = self.create_result_store()
 
         # Iterate over all endpoints
         with Progress(
@@ -201,33 +225,64 @@ class CiscoClientSDWAN(CiscoClientController):
             console=None,
         ) as progress:
             task = progress.add_task("Processing endpoints", total=len(endpoints_data))
-            for endpoint in endpoints_data:
-                progress.advance(task)
-                endpoint_dict = CiscoClientController.create_endpoint_dict(endpoint)
-
-                if all(
-                    x not in endpoint["endpoint"]
-                    for x in [
-                        "%v",
-                        "%i",
-                        "/v1/config-group/",
-                        "/v1/policy-group/",
-                        "/v1/feature-profile/",
-                        "/template/device/",
-                        "/template/policy/definition",
-                        "/template/policy/vedge",
-                        "/template/policy/vsmart",
-                        "/template/policy/security",
-                    ]
-                ):
-                    response = self.get_request(self.base_url + endpoint["endpoint"])
-
-                    if response:
-                        # Get the JSON content of the response
-                        data = response.json()
-
-                        if isinstance(data, list):
-                            for i in data:
+            self.collect_endpoints(
+                endpoints_data,
+                self.fetch_endpoint,
+                on_done=lambda: progress.advance(task),
+                on_result=lambda result: final_dict.update(result or {}),
+            )
+        return final_dict
+
+    def fetch_endpoint(
+        self, endpoint: dict[str, Any], dependencies: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        """
+        Fetch one endpoint, dispatching on its path to the handler of its kind.
+
+        Parameters:
+            endpoint (dict): The endpoint definition.
+            dependencies (dict): Unused, SD-WAN endpoints are independent.
+
+        Returns:
+            dict | None: The endpoint dictionary, or None if nothing was collected.
+        """
+        endpoint_dict = CiscoClientController.create_endpoint_dict(endpoint)
+
+        if all(
+            x not in endpoint["endpoint"]
+            for x in [
+                "%v",
+                "%i",
+                "/v1/config-group/",
+                "/v1/policy-group/",
+                "/v1/feature-profile/",
+                "/template/device/",
+                "/template/policy/definition",
+                "/template/policy/vedge",
+                "/template/policy/vsmart",
+                "/template/policy/security",
+            ]
+        ):
+            response = self.get_request(self.base_url + endpoint["endpoint"])
+
+            if response:
+                # Get the JSON content of the response
+                data = response_json(response)
+
+                if isinstance(data, list):
+                    for i in data:
+                        endpoint_dict[endpoint["name"]].append(
+                            {
+                                "data": i,
+                                "endpoint": endpoint["endpoint"]
+                                + "/"
+                                + self.get_id_value(i),
+                            }
+                        )
+                elif data.get("data"):
+                    if isinstance(data["data"], list):
+                        for i in data["data"]:
+                            try:
                                 endpoint_dict[endpoint["name"]].append(
                                     {
                                         "data": i,
@@ -236,99 +291,51 @@ class CiscoClientSDWAN(CiscoClientController):
                                         + self.get_id_value(i),
                                     }
                                 )
-                        elif data.get("data"):
-                            if isinstance(data["data"], list):
-                                for i in data["data"]:
-                                    try:
-                                        endpoint_dict[endpoint["name"]].append(
-                                            {
-                                                "data": i,
-                                                "endpoint": endpoint["endpoint"]
-                                                + "/"
-                                                + self.get_id_value(i),
-                                            }
-                                        )
-                                    except TypeError:
-                                        endpoint_dict[endpoint["name"]].append(
-                                            {
-                                                "data": i,
-                                                "endpoint": endpoint["endpoint"],
-                                            }
-                                        )
-                            else:
+                            except TypeError:
                                 endpoint_dict[endpoint["name"]].append(
                                     {
-                                        "data": data["data"],
+                                        "data": i,
                                         "endpoint": endpoint["endpoint"],
                                     }
                                 )
-
-                        # Save results to dictionary
-                        final_dict.update(endpoint_dict)
-                        self.log_response(endpoint["endpoint"], response)
-
-                # config groups
-                elif "/v1/config-group/" in endpoint["endpoint"]:
-                    endpoint_dict = self.get_config_groups(endpoint, endpoint_dict)
-                    final_dict.update(endpoint_dict)
-                # policy groups
-                elif "/v1/policy-group/" in endpoint["endpoint"]:
-                    endpoint_dict = self.get_policy_groups(endpoint, endpoint_dict)
-                    final_dict.update(endpoint_dict)
-                # feature profiles
-                elif "/v1/feature-profile/" in endpoint["endpoint"]:
-                    endpoint_dict = self.get_feature_profiles(endpoint, endpoint_dict)
-                    final_dict.update(endpoint_dict)
-                # device templates
-                elif endpoint["name"] == "cli_device_template":
-                    endpoint_dict = self.get_device_templates(endpoint, endpoint_dict)
-                    final_dict.update(endpoint_dict)
-                # policy definitions
-                elif any(
-                    substring in endpoint["endpoint"]
-                    for substring in [
-                        "/template/policy/definition",
-                        "/template/policy/vedge",
-                        "/template/policy/vsmart",
-                        "/template/policy/security",
-                    ]
-                ):
-                    endpoint_dict = self.get_policy_definitions(endpoint, endpoint_dict)
-                    final_dict.update(endpoint_dict)
-                # for feature templates and device templates
-                elif "%i" in endpoint["endpoint"]:
-                    endpoint_dict = self.get_feature_templates(endpoint, endpoint_dict)
-                    final_dict.update(endpoint_dict)
-
-                # resolve feature templates
-                elif "%i" in endpoint["endpoint"]:
-                    endpoint_dict = CiscoClientController.create_endpoint_dict(endpoint)
-                    new_endpoint = endpoint["endpoint"].replace(
-                        "/object/%i", ""
-                    )  # Replace '/object/%i' with ''
-                    response = self.get_request(self.base_url + new_endpoint)
-                    if response is None:
-                        continue
-                    for item in response.json()["data"]:
-                        template_endpoint = (
-                            new_endpoint + "/object/" + str(item["templateId"])
-                        )
-                        response = self.get_request(self.base_url + template_endpoint)
-                        if response is None:
-                            continue
-
-                        # Get the JSON content of the response
-                        data = response.json()
+                    else:
                         endpoint_dict[endpoint["name"]].append(
-                            {"data": data, "endpoint": template_endpoint}
+                            {
+                                "data": data["data"],
+                                "endpoint": endpoint["endpoint"],
+                            }
                         )
-                        # Save results to dictionary
-                        final_dict.update(endpoint_dict)
 
-                        self.log_response(endpoint["endpoint"], response)
-                else:
-                    pass
-        return final_dict
+                self.log_response(endpoint["endpoint"], response)
+                return endpoint_dict
+
+        # config groups
+        elif "/v1/config-group/" in endpoint["endpoint"]:
+            return self.get_config_groups(endpoint, endpoint_dict)
+        # policy groups
+        elif "/v1/policy-group/" in endpoint["endpoint"]:
+            return self.get_policy_groups(endpoint, endpoint_dict)
+        # feature profiles
+        elif "/v1/feature-profile/" in endpoint["endpoint"]:
+            return self.get_feature_profiles(endpoint, endpoint_dict)
+        # device templates
+        elif endpoint["name"] == "cli_device_template":
+            return self.get_device_templates(endpoint, endpoint_dict)
+        # policy definitions
+        elif any(
+            substring in endpoint["endpoint"]
+            for substring in [
+                "/template/policy/definition",
+                "/template/policy/vedge",
+                "/template/policy/vsmart",
+                "/template/policy/security",
+            ]
+        ):
+            return self.get_policy_definitions(endpoint, endpoint_dict)
+        # for feature templates and device templates
+        elif "%i" in endpoint["endpoint"]:
+            return self.get_feature_templates(endpoint, endpoint_dict)
+        return None
 
     def get_device_templates(
         self, endpoint: dict[str, Any], endpoint_dict: dict[str, Any]
@@ -345,7 +352,7 @@ class CiscoClientSDWAN(CiscoClientController):
         if response is None:
             return endpoint_dict
 
-        for item in response.json()["data"]:
+        for item in response_json(response)["data"]:
             if item["deviceType"] == "vsmart":
                 continue
             if item["devicesAttached"] != 0:
@@ -357,7 +364,9 @@ class CiscoClientSDWAN(CiscoClientController):
                 )
                 if response is None:
                     continue
-                attached_uuids = [device["uuid"] for device in response.json()["data"]]
+                attached_uuids = [
+                    device["uuid"] for device in response_json(response)["data"]
+                ]
                 data = {
                     "templateId": str(item["templateId"]),
                     "deviceIds": attached_uuids,
@@ -372,7 +381,7 @@ class CiscoClientSDWAN(CiscoClientController):
                 if response is None:
                     continue
 
-                data = response.json()
+                data = response_json(response)
                 if isinstance(data.get("data"), list):
                     for i in data["data"]:
                         try:
@@ -422,16 +431,38 @@ class CiscoClientSDWAN(CiscoClientController):
         if response is None:
             return endpoint_dict
 
-        for item in response.json()["data"]:
-            if "definitionId" in item.keys():
-                new_endpoint = endpoint["endpoint"] + item["definitionId"]
-            else:
-                new_endpoint = endpoint["endpoint"] + "definition/" + item["policyId"]
-            response = self.get_request(self.base_url + new_endpoint)
+        summaries = response_json(response)["data"]
+        new_endpoints = [
+            endpoint["endpoint"] + item["definitionId"]
+            if "definitionId" in item.keys()
+            else endpoint["endpoint"] + "definition/" + item["policyId"]
+            for item in summaries
+        ]
+        # Definitions unchanged since the previous run are not fetched again
+        reused = [
+            self.reuse_details(endpoint["name"], new_endpoint, summary)
+            for new_endpoint, summary in zip(new_endpoints, summaries, strict=True)
+        ]
+        fetched = iter(
+            self.get_many(
+                [
+                    self.base_url + e
+                    for e, items in zip(new_endpoints, reused, strict=True)
+                    if items is None
+                ]
+            )
+        )
+        for new_endpoint, summary, items in zip(
+            new_endpoints, summaries, reused, strict=True
+        ):
+            if items is not None:
+                endpoint_dict[endpoint["name"]].extend(items)
+                continue
+            response = next(fetched)
             if response is None:
                 continue
 
-            data = response.json()
+            data = response_json(response)
             try:
                 endpoint_dict[endpoint["name"]].append(
                     {
@@ -443,6 +474,12 @@ class CiscoClientSDWAN(CiscoClientController):
                 endpoint_dict[endpoint["name"]].append(
                     {"data": data, "endpoint": endpoint["endpoint"]}
                 )
+            self.record_details(
+                endpoint["name"],
+                new_endpoint,
+                summary,
+                endpoint_dict[endpoint["name"]][-1:],
+            )
 
             self.log_response(new_endpoint, response)
 
@@ -468,13 +505,37 @@ class CiscoClientSDWAN(CiscoClientController):
         response = self.get_request(self.base_url + new_endpoint)
         if response is None:
             return endpoint_dict
-        for item in response.json()["data"]:
-            template_endpoint = new_endpoint + "/object/" + str(item["templateId"])
-            response = self.get_request(self.base_url + template_endpoint)
+        summaries = response_json(response)["data"]
+        template_endpoints = [
+            new_endpoint + "/object/" + str(item["templateId"]) for item in summaries
+        ]
+        # Templates unchanged since the previous run are not fetched again
+        reused = [
+            self.reuse_details(endpoint["name"], template_endpoint, summary)
+            for template_endpoint, summary in zip(
+                template_endpoints, summaries, strict=True
+            )
+        ]
+        fetched = iter(
+            self.get_many(
+                [
+                    self.base_url + e
+                    for e, items in zip(template_endpoints, reused, strict=True)
+                    if items is None
+                ]
+            )
+        )
+        for template_endpoint, summary, items in zip(
+            template_endpoints, summaries, reused, strict=True
+        ):
+            if items is not None:
+                endpoint_dict[endpoint["name"]].extend(items)
+                continue
+            response = next(fetched)
             if response is None:
                 continue
 
-            data = response.json()
+            data = response_json(response)
             try:
                 endpoint_dict[endpoint["name"]].append(
                     {
@@ -488,6 +549,12 @@ class CiscoClientSDWAN(CiscoClientController):
                 endpoint_dict[endpoint["name"]].append(
                     {"data": data, "endpoint": endpoint["endpoint"]}
                 )
+            self.record_details(
+                endpoint["name"],
+                template_endpoint,
+                summary,
+                endpoint_dict[endpoint["name"]][-1:],
+            )
 
             self.log_response(template_endpoint, response)
 
@@ -512,13 +579,13 @@ class CiscoClientSDWAN(CiscoClientController):
         response = self.get_request(self.base_url + endpoint["endpoint"])
         if response is None:
             return endpoint_dict
-        for item in response.json():
+        for item in response_json(response):
             config_group_endpoint = endpoint["endpoint"] + self.get_id_value(item)
             response = self.get_request(self.base_url + config_group_endpoint)
             if response is None:
                 continue
 
-            data = response.json()
+            data = response_json(response)
 
             if data.get("solution") == "sdwan":
                 try:
@@ -544,7 +611,7 @@ class CiscoClientSDWAN(CiscoClientController):
                     )
                     if response is None:
                         continue
-                    for device_data in response.json().get("devices", []):
+                    for device_data in response_json(response).get("devices", []):
                         endpoint_dict["configuration_group_associated_devices"].append(
                             {
                                 "data": device_data,
@@ -563,7 +630,7 @@ class CiscoClientSDWAN(CiscoClientController):
                     )
                     if response is None:
                         continue
-                    for device_data in response.json().get("devices", []):
+                    for device_data in response_json(response).get("devices", []):
                         endpoint_dict["configuration_group_devices"].append(
                             {
                                 "data": device_data,
@@ -592,13 +659,13 @@ class CiscoClientSDWAN(CiscoClientController):
         response = self.get_request(self.base_url + endpoint["endpoint"])
         if response is None:
             return endpoint_dict
-        for item in response.json():
+        for item in response_json(response):
             policy_group_endpoint = endpoint["endpoint"] + self.get_id_value(item)
             response = self.get_request(self.base_url + policy_group_endpoint)
             if response is None:
                 continue
 
-            data = response.json()
+            data = response_json(response)
             if data.get("solution") == "sdwan":
                 try:
                     endpoint_dict[endpoint["name"]].append(
@@ -623,7 +690,7 @@ class CiscoClientSDWAN(CiscoClientController):
                     )
                     if response is None:
                         continue
-                    for device_data in response.json().get("devices", []):
+                    for device_data in response_json(response).get("devices", []):
                         endpoint_dict["policy_group_devices"].append(
                             {
                                 "data": device_data,
@@ -652,20 +719,26 @@ class CiscoClientSDWAN(CiscoClientController):
             return endpoint_dict
 
         try:
-            data_loop = response.json()
+            data_loop = response_json(response)
         except AttributeError:
             data_loop = []
-        for item in data_loop:
-            profile_endpoint = endpoint["endpoint"] + "/" + str(item["profileId"])
-            response = self.get_request(self.base_url + profile_endpoint)
+        profile_endpoints = [
+            endpoint["endpoint"] + "/" + str(item["profileId"]) for item in data_loop
+        ]
+        responses = self.get_many([self.base_url + e for e in profile_endpoints])
+        for profile_endpoint, response in zip(
+            profile_endpoints, responses, strict=True
+        ):
             if response is None:
                 continue
             main_entry = {
-                "data": response.json(),
+                "data": response_json(response),
                 "endpoint": self.base_url + profile_endpoint,
             }
             children_entries = []
-            associated_parcels = response.json().get("associatedProfileParcels", [])
+            associated_parcels = response_json(response).get(
+                "associatedProfileParcels", []
+            )
             for children_endpoint in endpoint.get("children", []):
                 children_endpoint_type = children_endpoint["endpoint"]
                 children_endpoint_type = self.strip_backslash(children_endpoint_type)
@@ -695,42 +768,45 @@ class CiscoClientSDWAN(CiscoClientController):
         parcel_type = parcel["parcelType"]
         if parcel_type.startswith(upstream_parcel_type):
             parcel_type = parcel_type[len(upstream_parcel_type) :].lstrip("/")
-        parcel_id = parcel["parcelId"]
-        new_endpoint = upstream_endpoint + "/" + parcel_type + "/" + parcel_id
-        response = self.get_request(self.base_url + new_endpoint)
-        if response is None:
-            return {"data": {}, "endpoint": new_endpoint}
-        entry = {
-            "data": response.json(),
-            "endpoint": new_endpoint,
-        }
-        children_entries = []
-        for children_endpoint in children_endpoints:
-            children_endpoint_type = (
-                parcel_type + "/" + self.strip_backslash(children_endpoint["endpoint"])
-            )
-            children_endpoint_type1 = self.strip_backslash(children_endpoint_type)
-            children_endpoint_type2 = self.strip_backslash(children_endpoint_type)
-            if children_endpoint_type.startswith(parcel_type):
-                children_endpoint_type2 = children_endpoint_type1[
-                    len(parcel_type) :
-                ].lstrip("/")
-            for subparcel in parcel.get("subparcels", []):
-                if subparcel["parcelType"] in [
-                    children_endpoint_type1,
-                    children_endpoint_type2,
-                ]:
-                    children_entries.append(
-                        self.extract_feature_parcel(
-                            new_endpoint,
-                            parcel_type,
-                            children_endpoint.get("children", []),
-                            subparcel,
+        with self.tracer.span(parcel_type, "feature_parcel"):
+            parcel_id = parcel["parcelId"]
+            new_endpoint = upstream_endpoint + "/" + parcel_type + "/" + parcel_id
+            response = self.get_request(self.base_url + new_endpoint)
+            if response is None:
+                return {"data": {}, "endpoint": new_endpoint}
+            entry = {
+                "data": response_json(response),
+                "endpoint": new_endpoint,
+            }
+            children_entries = []
+            for children_endpoint in children_endpoints:
+                children_endpoint_type = (
+                    parcel_type
+                    + "/"
+                    + self.strip_backslash(children_endpoint["endpoint"])
+                )
+                children_endpoint_type1 = self.strip_backslash(children_endpoint_type)
+                children_endpoint_type2 = self.strip_backslash(children_endpoint_type)
+                if children_endpoint_type.startswith(parcel_type):
+                    children_endpoint_type2 = children_endpoint_type1[
+                        len(parcel_type) :
+                    ].lstrip("/")
+                for subparcel in parcel.get("subparcels", []):
+                    if subparcel["parcelType"] in [
+                        children_endpoint_type1,
+                        children_endpoint_type2,
+                    ]:
+                        children_entries.append(
+                            self.extract_feature_parcel(
+                                new_endpoint,
+                                parcel_type,
+                                children_endpoint.get("children", []),
+                                subparcel,
+                            )
                         )
-                    )
-        if children_entries:
-            entry["children"] = children_entries
-        return entry
+            if children_entries:
+                entry["children"] = children_entries
+            return entry
 
     @staticmethod
     def _merge_url_list_endpoints(
@@ -2,11 +2,13 @@ import concurrent.futures
 import json
 import logging
 import re
-import zipfile
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from typing import Any
 from urllib.parse import urlparse
 
+import httpx
 import paramiko  # type: ignore[import-untyped]
 from rich.progress import (
     BarColumn,
@@ -16,11 +18,40 @@ from rich.progress import (
     TextColumn,
 )
 
+from nac_collector import json_codec
+from nac_collector.archive import ArchiveWriter, Compression
+from nac_collector.constants import RETRY_BUDGET
+from nac_collector.metrics import (
+    DEVICE_METRICS_FILENAME,
+    MetricsRecorder,
+    endpoint_label,
+)
+from nac_collector.recording import Recording
+from nac_collector.retry import (
+    IDEMPOTENT_METHODS,
+    RetryBudget,
+    RetryPolicy,
+    classify_error,
+)
+
 
 class CiscoClientDevice(ABC):
     """
     Abstract Base Class for controller-less device collection.
     Manages connections to multiple individual devices.
+
+    SSH connection attempts and HTTP requests that fail with a transient error are retried
+    up to max_retries times with jittered exponential backoff, within a retry budget shared
+    by all devices. Non-idempotent HTTP requests are only retried if they failed to connect.
+
+    Requests and SSH commands are recorded per device in self.metrics, written to the
+    archive as _metrics.json.
+
+    Given a recording, requests and SSH command output are recorded to it, or replayed
+    from it without connecting to the devices.
+
+    archive_workers threads encode the archive members ahead of writing (see
+    ArchiveWriter); with the default of 1 they are written by zipfile as they are encoded.
     """
 
     def __init__(
@@ -32,14 +63,21 @@ class CiscoClientDevice(ABC):
         retry_after: int,
         timeout: int,
         ssl_verify: bool = False,
+        retry_budget: int = RETRY_BUDGET,
+        recording: Recording | None = None,
+        archive_workers: int = 1,
     ) -> None:
         self.devices = devices
         self.default_username = default_username
         self.default_password = default_password
         self.max_retries = max_retries
         self.retry_after = retry_after
+        self.retry_policy = RetryPolicy(max_retries, budget=RetryBudget(retry_budget))
         self.timeout = timeout
         self.ssl_verify = ssl_verify
+        self.metrics = MetricsRecorder()
+        self.recording = recording
+        self.archive_workers = archive_workers
         self.logger = logging.getLogger(__name__)
 
     @abstractmethod
@@ -53,6 +91,48 @@ class CiscoClientDevice(ABC):
         Device-based solutions typically have a single endpoint for full config.
         """
 
+    def create_client(self, **kwargs: Any) -> httpx.Client:
+        """Create an HTTP client for a device, going through the recording if there is one."""
+        if self.recording is not None:
+            kwargs["transport"] = self.recording.transport(self.ssl_verify)
+        return httpx.Client(verify=self.ssl_verify, **kwargs)
+
+    def send_request(
+        self, method: str, url: str, send: Callable[[], httpx.Response]
+    ) -> httpx.Response:
+        """
+        Send an HTTP request to a device, retrying transport errors according to the retry
+        policy.
+
+        Parameters:
+            method (str): HTTP method of the request, which decides whether timeouts are
+                retried (see RetryPolicy).
+            url (str): URL of the request.
+            send (Callable): Sends the request and returns the response.
+
+        Returns:
+            httpx.Response: The response.
+
+        Raises:
+            httpx.TransportError: If the last attempt failed.
+        """
+        label = endpoint_label(url, host=True)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                return self.metrics.time_request(label, send)
+            except httpx.TransportError as e:
+                delay = self.retry_policy.next_delay(attempt, e, idempotent=idempotent)
+                if delay is None:
+                    raise
+                self.metrics.record_retry(label, classify_error(e), delay)
+                self.logger.warning(
+                    f"{method} {url} failed ({e}), retrying in {delay:.1f} seconds"
+                )
+                time.sleep(delay)
+                attempt += 1
+
     def get_device_credentials(self, device: dict[str, Any]) -> tuple[str, str]:
         """Get credentials for a device (device-specific or defaults)"""
         username = device.get("username", self.default_username)
@@ -90,30 +170,43 @@ class CiscoClientDevice(ABC):
         ssh_client = paramiko.SSHClient()
         ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # nosec B507
 
+        label = f"ssh://{hostname}:{port}"
+        start = time.monotonic()
         try:
-            # Connect to the device
-            ssh_client.connect(
-                hostname=hostname,
-                port=port,
-                username=username,
-                password=password,
-                timeout=timeout,
-                look_for_keys=False,
-                allow_agent=False,
-            )
-
-            self.logger.debug(
-                f"Collecting configuration from {device.get('name')} via SSH"
+            if self.recording is not None and self.recording.replaying:
+                replayed = self.recording.replay_command(label, command)
+                if replayed is None:
+                    raise paramiko.SSHException(f"{label} is not in the recording")
+                exit_status, output_bytes, error_bytes = replayed
+            else:
+                exit_status, output_bytes, error_bytes = self._run_ssh_command(
+                    ssh_client,
+                    device,
+                    hostname,
+                    port,
+                    username,
+                    password,
+                    command,
+                    timeout,
+                )
+                if self.recording is not None:
+                    self.recording.record_command(
+                        label,
+                        command,
+                        exit_status,
+                        output_bytes,
+                        error_bytes,
+                        time.monotonic() - start,
+                    )
+            self.metrics.record_request(
+                label,
+                time.monotonic() - start,
+                status=f"exit {exit_status}",
+                size=len(output_bytes),
             )
 
-            # Execute the command
-            _, stdout, stderr = ssh_client.exec_command(command)  # nosec B601
-
-            # Wait for command completion and get exit status
-            exit_status = stdout.channel.recv_exit_status()
-
             if exit_status != 0:
-                error_output = stderr.read().decode("utf-8").strip()
+                error_output = error_bytes.decode("utf-8").strip()
                 self.logger.error(
                     f"SSH command failed on {device.get('name')} with exit status {exit_status}: {error_output}"
                 )
@@ -122,7 +215,7 @@ class CiscoClientDevice(ABC):
                 }
 
             # Read the output
-            output = stdout.read().decode("utf-8").strip()
+            output = output_bytes.decode("utf-8").strip()
 
             if not output:
                 self.logger.error(
@@ -135,7 +228,7 @@ class CiscoClientDevice(ABC):
                 cleaned_output = self._clean_ssh_output(output)
 
                 # Parse JSON output
-                config_data = json.loads(cleaned_output)
+                config_data = json_codec.loads(cleaned_output)
 
                 # Apply device-specific post-processing
                 processed_data = self._process_ssh_output(config_data)
@@ -157,10 +250,16 @@ class CiscoClientDevice(ABC):
         except paramiko.AuthenticationException:
             error_msg = f"SSH authentication failed for {device.get('name')}"
             self.logger.error(error_msg)
+            self.metrics.record_request(
+                label, time.monotonic() - start, error="authentication"
+            )
             return {"error": error_msg}
         except paramiko.SSHException as e:
             error_msg = f"SSH connection error to {device.get('name')}: {e}"
             self.logger.error(error_msg)
+            self.metrics.record_request(
+                label, time.monotonic() - start, error=classify_error(e)
+            )
             return {"error": error_msg}
         except Exception as e:
             error_msg = f"Error collecting from {device.get('name')}: {e}"
@@ -169,6 +268,82 @@ class CiscoClientDevice(ABC):
         finally:
             ssh_client.close()
 
+    def _run_ssh_command(
+        self,
+        ssh_client: paramiko.SSHClient,
+        device: dict[str, Any],
+        hostname: str,
+        port: int,
+        username: str,
+        password: str,
+        command: str,
+        timeout: int,
+    ) -> tuple[int, bytes, bytes]:
+        """
+        Connect to the device and run a command.
+        Returns its exit status, standard output, and standard error if it failed.
+        """
+        # Connect to the device
+        self._connect_with_retry(
+            ssh_client, device, hostname, port, username, password, timeout
+        )
+
+        self.logger.debug(f"Collecting configuration from {device.get('name')} via SSH")
+
+        # Execute the command
+        _, stdout, stderr = ssh_client.exec_command(command)  # nosec B601
+
+        # Wait for command completion and get exit status
+        exit_status = stdout.channel.recv_exit_status()
+        output_bytes = stdout.read()
+        error_bytes = stderr.read() if exit_status != 0 else b""
+        return exit_status, output_bytes, error_bytes
+
+    def _connect_with_retry(
+        self,
+        ssh_client: paramiko.SSHClient,
+        device: dict[str, Any],
+        hostname: str,
+        port: int,
+        username: str,
+        password: str,
+        timeout: int,
+    ) -> None:
+        """
+        Open the SSH connection, retrying transient failures according to the retry policy.
+        Authentication failures are raised straight away.
+        """
+        attempt = 0
+        while True:
+            try:
+                ssh_client.connect(
+                    hostname=hostname,
+                    port=port,
+                    username=username,
+                    password=password,
+                    timeout=timeout,
+                    look_for_keys=False,
+                    allow_agent=False,
+                )
+                return
+            except paramiko.AuthenticationException:
+                raise
+            # paramiko raises a bare EOFError when the device resets the connection
+            # during the banner exchange
+            except (paramiko.SSHException, OSError, EOFError) as e:
+                delay = self.retry_policy.next_delay(attempt, e)
+                if delay is None:
+                    raise
+                self.metrics.record_retry(
+                    f"ssh://{hostname}:{port}", classify_error(e), delay
+                )
+                self.logger.warning(
+                    f"SSH connection to {device.get('name')} failed ({e}), "
+                    f"retrying in {delay:.1f} seconds"
+                )
+                time.sleep(delay)
+                attempt += 1
+
     def _clean_ssh_output(self, output: str) -> str:
         """
         Clean SSH command output by removing non-JSON lines.
@@ -219,15 +394,19 @@ class CiscoClientDevice(ABC):
             sanitized = "device"
         return sanitized
 
-    def collect_and_write_to_archive(self, output: str) -> None:
+    def collect_and_write_to_archive(
+        self, output: str, compression: Compression = Compression.DEFLATE
+    ) -> None:
         """
-        Collect from all devices and write individual JSON files to ZIP archive.
-        Each device gets its own JSON file named after the device.
+        Collect from all devices and write individual JSON files to the archive.
+        Each device gets its own JSON file named after the device, and the request
+        metrics go to _metrics.json; members are compressed with the given codec and
+        encoded ahead on archive_workers threads.
         """
         successful = 0
         failed = 0
 
-        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        with ArchiveWriter(output, compression, self.archive_workers) as archive:
             # Collect from devices in parallel with progress bar
             with Progress(
                 SpinnerColumn(),
@@ -258,8 +437,7 @@ class CiscoClientDevice(ABC):
                             device_data = future.result()
                             if device_data:
                                 # Write device data to JSON file in archive
-                                json_content = json.dumps(device_data, indent=4)
-                                zip_file.writestr(json_filename, json_content)
+                                archive.write_json(json_filename, device_data)
                                 successful += 1
                                 self.logger.info(
                                     f"Successfully collected from {device_name}"
@@ -270,8 +448,7 @@ class CiscoClientDevice(ABC):
                                     "device": device_name,
                                     "error": "Collection failed - authentication or connection error",
                                 }
-                                json_content = json.dumps(error_data, indent=4)
-                                zip_file.writestr(json_filename, json_content)
+                                archive.write_json(json_filename, error_data)
                                 failed += 1
                                 self.logger.error(
                                     f"Failed to collect from {device_name}"
@@ -279,13 +456,15 @@ class CiscoClientDevice(ABC):
                         except Exception as e:
                             # Write error information for failed device
                             error_data = {"device": device_name, "error": str(e)}
-                            json_content = json.dumps(error_data, indent=4)
-                            zip_file.writestr(json_filename, json_content)
+                            archive.write_json(json_filename, error_data)
                             failed += 1
                             self.logger.error(
                                 f"Error collecting from {device_name}: {e}"
                             )
 
+            if not self.metrics.empty:
+                archive.write_json(DEVICE_METRICS_FILENAME, self.metrics.snapshot())
+
         self.logger.info(
             f"Collection complete: {successful} successful, {failed} failed. "
             f"Data written to {output}"
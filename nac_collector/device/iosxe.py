@@ -1,8 +1,7 @@
 from typing import Any
 
-import httpx
-
 from nac_collector.device.base import CiscoClientDevice
+from nac_collector.json_codec import response_json
 
 
 class CiscoClientIOSXE(CiscoClientDevice):
@@ -82,18 +81,19 @@ class CiscoClientIOSXE(CiscoClientDevice):
         config_url = f"{base_url}{self.CONFIG_ENDPOINT}"
 
         try:
-            with httpx.Client(
-                verify=self.ssl_verify,
+            with self.create_client(
                 auth=(username, password),
                 timeout=self.RESTCONF_DATA_TIMEOUT,
                 headers={"Accept": "application/yang-data+json"},
             ) as client:
                 self.logger.debug(f"Collecting configuration from {device.get('name')}")
-                response = client.get(config_url)
+                response = self.send_request(
+                    "GET", config_url, lambda: client.get(config_url)
+                )
 
                 if response.status_code == 200:
                     # Return the full configuration
-                    config_data = response.json()
+                    config_data = response_json(response)
                     self.logger.info(
                         f"Successfully collected configuration from {device.get('name')}"
                     )
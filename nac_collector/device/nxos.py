@@ -4,6 +4,7 @@ from typing import Any
 import httpx
 
 from nac_collector.device.base import CiscoClientDevice
+from nac_collector.json_codec import response_json
 
 
 class CiscoClientNXOS(CiscoClientDevice):
@@ -38,10 +39,7 @@ class CiscoClientNXOS(CiscoClientDevice):
             target = f"https://{target}"
 
         # Create HTTP client
-        client = httpx.Client(
-            verify=self.ssl_verify,
-            timeout=self.timeout,
-        )
+        client = self.create_client(timeout=self.timeout)
 
         try:
             # Authenticate using aaaLogin
@@ -49,7 +47,9 @@ class CiscoClientNXOS(CiscoClientDevice):
             auth_data = {"aaaUser": {"attributes": {"name": username, "pwd": password}}}
 
             self.logger.debug(f"Authenticating to {device_name} via REST")
-            auth_response = client.post(auth_url, json=auth_data)
+            auth_response = self.send_request(
+                "POST", auth_url, lambda: client.post(auth_url, json=auth_data)
+            )
 
             if auth_response.status_code != 200:
                 self.logger.error(
@@ -115,7 +115,9 @@ class CiscoClientNXOS(CiscoClientDevice):
             config_url = f"{target}{self.CONFIG_ENDPOINT}"
 
             self.logger.debug(f"Collecting configuration from {device_name} via REST")
-            config_response = client.get(config_url)
+            config_response = self.send_request(
+                "GET", config_url, lambda: client.get(config_url)
+            )
 
             if config_response.status_code != 200:
                 self.logger.error(
@@ -126,7 +128,7 @@ class CiscoClientNXOS(CiscoClientDevice):
                 }
 
             try:
-                config_data = config_response.json()
+                config_data = response_json(config_response)
 
                 # Process the response to extract the first element from imdata
                 processed_data = self._process_rest_output(config_data)
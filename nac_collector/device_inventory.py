@@ -2,7 +2,7 @@ import logging
 from pathlib import Path
 from typing import Any
 
-from ruamel.yaml import YAML
+from nac_collector import yaml_cache
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +24,8 @@ def load_devices_from_file(file_path: str | Path) -> list[dict[str, Any]]:
     Returns:
         list[dict[str, Any]]: List of device dictionaries, empty list on error
     """
-    yaml = YAML(typ="safe", pure=True)
-
     try:
-        path = Path(file_path)
-        with path.open() as f:
-            devices = yaml.load(f)
+        devices = yaml_cache.load_file(file_path, pure=True)
 
         if not devices:
             logger.error("Invalid devices file format: file is empty or invalid")
@@ -4,10 +4,8 @@ import logging
 from pathlib import Path
 from typing import Any
 
-from ruamel.yaml import YAML
-
+from nac_collector import yaml_cache
 from nac_collector.constants import GIT_TMP
-from nac_collector.github_repo_wrapper import GithubRepoWrapper
 from nac_collector.resource_manager import ResourceManager
 
 logger = logging.getLogger(__name__)
@@ -63,11 +61,9 @@ class EndpointResolver:
     def _load_from_file(file_path: str) -> list[dict[str, Any]] | None:
         """Load endpoint data from a YAML file."""
         try:
-            yaml = YAML(typ="safe", pure=True)
-            with Path(file_path).open(encoding="utf-8") as f:
-                data: list[dict[str, Any]] = yaml.load(f)
-                logger.debug("Loaded endpoint data from file: %s", file_path)
-                return data
+            data: list[dict[str, Any]] = yaml_cache.load_file(file_path, pure=True)
+            logger.debug("Loaded endpoint data from file: %s", file_path)
+            return data
         except Exception as e:
             logger.error("Failed to load endpoint data from file %s: %s", file_path, e)
             return None
@@ -75,6 +71,9 @@ class EndpointResolver:
     @staticmethod
     def _load_from_git_provider(solution: str) -> list[dict[str, Any]] | None:
         """Load endpoint data from upstream sources."""
+        # Imported here: GitPython is only needed with --fetch-latest
+        from nac_collector.github_repo_wrapper import GithubRepoWrapper
+
         try:
             wrapper = GithubRepoWrapper(
                 repo_url=f"https://github.com/CiscoDevNet/terraform-provider-{solution.lower()}.git",
@@ -0,0 +1,278 @@
+"""JSON encoding and decoding backed by the fastest JSON library installed."""
+
+import json
+import math
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+import httpx
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None  # type: ignore[assignment]
+
+# Name of the library doing the work: "orjson", "msgspec" or "json" (standard library)
+BACKEND = (
+    "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+)
+
+# Lists nested less than STREAM_DEPTH deep are encoded STREAM_BATCH items per native call
+# (and a top-level object one key at a time), so a large document is never held as one
+# encoded string
+STREAM_DEPTH = 2
+STREAM_BATCH = 1000
+
+JSONDecodeError = json.JSONDecodeError
+
+_NON_ASCII = re.compile("[^\x00-\x7f]")
+# Integers of 20 digits or more may not fit in 64 bits
+_WIDE_INTEGER = re.compile(r"\d{20}")
+_WIDE_INTEGER_BYTES = re.compile(rb"\d{20}")
+
+
+def _may_hold_wide_integer(data: bytes | bytearray | memoryview | str) -> bool:
+    """Whether a JSON document contains a run of digits too long for a 64-bit integer."""
+    if isinstance(data, str):
+        return _WIDE_INTEGER.search(data) is not None
+    return _WIDE_INTEGER_BYTES.search(data) is not None
+
+
+def _is_native_safe(data: Any) -> bool:
+    """
+    Whether the native backends encode data exactly as the json module does.
+
+    They write NaN and infinities as null, and exponents without a "+" or leading zero
+    (1e16 rather than 1e+16); every other float is the shortest repr either way.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is dict:
+            stack.extend(value.values())
+        elif kind is list or kind is tuple:
+            stack.extend(value)
+        elif kind is float and ("e" in repr(value) or not math.isfinite(value)):
+            return False
+    return True
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    """
+    Decode a JSON document.
+
+    The native backends are stricter than the json module (they reject NaN, for example);
+    documents they refuse are decoded by the json module, so errors are the same whichever
+    backend is installed. So are documents with integers that may be wider than 64 bits,
+    which orjson would decode as floats.
+
+    Parameters:
+        data (bytes | str): The JSON document.
+
+    Returns:
+        Any: The decoded data.
+
+    Raises:
+        json.JSONDecodeError: If data is not valid JSON.
+    """
+    native = BACKEND != "json" and not _may_hold_wide_integer(data)
+    if native and BACKEND == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    elif native and BACKEND == "msgspec":
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError:
+            pass
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def response_json(response: httpx.Response) -> Any:
+    """
+    Decode the JSON body of a response; a faster equivalent of response.json().
+
+    Parameters:
+        response (httpx.Response): The response.
+
+    Returns:
+        Any: The decoded body.
+
+    Raises:
+        json.JSONDecodeError: If the body is not valid JSON.
+    """
+    return loads(response.content)
+
+
+def dumps(data: Any) -> str:
+    """
+    Encode data as a compact JSON document, e.g. for a request body.
+
+    Parameters:
+        data (Any): JSON-serializable data.
+
+    Returns:
+        str: The JSON document.
+    """
+    try:
+        if BACKEND == "orjson" and _is_native_safe(data):
+            return orjson.dumps(data).decode("utf-8")
+        if BACKEND == "msgspec" and _is_native_safe(data):
+            encoded: bytes = msgspec.json.encode(data)
+            return encoded.decode("utf-8")
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _escape_non_ascii(match: re.Match[str]) -> str:
+    return json.dumps(match.group())[1:-1]
+
+
+def _ensure_ascii(encoded: bytes) -> bytes:
+    """Escape non-ASCII characters as \\u sequences, as the json module does by default."""
+    if encoded.isascii():
+        return encoded
+    text = _NON_ASCII.sub(_escape_non_ascii, encoded.decode("utf-8"))
+    return text.encode("ascii")
+
+
+def _encode_indented(data: Any, indent: int) -> bytes:
+    """Encode data with the native backend, indented by indent spaces per level."""
+    if BACKEND == "orjson":
+        encoded: bytes = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        if indent != 2:
+            # orjson only indents by two spaces. Raw newlines never occur inside JSON
+            # strings, so the spaces opening each line are all indentation: rescale them
+            lines = []
+            for line in encoded.split(b"\n"):
+                content = line.lstrip(b" ")
+                lines.append(
+                    b" " * ((len(line) - len(content)) // 2 * indent) + content
+                )
+            encoded = b"\n".join(lines)
+        return _ensure_ascii(encoded)
+    encoded = msgspec.json.format(msgspec.json.encode(data), indent=indent)
+    return _ensure_ascii(bytes(encoded))
+
+
+def _encode_value(data: Any, indent: int, depth: int) -> bytes:
+    """Encode data nested depth levels deep, falling back to the json module if needed."""
+    try:
+        if not _is_native_safe(data):
+            raise ValueError("float written differently by the native backend")
+        encoded = _encode_indented(data, indent)
+    except (TypeError, ValueError, OverflowError):
+        # Non-string keys, integers wider than 64 bits, NaN...: let the json module decide
+        encoded = json.dumps(data, indent=indent).encode("utf-8")
+    if depth:
+        encoded = encoded.replace(b"\n", b"\n" + b" " * (indent * depth))
+    return encoded
+
+
+def _iter_native(data: Any, indent: int, depth: int) -> Iterator[bytes]:
+    """Yield the pieces of data encoded by the native backend at the given depth."""
+    if (
+        depth == 0
+        and isinstance(data, dict)
+        and data
+        and all(isinstance(key, str) for key in data)
+    ):
+        yield b"{"
+        for index, (key, value) in enumerate(data.items()):
+            yield b"\n" if index == 0 else b",\n"
+            yield b" " * indent + _encode_indented(key, indent) + b": "
+            yield from _iter_native(value, indent, 1)
+        yield b"\n}"
+        return
+
+    if depth < STREAM_DEPTH and isinstance(data, list) and len(data) > STREAM_BATCH:
+        closing = b"\n" + b" " * (indent * depth) + b"]"
+        yield b"["
+        for start in range(0, len(data), STREAM_BATCH):
+            encoded = _encode_value(data[start : start + STREAM_BATCH], indent, depth)
+            # Keep the items of the batch, without its brackets
+            yield (b"," if start else b"") + encoded[1 : -len(closing)]
+        yield closing
+        return
+
+    yield _encode_value(data, indent, depth)
+
+
+def _iter_mapping(data: Mapping[str, Any], indent: int) -> Iterator[bytes]:
+    """Yield the pieces of a mapping that is not a dict, reading one value at a time."""
+    newline = b"\n" + b" " * indent
+    empty = True
+    for key, value in data.items():
+        yield (b"{" if empty else b",") + newline
+        yield json.dumps(key).encode("ascii") + b": "
+        for chunk in iter_encode(value, indent):
+            # Raw newlines never occur inside JSON strings
+            yield chunk.replace(b"\n", newline)
+        empty = False
+    yield b"{}" if empty else b"\n}"
+
+
+def _buffered(pieces: Iterable[bytes], chunk_size: int) -> Iterator[bytes]:
+    """Join pieces into chunks of about chunk_size bytes."""
+    buffer: list[bytes] = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield b"".join(buffer)
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def iter_encode(
+    data: Any, indent: int = 4, chunk_size: int = 1024 * 1024
+) -> Iterator[bytes]:
+    """
+    Encode data as indented JSON incrementally, yielding UTF-8 chunks of about chunk_size.
+
+    The concatenated chunks are identical to json.dumps(data, indent=indent): values the
+    native backends would write differently (NaN, floats in exponent notation...) are
+    encoded by the json module.
+
+    A top-level mapping that is not a dict, such as a ResultStore, is encoded like a dict,
+    reading its values one at a time.
+
+    Parameters:
+        data (Any): JSON-serializable data.
+        indent (int): Spaces per indentation level.
+        chunk_size (int): Bytes (characters with the json module) buffered per chunk.
+    """
+    if isinstance(data, Mapping) and not isinstance(data, dict):
+        yield from _buffered(_iter_mapping(data, indent), chunk_size)
+        return
+
+    if BACKEND == "json":
+        encoder = json.JSONEncoder(indent=indent)
+        text: list[str] = []
+        buffered = 0
+        for piece in encoder.iterencode(data):
+            text.append(piece)
+            buffered += len(piece)
+            if buffered >= chunk_size:
+                yield "".join(text).encode("utf-8")
+                text.clear()
+                buffered = 0
+        if text:
+            yield "".join(text).encode("utf-8")
+        return
+
+    yield from _buffered(_iter_native(data, indent, 0), chunk_size)
@@ -0,0 +1,422 @@
+"""Per-endpoint request metrics, written to the archive and to Prometheus textfiles."""
+
+import bisect
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from nac_collector.constants import METRICS_LATENCY_BUCKETS
+from nac_collector.retry import classify_error
+
+logger = logging.getLogger(__name__)
+
+# Archive member holding MetricsRecorder.snapshot()
+METRICS_FILENAME = "metrics.json"
+# Same, in device archives: device file names never start with "_" (see
+# CiscoClientDevice.sanitize_filename()), so no device can take its place
+DEVICE_METRICS_FILENAME = "_metrics.json"
+METRICS_VERSION = 1
+
+# Path segments identifying one object (UUIDs, numeric ids, long hex ids) are folded
+# into "{id}" so children of every parent are aggregated under one endpoint
+_ID_SEGMENT = re.compile(
+    r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|\d+|[0-9a-fA-F]{24,})$"
+)
+
+
+def endpoint_label(url: str, host: bool = False) -> str:
+    """
+    Return the endpoint a request URL is accounted under.
+
+    Parameters:
+        url (str): Request URL.
+        host (bool): Prefix the label with the host, for clients talking to many devices.
+
+    Returns:
+        str: The URL path without query string, object ids replaced by "{id}".
+    """
+    parts = urlsplit(url)
+    label = "/".join(
+        "{id}" if _ID_SEGMENT.match(segment) else segment
+        for segment in (parts.path or "/").split("/")
+    )
+    return parts.netloc + label if host else label
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRecorder:
+    """
+    Collect request metrics per endpoint: latency histogram, response bytes, status
+    codes, retries by reason, time spent waiting on 429 responses and pagination depth.
+
+    Every HTTP attempt (or SSH command) is recorded, so a request retried twice counts
+    three times in "requests". Attempts that failed without a response are counted under
+    the error kind (see classify_error()) instead of a status code.
+
+    The recorder is safe to share between threads.
+
+    Parameters:
+        buckets (tuple): Upper bounds in seconds of the latency histogram buckets.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = METRICS_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.started = time.time()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict[str, Any]] = {}
+
+    def _entry(self, endpoint: str) -> dict[str, Any]:
+        """Return the counters of an endpoint, creating them. Called with the lock held."""
+        entry = self._endpoints.get(endpoint)
+        if entry is None:
+            entry = {
+                "requests": 0,
+                "errors": 0,
+                "status": {},
+                "bytes": 0,
+                "retries": {},
+                "rate_limit_waits": 0,
+                "rate_limit_wait_seconds": 0.0,
+                "paginated_fetches": 0,
+                "pages": 0,
+                "max_pages": 0,
+                "latency": {
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "count": 0,
+                    "sum": 0.0,
+                    "max": 0.0,
+                },
+            }
+            self._endpoints[endpoint] = entry
+        return entry
+
+    def record_request(
+        self,
+        endpoint: str,
+        latency: float,
+        status: int | str | None = None,
+        size: int = 0,
+        error: str | None = None,
+    ) -> None:
+        """
+        Record one attempt.
+
+        Parameters:
+            endpoint (str): Endpoint label, see endpoint_label().
+            latency (float): Seconds until the response (or the failure).
+            status (int | str, optional): Status code of the response.
+            size (int): Bytes of the response body.
+            error (str, optional): Kind of failure when there is no response.
+        """
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["requests"] += 1
+            key = str(status) if error is None else error
+            entry["status"][key] = entry["status"].get(key, 0) + 1
+            if error is not None:
+                entry["errors"] += 1
+            entry["bytes"] += size
+            histogram = entry["latency"]
+            histogram["buckets"][bisect.bisect_left(self.buckets, latency)] += 1
+            histogram["count"] += 1
+            histogram["sum"] += latency
+            histogram["max"] = max(histogram["max"], latency)
+
+    def record_response(
+        self, endpoint: str, latency: float, response: httpx.Response
+    ) -> None:
+        """
+        Record an attempt that got a response.
+
+        Parameters:
+            endpoint (str): Endpoint label.
+            latency (float): Seconds until the response was read.
+            response (httpx.Response): The response.
+        """
+        self.record_request(
+            endpoint, latency, response.status_code, len(response.content)
+        )
+
+    def time_request(
+        self, endpoint: str, send: Callable[[], httpx.Response]
+    ) -> httpx.Response:
+        """
+        Send a request and record its latency and outcome.
+
+        Parameters:
+            endpoint (str): Endpoint label.
+            send (Callable): Sends the request and returns the response.
+
+        Returns:
+            httpx.Response: The response; transport errors are recorded and re-raised.
+        """
+        start = time.monotonic()
+        try:
+            response = send()
+        except httpx.TransportError as e:
+            self.record_request(
+                endpoint, time.monotonic() - start, error=classify_error(e)
+            )
+            raise
+        self.record_response(endpoint, time.monotonic() - start, response)
+        return response
+
+    def record_retry(self, endpoint: str, reason: str, wait: float = 0.0) -> None:
+        """
+        Record a retry.
+
+        Parameters:
+            endpoint (str): Endpoint label.
+            reason (str): Why the attempt is retried: "429", "401" or an error kind.
+            wait (float): Seconds slept before the retry.
+        """
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["retries"][reason] = entry["retries"].get(reason, 0) + 1
+            if reason == "429":
+                entry["rate_limit_waits"] += 1
+                entry["rate_limit_wait_seconds"] += wait
+
+    def record_pages(self, endpoint: str, pages: int) -> None:
+        """
+        Record the number of pages a paginated fetch took.
+
+        Parameters:
+            endpoint (str): Endpoint label.
+            pages (int): Pages requested, count request excluded.
+        """
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["paginated_fetches"] += 1
+            entry["pages"] += pages
+            entry["max_pages"] = max(entry["max_pages"], pages)
+
+    @property
+    def empty(self) -> bool:
+        """True if nothing has been recorded."""
+        with self._lock:
+            return not self._endpoints
+
+    def _quantile(self, histogram: dict[str, Any], q: float) -> float:
+        """Estimate a latency quantile as the upper bound of the bucket reaching it."""
+        target = q * histogram["count"]
+        seen = 0
+        for bound, count in zip(self.buckets, histogram["buckets"], strict=False):
+            seen += count
+            if seen >= target:
+                return min(bound, float(histogram["max"]))
+        return float(histogram["max"])
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Return the recorded metrics, as written to metrics.json.
+
+        Returns:
+            dict: Run totals and the metrics of every endpoint, slowest total time first.
+        """
+        with self._lock:
+            endpoints = {
+                name: {
+                    **entry,
+                    "status": dict(entry["status"]),
+                    "retries": dict(entry["retries"]),
+                    "latency": {
+                        **entry["latency"],
+                        "buckets": list(entry["latency"]["buckets"]),
+                    },
+                }
+                for name, entry in self._endpoints.items()
+            }
+        totals: dict[str, Any] = {
+            "requests": 0,
+            "errors": 0,
+            "bytes": 0,
+            "retries": 0,
+            "rate_limit_wait_seconds": 0.0,
+        }
+        for entry in endpoints.values():
+            histogram = entry["latency"]
+            if histogram["count"]:
+                histogram["mean"] = histogram["sum"] / histogram["count"]
+                histogram["p50"] = self._quantile(histogram, 0.5)
+                histogram["p95"] = self._quantile(histogram, 0.95)
+            totals["requests"] += entry["requests"]
+            totals["errors"] += entry["errors"]
+            totals["bytes"] += entry["bytes"]
+            totals["retries"] += sum(entry["retries"].values())
+            totals["rate_limit_wait_seconds"] += entry["rate_limit_wait_seconds"]
+        return {
+            "version": METRICS_VERSION,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "duration": time.monotonic() - self._start,
+            "buckets": list(self.buckets),
+            "totals": totals,
+            "endpoints": dict(
+                sorted(
+                    endpoints.items(),
+                    key=lambda item: item[1]["latency"]["sum"],
+                    reverse=True,
+                )
+            ),
+        }
+
+    def prometheus_text(self, solution: str) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Parameters:
+            solution (str): Value of the "solution" label.
+
+        Returns:
+            str: The exposition text.
+        """
+        snapshot = self.snapshot()
+        base = f'solution="{_escape_label(solution)}"'
+        # Metric name -> (type, help, samples as (label string, value))
+        families: dict[str, tuple[str, str, list[tuple[str, Any]]]] = {
+            "nac_collector_requests_total": (
+                "counter",
+                "Requests sent, by response status or error kind",
+                [],
+            ),
+            "nac_collector_request_duration_seconds": (
+                "histogram",
+                "Request latency in seconds",
+                [],
+            ),
+            "nac_collector_response_bytes_total": (
+                "counter",
+                "Bytes of response bodies received",
+                [],
+            ),
+            "nac_collector_retries_total": (
+                "counter",
+                "Requests retried, by reason",
+                [],
+            ),
+            "nac_collector_rate_limit_wait_seconds_total": (
+                "counter",
+                "Seconds waited on 429 Too Many Requests responses",
+                [],
+            ),
+            "nac_collector_pagination_max_pages": (
+                "gauge",
+                "Most pages fetched by one paginated request",
+                [],
+            ),
+            "nac_collector_run_duration_seconds": (
+                "gauge",
+                "Duration of the collection run in seconds",
+                [("", snapshot["duration"])],
+            ),
+            "nac_collector_last_run_timestamp_seconds": (
+                "gauge",
+                "Start of the collection run",
+                [("", self.started)],
+            ),
+        }
+
+        def add(name: str, suffix: str, labels: str, value: Any) -> None:
+            families[name][2].append((suffix + "{" + labels, value))
+
+        for endpoint, entry in snapshot["endpoints"].items():
+            labels = f'{base},endpoint="{_escape_label(endpoint)}"'
+            for status, count in entry["status"].items():
+                add(
+                    "nac_collector_requests_total",
+                    "",
+                    f'{labels},status="{_escape_label(status)}"',
+                    count,
+                )
+            histogram = entry["latency"]
+            cumulative = 0
+            bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, histogram["buckets"], strict=True):
+                cumulative += count
+                add(
+                    "nac_collector_request_duration_seconds",
+                    "_bucket",
+                    f'{labels},le="{bound}"',
+                    cumulative,
+                )
+            add(
+                "nac_collector_request_duration_seconds",
+                "_sum",
+                labels,
+                histogram["sum"],
+            )
+            add(
+                "nac_collector_request_duration_seconds",
+                "_count",
+                labels,
+                histogram["count"],
+            )
+            add("nac_collector_response_bytes_total", "", labels, entry["bytes"])
+            for reason, count in entry["retries"].items():
+                add(
+                    "nac_collector_retries_total",
+                    "",
+                    f'{labels},reason="{_escape_label(reason)}"',
+                    count,
+                )
+            add(
+                "nac_collector_rate_limit_wait_seconds_total",
+                "",
+                labels,
+                entry["rate_limit_wait_seconds"],
+            )
+            if entry["paginated_fetches"]:
+                add(
+                    "nac_collector_pagination_max_pages", "", labels, entry["max_pages"]
+                )
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                # Run-level samples only carry the solution label
+                labels = labels or "{" + base
+                lines.append(f"{name}{labels}}} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, solution: str) -> None:
+        """
+        Write the metrics to a Prometheus textfile, e.g. for the node_exporter textfile
+        collector. The file is replaced atomically so it is never scraped half written.
+
+        Parameters:
+            path (str): Destination file, conventionally ending in .prom.
+            solution (str): Value of the "solution" label.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text(solution))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        logger.info("Metrics written to %s", path)
@@ -0,0 +1,323 @@
+"""Sampling profiler of a collection run, attributing CPU time and allocations to endpoints."""
+
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any
+
+from nac_collector.constants import PROFILE_INTERVAL
+from nac_collector.tracing import Span, SpanListener
+
+logger = logging.getLogger(__name__)
+
+# Root frame of the stacks sampled outside of any endpoint
+NO_ENDPOINT = "(no endpoint)"
+
+
+class _EndpointStats:
+    """Resources used by one endpoint."""
+
+    __slots__ = ("cpu", "samples", "peak", "retained", "runs")
+
+    def __init__(self) -> None:
+        self.cpu = 0.0
+        self.samples = 0
+        self.peak = 0
+        self.retained = 0
+        self.runs = 0
+
+
+class Profiler(SpanListener):
+    """
+    Sample the stacks of every thread of a run and attribute them to endpoints.
+
+    A background thread samples the stack of each thread every interval seconds.
+    Threads whose CPU clock did not advance since the previous sample are waiting
+    (for the network, a lock or a slot) and are left out, so the samples show where the
+    collector itself spends CPU. Each sampled stack is rooted at the endpoint the thread
+    was collecting, which the profiler learns from the endpoint spans of the clients'
+    tracers (see Tracer.add_listener()).
+
+    Per endpoint the profiler also measures:
+        - cpu: thread CPU time spent inside its spans, on every thread that ran them.
+        - peak: highest growth of the memory traced by tracemalloc while it ran,
+          as seen by the sampler. Endpoints running concurrently share their growth.
+        - retained: memory still allocated when its spans closed, e.g. its results.
+
+    Tracing allocations slows the run down considerably; pass trace_malloc=False to
+    profile CPU only.
+
+    Parameters:
+        interval (float): Seconds between samples. Defaults to PROFILE_INTERVAL.
+        trace_malloc (bool): Trace allocations with tracemalloc. Defaults to True.
+    """
+
+    def __init__(
+        self, interval: float = PROFILE_INTERVAL, trace_malloc: bool = True
+    ) -> None:
+        self.interval = interval
+        self.trace_malloc = trace_malloc
+        self.samples = 0
+        self.idle_samples = 0
+        self.stacks: Counter[str] = Counter()
+        self.endpoints: dict[str, _EndpointStats] = {}
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.memory_peak = 0
+        self._lock = threading.Lock()
+        # Per thread: endpoint being collected, spans of it open, CPU and traced
+        # memory when the first of them opened
+        self._active: dict[int, tuple[str, int, float, int]] = {}
+        self._cpu_clocks: dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+        self._started_cpu = 0.0
+        self._owns_tracemalloc = False
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._owns_tracemalloc = self.trace_malloc and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="nac-collector-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling, and tracing allocations."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.wall_time = time.perf_counter() - self._started
+        self.cpu_time = time.process_time() - self._started_cpu
+        if self.trace_malloc and tracemalloc.is_tracing():
+            self.memory_peak = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def span_started(self, span: Span) -> None:
+        if span.endpoint is None:
+            return
+        thread = threading.get_ident()
+        with self._lock:
+            active = self._active.get(thread)
+            if active is not None:
+                endpoint, depth, cpu, memory = active
+                self._active[thread] = (endpoint, depth + 1, cpu, memory)
+                return
+            self._active[thread] = (span.endpoint, 1, time.thread_time(), _traced())
+
+    def span_ended(self, span: Span) -> None:
+        if span.endpoint is None:
+            return
+        thread = threading.get_ident()
+        with self._lock:
+            active = self._active.get(thread)
+            if active is None:
+                return
+            endpoint, depth, cpu, memory = active
+            if depth > 1:
+                self._active[thread] = (endpoint, depth - 1, cpu, memory)
+                return
+            del self._active[thread]
+            stats = self._stats(endpoint)
+            stats.cpu += time.thread_time() - cpu
+            stats.runs += 1
+            if self.trace_malloc:
+                traced = _traced()
+                stats.retained += traced - memory
+                stats.peak = max(stats.peak, traced - memory)
+
+    def _stats(self, endpoint: str) -> _EndpointStats:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = _EndpointStats()
+        return stats
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude: int | None = None) -> None:
+        """
+        Take one sample of the stack of every running thread.
+
+        Parameters:
+            exclude (int, optional): Identifier of a thread left out, the sampler's own.
+        """
+        frames = sys._current_frames()
+        traced = _traced() if self.trace_malloc else 0
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        with self._lock:
+            for thread, frame in frames.items():
+                if thread == exclude:
+                    continue
+                if not self._on_cpu(thread):
+                    self.idle_samples += 1
+                    continue
+                self.samples += 1
+                active = self._active.get(thread)
+                if active is not None:
+                    root = active[0]
+                    self._stats(root).samples += 1
+                else:
+                    root = f"{NO_ENDPOINT} {names.get(thread, thread)}"
+                self.stacks[";".join([root, *_stack(frame)])] += 1
+            for endpoint, _, _, memory in self._active.values():
+                stats = self._stats(endpoint)
+                stats.peak = max(stats.peak, traced - memory)
+            for thread in list(self._cpu_clocks):
+                if thread not in frames:
+                    del self._cpu_clocks[thread]
+
+    def _on_cpu(self, thread: int) -> bool:
+        """Whether the CPU clock of a thread advanced since its previous sample."""
+        if not hasattr(time, "pthread_getcpuclockid"):
+            # No per-thread clocks: count every sample
+            return True
+        try:
+            clock = time.clock_gettime(time.pthread_getcpuclockid(thread))
+        except OSError:
+            # The thread has exited
+            return False
+        previous = self._cpu_clocks.get(thread)
+        self._cpu_clocks[thread] = clock
+        return previous is None or clock > previous
+
+    def folded(self) -> list[str]:
+        """
+        Return the sampled stacks in the collapsed format of flamegraph.pl.
+
+        Returns:
+            list[str]: "root;caller;...;callee count" lines, rooted at the endpoint.
+        """
+        with self._lock:
+            return [f"{stack} {count}" for stack, count in sorted(self.stacks.items())]
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Return the resources used by the run and by each endpoint.
+
+        Returns:
+            dict: Run totals, and per endpoint its CPU seconds, share of the CPU
+                samples, allocation peak and retained bytes, busiest first.
+        """
+        with self._lock:
+            endpoints = sorted(
+                self.endpoints.items(), key=lambda item: item[1].cpu, reverse=True
+            )
+            functions: Counter[str] = Counter()
+            for stack, count in self.stacks.items():
+                functions[stack.rsplit(";", 1)[-1]] += count
+            return {
+                "wall_time": round(self.wall_time, 3),
+                "cpu_time": round(self.cpu_time, 3),
+                "memory_peak": self.memory_peak,
+                "samples": self.samples,
+                "idle_samples": self.idle_samples,
+                "interval": self.interval,
+                "endpoints": {
+                    name: {
+                        "cpu": round(stats.cpu, 3),
+                        "samples": stats.samples,
+                        "share": round(stats.samples / self.samples, 4)
+                        if self.samples
+                        else 0.0,
+                        "peak": stats.peak,
+                        "retained": stats.retained,
+                        "runs": stats.runs,
+                    }
+                    for name, stats in endpoints
+                },
+                "functions": dict(functions.most_common(20)),
+            }
+
+    def table(self) -> str:
+        """
+        Return the summary as a text table.
+
+        Returns:
+            str: Run totals, the endpoints and the functions most often on CPU.
+        """
+        summary = self.summary()
+        lines = [
+            f"Wall time {summary['wall_time']:.2f}s, CPU time {summary['cpu_time']:.2f}s, "
+            f"traced memory peak {_mib(summary['memory_peak'])}, "
+            f"{summary['samples']} CPU samples every {summary['interval'] * 1000:g}ms",
+            "",
+            f"{'Endpoint':<48} {'CPU s':>8} {'CPU %':>6} {'Alloc peak':>11} {'Retained':>11}",
+        ]
+        for name, stats in summary["endpoints"].items():
+            lines.append(
+                f"{name[:48]:<48} {stats['cpu']:>8.3f} {stats['share'] * 100:>6.1f} "
+                f"{_mib(stats['peak']):>11} {_mib(stats['retained']):>11}"
+            )
+        lines += ["", f"{'Function (self)':<72} {'CPU %':>6}"]
+        for function, count in summary["functions"].items():
+            share = count / summary["samples"] * 100 if summary["samples"] else 0.0
+            lines.append(f"{function[:72]:<72} {share:>6.1f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: str, name: str) -> tuple[str, str]:
+        """
+        Write the flamegraph profile and the summary table to a directory.
+
+        Parameters:
+            directory (str): Destination directory.
+            name (str): File name prefix, e.g. the solution.
+
+        Returns:
+            tuple: Paths of <name>-profile.folded and <name>-profile.txt.
+        """
+        folded_path = os.path.join(directory, f"{name}-profile.folded")
+        table_path = os.path.join(directory, f"{name}-profile.txt")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in self.folded())
+        with open(table_path, "w", encoding="utf-8") as f:
+            f.write(self.table())
+        logger.info("Profile written to %s and %s", folded_path, table_path)
+        return folded_path, table_path
+
+
+def _traced() -> int:
+    """Return the memory currently traced by tracemalloc, 0 when it is not tracing."""
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def _stack(frame: FrameType | None) -> list[str]:
+    """Return the frames of a stack, outermost first, as "function (file:line)"."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        # co_qualname is new in Python 3.11
+        name = getattr(code, "co_qualname", code.co_name)
+        stack.append(
+            f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _mib(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MiB"
@@ -0,0 +1,440 @@
+"""Recording of the requests of a run to a directory, and offline replay of them."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, TextIO
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.jsonl"
+BODIES_DIRNAME = "bodies"
+
+# Headers describing the body on the wire; bodies are stored decoded, so they no
+# longer apply when the body is served again
+WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class Recording:
+    """
+    Request/response pairs of a collection run, stored in a directory.
+
+    Recording, every exchange sent through transport() or async_transport() is appended
+    to index.jsonl: method, URL, status, headers and elapsed time, or the transport error
+    raised. Bodies are stored decoded in bodies/<sha256>, so identical bodies are stored
+    once. SSH command output is recorded alongside with record_command(). Request headers
+    and bodies are never stored, so credentials sent to the controller stay out of the
+    recording; the responses, login tokens included, are stored as received.
+
+    Replaying, the transports answer from the recording without touching the network.
+    Exchanges are keyed by method and URL; the responses recorded for a key are served in
+    their recorded order, the last one again once they are used up, so retries and
+    re-logins are replayed as they happened. A request that was never recorded is
+    answered with a 404.
+
+    A recording is safe to share between threads.
+
+    Parameters:
+        directory (str): Directory of the recording, created if missing.
+        replay (bool): Serve the recording instead of recording a new one. Defaults to
+            False, which replaces any recording already in the directory.
+    """
+
+    def __init__(self, directory: str, replay: bool = False) -> None:
+        self.directory = directory
+        self.replaying = replay
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Recorded exchanges per key, and how many of them were served so far
+        self._exchanges: dict[tuple[str, str], list[dict[str, Any]]] = defaultdict(list)
+        self._served: dict[tuple[str, str], int] = defaultdict(int)
+        self._index: TextIO | None = None
+        if replay:
+            self._load_index()
+        else:
+            os.makedirs(os.path.join(directory, BODIES_DIRNAME), exist_ok=True)
+            # Line buffered, so a run cut short leaves every exchange made so far
+            self._index = open(
+                os.path.join(directory, INDEX_FILENAME),
+                "w",
+                buffering=1,
+                encoding="utf-8",
+            )
+
+    def _load_index(self) -> None:
+        path = os.path.join(self.directory, INDEX_FILENAME)
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        exchange = json.loads(line)
+                        self._exchanges[self.key(exchange)].append(exchange)
+        except OSError as e:
+            raise ValueError(f"No recording found in {self.directory}: {e}") from e
+
+    @staticmethod
+    def key(exchange: dict[str, Any]) -> tuple[str, str]:
+        """Return the replay key of an exchange: its method and URL."""
+        return exchange["method"], exchange["url"]
+
+    def close(self) -> None:
+        """Close the index of a recording being written."""
+        if self._index is not None:
+            self._index.close()
+
+    def __enter__(self) -> "Recording":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def transport(
+        self,
+        verify: Any = True,
+        http2: bool = False,
+        limits: httpx.Limits | None = None,
+    ) -> httpx.BaseTransport:
+        """
+        Return a transport for httpx.Client recording to or replaying from this recording.
+
+        A client given a transport ignores its own verify, http2 and limits arguments, so
+        they are passed here instead; limits default to those of httpx.
+
+        Returns:
+            httpx.BaseTransport: The transport.
+        """
+        inner = (
+            None
+            if self.replaying
+            else httpx.HTTPTransport(verify=verify, http2=http2, **_limits(limits))
+        )
+        return _RecordingTransport(self, inner)
+
+    def async_transport(
+        self,
+        verify: Any = True,
+        http2: bool = False,
+        limits: httpx.Limits | None = None,
+    ) -> httpx.AsyncBaseTransport:
+        """
+        Return a transport for httpx.AsyncClient, see transport().
+
+        Returns:
+            httpx.AsyncBaseTransport: The transport.
+        """
+        inner = (
+            None
+            if self.replaying
+            else httpx.AsyncHTTPTransport(verify=verify, http2=http2, **_limits(limits))
+        )
+        return _AsyncRecordingTransport(self, inner)
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        status: int | None = None,
+        headers: list[tuple[str, str]] | None = None,
+        content: bytes = b"",
+        elapsed: float = 0.0,
+        error: BaseException | None = None,
+        **fields: Any,
+    ) -> None:
+        """
+        Append an exchange to the recording.
+
+        Parameters:
+            method (str): Request method.
+            url (str): Request URL.
+            status (int, optional): Response status code.
+            headers (list, optional): Response headers.
+            content (bytes): Decoded response body.
+            elapsed (float): Seconds from sending the request to reading the body.
+            error (BaseException, optional): Error raised instead of a response.
+            **fields: Extra fields stored with the exchange.
+        """
+        exchange: dict[str, Any] = {
+            "method": method,
+            "url": url,
+            "elapsed": round(elapsed, 6),
+            **fields,
+        }
+        if error is not None:
+            exchange["error"] = type(error).__name__
+            exchange["message"] = str(error)
+        else:
+            exchange["status"] = status
+            exchange["headers"] = [
+                [name, value]
+                for name, value in headers or []
+                if name.lower() not in WIRE_HEADERS
+            ]
+            exchange["body"] = self._store_body(content)
+        line = json.dumps(exchange) + "\n"
+        with self._lock:
+            if self._index is None:
+                raise ValueError("A replayed recording cannot be recorded to")
+            self._index.write(line)
+            self.recorded += 1
+
+    def _store_body(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._body_path(digest)
+        if os.path.exists(path):
+            return digest
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return digest
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.directory, BODIES_DIRNAME, digest)
+
+    def next_exchange(self, method: str, url: str) -> dict[str, Any] | None:
+        """
+        Return the next recorded exchange of a request.
+
+        Parameters:
+            method (str): Request method.
+            url (str): Request URL.
+
+        Returns:
+            dict | None: The exchange, or None if the request was never recorded.
+        """
+        key = (method, url)
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                self.misses += 1
+                logger.warning("%s %s is not in the recording.", method, url)
+                return None
+            served = self._served[key]
+            self._served[key] = served + 1
+            self.replayed += 1
+        return exchanges[min(served, len(exchanges) - 1)]
+
+    def body(self, exchange: dict[str, Any]) -> bytes:
+        """Return the body of a recorded exchange."""
+        with open(self._body_path(exchange["body"]), "rb") as f:
+            return f.read()
+
+    def replay(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a request from the recording.
+
+        Parameters:
+            request (httpx.Request): The request.
+
+        Returns:
+            httpx.Response: The recorded response, or a 404 if there is none.
+
+        Raises:
+            httpx.TransportError: The error recorded for the request.
+        """
+        exchange = self.next_exchange(request.method, str(request.url))
+        if exchange is None:
+            return httpx.Response(
+                404, json={"error": "Not in the recording"}, request=request
+            )
+        if "error" in exchange:
+            error_class = getattr(httpx, exchange["error"], httpx.TransportError)
+            if not (
+                isinstance(error_class, type)
+                and issubclass(error_class, httpx.TransportError)
+            ):
+                error_class = httpx.TransportError
+            raise error_class(exchange["message"], request=request)
+        return httpx.Response(
+            exchange["status"],
+            headers=exchange["headers"],
+            content=self.body(exchange),
+            request=request,
+        )
+
+    def record_command(
+        self,
+        target: str,
+        command: str,
+        exit_status: int,
+        stdout: bytes,
+        stderr: bytes,
+        elapsed: float = 0.0,
+    ) -> None:
+        """
+        Append the output of an SSH command to the recording.
+
+        Parameters:
+            target (str): ssh://host:port of the device.
+            command (str): The command run.
+            exit_status (int): Its exit status.
+            stdout (bytes): Its standard output.
+            stderr (bytes): Its standard error.
+            elapsed (float): Seconds from connecting to reading the output.
+        """
+        self.record(
+            "SSH",
+            f"{target} {command}",
+            status=exit_status,
+            content=stdout,
+            elapsed=elapsed,
+            stderr=stderr.decode("utf-8", errors="replace"),
+        )
+
+    def replay_command(
+        self, target: str, command: str
+    ) -> tuple[int, bytes, bytes] | None:
+        """
+        Return the recorded output of an SSH command.
+
+        Parameters:
+            target (str): ssh://host:port of the device.
+            command (str): The command run.
+
+        Returns:
+            tuple | None: Exit status, standard output and standard error, or None if the
+                command was never recorded.
+        """
+        exchange = self.next_exchange("SSH", f"{target} {command}")
+        if exchange is None:
+            return None
+        return (
+            exchange["status"],
+            self.body(exchange),
+            exchange.get("stderr", "").encode("utf-8"),
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Return the counters of the recording.
+
+        Returns:
+            dict: Exchanges recorded, replayed and missing from the recording.
+        """
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "misses": self.misses,
+            }
+
+
+class _RecordingTransport(httpx.BaseTransport):
+    """Transport recording the exchanges of an inner transport, or replaying without one."""
+
+    def __init__(self, recording: Recording, inner: httpx.BaseTransport | None) -> None:
+        self.recording = recording
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.inner is None:
+            return self.recording.replay(request)
+        start = time.monotonic()
+        try:
+            response = self.inner.handle_request(request)
+            try:
+                content = response.read()
+            finally:
+                response.close()
+        except httpx.TransportError as e:
+            self.recording.record(
+                request.method,
+                str(request.url),
+                elapsed=time.monotonic() - start,
+                error=e,
+            )
+            raise
+        self.recording.record(
+            request.method,
+            str(request.url),
+            response.status_code,
+            response.headers.multi_items(),
+            content,
+            time.monotonic() - start,
+        )
+        return _decoded(response, content, request)
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+
+
+class _AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """Asynchronous counterpart of _RecordingTransport."""
+
+    def __init__(
+        self, recording: Recording, inner: httpx.AsyncBaseTransport | None
+    ) -> None:
+        self.recording = recording
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.inner is None:
+            return self.recording.replay(request)
+        start = time.monotonic()
+        try:
+            response = await self.inner.handle_async_request(request)
+            try:
+                content = await response.aread()
+            finally:
+                await response.aclose()
+        except httpx.TransportError as e:
+            self.recording.record(
+                request.method,
+                str(request.url),
+                elapsed=time.monotonic() - start,
+                error=e,
+            )
+            raise
+        self.recording.record(
+            request.method,
+            str(request.url),
+            response.status_code,
+            response.headers.multi_items(),
+            content,
+            time.monotonic() - start,
+        )
+        return _decoded(response, content, request)
+
+    async def aclose(self) -> None:
+        if self.inner is not None:
+            await self.inner.aclose()
+
+
+def _limits(limits: httpx.Limits | None) -> dict[str, Any]:
+    return {"limits": limits} if limits is not None else {}
+
+
+def _decoded(
+    response: httpx.Response, content: bytes, request: httpx.Request
+) -> httpx.Response:
+    """Rebuild a response whose body has been read and decoded, as it is replayed."""
+    headers = [
+        (name, value)
+        for name, value in response.headers.multi_items()
+        if name.lower() not in WIRE_HEADERS
+    ]
+    return httpx.Response(
+        response.status_code,
+        headers=headers,
+        content=content,
+        request=request,
+        extensions=response.extensions,
+    )
@@ -0,0 +1,104 @@
+"""Client classes of the supported solutions, imported only when a solution is selected."""
+
+import functools
+import importlib
+import logging
+from importlib.metadata import entry_points
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Solution -> "module:class" of its client. The client modules pull in heavy
+# dependencies (the Meraki SDK, paramiko, TinyDB), so they are imported on first use.
+CLIENTS: dict[str, str] = {
+    "SDWAN": "nac_collector.controller.sdwan:CiscoClientSDWAN",
+    "ISE": "nac_collector.controller.ise:CiscoClientISE",
+    "NDO": "nac_collector.controller.ndo:CiscoClientNDO",
+    "FMC": "nac_collector.controller.fmc:CiscoClientFMC",
+    "CDFMC": "nac_collector.controller.fmc:CiscoClientCDFMC",
+    "CATALYSTCENTER": "nac_collector.controller.catalystcenter:CiscoClientCATALYSTCENTER",
+    "MERAKI": "nac_collector.controller.meraki:CiscoClientMERAKI",
+    "NDFC": "nac_collector.controller.ndfc:CiscoClientNDFC",
+    "IOSXE": "nac_collector.device.iosxe:CiscoClientIOSXE",
+    "IOSXR": "nac_collector.device.iosxr:CiscoClientIOSXR",
+    "NXOS": "nac_collector.device.nxos:CiscoClientNXOS",
+}
+
+# Entry point group of collector plugins: the entry point name is the solution,
+# its value the "module:class" of a CiscoClientController subclass
+ENTRY_POINT_GROUP = "nac_collector.solutions"
+
+
+@functools.cache
+def solutions() -> dict[str, str]:
+    """
+    Return the client of every solution, built-in and installed as a plugin.
+
+    Only the entry point metadata is read; plugin modules are imported when
+    their solution is selected.
+
+    Returns:
+        dict: Solution name -> "module:class" of its client.
+    """
+    clients = dict(CLIENTS)
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        name = entry_point.name.upper()
+        if name in CLIENTS:
+            logger.warning(
+                "Ignoring plugin %s: %s is a built-in solution", entry_point.value, name
+            )
+            continue
+        clients[name] = entry_point.value
+    return clients
+
+
+def client_path(solution: str) -> str:
+    """
+    Return the import path of the client of a solution.
+
+    Parameters:
+        solution (str): Solution name, e.g. "ISE".
+
+    Returns:
+        str: "module:class".
+
+    Raises:
+        ValueError: The solution is not supported.
+    """
+    try:
+        return solutions()[solution.upper()]
+    except KeyError:
+        raise ValueError(f"Unsupported solution: {solution}") from None
+
+
+def load(path: str) -> Any:
+    """
+    Import the object at a "module:attribute" path.
+
+    Parameters:
+        path (str): Module and attribute, separated by a colon.
+
+    Returns:
+        The attribute of the imported module.
+    """
+    module_name, _, attribute = path.partition(":")
+    module = importlib.import_module(module_name)
+    logger.debug("Loaded %s", path)
+    return getattr(module, attribute)
+
+
+def load_client(solution: str) -> type[Any]:
+    """
+    Import and return the client class of a solution.
+
+    Parameters:
+        solution (str): Solution name, e.g. "ISE".
+
+    Returns:
+        type: The client class, a CiscoClientController or CiscoClientDevice subclass.
+
+    Raises:
+        ValueError: The solution is not supported.
+    """
+    client_class: type[Any] = load(client_path(solution))
+    return client_class
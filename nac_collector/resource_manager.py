@@ -4,7 +4,7 @@ import logging
 from importlib import resources
 from typing import Any
 
-from ruamel.yaml import YAML
+from nac_collector import yaml_cache
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +32,7 @@ class ResourceManager:
                 content = resources.read_text(endpoints, filename)
                 logger.debug("Read packaged endpoint data for: %s", solution)
 
-                yaml = YAML(typ="safe")
-                parsed_content: list[dict[str, Any]] = yaml.load(content)
+                parsed_content: list[dict[str, Any]] = yaml_cache.load(content)
                 return parsed_content
             else:
                 logger.debug("Packaged endpoint file not found: %s", filename)
@@ -66,8 +65,7 @@ class ResourceManager:
                 content = resources.read_text(lookups, filename)
                 logger.debug("Read packaged lookup content for: %s", solution)
 
-                yaml = YAML(typ="safe")
-                parsed_content: dict[str, Any] = yaml.load(content)
+                parsed_content: dict[str, Any] = yaml_cache.load(content)
                 return parsed_content
             else:
                 logger.debug("Packaged lookup file not found: %s", filename)
@@ -102,8 +100,7 @@ class ResourceManager:
                     "Read packaged endpoint overrides content for: %s", solution
                 )
 
-                yaml = YAML(typ="safe")
-                parsed_content: dict[str, Any] = yaml.load(content)
+                parsed_content: dict[str, Any] = yaml_cache.load(content)
                 return parsed_content
             else:
                 logger.debug("Packaged endpoint overrides file not found: %s", filename)
@@ -0,0 +1,168 @@
+"""Retry policy shared by controller and device clients."""
+
+import logging
+import random
+import socket
+import threading
+
+import httpx
+
+from nac_collector.constants import (
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_BUDGET,
+)
+
+logger = logging.getLogger(__name__)
+
+# Methods a server may receive twice without a different outcome
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Failures that happen before a request reaches the server, safe to retry for any method
+UNSENT_ERRORS = frozenset({"pool", "connect", "response"})
+
+
+def classify_error(error: BaseException | None) -> str:
+    """
+    Map a failure to the kind of retry it deserves.
+
+    Parameters:
+        error (BaseException, optional): The exception raised by the attempt, None for a
+            retryable response such as 429.
+
+    Returns:
+        str: One of "pool", "connect", "read", "timeout", "transport" or "response".
+    """
+    if error is None:
+        return "response"
+    if isinstance(error, httpx.PoolTimeout):
+        return "pool"
+    if isinstance(error, httpx.ConnectTimeout | httpx.ConnectError | ConnectionError):
+        return "connect"
+    if isinstance(error, httpx.ReadTimeout | httpx.WriteTimeout):
+        return "read"
+    if isinstance(error, httpx.TimeoutException | socket.timeout):
+        return "timeout"
+    return "transport"
+
+
+class RetryBudget:
+    """
+    Number of retries allowed across a whole run.
+
+    Every retry, whatever request or device it belongs to, takes one unit. Once the budget is
+    used up further failures are returned immediately instead of being retried, so a flaky
+    link fails the run quickly rather than stretching it by minutes.
+
+    Parameters:
+        total (int): Retries allowed for the run. 0 disables retries.
+    """
+
+    def __init__(self, total: int = RETRY_BUDGET) -> None:
+        self.total = max(0, total)
+        self.used = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """Retries left in the budget."""
+        return self.total - self.used
+
+    def consume(self) -> bool:
+        """
+        Take one retry from the budget.
+
+        Returns:
+            bool: True if the retry may go ahead, False if the budget is exhausted.
+        """
+        with self._lock:
+            if self.used < self.total:
+                self.used += 1
+                return True
+            self.denied += 1
+            first_denial = self.denied == 1
+        if first_denial:
+            logger.warning(
+                "Retry budget of %s exhausted, failing further requests without retrying.",
+                self.total,
+            )
+        return False
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, bounded by attempts and a shared retry budget.
+
+    Connect and read timeouts and transport errors back off exponentially from
+    backoff_base up to backoff_max, with the actual delay drawn uniformly below that bound
+    so clients that failed together do not retry together. Pool timeouts are local
+    contention for a connection and are retried immediately without touching the budget.
+    An explicit Retry-After from the server is honoured as is.
+
+    A non-idempotent request that timed out or failed after connecting may already have
+    been processed by the server, so only failures to connect are retried for it.
+
+    Parameters:
+        max_retries (int): Maximum number of attempts per request.
+        backoff_base (float): Upper bound of the first backoff in seconds.
+        backoff_max (float): Cap on the backoff bound in seconds.
+        budget (RetryBudget, optional): Budget shared by every request of the run.
+    """
+
+    def __init__(
+        self,
+        max_retries: int,
+        backoff_base: float = RETRY_BACKOFF_BASE,
+        backoff_max: float = RETRY_BACKOFF_MAX,
+        budget: RetryBudget | None = None,
+    ) -> None:
+        self.max_retries = max(1, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Return a jittered delay for the given zero-based attempt.
+
+        Parameters:
+            attempt (int): Index of the attempt that failed.
+
+        Returns:
+            float: Seconds to wait, between 0 and min(backoff_max, backoff_base * 2**attempt).
+        """
+        bound = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return random.uniform(0, bound)  # nosec B311
+
+    def next_delay(
+        self,
+        attempt: int,
+        error: BaseException | None = None,
+        retry_after: float | None = None,
+        idempotent: bool = True,
+    ) -> float | None:
+        """
+        Decide whether a failed attempt is retried and how long to wait first.
+
+        Parameters:
+            attempt (int): Index of the attempt that failed.
+            error (BaseException, optional): The exception raised by the attempt.
+            retry_after (float, optional): Delay requested by the server.
+            idempotent (bool): Whether the request may be sent twice, see
+                IDEMPOTENT_METHODS. Defaults to True.
+
+        Returns:
+            float | None: Seconds to wait before the next attempt, or None to give up.
+        """
+        if attempt + 1 >= self.max_retries:
+            return None
+        kind = classify_error(error)
+        if not idempotent and kind not in UNSENT_ERRORS:
+            return None
+        if kind == "pool":
+            return 0.0
+        if not self.budget.consume():
+            return None
+        if retry_after is not None:
+            return retry_after
+        return self.backoff(attempt)
@@ -0,0 +1,405 @@
+"""Optional tracing of the collection call tree, exported to Chrome trace or OTLP JSON."""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from enum import Enum
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Spans of this category are HTTP requests (SPAN_KIND_CLIENT in OTLP)
+HTTP_CATEGORY = "http"
+# Spans of this category collect one endpoint; spans opened inside them belong to it
+ENDPOINT_CATEGORY = "endpoint"
+
+# OTLP span kinds and status codes
+_OTLP_KIND_INTERNAL = 1
+_OTLP_KIND_CLIENT = 3
+_OTLP_STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "nac_collector_span", default=None
+)
+
+
+class TraceFormat(str, Enum):
+    """Supported trace file formats."""
+
+    # Chrome trace event JSON, viewable in Perfetto or chrome://tracing
+    CHROME = "chrome"
+    # OTLP/JSON ExportTraceServiceRequest, as written by the OpenTelemetry file exporter
+    OTLP = "otlp"
+
+
+class Span:
+    """
+    One timed operation of the call tree.
+
+    Parameters:
+        name (str): Span name, e.g. the endpoint name or "GET /api/path".
+        category (str): Kind of operation: endpoint, fan-out, pagination, http...
+        parent (Span, optional): Enclosing span.
+        attributes (dict): Span attributes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        category: str,
+        parent: "Span | None",
+        attributes: dict[str, Any],
+    ) -> None:
+        self.name = name
+        self.category = category
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        # Name of the endpoint this span belongs to: its own, or its parent's
+        self.endpoint: str | None = (
+            name
+            if category == ENDPOINT_CATEGORY
+            else parent.endpoint
+            if parent is not None
+            else None
+        )
+        self.attributes = attributes
+        self.error: str | None = None
+        self.start = time.perf_counter_ns()
+        self.end: int | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an attribute of the span."""
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> int:
+        """Nanoseconds from start to end (to now while the span is open)."""
+        end = self.end if self.end is not None else time.perf_counter_ns()
+        return end - self.start
+
+
+class _NoopSpan:
+    """Span handed out by a disabled tracer."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class SpanListener:
+    """Receiver of the spans of a Tracer as they open and close, see add_listener()."""
+
+    def span_started(self, span: Span) -> None:
+        """Called on the thread opening the span."""
+
+    def span_ended(self, span: Span) -> None:
+        """Called on the thread closing the span, once its end is set."""
+
+
+class Tracer:
+    """
+    Record spans for the endpoint -> children -> request -> page call tree.
+
+    The enclosing span is tracked in a context variable, so spans opened in asyncio tasks
+    started by gather() are linked to the span that was open when they were created.
+    Threads do not inherit it; run work submitted to executors through wrap().
+
+    A disabled tracer records nothing and costs one attribute check per span. Listeners
+    added with add_listener() see every span even then, without the tracer keeping them.
+
+    Parameters:
+        enabled (bool): Record spans. Defaults to False.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.listeners: list[SpanListener] = []
+        self.trace_id = os.urandom(16).hex()
+        # Wall clock of the perf_counter origin, to export absolute timestamps
+        self._origin = time.perf_counter_ns()
+        self._epoch = time.time_ns()
+        self._lock = threading.Lock()
+        self.spans: list[Span] = []
+
+    @property
+    def active(self) -> bool:
+        """Whether spans are opened at all: the tracer is enabled or has listeners."""
+        return self.enabled or bool(self.listeners)
+
+    def add_listener(self, listener: SpanListener) -> None:
+        """
+        Notify a listener of every span opened and closed from now on.
+
+        Parameters:
+            listener (SpanListener): The listener.
+        """
+        self.listeners.append(listener)
+
+    def span(
+        self, name: str, category: str = "internal", **attributes: Any
+    ) -> AbstractContextManager[Span | _NoopSpan]:
+        """
+        Open a span for the duration of a with block.
+
+        Parameters:
+            name (str): Span name.
+            category (str): Kind of operation.
+            **attributes: Span attributes.
+
+        Returns:
+            A context manager yielding the span; exceptions leaving the block mark it failed.
+        """
+        if not self.active:
+            return nullcontext(_NOOP_SPAN)
+        return self._span(name, category, attributes)
+
+    @contextmanager
+    def _span(
+        self, name: str, category: str, attributes: dict[str, Any]
+    ) -> Iterator[Span]:
+        span = Span(name, category, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        for listener in self.listeners:
+            listener.span_started(span)
+        try:
+            yield span
+        except GeneratorExit:
+            # The loop of each_endpoint() was left early
+            raise
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.end = time.perf_counter_ns()
+            _current_span.reset(token)
+            for listener in self.listeners:
+                listener.span_ended(span)
+            if self.enabled:
+                with self._lock:
+                    self.spans.append(span)
+
+    def each_endpoint(
+        self, endpoints: Iterable[dict[str, Any]]
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over endpoint definitions, each processed inside its own span.
+
+        The span of an endpoint is open while the loop body runs and is closed when the
+        loop moves on to the next endpoint.
+
+        Parameters:
+            endpoints (Iterable[dict]): Endpoint definitions with name and endpoint keys.
+        """
+        if not self.active:
+            yield from endpoints
+            return
+        for endpoint in endpoints:
+            with self.span(
+                str(endpoint.get("name")),
+                ENDPOINT_CATEGORY,
+                endpoint=endpoint.get("endpoint"),
+            ):
+                yield endpoint
+
+    def wrap(
+        self, func: Callable[..., T], name: str, category: str, **attributes: Any
+    ) -> Callable[..., T]:
+        """
+        Bind func to a span under the span currently open, to run it on another thread.
+
+        Parameters:
+            func (Callable): The function to run.
+            name (str): Span name.
+            category (str): Kind of operation.
+            **attributes: Span attributes.
+
+        Returns:
+            Callable: func, running inside the span when called.
+        """
+        if not self.active:
+            return func
+        context = contextvars.copy_context()
+
+        def run(*args: Any, **kwargs: Any) -> T:
+            with self.span(name, category, **attributes):
+                return func(*args, **kwargs)
+
+        # Each call gets its own copy: a context cannot be entered by two threads
+        return lambda *args, **kwargs: context.copy().run(run, *args, **kwargs)
+
+    def critical_path(self) -> list[Span]:
+        """
+        Return the chain of spans the run waited on.
+
+        Starting from the root span that ended last, each step descends into the child
+        that ended last, i.e. the one its parent was still waiting for.
+
+        Returns:
+            list[Span]: Spans from the root down to a leaf; empty without spans.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        children: dict[str | None, list[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        path: list[Span] = []
+        candidates = children.get(None, [])
+        while candidates:
+            span = max(candidates, key=lambda s: s.end or 0)
+            path.append(span)
+            candidates = children.get(span.span_id, [])
+        return path
+
+    def _timestamp(self, counter: int) -> int:
+        """Convert a perf_counter_ns() reading to Unix nanoseconds."""
+        return self._epoch + counter - self._origin
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """
+        Return the spans as Chrome trace events.
+
+        Overlapping spans of concurrent requests share one thread, which the viewers
+        cannot stack, so spans are laid out on lanes where each one nests inside its
+        parent or starts a free lane.
+
+        Returns:
+            dict: {"traceEvents": [...]} with one complete ("X") event per span.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: (s.start, -s.duration))
+        critical = {span.span_id for span in self.critical_path()}
+        lanes: list[list[Span]] = []
+        lane_of: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for span in spans:
+            for stack in lanes:
+                while stack and (stack[-1].end or 0) <= span.start:
+                    stack.pop()
+            lane = lane_of.get(span.parent_id or "")
+            if (
+                lane is None
+                or not lanes[lane]
+                or lanes[lane][-1].span_id != (span.parent_id)
+            ):
+                lane = next((i for i, s in enumerate(lanes) if not s), len(lanes))
+                if lane == len(lanes):
+                    lanes.append([])
+            lanes[lane].append(span)
+            lane_of[span.span_id] = lane
+            args = dict(span.attributes)
+            if span.error is not None:
+                args["error"] = span.error
+            if span.span_id in critical:
+                args["critical_path"] = True
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": (span.start - self._origin) / 1000,
+                    "dur": span.duration / 1000,
+                    "pid": 1,
+                    "tid": lane + 1,
+                    "args": args,
+                }
+            )
+        for lane in range(len(lanes)):
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": lane + 1,
+                    "args": {"name": f"lane {lane + 1}"},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def otlp(self, service: str = "nac-collector") -> dict[str, Any]:
+        """
+        Return the spans as an OTLP/JSON ExportTraceServiceRequest.
+
+        Parameters:
+            service (str): Value of the service.name resource attribute.
+
+        Returns:
+            dict: One resourceSpans entry holding every span of the trace.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        otlp_spans = []
+        for span in spans:
+            attributes = {"nac_collector.category": span.category, **span.attributes}
+            otlp_span: dict[str, Any] = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": _OTLP_KIND_CLIENT
+                if span.category == HTTP_CATEGORY
+                else _OTLP_KIND_INTERNAL,
+                "startTimeUnixNano": str(self._timestamp(span.start)),
+                "endTimeUnixNano": str(self._timestamp(span.start + span.duration)),
+                "attributes": [
+                    _otlp_attribute(key, value)
+                    for key, value in attributes.items()
+                    if value is not None
+                ],
+            }
+            if span.error is not None:
+                otlp_span["status"] = {
+                    "code": _OTLP_STATUS_ERROR,
+                    "message": span.error,
+                }
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [_otlp_attribute("service.name", service)]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "nac_collector"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    def write(self, path: str, trace_format: TraceFormat = TraceFormat.CHROME) -> None:
+        """
+        Write the recorded spans to a file.
+
+        Parameters:
+            path (str): Destination file.
+            trace_format (TraceFormat): Chrome trace events or OTLP/JSON.
+        """
+        if trace_format == TraceFormat.OTLP:
+            document = self.otlp()
+        else:
+            document = self.chrome_trace()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+        logger.info("Trace with %s spans written to %s", len(self.spans), path)
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    """Encode one attribute as an OTLP KeyValue."""
+    encoded: dict[str, Any]
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
@@ -0,0 +1,152 @@
+"""Parsed YAML documents cached in marshal form, keyed by the hash of their content."""
+
+import contextlib
+import hashlib
+import logging
+import marshal
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Directory of the cache; an empty value disables it
+CACHE_DIR_ENV = "NAC_YAML_CACHE_DIR"
+# Part of every key, bumped when the cached form changes
+CACHE_VERSION = 1
+
+
+def cache_dir() -> Path | None:
+    """
+    Return the directory of the cache.
+
+    Returns:
+        Path | None: $NAC_YAML_CACHE_DIR if set, otherwise nac-collector/yaml in
+            $XDG_CACHE_HOME or ~/.cache. None if the cache is disabled.
+    """
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if directory is not None:
+        return Path(directory) if directory else None
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "nac-collector" / "yaml"
+
+
+def cache_key(content: bytes) -> str:
+    """
+    Return the cache key of a YAML document.
+
+    The marshal format depends on the Python version, which is part of the key
+    with the content hash.
+
+    Parameters:
+        content (bytes): The YAML document.
+
+    Returns:
+        str: Hex digest naming the cache entry.
+    """
+    digest = hashlib.sha256(
+        f"{CACHE_VERSION}:{marshal.version}:{sys.version_info[:2]}:".encode()
+    )
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def parse(content: str | bytes, pure: bool = False) -> Any:
+    """
+    Parse a YAML document with the safe loader, bypassing the cache.
+
+    Parameters:
+        content (str | bytes): The YAML document.
+        pure (bool, optional): Use the pure-Python loader even if the C one is
+            installed. Defaults to False.
+
+    Returns:
+        Any: The parsed document.
+    """
+    # Imported here: ruamel.yaml is not needed when every document is cached
+    from ruamel.yaml import YAML
+
+    return YAML(typ="safe", pure=pure).load(content)
+
+
+def load(content: str | bytes, pure: bool = False) -> Any:
+    """
+    Parse a YAML document, or load it from the cache if it was parsed before.
+
+    Entries are never stale: a changed document has a different key. Documents
+    holding values marshal cannot store (e.g. timestamps) are parsed every time.
+
+    Parameters:
+        content (str | bytes): The YAML document.
+        pure (bool, optional): Use the pure-Python loader on a cache miss.
+            Defaults to False.
+
+    Returns:
+        Any: The parsed document.
+
+    Raises:
+        ruamel.yaml.YAMLError: If the document is not valid YAML.
+    """
+    directory = cache_dir()
+    if directory is None:
+        return parse(content, pure)
+
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    path = directory / f"{cache_key(data)}.marshal"
+    try:
+        # Entries are written by store() in the user's own cache directory
+        return marshal.loads(path.read_bytes())  # nosec B302
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        logger.debug("Ignoring unreadable YAML cache entry %s: %s", path, e)
+
+    parsed = parse(content, pure)
+    store(path, parsed)
+    return parsed
+
+
+def load_file(file_path: str | Path, pure: bool = False) -> Any:
+    """
+    Parse a YAML file through the cache, see load().
+
+    Parameters:
+        file_path (str | Path): Path to the YAML file.
+        pure (bool, optional): Use the pure-Python loader on a cache miss.
+            Defaults to False.
+
+    Returns:
+        Any: The parsed document.
+    """
+    return load(Path(file_path).read_bytes(), pure)
+
+
+def store(path: Path, parsed: Any) -> None:
+    """
+    Write a parsed document to the cache, atomically; failures are only logged.
+
+    Parameters:
+        path (Path): The cache entry.
+        parsed (Any): The parsed document.
+    """
+    try:
+        serialized = marshal.dumps(parsed)
+    except ValueError as e:
+        logger.debug("Not caching YAML document: %s", e)
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, suffix=".tmp", delete=False
+        ) as f:
+            f.write(serialized)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(f.name)
+            raise
+    except OSError as e:
+        logger.debug("Could not write YAML cache entry %s: %s", path, e)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""
+Compare the JSON codec used by nac-collector with the standard library json module.
+
+Builds synthetic payloads shaped like the largest responses nac-collector handles, an
+NXOS "/api/mo/sys.json?rsp-subtree=full" imdata tree and an NDFC policy list with
+escaped template JSON, then times decoding them (response bodies) and encoding them
+with indent=4 (archive members).
+
+The codec uses orjson or msgspec when installed (pip install nac-collector[fast-json]);
+without either the two columns are expected to match.
+
+Usage:
+uv run ./scripts/bench_json_codec.py
+uv run ./scripts/bench_json_codec.py --scale 4 --repeat 5
+
+Example output (--scale 4, orjson 3.8, one CPU):
+JSON backend: orjson
+payload          size  decode json  decode codec  encode json  encode codec
+nxos_imdata     7.7MB       0.457s        0.305s       1.464s        0.461s
+ndfc_policy    43.3MB       0.837s        0.422s       1.447s        0.727s
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+from typing import Any
+
+from nac_collector import json_codec
+
+
+def nxos_imdata(scale: int) -> dict[str, Any]:
+    """An NXOS sys subtree with interfaces, VLANs and BGP neighbors."""
+
+    def mo(cls: str, attributes: dict[str, Any], children: list[Any]) -> dict[str, Any]:
+        return {cls: {"attributes": attributes, "children": children}}
+
+    interfaces = [
+        mo(
+            "l1PhysIf",
+            {
+                "id": f"eth1/{i}",
+                "adminSt": "up",
+                "descr": f"uplink to leaf{i % 48}",
+                "mtu": "9216",
+                "speed": "auto",
+                "layer": "Layer2",
+                "mode": "trunk",
+                "trunkVlans": "1-4094",
+            },
+            [mo("rmonIfIn", {"octets": str(i * 1000)}, [])],
+        )
+        for i in range(4000 * scale)
+    ]
+    vlans = [
+        mo(
+            "l2BD",
+            {"fabEncap": f"vlan-{i}", "name": f"VLAN_{i}", "adminSt": "active"},
+            [],
+        )
+        for i in range(4000 * scale)
+    ]
+    neighbors = [
+        mo(
+            "bgpPeer",
+            {
+                "addr": f"10.{i // 256 % 256}.{i % 256}.1",
+                "asn": "65001",
+                "inheritContPeerCtrl": "",
+            },
+            [mo("bgpPeerAf", {"type": "ipv4-ucast", "ctrl": "nh-self"}, [])],
+        )
+        for i in range(2000 * scale)
+    ]
+    system = mo(
+        "topSystem",
+        {"name": "switch1", "serial": "FDO12345678"},
+        [
+            mo("interfaceEntity", {}, interfaces),
+            mo("bdEntity", {}, vlans),
+            mo("bgpEntity", {}, neighbors),
+        ],
+    )
+    return {"totalCount": "1", "imdata": [system]}
+
+
+def ndfc_policy(scale: int) -> list[dict[str, Any]]:
+    """NDFC switch policies, each carrying its template configuration as escaped JSON."""
+    return [
+        {
+            "id": i,
+            "policyId": f"POLICY-{i}",
+            "description": "",
+            "serialNumber": f"FDO{i % 64:08d}",
+            "entityType": "INTERFACE",
+            "entityName": f"Ethernet1/{i % 64}",
+            "templateName": "int_trunk_host",
+            "templateContentType": "PYTHON",
+            "nvPairs": {
+                "INTF_NAME": f"Ethernet1/{i % 64}",
+                "ADMIN_STATE": "true",
+                "MTU": "jumbo",
+                "ALLOWED_VLANS": "none",
+                "DESC": f"host port {i}",
+                "CONF": "",
+                "networkTemplateConfig": json.dumps(
+                    {
+                        "vlanId": str(i % 4094),
+                        "gatewayIpAddress": f"10.{i % 256}.0.1/24",
+                    }
+                ),
+            },
+            "autoGenerated": False,
+            "deleted": False,
+            "source": "",
+            "priority": 500,
+            "status": "NA",
+        }
+        for i in range(20000 * scale)
+    ]
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    """Return the fastest of repeat runs of func, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--scale", type=int, default=1, help="Payload size multiplier")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    print(f"JSON backend: {json_codec.BACKEND}")
+    print(
+        f"{'payload':<12} {'size':>8} {'decode json':>12} {'decode codec':>13} "
+        f"{'encode json':>12} {'encode codec':>13}"
+    )
+    for name, payload in (
+        ("nxos_imdata", nxos_imdata(args.scale)),
+        ("ndfc_policy", ndfc_policy(args.scale)),
+    ):
+        body = json.dumps(payload).encode("utf-8")
+        assert json_codec.loads(body) == payload
+        assert (
+            b"".join(json_codec.iter_encode(payload))
+            == json.dumps(payload, indent=4).encode()
+        )
+
+        timings = (
+            best_of(args.repeat, lambda body=body: json.loads(body)),
+            best_of(args.repeat, lambda body=body: json_codec.loads(body)),
+            best_of(args.repeat, lambda payload=payload: json.dumps(payload, indent=4)),
+            best_of(
+                args.repeat,
+                lambda payload=payload: b"".join(json_codec.iter_encode(payload)),
+            ),
+        )
+        print(
+            f"{name:<12} {len(body) / 1e6:>6.1f}MB "
+            + " ".join(
+                f"{timing:>{width}.3f}s"
+                for timing, width in zip(timings, (11, 12, 11, 12), strict=True)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Run the collection of one benchmark scenario and write its measurements as JSON.
+
+Usage: python -m tests.benchmarks.runner SCENARIO BASE_URL RESULT_FILE
+       python -m tests.benchmarks.runner --startup SOLUTION RESULT_FILE
+
+Run by test_benchmarks.py in a fresh process for every scenario, so that the peak RSS
+and CPU time measured are those of the collection alone. With --startup, only the CLI
+and the client of a solution are imported, as a collection job starts.
+
+Both also time a reference workload once their measurements are taken, against which
+test_benchmarks.py scales the times of the baseline.
+"""
+
+import gc
+import json
+import random
+import resource
+import sys
+import time
+
+# Dependencies that take a noticeable share of the startup, imported only by the
+# clients that need them
+HEAVY_MODULES = ("git", "meraki", "paramiko", "ruamel", "tinydb")
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process, in MiB."""
+    # Linux keeps ru_maxrss across exec, i.e. the peak of the forking test process
+    # when it is larger; the high water mark of /proc is that of this program alone
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kibibytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reference_time() -> float:
+    """
+    Time a fixed workload like that of a collection: encoding, hashing and decoding JSON.
+
+    The median of several runs, with the garbage collector off as its runs depend on the
+    objects the process holds.
+    """
+    # Imported here, so that --startup measures the CLI imports alone
+    import hashlib
+
+    items = [
+        {"id": f"{index:08d}", "name": f"item_{index}", "tags": list(range(10))}
+        for index in range(20_000)
+    ]
+    times = []
+    gc.disable()
+    try:
+        for _ in range(5):
+            start = time.perf_counter()
+            document = json.dumps(items, indent=4)
+            hashlib.sha256(document.encode()).hexdigest()
+            json.loads(document)
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return sorted(times)[len(times) // 2]
+
+
+def main(scenario_name: str, base_url: str, result_file: str) -> None:
+    # Imported here, so that --startup measures the CLI imports alone
+    from tests.benchmarks.scenarios import SCENARIOS
+
+    scenario = SCENARIOS[scenario_name]
+    # Same backoff jitter from run to run
+    random.seed(0)
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    entries = scenario.collect(base_url)
+    result = {
+        "wall_time": time.perf_counter() - start_wall,
+        "cpu_time": time.process_time() - start_cpu,
+        "peak_rss_mb": peak_rss_mb(),
+        "entries": entries,
+    }
+    result["reference_time"] = reference_time()
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def startup(solution: str, result_file: str) -> None:
+    start = time.perf_counter()
+    import nac_collector.cli.main  # noqa: F401
+    from nac_collector.registry import load_client
+
+    load_client(solution)
+    result = {
+        "import_time": time.perf_counter() - start,
+        "startup_rss_mb": peak_rss_mb(),
+        "modules": len(sys.modules),
+        "heavy_modules": [module for module in HEAVY_MODULES if module in sys.modules],
+    }
+    result["reference_time"] = reference_time()
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--startup":
+        startup(*sys.argv[2:4])
+    else:
+        main(*sys.argv[1:4])
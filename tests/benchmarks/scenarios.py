@@ -0,0 +1,320 @@
+"""
+Benchmark scenarios: a stand-in server at a given scale, and the collection run against it.
+
+The stand-in runs in the test process; collect() runs in a fresh child process (see
+runner.py), so that its peak RSS and CPU time are the collector's alone. The scenarios
+with faults (see mock_controllers/faults.py) measure how quickly a client recovers.
+"""
+
+import os
+import tempfile
+import zipfile
+from collections.abc import Callable
+from typing import Any
+
+from nac_collector import json_codec
+from nac_collector.constants import MAX_RETRIES, RETRY_AFTER, TIMEOUT
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.catalystcenter import CiscoClientCATALYSTCENTER
+from nac_collector.controller.fmc import CiscoClientFMC
+from nac_collector.controller.ise import CiscoClientISE
+from nac_collector.controller.meraki import CiscoClientMERAKI
+from nac_collector.controller.ndfc import CiscoClientNDFC
+from nac_collector.controller.ndo import CiscoClientNDO
+from nac_collector.controller.sdwan import CiscoClientSDWAN
+from nac_collector.device.base import CiscoClientDevice
+from nac_collector.device.iosxe import CiscoClientIOSXE
+from nac_collector.device.iosxr import CiscoClientIOSXR
+from nac_collector.device.nxos import CiscoClientNXOS
+from nac_collector.metrics import DEVICE_METRICS_FILENAME
+from tests.integration.mock_controllers import (
+    ConnectionReset,
+    Latency,
+    MockCatalystCenterServer,
+    MockControllerServer,
+    MockFMCServer,
+    MockIOSXEServer,
+    MockIOSXRServer,
+    MockISEServer,
+    MockMerakiServer,
+    MockNDFCServer,
+    MockNDOServer,
+    MockNXOSServer,
+    MockSDWANServer,
+    RateLimitStorm,
+    TokenExpiry,
+    host_alias,
+    lognormal,
+)
+from tests.integration.mock_controllers.meraki import HOSTNAME as MERAKI_HOSTNAME
+
+# As the CLI creates the clients
+CLIENT_ARGS = {
+    "username": "admin",
+    "password": "password",
+    "max_retries": MAX_RETRIES,
+    "retry_after": RETRY_AFTER,
+    "timeout": TIMEOUT,
+    "ssl_verify": False,
+}
+
+ISE_ENDPOINTS = [{"name": "endpoint", "endpoint": "/ers/config/endpoint"}]
+ISE_ENDPOINT_DETAILS = ("/ers/config/endpoint/",)
+CATALYSTCENTER_DEVICES = [
+    {"name": "network_device", "endpoint": "/dna/intent/api/v1/network-device"}
+]
+FMC_DEVICES = [
+    {
+        "name": "device",
+        "endpoint": "/api/fmc_config/v1/domain/{DOMAIN_UUID}/devices/devicerecords",
+        "children": [{"name": "device_vrf", "endpoint": "/routing/virtualrouters"}],
+    }
+]
+
+
+class Scenario:
+    """
+    One benchmark: a stand-in server and the collection run against it.
+
+    Parameters:
+        name (str): Scenario name, the key of its baseline.
+        server (Callable): Create the stand-in server, a MockControllerServer or, for
+            SSH, a MockIOSXRServer.
+        collect (Callable[[str], int]): Run the collection against the base URL of the
+            stand-in, returning the number of entries collected.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        server: Callable[[], MockControllerServer | MockIOSXRServer],
+        collect: Callable[[str], int],
+    ) -> None:
+        self.name = name
+        self.server = server
+        self.collect = collect
+
+
+def count_entries(data: dict[str, Any]) -> int:
+    """Count the entries collected from a controller, children included."""
+    count = 0
+    for entries in data.values():
+        for entry in entries:
+            count += len(entry["data"]) if isinstance(entry.get("data"), list) else 1
+            for children in (entry.get("children") or {}).values():
+                count += count_entries({"": children})
+    return count
+
+
+def controller_collection(
+    client_class: type[CiscoClientController],
+    endpoints: list[dict[str, Any]],
+    **kwargs: Any,
+) -> Callable[[str], int]:
+    """Return a collect() authenticating a controller client and collecting endpoints."""
+
+    def collect(base_url: str) -> int:
+        client = client_class(base_url=base_url, **CLIENT_ARGS, **kwargs)
+        if not client.authenticate():
+            raise RuntimeError(f"{client_class.__name__} failed to authenticate")
+        return count_entries(client.get_from_endpoints_data(endpoints))
+
+    return collect
+
+
+def meraki_collection(endpoints: list[dict[str, Any]]) -> Callable[[str], int]:
+    """Return a collect() for Meraki, resolving the Meraki host to the stand-in."""
+    collect_endpoints = controller_collection(
+        CiscoClientMERAKI, endpoints, rate_limit=0
+    )
+
+    def collect(base_url: str) -> int:
+        with host_alias(MERAKI_HOSTNAME):
+            return collect_endpoints(base_url)
+
+    return collect
+
+
+def device_collection(
+    client_class: type[CiscoClientDevice], devices: int, **device: Any
+) -> Callable[[str], int]:
+    """Return a collect() writing the configuration of every device to an archive."""
+
+    def collect(base_url: str) -> int:
+        client = client_class(
+            devices=[
+                {"name": f"device{index}", "target": base_url, **device}
+                for index in range(devices)
+            ],
+            default_username=CLIENT_ARGS["username"],
+            default_password=CLIENT_ARGS["password"],
+            max_retries=MAX_RETRIES,
+            retry_after=RETRY_AFTER,
+            timeout=TIMEOUT,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "devices.zip")
+            client.collect_and_write_to_archive(output)
+            with zipfile.ZipFile(output) as archive:
+                return sum(
+                    1
+                    for name in archive.namelist()
+                    if name != DEVICE_METRICS_FILENAME
+                    and "error" not in json_codec.loads(archive.read(name))
+                )
+
+    return collect
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario(
+            "ise_endpoints_10k",
+            lambda: MockISEServer(scale=10_000),
+            controller_collection(CiscoClientISE, ISE_ENDPOINTS),
+        ),
+        Scenario(
+            "catalystcenter_devices_2k",
+            lambda: MockCatalystCenterServer(scale=2_000),
+            controller_collection(
+                CiscoClientCATALYSTCENTER, CATALYSTCENTER_DEVICES, rate_limit=0
+            ),
+        ),
+        Scenario(
+            "fmc_devices_2k",
+            lambda: MockFMCServer(scale=2_000, children=1),
+            controller_collection(
+                CiscoClientFMC,
+                [
+                    {
+                        "name": "device",
+                        "endpoint": "/api/fmc_config/v1/domain/{DOMAIN_UUID}/devices/devicerecords",
+                        "children": [
+                            {
+                                "name": "device_vrf",
+                                "endpoint": "/routing/virtualrouters",
+                            }
+                        ],
+                    }
+                ],
+                rate_limit=0,
+            ),
+        ),
+        Scenario(
+            "meraki_networks_5k",
+            lambda: MockMerakiServer(sizes={"/organizations": 1, "/networks": 5_000}),
+            meraki_collection(
+                [
+                    {
+                        "name": "organization",
+                        "has_own_id": True,
+                        "endpoint": "/organizations",
+                        "children": [
+                            {
+                                "name": "network",
+                                "has_own_id": True,
+                                "endpoint": "/networks",
+                            }
+                        ],
+                    }
+                ]
+            ),
+        ),
+        Scenario(
+            "sdwan_policy_objects_5k",
+            lambda: MockSDWANServer(scale=5_000),
+            controller_collection(
+                CiscoClientSDWAN,
+                [
+                    {
+                        "name": "class_map_policy_object",
+                        "endpoint": "/template/policy/list/class/",
+                    }
+                ],
+            ),
+        ),
+        Scenario(
+            "ndo_tenants_2k",
+            lambda: MockNDOServer(scale=2_000),
+            controller_collection(
+                CiscoClientNDO,
+                [{"name": "tenants", "endpoint": "/mso/api/v1/tenants"}],
+                domain="DefaultAuth",
+            ),
+        ),
+        Scenario(
+            "ndfc_policies_50k",
+            lambda: MockNDFCServer(
+                sizes={"/inventory": 200, "/policies/pagination": 50_000}
+            ),
+            controller_collection(
+                CiscoClientNDFC,
+                [
+                    {
+                        "name": "Discovered_Switches",
+                        "endpoint": "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest/control/fabrics/%v/inventory",
+                    },
+                    {
+                        "name": "Policies",
+                        "endpoint": "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest/control/policies/pagination?fabricName=%v",
+                    },
+                ],
+                fabric_name="fabric1",
+            ),
+        ),
+        Scenario(
+            "ise_endpoints_2k_429_storm",
+            lambda: MockISEServer(
+                scale=2_000,
+                faults=[
+                    RateLimitStorm(
+                        every=500, burst=20, retry_after=1, paths=ISE_ENDPOINT_DETAILS
+                    )
+                ],
+            ),
+            controller_collection(CiscoClientISE, ISE_ENDPOINTS),
+        ),
+        Scenario(
+            "ise_endpoints_2k_resets",
+            lambda: MockISEServer(
+                scale=2_000,
+                faults=[ConnectionReset(rate=0.01, paths=ISE_ENDPOINT_DETAILS)],
+            ),
+            controller_collection(CiscoClientISE, ISE_ENDPOINTS),
+        ),
+        Scenario(
+            "catalystcenter_devices_2k_latency",
+            lambda: MockCatalystCenterServer(
+                scale=2_000, faults=[Latency(lognormal(0.05))]
+            ),
+            controller_collection(
+                CiscoClientCATALYSTCENTER, CATALYSTCENTER_DEVICES, rate_limit=0
+            ),
+        ),
+        Scenario(
+            "fmc_devices_500_token_expiry",
+            lambda: MockFMCServer(
+                scale=500,
+                children=1,
+                faults=[TokenExpiry(every=100, paths=("/api/fmc_config/",))],
+            ),
+            controller_collection(CiscoClientFMC, FMC_DEVICES, rate_limit=0),
+        ),
+        Scenario(
+            "iosxe_devices_2k",
+            lambda: MockIOSXEServer(scale=48),
+            device_collection(CiscoClientIOSXE, 2_000),
+        ),
+        Scenario(
+            "iosxr_devices_200",
+            lambda: MockIOSXRServer(scale=48),
+            device_collection(CiscoClientIOSXR, 200),
+        ),
+        Scenario(
+            "nxos_devices_2k",
+            lambda: MockNXOSServer(scale=48),
+            device_collection(CiscoClientNXOS, 2_000),
+        ),
+    ]
+}
@@ -0,0 +1,199 @@
+"""
+Collection benchmarks against the stand-in servers, compared with baseline.json.
+
+Opt-in, as they take minutes: NAC_BENCHMARK=1 pytest tests/benchmarks -s
+
+A time or memory measurement regresses when it exceeds its baseline by more than the
+threshold (NAC_BENCHMARK_THRESHOLD, default 25%) and by more than the noise floor of the
+metric. The request count may grow by 5% at most, as retries under injected faults vary
+from run to run, and the number of entries collected must match exactly.
+
+Times depend on the machine, and on its load. Every benchmark process also times a
+reference workload (see runner.reference_time()), recorded with the baseline; when the
+workload takes longer now, times are compared with the baseline scaled accordingly, so
+that a slower or busier machine does not fail every benchmark. Record a new baseline, e.g. after
+an intended change, with NAC_BENCHMARK_UPDATE=1.
+
+The startup benchmarks measure the imports a short collection job pays before its first
+request, in a fresh interpreter per solution. Rather than the number of modules, which
+changes with every dependency release, they check which of the heavy dependencies are
+imported: only those the client of the solution needs.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("resource")
+
+from tests.benchmarks.scenarios import SCENARIOS  # noqa: E402
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(
+        os.environ.get("NAC_BENCHMARK", "") == "",
+        reason="benchmarks run with NAC_BENCHMARK=1",
+    ),
+]
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+REPO_ROOT = Path(__file__).parents[2]
+THRESHOLD = float(os.environ.get("NAC_BENCHMARK_THRESHOLD", "0.25"))
+UPDATE = os.environ.get("NAC_BENCHMARK_UPDATE", "") != ""
+THRESHOLDS = {
+    "wall_time": THRESHOLD,
+    "cpu_time": THRESHOLD,
+    "peak_rss_mb": THRESHOLD,
+    "requests": 0.05,
+    # Import times of a few tenths of a second vary more from run to run
+    "import_time": 0.5,
+    "startup_rss_mb": THRESHOLD,
+}
+# Differences below these are noise, whatever the threshold
+NOISE_FLOOR = {
+    "wall_time": 0.5,
+    "cpu_time": 0.5,
+    "peak_rss_mb": 16.0,
+    "requests": 0,
+    "import_time": 0.25,
+    "startup_rss_mb": 4.0,
+}
+EXACT_METRICS = ("entries",)
+# Metrics scaled by the speed of the machine, see check_baseline()
+TIME_METRICS = ("wall_time", "cpu_time", "import_time")
+# Solutions whose CLI startup is measured, the lightest client and those with
+# dependencies of their own, with the heavy modules (see runner.HEAVY_MODULES) their
+# client imports
+STARTUP_SOLUTIONS = {
+    "CATALYSTCENTER": ["tinydb"],
+    "IOSXR": ["paramiko"],
+    "ISE": [],
+    "MERAKI": ["meraki"],
+}
+
+
+def load_baseline():
+    if not BASELINE_FILE.exists():
+        return {}
+    return json.loads(BASELINE_FILE.read_text(encoding="utf-8"))
+
+
+def save_baseline(name, result):
+    baseline = load_baseline()
+    baseline[name] = {
+        metric: round(value, 3) if isinstance(value, float) else value
+        for metric, value in result.items()
+    }
+    BASELINE_FILE.write_text(
+        json.dumps(dict(sorted(baseline.items())), indent=2) + "\n", encoding="utf-8"
+    )
+
+
+def run_scenario(name, tmp_path):
+    """Run a scenario in a child process against its stand-in, returning its measurements."""
+    result_file = tmp_path / "result.json"
+    with SCENARIOS[name].server() as server:
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "tests.benchmarks.runner",
+                name,
+                server.base_url,
+                str(result_file),
+            ],
+            cwd=REPO_ROOT,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        requests = server.total_requests
+    result = json.loads(result_file.read_text(encoding="utf-8"))
+    result["requests"] = requests
+    return result
+
+
+def regressions(result, baseline, speed=1.0):
+    """
+    Return a description of every measurement regressing from its baseline.
+
+    Times are compared with their baseline multiplied by speed.
+    """
+    found = []
+    for metric in EXACT_METRICS:
+        if metric in result and result[metric] != baseline[metric]:
+            found.append(f"{metric}: {result[metric]} (baseline {baseline[metric]})")
+    for metric, threshold in THRESHOLDS.items():
+        if metric not in result:
+            continue
+        value, reference = result[metric], baseline[metric]
+        if metric in TIME_METRICS:
+            reference *= speed
+        if (
+            value > reference * (1 + threshold)
+            and value - reference > NOISE_FLOOR[metric]
+        ):
+            found.append(
+                f"{metric}: {value:.2f} (baseline {reference:.2f}, "
+                f"+{(value / reference - 1) * 100:.0f}%)"
+            )
+    return found
+
+
+def check_baseline(name, result):
+    """Record the result as the baseline of name, or fail if it regressed from it."""
+    if UPDATE:
+        save_baseline(name, result)
+        return
+    baseline = load_baseline().get(name)
+    if baseline is None:
+        pytest.skip(f"no baseline for {name}, record one with NAC_BENCHMARK_UPDATE=1")
+    # How much slower the machine is than when the baseline was recorded. A faster
+    # reference does not tighten the comparison: the workload is short, and a burst of
+    # CPU it happened to get would fail the benchmarks that did not change
+    reference = result["reference_time"]
+    speed = max(1.0, reference / baseline.get("reference_time", reference))
+    found = regressions(result, baseline, speed)
+    assert not found, (
+        f"{name} regressed, machine {speed:.2f}x the baseline time: " + "; ".join(found)
+    )
+
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_benchmark(name, tmp_path):
+    result = run_scenario(name, tmp_path)
+    print(
+        f"\n{name}: {result['wall_time']:.2f}s wall, {result['cpu_time']:.2f}s CPU, "
+        f"{result['peak_rss_mb']:.0f} MiB peak RSS, {result['requests']} requests, "
+        f"{result['entries']} entries"
+    )
+    check_baseline(name, result)
+
+
+@pytest.mark.parametrize("solution", sorted(STARTUP_SOLUTIONS))
+def test_startup(solution, tmp_path):
+    """Time and memory to import the CLI and the client of a solution."""
+    result_file = tmp_path / "result.json"
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "tests.benchmarks.runner",
+            "--startup",
+            solution,
+            str(result_file),
+        ],
+        cwd=REPO_ROOT,
+        check=True,
+    )
+    result = json.loads(result_file.read_text(encoding="utf-8"))
+    print(
+        f"\nstartup {solution}: {result['import_time']:.3f}s imports, "
+        f"{result['startup_rss_mb']:.0f} MiB peak RSS, {result['modules']} modules"
+    )
+    assert result.pop("heavy_modules") == STARTUP_SOLUTIONS[solution]
+    del result["modules"]
+    check_baseline(f"startup_{solution.lower()}", result)
@@ -0,0 +1,11 @@
+import pytest
+
+from nac_collector.yaml_cache import CACHE_DIR_ENV
+
+
+@pytest.fixture(autouse=True)
+def yaml_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep the parsed YAML cache of every test out of the user's cache directory."""
+    cache_dir = tmp_path_factory.mktemp("yaml-cache")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(cache_dir))
+    return cache_dir
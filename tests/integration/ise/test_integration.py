@@ -86,7 +86,11 @@ def test_cisco_client_ise_with_integration(cisco_client, tmpdir):
         }
 
         if url in mock_responses:
-            return Mock(status_code=200, json=lambda: mock_responses[url])
+            return Mock(
+                status_code=200,
+                json=lambda: mock_responses[url],
+                content=json.dumps(mock_responses[url]).encode(),
+            )
         else:
             raise ValueError(f"Unexpected URL in mock_get_request: {url}")
 
@@ -0,0 +1,64 @@
+"""
+Local HTTP stand-ins for the controller APIs, serving synthetic data at configurable scale.
+
+Each stand-in implements the authentication flow and pagination style its collector
+relies on, so a CiscoClient* collection runs end to end without a controller:
+
+    with MockISEServer(scale=1000) as server:
+        client = CiscoClientISE(base_url=server.base_url, ...)
+
+The device stand-ins serve the IOS-XE and NX-OS device APIs, and IOS-XR over SSH; one
+server stands in for any number of devices targeting it. Faults from faults.py are injected into the responses
+of any stand-in, e.g. MockISEServer(faults=[RateLimitStorm(every=50)]).
+"""
+
+from .catalystcenter import MockCatalystCenterServer
+from .devices import MockIOSXEServer, MockIOSXRServer, MockNXOSServer
+from .faults import (
+    ConnectionReset,
+    Fault,
+    Latency,
+    RateLimitStorm,
+    ResetListener,
+    SlowBody,
+    TokenExpiry,
+    TruncatedBody,
+    fixed,
+    lognormal,
+    uniform,
+)
+from .fmc import MockFMCServer
+from .ise import MockISEServer
+from .meraki import MockMerakiServer
+from .ndfc import MockNDFCServer
+from .ndo import MockNDOServer
+from .sdwan import MockSDWANServer
+from .server import MockControllerServer, MockRequest, MockResponse, host_alias
+
+__all__ = [
+    "ConnectionReset",
+    "Fault",
+    "Latency",
+    "MockCatalystCenterServer",
+    "MockControllerServer",
+    "MockFMCServer",
+    "MockIOSXEServer",
+    "MockIOSXRServer",
+    "MockISEServer",
+    "MockMerakiServer",
+    "MockNDFCServer",
+    "MockNDOServer",
+    "MockNXOSServer",
+    "MockRequest",
+    "MockResponse",
+    "MockSDWANServer",
+    "RateLimitStorm",
+    "ResetListener",
+    "SlowBody",
+    "TokenExpiry",
+    "TruncatedBody",
+    "fixed",
+    "host_alias",
+    "lognormal",
+    "uniform",
+]
@@ -0,0 +1,54 @@
+"""Stand-in for Cisco Catalyst Center: token authentication and offset/limit pagination."""
+
+from typing import Any
+
+from .server import MockControllerServer, MockRequest, MockResponse
+
+AUTH_ENDPOINT = "/dna/system/api/v1/auth/token"
+
+
+class MockCatalystCenterServer(MockControllerServer):
+    """
+    Catalyst Center API stand-in.
+
+    A token is obtained by posting basic credentials to the token endpoint and sent in
+    the x-auth-token header. Collections are paginated with the 1-based offset and limit
+    query parameters, wrapped in "response", and every collection has a "/count" sibling.
+    """
+
+    PAGE_SIZE = 500
+
+    def login(self, request: MockRequest) -> MockResponse | None:
+        if request.path != AUTH_ENDPOINT:
+            return None
+        if request.basic_auth() != (self.username, self.password):
+            return MockResponse(401, {"error": "Unauthorized"})
+        return MockResponse(200, {"Token": self.issue_token()})
+
+    def authorized(self, request: MockRequest) -> bool:
+        return self.valid_token(request.headers.get("x-auth-token"))
+
+    def route(self, request: MockRequest, path: str) -> MockResponse:
+        if path.endswith("/count"):
+            items = self.collection(path.removesuffix("/count"))
+            return MockResponse(200, {"response": len(items), "version": "1.0"})
+        return super().route(request, path)
+
+    def item_response(
+        self, request: MockRequest, path: str, item: dict[str, Any]
+    ) -> MockResponse:
+        return MockResponse(200, {"response": item, "version": "1.0"})
+
+    def collection_response(
+        self, request: MockRequest, path: str, items: list[dict[str, Any]]
+    ) -> MockResponse:
+        offset = int(request.query.get("offset", 1))
+        limit = int(request.query.get("limit", self.page_size))
+        page = items[offset - 1 : offset - 1 + limit]
+        return MockResponse(200, {"response": page, "version": "1.0"})
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        item = super().make_item(path, index, id_)
+        item["siteId"] = id_
+        item["instanceUuid"] = id_
+        return item
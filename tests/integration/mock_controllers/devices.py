@@ -0,0 +1,284 @@
+"""Stand-ins for the device APIs: IOS-XE RESTCONF, NX-OS NX-API REST and IOS-XR SSH."""
+
+import json
+import logging
+import socket
+import threading
+from collections import Counter
+from typing import Any
+
+import paramiko
+
+from .server import MockControllerServer, MockRequest, MockResponse
+
+IOSXE_CONFIG_ENDPOINT = "/restconf/data/Cisco-IOS-XE-native:native"
+NXOS_AUTH_ENDPOINT = "/api/aaaLogin.json"
+NXOS_CONFIG_ENDPOINT = "/api/mo/sys.json"
+IOSXR_CONFIG_COMMAND = "show running-config | json unified-model"
+# Seconds an SSH session may take, so a stuck client does not hold a thread forever
+IOSXR_SESSION_TIMEOUT = 30
+# Log channel of the server transports, which report clients disconnecting as errors
+IOSXR_LOG_CHANNEL = "tests.mock_controllers.iosxr"
+logging.getLogger(IOSXR_LOG_CHANNEL).setLevel(logging.CRITICAL)
+
+
+class MockIOSXEServer(MockControllerServer):
+    """
+    IOS-XE RESTCONF stand-in.
+
+    Basic credentials are sent with every request. The native configuration holds
+    `scale` interfaces; one server stands in for any number of devices, all targeting it.
+    """
+
+    def authorized(self, request: MockRequest) -> bool:
+        return request.basic_auth() == (self.username, self.password)
+
+    def route(self, request: MockRequest, path: str) -> MockResponse:
+        if path != IOSXE_CONFIG_ENDPOINT:
+            return MockResponse(404, {"error": "Not Found"})
+        interfaces = self.collection("/interface/GigabitEthernet")
+        return MockResponse(
+            200,
+            {
+                "Cisco-IOS-XE-native:native": {
+                    "version": "17.12",
+                    "hostname": "switch",
+                    "interface": {"GigabitEthernet": interfaces},
+                }
+            },
+        )
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        return {
+            "id": id_,
+            "name": f"1/0/{index + 1}",
+            "description": f"Synthetic interface {index}",
+            "switchport-config": {"switchport": {"access": {"vlan": {"vlan": 10}}}},
+        }
+
+
+class MockNXOSServer(MockControllerServer):
+    """
+    NX-OS NX-API REST stand-in.
+
+    Posting aaaUser credentials to aaaLogin returns a token, also set as the APIC-cookie
+    cookie sent with later requests. The system tree holds `scale` physical interfaces;
+    one server stands in for any number of devices, all targeting it.
+    """
+
+    def login(self, request: MockRequest) -> MockResponse | None:
+        if request.path != NXOS_AUTH_ENDPOINT:
+            return None
+        attributes = ((request.json() or {}).get("aaaUser") or {}).get("attributes", {})
+        if (attributes.get("name"), attributes.get("pwd")) != (
+            self.username,
+            self.password,
+        ):
+            return MockResponse(401, {"imdata": [{"error": {"attributes": {}}}]})
+        token = self.issue_token()
+        return MockResponse(
+            200,
+            {"imdata": [{"aaaLogin": {"attributes": {"token": token}}}]},
+            headers=[("Set-Cookie", f"APIC-cookie={token}; Path=/; HttpOnly")],
+        )
+
+    def authorized(self, request: MockRequest) -> bool:
+        return self.valid_token(request.cookie("APIC-cookie"))
+
+    def route(self, request: MockRequest, path: str) -> MockResponse:
+        if path != NXOS_CONFIG_ENDPOINT:
+            return MockResponse(404, {"imdata": []})
+        interfaces = self.collection("/intf-items/phys-items")
+        return MockResponse(
+            200,
+            {
+                "totalCount": "1",
+                "imdata": [
+                    {
+                        "topSystem": {
+                            "attributes": {"name": "switch"},
+                            "children": [{"interfaceEntity": {"children": interfaces}}],
+                        }
+                    }
+                ],
+            },
+        )
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        return {
+            "id": id_,
+            "l1PhysIf": {
+                "attributes": {
+                    "id": f"eth1/{index + 1}",
+                    "descr": f"Synthetic interface {index}",
+                    "adminSt": "up",
+                }
+            },
+        }
+
+
+class _IOSXRSession(paramiko.ServerInterface):
+    """Server side of one SSH session: password login and a single exec request."""
+
+    def __init__(self, server: "MockIOSXRServer") -> None:
+        self.server = server
+        self.command: str | None = None
+        self.command_received = threading.Event()
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        if (username, password) == (self.server.username, self.server.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel: Any, command: bytes) -> bool:
+        self.command = command.decode("utf-8")
+        self.command_received.set()
+        return True
+
+
+class MockIOSXRServer:
+    """
+    IOS-XR SSH stand-in.
+
+    Accepts password logins and answers the running configuration command with the
+    unified model of `scale` interfaces, after the timestamp line IOS-XR prints first;
+    other commands fail with exit status 1. One server stands in for any number of
+    devices, all targeting it. Use it as a context manager, or call start() and stop().
+
+    Parameters:
+        scale (int): Number of interfaces in the configuration. Defaults to 10.
+        username (str): Accepted username. Defaults to "admin".
+        password (str): Accepted password. Defaults to "password".
+    """
+
+    def __init__(
+        self, scale: int = 10, username: str = "admin", password: str = "password"
+    ) -> None:
+        self.scale = scale
+        self.username = username
+        self.password = password
+        # Commands run, by command
+        self.requests: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._socket: socket.socket | None = None
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        self._host_key: paramiko.RSAKey | None = None
+        self._output = b""
+
+    def start(self) -> "MockIOSXRServer":
+        """Start serving on a free port of the loopback interface."""
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._output = self.running_config()
+        self._closing = False
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        self._socket.settimeout(0.05)
+        self._thread = threading.Thread(
+            target=self._serve, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop accepting connections and close the listening socket."""
+        self._closing = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self) -> "MockIOSXRServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        if self._socket is None:
+            raise RuntimeError(f"{type(self).__name__} is not running")
+        return int(self._socket.getsockname()[1])
+
+    @property
+    def base_url(self) -> str:
+        """Target to give the devices."""
+        return f"127.0.0.1:{self.port}"
+
+    @property
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(self.requests.values())
+
+    def running_config(self) -> bytes:
+        """Return the output of the running configuration command."""
+        interfaces = [
+            {
+                "interface-name": f"GigabitEthernet0/0/0/{index}",
+                "description": f"Synthetic interface {index}",
+                "ipv4": {
+                    "addresses": {
+                        "address": {
+                            "address": f"10.{index // 256}.{index % 256}.1",
+                            "netmask": "255.255.255.0",
+                        }
+                    }
+                },
+            }
+            for index in range(self.scale)
+        ]
+        config = {
+            "data": {
+                "Cisco-IOS-XR-um-hostname-cfg:hostname": {"system-network-name": "xr"},
+                "Cisco-IOS-XR-um-interface-cfg:interfaces": {"interface": interfaces},
+            }
+        }
+        return b"Thu Oct 17 07:00:00.000 UTC\n" + json.dumps(config).encode()
+
+    def _serve(self) -> None:
+        assert self._socket is not None
+        while not self._closing:
+            try:
+                connection, _ = self._socket.accept()
+            except TimeoutError:
+                continue
+            threading.Thread(
+                target=self._session, args=(connection,), daemon=True
+            ).start()
+
+    def _session(self, connection: socket.socket) -> None:
+        transport = paramiko.Transport(connection)
+        transport.set_log_channel(IOSXR_LOG_CHANNEL)
+        transport.add_server_key(self._host_key)
+        session = _IOSXRSession(self)
+        try:
+            transport.start_server(server=session)
+            channel = transport.accept(IOSXR_SESSION_TIMEOUT)
+            if channel is None or not session.command_received.wait(
+                IOSXR_SESSION_TIMEOUT
+            ):
+                return
+            with self._lock:
+                self.requests[session.command or ""] += 1
+            if session.command == IOSXR_CONFIG_COMMAND:
+                channel.sendall(self._output)
+                channel.send_exit_status(0)
+            else:
+                channel.sendall_stderr(b"% Invalid input detected\n")
+                channel.send_exit_status(1)
+            channel.close()
+            # Until the client disconnects
+            transport.join(IOSXR_SESSION_TIMEOUT)
+        except (paramiko.SSHException, EOFError, OSError):
+            pass
+        finally:
+            transport.close()
@@ -0,0 +1,291 @@
+"""
+Faults injected into the responses of a stand-in: latency, 429 storms, connection resets,
+truncated and slow bodies, and expired tokens.
+
+Pass them to any stand-in, e.g. MockISEServer(faults=[RateLimitStorm(every=50)]). Faults
+are drawn from a random generator seeded per server, so a run injects the same faults
+into the same requests given the same request order; server.faults_injected counts them.
+"""
+
+import random
+import socket
+import struct
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .server import MockControllerServer, MockRequest, MockResponse, _Handler
+
+
+class Fault:
+    """
+    A fault injected into a share of the requests to a stand-in.
+
+    Subclasses act before the request is served (before()), or on the way the response
+    is sent (send()).
+
+    Parameters:
+        rate (float): Share of the matching requests the fault hits. Defaults to 1.0.
+        paths (tuple[str, ...], optional): Only requests whose path contains one of these
+            are hit. Defaults to every request.
+    """
+
+    name = "fault"
+
+    def __init__(self, rate: float = 1.0, paths: tuple[str, ...] | None = None) -> None:
+        self.rate = rate
+        self.paths = paths
+
+    def matches(self, request: "MockRequest", rng: random.Random) -> bool:
+        """Return whether the fault hits a request."""
+        if self.paths is not None and not any(p in request.path for p in self.paths):
+            return False
+        return self.rate >= 1.0 or rng.random() < self.rate
+
+    def before(
+        self, server: "MockControllerServer", request: "MockRequest"
+    ) -> "MockResponse | None":
+        """Act before the request is served; return a response to serve it instead."""
+        return None
+
+    def send(self, handler: "_Handler", response: "MockResponse") -> bool:
+        """Send the response faultily; return False to send it normally."""
+        return False
+
+
+def fixed(seconds: float) -> Callable[[random.Random], float]:
+    """Latency distribution: always the same delay."""
+    return lambda rng: seconds
+
+
+def uniform(low: float, high: float) -> Callable[[random.Random], float]:
+    """Latency distribution: uniform between two delays."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """Latency distribution: log-normal around a median, the long tail of real APIs."""
+    return lambda rng: median * rng.lognormvariate(0.0, sigma)
+
+
+class Latency(Fault):
+    """
+    Delay the response by a delay drawn from a distribution.
+
+    Parameters:
+        distribution (Callable[[random.Random], float]): Draws a delay in seconds, e.g.
+            fixed(0.05), uniform(0.01, 0.1) or lognormal(0.05).
+        **kwargs: See Fault.
+    """
+
+    name = "latency"
+
+    def __init__(
+        self, distribution: Callable[[random.Random], float], **kwargs: Any
+    ) -> None:
+        super().__init__(**kwargs)
+        self.distribution = distribution
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+
+    def before(
+        self, server: "MockControllerServer", request: "MockRequest"
+    ) -> "MockResponse | None":
+        with self._lock:
+            delay = self.distribution(self._rng)
+        time.sleep(max(0.0, delay))
+        return None
+
+
+class RateLimitStorm(Fault):
+    """
+    Answer bursts of requests with 429 Too Many Requests.
+
+    Of every `every` matching requests, the first `burst` are rate limited, with a
+    Retry-After header unless retry_after is None.
+
+    Parameters:
+        every (int): Length of the cycle, in matching requests. Defaults to 100.
+        burst (int): Rate-limited requests at the start of each cycle. Defaults to 10.
+        retry_after (int, optional): Retry-After sent, in seconds. Defaults to 1.
+        **kwargs: See Fault.
+    """
+
+    name = "429"
+
+    def __init__(
+        self,
+        every: int = 100,
+        burst: int = 10,
+        retry_after: int | None = 1,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.every = every
+        self.burst = burst
+        self.retry_after = retry_after
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def matches(self, request: "MockRequest", rng: random.Random) -> bool:
+        if not super().matches(request, rng):
+            return False
+        with self._lock:
+            position = self._count % self.every
+            self._count += 1
+        return position < self.burst
+
+    def before(
+        self, server: "MockControllerServer", request: "MockRequest"
+    ) -> "MockResponse | None":
+        from .server import MockResponse
+
+        headers = []
+        if self.retry_after is not None:
+            headers.append(("Retry-After", str(self.retry_after)))
+        return MockResponse(429, {"error": "Too Many Requests"}, headers)
+
+
+class TokenExpiry(Fault):
+    """
+    Expire every session token once every `every` matching requests.
+
+    The request that expires the tokens is then refused with 401, as are the requests
+    of every client until it logs in again.
+
+    Parameters:
+        every (int): Matching requests between expiries. Defaults to 100.
+        **kwargs: See Fault.
+    """
+
+    name = "expiry"
+
+    def __init__(self, every: int = 100, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.every = every
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def matches(self, request: "MockRequest", rng: random.Random) -> bool:
+        if not super().matches(request, rng):
+            return False
+        with self._lock:
+            self._count += 1
+            return self._count % self.every == 0
+
+    def before(
+        self, server: "MockControllerServer", request: "MockRequest"
+    ) -> "MockResponse | None":
+        server.revoke_tokens()
+        return None
+
+
+class ConnectionReset(Fault):
+    """Reset the connection instead of answering."""
+
+    name = "reset"
+
+    def send(self, handler: "_Handler", response: "MockResponse") -> bool:
+        # Closing with a zero linger time sends RST rather than FIN
+        handler.connection.setsockopt(
+            socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+        )
+        handler.close_connection = True
+        return True
+
+
+class TruncatedBody(Fault):
+    """
+    Announce the full body but close the connection part way through it.
+
+    Parameters:
+        keep (float): Share of the body sent. Defaults to 0.5.
+        **kwargs: See Fault.
+    """
+
+    name = "truncated"
+
+    def __init__(self, keep: float = 0.5, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.keep = keep
+
+    def send(self, handler: "_Handler", response: "MockResponse") -> bool:
+        handler.send_head(response)
+        handler.wfile.write(response.content[: int(len(response.content) * self.keep)])
+        handler.close_connection = True
+        return True
+
+
+class SlowBody(Fault):
+    """
+    Send the body in chunks spaced out in time, as an overloaded controller does.
+
+    Parameters:
+        chunk_size (int): Bytes per chunk. Defaults to 1024.
+        delay (float): Seconds between chunks. Defaults to 0.01.
+        **kwargs: See Fault.
+    """
+
+    name = "slow"
+
+    def __init__(self, chunk_size: int = 1024, delay: float = 0.01, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.chunk_size = chunk_size
+        self.delay = delay
+
+    def send(self, handler: "_Handler", response: "MockResponse") -> bool:
+        handler.send_head(response)
+        for start in range(0, len(response.content), self.chunk_size):
+            handler.wfile.write(response.content[start : start + self.chunk_size])
+            handler.wfile.flush()
+            time.sleep(self.delay)
+        return True
+
+
+class ResetListener:
+    """
+    TCP listener resetting every connection it accepts, standing in for the SSH port of
+    an unreachable device.
+
+    Use as a context manager; connections counts the connections accepted.
+    """
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self._socket: socket.socket | None = None
+        self._thread: threading.Thread | None = None
+        self._closing = False
+
+    def __enter__(self) -> "ResetListener":
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        self._socket.settimeout(0.05)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._closing = True
+        if self._thread is not None:
+            self._thread.join()
+        if self._socket is not None:
+            self._socket.close()
+
+    @property
+    def port(self) -> int:
+        assert self._socket is not None
+        return int(self._socket.getsockname()[1])
+
+    def _serve(self) -> None:
+        assert self._socket is not None
+        while not self._closing:
+            try:
+                connection, _ = self._socket.accept()
+            except TimeoutError:
+                continue
+            self.connections += 1
+            connection.setsockopt(
+                socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+            )
+            connection.close()
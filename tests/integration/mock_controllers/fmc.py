@@ -0,0 +1,105 @@
+"""Stand-in for Cisco FMC: token authentication with domains and paging.next pagination."""
+
+import json
+import math
+import re
+from typing import Any
+
+from .server import MockControllerServer, MockRequest, MockResponse
+
+AUTH_ENDPOINT = "/api/fmc_platform/v1/auth/generatetoken"
+DOMAIN_ENDPOINT = "/api/fmc_platform/v1/info/domain"
+GLOBAL_DOMAIN = "e276abec-e0f2-11e3-8169-6d9ed49b625f"
+
+_DOMAIN_PATTERN = re.compile(r"/domain/(?P<uuid>[^/]+)/")
+
+
+class MockFMCServer(MockControllerServer):
+    """
+    FMC API stand-in.
+
+    Posting basic credentials to the token endpoint returns the access and refresh tokens
+    and the domains in response headers; the access token is sent in X-auth-access-token,
+    or, like cdFMC, the password is sent as a bearer token. Collections hold "items" and a
+    "paging" object whose "next" link carries the offset and limit of the following page.
+
+    Parameters:
+        domains (dict[str, str], optional): Domain names by UUID. Defaults to Global.
+        **kwargs: See MockControllerServer.
+    """
+
+    # FMC returns 25 items per page unless asked for more
+    PAGE_SIZE = 25
+
+    def __init__(self, domains: dict[str, str] | None = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.domains = domains or {GLOBAL_DOMAIN: "Global"}
+
+    def login(self, request: MockRequest) -> MockResponse | None:
+        if request.path != AUTH_ENDPOINT:
+            return None
+        if request.basic_auth() != (self.username, self.password):
+            return MockResponse(
+                401, {"error": {"messages": [{"description": "Unauthorized"}]}}
+            )
+        domains = [{"uuid": uuid, "name": name} for uuid, name in self.domains.items()]
+        return MockResponse(
+            204,
+            headers=[
+                ("X-auth-access-token", self.issue_token()),
+                ("X-auth-refresh-token", self.issue_token()),
+                ("DOMAIN_UUID", next(iter(self.domains))),
+                ("DOMAINS", json.dumps(domains)),
+            ],
+        )
+
+    def authorized(self, request: MockRequest) -> bool:
+        return (
+            self.valid_token(request.headers.get("X-auth-access-token"))
+            or request.bearer() == self.password
+        )
+
+    def route(self, request: MockRequest, path: str) -> MockResponse:
+        if path == DOMAIN_ENDPOINT:
+            domains = [
+                {"uuid": uuid, "name": name, "type": "Domain"}
+                for uuid, name in self.domains.items()
+            ]
+            return self.collection_response(request, path, domains)
+        return super().route(request, path)
+
+    def collection_response(
+        self, request: MockRequest, path: str, items: list[dict[str, Any]]
+    ) -> MockResponse:
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", self.page_size))
+        expanded = request.query.get("expanded", "false")
+        paging: dict[str, Any] = {
+            "offset": offset,
+            "limit": limit,
+            "count": len(items),
+            "pages": math.ceil(len(items) / limit) if limit else 0,
+        }
+        if offset + limit < len(items):
+            paging["next"] = [
+                f"{self.url}{request.path}"
+                f"?offset={offset + limit}&limit={limit}&expanded={expanded}"
+            ]
+        body: dict[str, Any] = {"links": {"self": self.url + request.path}}
+        # FMC leaves "items" out of empty collections
+        if items:
+            body["items"] = items[offset : offset + limit]
+        body["paging"] = paging
+        return MockResponse(200, body)
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        item = super().make_item(path, index, id_)
+        item["type"] = path.rstrip("/").rsplit("/", 1)[-1]
+        match = _DOMAIN_PATTERN.search(path + "/")
+        if match and match.group("uuid") in self.domains:
+            uuid = match.group("uuid")
+            item["metadata"] = {
+                "domain": {"id": uuid, "name": self.domains[uuid], "type": "Domain"},
+                "readOnly": {"state": False},
+            }
+        return item
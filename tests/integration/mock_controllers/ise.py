@@ -0,0 +1,73 @@
+"""Stand-in for Cisco ISE: basic authentication, ERS nextPage pagination and OpenAPI."""
+
+from typing import Any
+
+from .server import MockControllerServer, MockRequest, MockResponse
+
+ERS_PREFIX = "/ers/config/"
+AUTH_ENDPOINTS = ("/admin/API/NetworkAccessConfig/ERS", "/admin/API/apiService/get")
+
+
+class MockISEServer(MockControllerServer):
+    """
+    ISE API stand-in.
+
+    Every request is authenticated with basic credentials. ERS collections are listed
+    page by page through SearchResult.nextPage, with the item details behind each
+    resource link; OpenAPI collections are returned whole under "response".
+    """
+
+    # ISE returns 20 ERS resources per page unless asked for more
+    PAGE_SIZE = 20
+
+    def login(self, request: MockRequest) -> MockResponse | None:
+        if request.path not in AUTH_ENDPOINTS:
+            return None
+        if not self.authorized(request):
+            return MockResponse(401)
+        return MockResponse(200, "")
+
+    def authorized(self, request: MockRequest) -> bool:
+        return request.basic_auth() == (self.username, self.password)
+
+    def item_response(
+        self, request: MockRequest, path: str, item: dict[str, Any]
+    ) -> MockResponse:
+        if path.startswith(ERS_PREFIX):
+            # ERS wraps the details in the resource type, e.g. {"NetworkDevice": {...}}
+            resource = path[len(ERS_PREFIX) :].split("/")[0]
+            return MockResponse(200, {resource[:1].upper() + resource[1:]: item})
+        return MockResponse(200, {"response": item})
+
+    def collection_response(
+        self, request: MockRequest, path: str, items: list[dict[str, Any]]
+    ) -> MockResponse:
+        if not path.startswith(ERS_PREFIX):
+            return MockResponse(200, {"response": items})
+
+        size = int(request.query.get("size", self.page_size))
+        page = int(request.query.get("page", 1))
+        url = self.url + request.path
+        search_result: dict[str, Any] = {
+            "total": len(items),
+            "resources": [
+                {
+                    "id": item["id"],
+                    "name": item["name"],
+                    "description": item["description"],
+                    "link": {
+                        "rel": "self",
+                        "href": f"{url}/{item['id']}",
+                        "type": "application/json",
+                    },
+                }
+                for item in items[(page - 1) * size : page * size]
+            ],
+        }
+        if page * size < len(items):
+            search_result["nextPage"] = {
+                "rel": "next",
+                "href": f"{url}?size={size}&page={page + 1}",
+                "type": "application/json",
+            }
+        return MockResponse(200, {"SearchResult": search_result})
@@ -0,0 +1,82 @@
+"""Stand-in for the Meraki Dashboard API: API key authentication and Link header pagination."""
+
+from contextlib import AbstractContextManager
+from typing import Any
+from urllib.parse import urlencode
+
+from .server import MockControllerServer, MockRequest, MockResponse, host_alias
+
+# The Meraki SDK only follows pagination links to Meraki hosts
+HOSTNAME = "api.meraki.com"
+
+
+class MockMerakiServer(MockControllerServer):
+    """
+    Meraki Dashboard API stand-in.
+
+    Requests carry the API key (the password) as a bearer token. Collections are lists
+    paginated with perPage and startingAfter, the following page being announced in a
+    Link header.
+
+    The Meraki SDK only follows Link headers to Meraki hosts, so while the server runs
+    HOSTNAME resolves to the loopback address (see host_alias()) and base_url uses it.
+    """
+
+    API_PREFIX = "/api/v1"
+    PAGE_SIZE = 1000
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._alias: AbstractContextManager[None] | None = None
+
+    def start(self) -> "MockMerakiServer":
+        self._alias = host_alias(HOSTNAME)
+        self._alias.__enter__()
+        super().start()
+        return self
+
+    def stop(self) -> None:
+        super().stop()
+        if self._alias is not None:
+            self._alias.__exit__(None, None, None)
+            self._alias = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{HOSTNAME}:{self.port}{self.API_PREFIX}"
+
+    def authorized(self, request: MockRequest) -> bool:
+        return request.bearer() == self.password
+
+    def collection_response(
+        self, request: MockRequest, path: str, items: list[dict[str, Any]]
+    ) -> MockResponse:
+        per_page = int(request.query.get("perPage", self.page_size))
+        start = 0
+        starting_after = request.query.get("startingAfter")
+        if starting_after is not None:
+            ids = [item["id"] for item in items]
+            start = ids.index(starting_after) + 1 if starting_after in ids else len(ids)
+        page = items[start : start + per_page]
+        headers = []
+        if start + per_page < len(items):
+            query = urlencode({"perPage": per_page, "startingAfter": page[-1]["id"]})
+            next_url = f"http://{HOSTNAME}:{self.port}{request.path}?{query}"
+            headers.append(("Link", f"<{next_url}>; rel=next"))
+        return MockResponse(200, page, headers)
+
+    def make_id(self, path: str, index: int) -> str:
+        # Meraki ids are short opaque strings, e.g. N_24329156 for networks
+        return f"{path.rstrip('/').rsplit('/', 1)[-1][:1].upper()}_{super().make_id(path, index)[:13]}"
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        item = super().make_item(path, index, id_)
+        item.update(
+            {
+                "serial": id_,
+                "networkId": id_,
+                "productType": "appliance",
+                "model": "MX68",
+            }
+        )
+        return item
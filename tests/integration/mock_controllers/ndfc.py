@@ -0,0 +1,78 @@
+"""Stand-in for NDFC: Nexus Dashboard login and a single-site fabric of switches and policies."""
+
+from typing import Any
+
+from .ndo import MockNexusDashboardServer
+from .server import MockRequest, MockResponse
+
+FABRICS_PATH = "/control/fabrics/"
+INVENTORY_SUFFIX = "/inventory"
+POLICIES_PATH = "/control/policies/pagination"
+
+
+class MockNDFCServer(MockNexusDashboardServer):
+    """
+    NDFC API stand-in.
+
+    Serves one fabric that is not a multi-site domain. Collections are bare lists, not
+    paginated (the policies endpoint returns every policy despite its name). Switches
+    have serial numbers, and policies are spread over the switches, every fourth one
+    being auto-generated.
+
+    Parameters:
+        fabric_name (str): Name of the fabric. Defaults to "fabric1".
+        **kwargs: See MockNexusDashboardServer; size the inventory and the policies
+            with sizes={"/inventory": ..., "/policies/pagination": ...}.
+    """
+
+    API_PREFIX = "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest"
+
+    def __init__(self, fabric_name: str = "fabric1", **kwargs: Any) -> None:
+        kwargs.setdefault("domain", "local")
+        super().__init__(**kwargs)
+        self.fabric_name = fabric_name
+
+    def route(self, request: MockRequest, path: str) -> MockResponse:
+        if path == FABRICS_PATH + "msd/fabric-associations":
+            return MockResponse(200, [])
+        if path == FABRICS_PATH + self.fabric_name:
+            return MockResponse(
+                200,
+                {
+                    "id": 1,
+                    "fabricName": self.fabric_name,
+                    "fabricType": "Switch_Fabric",
+                    "templateName": "Easy_Fabric",
+                    "nvPairs": {"FABRIC_NAME": self.fabric_name, "BGP_AS": "65001"},
+                },
+            )
+        return super().route(request, path)
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        item = super().make_item(path, index, id_)
+        item["fabricName"] = self.fabric_name
+        if path.endswith(INVENTORY_SUFFIX):
+            item.update(
+                {
+                    "serialNumber": f"FDO{index:08d}",
+                    "hostName": f"leaf{index}",
+                    "logicalName": f"leaf{index}",
+                    "switchRole": "leaf",
+                }
+            )
+        elif path == POLICIES_PATH:
+            switches = self.collection_size(
+                f"{FABRICS_PATH}{self.fabric_name}{INVENTORY_SUFFIX}", False
+            )
+            item.update(
+                {
+                    "policyId": f"POLICY-{index}",
+                    "serialNumber": f"FDO{index % max(switches, 1):08d}",
+                    "templateName": "switch_freeform",
+                    "autoGenerated": index % 4 == 0,
+                    "source": "",
+                    "priority": 500,
+                    "nvPairs": {"CONF": f"interface loopback{index}"},
+                }
+            )
+        return item
@@ -0,0 +1,69 @@
+"""Stand-in for Nexus Dashboard Orchestrator, and the Nexus Dashboard login it shares with NDFC."""
+
+from typing import Any
+
+from .server import MockControllerServer, MockRequest, MockResponse
+
+LOGIN_ENDPOINT = "/login"
+
+
+class MockNexusDashboardServer(MockControllerServer):
+    """
+    Nexus Dashboard platform stand-in.
+
+    Posting userName, userPasswd and domain to /login returns a token, also set as the
+    AuthCookie cookie; requests carry either the cookie or the token as a bearer token.
+
+    Parameters:
+        domain (str): Accepted login domain. Defaults to "DefaultAuth".
+        **kwargs: See MockControllerServer.
+    """
+
+    def __init__(self, domain: str = "DefaultAuth", **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.domain = domain
+
+    def login(self, request: MockRequest) -> MockResponse | None:
+        if request.path != LOGIN_ENDPOINT:
+            return None
+        credentials = request.json() or {}
+        if (
+            credentials.get("userName"),
+            credentials.get("userPasswd"),
+            credentials.get("domain"),
+        ) != (self.username, self.password, self.domain):
+            return MockResponse(401, {"errors": ["Invalid credentials"]})
+        token = self.issue_token()
+        return MockResponse(
+            200,
+            {"jwttoken": token, "token": token, "username": self.username},
+            headers=[("Set-Cookie", f"AuthCookie={token}; Path=/; HttpOnly")],
+        )
+
+    def authorized(self, request: MockRequest) -> bool:
+        return self.valid_token(request.bearer()) or self.valid_token(
+            request.cookie("AuthCookie")
+        )
+
+
+class MockNDOServer(MockNexusDashboardServer):
+    """
+    NDO API stand-in.
+
+    Collections are not paginated and are returned under their name, e.g.
+    {"tenants": [...]}; template summaries are a bare list of templates.
+    """
+
+    def collection_response(
+        self, request: MockRequest, path: str, items: list[dict[str, Any]]
+    ) -> MockResponse:
+        if path.endswith("/templates/summaries"):
+            return MockResponse(200, items)
+        return MockResponse(200, {path.rstrip("/").rsplit("/", 1)[-1]: items})
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        item = super().make_item(path, index, id_)
+        if path.endswith("/templates/summaries"):
+            item["templateId"] = id_
+            item["templateName"] = item["name"]
+        return item
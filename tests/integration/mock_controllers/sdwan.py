@@ -0,0 +1,104 @@
+"""Stand-in for Cisco SD-WAN Manager: JSESSIONID and XSRF token, or API token, authentication."""
+
+import base64
+import json
+import secrets
+from typing import Any
+
+from .server import MockControllerServer, MockRequest, MockResponse
+
+AUTH_ENDPOINT = "/j_security_check"
+TOKEN_ENDPOINT = "/dataservice/client/token"
+
+# Configuration groups, policy groups and feature profiles are returned as bare lists
+_LIST_PATHS = ("/v1/config-group", "/v1/policy-group", "/v1/feature-profile")
+
+
+class MockSDWANServer(MockControllerServer):
+    """
+    SD-WAN Manager API stand-in.
+
+    Posting the j_username and j_password form to /j_security_check opens a session
+    (JSESSIONID cookie), for which /dataservice/client/token returns the XSRF token; both
+    are sent with every request. An API token from api_token() is accepted instead, as
+    Manager 20.18 does. Collections are not paginated and are returned under "data".
+    """
+
+    API_PREFIX = "/dataservice"
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        # XSRF token of every open session, by JSESSIONID
+        self.sessions: dict[str, str] = {}
+        # CSRF token of every API token
+        self.api_tokens: dict[str, str] = {}
+
+    def api_token(self) -> str:
+        """Return a JWT-shaped API token carrying its CSRF token, as Manager issues them."""
+        csrf = secrets.token_hex(16)
+        payload = base64.urlsafe_b64encode(json.dumps({"csrf": csrf}).encode())
+        token = f"e30.{payload.decode().rstrip('=')}.{secrets.token_hex(8)}"
+        with self._lock:
+            self.api_tokens[token] = csrf
+        return token
+
+    def revoke_tokens(self) -> None:
+        super().revoke_tokens()
+        with self._lock:
+            self.sessions.clear()
+            self.api_tokens.clear()
+
+    def login(self, request: MockRequest) -> MockResponse | None:
+        if request.path == AUTH_ENDPOINT:
+            form = request.form()
+            if (form.get("j_username"), form.get("j_password")) != (
+                self.username,
+                self.password,
+            ):
+                # Manager answers failed logins with the login page and no session
+                return MockResponse(200, "<html>login</html>")
+            session = secrets.token_hex(16)
+            with self._lock:
+                self.sessions[session] = secrets.token_hex(32)
+            return MockResponse(
+                200, headers=[("Set-Cookie", f"JSESSIONID={session}; Path=/; HttpOnly")]
+            )
+        if request.path == TOKEN_ENDPOINT:
+            with self._lock:
+                xsrf = self.sessions.get(request.cookie("JSESSIONID") or "")
+            if xsrf is None:
+                return MockResponse(401)
+            return MockResponse(200, xsrf)
+        return None
+
+    def authorized(self, request: MockRequest) -> bool:
+        token = request.bearer()
+        with self._lock:
+            if token is not None:
+                expected = self.api_tokens.get(token)
+            else:
+                expected = self.sessions.get(request.cookie("JSESSIONID") or "")
+        return expected is not None and expected == request.headers.get("X-XSRF-TOKEN")
+
+    def collection_response(
+        self, request: MockRequest, path: str, items: list[dict[str, Any]]
+    ) -> MockResponse:
+        if path.startswith(_LIST_PATHS):
+            return MockResponse(200, items)
+        return MockResponse(200, {"header": {}, "data": items})
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        item = super().make_item(path, index, id_)
+        # The id under the names the different template and policy APIs use
+        for key in ("templateId", "definitionId", "policyId", "profileId"):
+            item[key] = id_
+        item.update(
+            {
+                "deviceType": "vedge",
+                "devicesAttached": 0,
+                "solution": "sdwan",
+                "numberOfDevices": 0,
+                "associatedProfileParcels": [],
+            }
+        )
+        return item
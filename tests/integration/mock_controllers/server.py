@@ -0,0 +1,418 @@
+"""Local HTTP stand-in for a controller API, serving synthetic data generated per path."""
+
+import base64
+import hashlib
+import json
+import logging
+import random
+import secrets
+import socket
+import threading
+import uuid
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qsl, urlsplit
+
+if TYPE_CHECKING:
+    from .faults import Fault
+
+logger = logging.getLogger(__name__)
+
+
+class MockRequest:
+    """
+    A request received by a stand-in.
+
+    Parameters:
+        method (str): HTTP method.
+        target (str): Request target, path and query.
+        headers: Request headers.
+        body (bytes): Request body.
+    """
+
+    def __init__(self, method: str, target: str, headers: Any, body: bytes) -> None:
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        """Return the body decoded as JSON, or None if it is not JSON."""
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            return None
+
+    def form(self) -> dict[str, str]:
+        """Return the body decoded as a URL-encoded form."""
+        return dict(parse_qsl(self.body.decode("utf-8", "replace")))
+
+    def cookie(self, name: str) -> str | None:
+        """Return the value of a request cookie."""
+        for cookie in (self.headers.get("Cookie") or "").split(";"):
+            key, _, value = cookie.strip().partition("=")
+            if key == name:
+                return value
+        return None
+
+    def basic_auth(self) -> tuple[str, str] | None:
+        """Return the username and password of a basic Authorization header."""
+        scheme, _, credentials = (self.headers.get("Authorization") or "").partition(
+            " "
+        )
+        if scheme.lower() != "basic":
+            return None
+        try:
+            username, _, password = (
+                base64.b64decode(credentials).decode("utf-8").partition(":")
+            )
+        except ValueError:
+            return None
+        return username, password
+
+    def bearer(self) -> str | None:
+        """Return the token of a bearer Authorization header."""
+        scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+        return token if scheme.lower() == "bearer" else None
+
+
+class MockResponse:
+    """
+    A response sent by a stand-in.
+
+    Parameters:
+        status (int): HTTP status code. Defaults to 200.
+        body: dict or list (sent as JSON), str, bytes or None.
+        headers (list[tuple[str, str]], optional): Extra response headers.
+    """
+
+    def __init__(
+        self,
+        status: int = 200,
+        body: Any = None,
+        headers: list[tuple[str, str]] | None = None,
+    ) -> None:
+        self.status = status
+        self.headers = list(headers or [])
+        if body is None:
+            self.content = b""
+        elif isinstance(body, bytes):
+            self.content = body
+        elif isinstance(body, str):
+            self.content = body.encode("utf-8")
+            self.headers.append(("Content-Type", "text/plain"))
+        else:
+            self.content = json.dumps(body, separators=(",", ":")).encode("utf-8")
+            self.headers.append(("Content-Type", "application/json"))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Hand every request to the stand-in owning the HTTP server."""
+
+    # Keep connections alive, as the controllers do
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, which Nagle would delay on keep-alive
+    disable_nagle_algorithm = True
+    server: "_HTTPServer"
+
+    def _dispatch(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        request = MockRequest(self.command, self.path, self.headers, body)
+        controller = self.server.controller
+        faults = controller.select_faults(request)
+        try:
+            response = None
+            for fault in faults:
+                response = fault.before(controller, request)
+                if response is not None:
+                    break
+            if response is None:
+                response = controller.dispatch(request)
+        except Exception:
+            logger.exception("Stand-in failed on %s %s", self.command, self.path)
+            response = MockResponse(500, {"error": "Internal Server Error"})
+        if any(fault.send(self, response) for fault in faults):
+            return
+        self.send_head(response)
+        if self.command != "HEAD":
+            self.wfile.write(response.content)
+
+    def send_head(self, response: "MockResponse") -> None:
+        """Send the status line and headers of a response."""
+        self.send_response(response.status)
+        for name, value in response.headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(response.content)))
+        self.end_headers()
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format, *args)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Concurrent collection opens many connections at once
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], controller: "MockControllerServer"):
+        self.controller = controller
+        super().__init__(address, _Handler)
+
+
+class MockControllerServer:
+    """
+    Local HTTP stand-in for a controller API.
+
+    Every path under API_PREFIX is a collection of synthetic items, generated on first
+    request and stable afterwards. A path whose last segment is the id of an item serves
+    that item; a path with an item id further up is a collection of children of that item.
+    Subclasses implement the authentication flow and the response and pagination format of
+    their controller.
+
+    The server runs on a background thread of the test process; use it as a context
+    manager, or call start() and stop().
+
+    Parameters:
+        scale (int): Number of items in every top-level collection. Defaults to 10.
+        children (int): Number of items in every collection of children. Defaults to 2.
+        sizes (dict[str, int], optional): Number of items of the collections whose path
+            ends with a key, overriding scale and children, e.g. {"/networks": 5000}.
+        page_size (int, optional): Default page size. Defaults to PAGE_SIZE.
+        username (str): Accepted username. Defaults to "admin".
+        password (str): Accepted password, or API key. Defaults to "password".
+        faults (list[Fault], optional): Faults injected into the responses, see faults.py.
+        seed (int): Seed of the random generator drawing the faults. Defaults to 0.
+    """
+
+    # Prefix of the paths served as collections
+    API_PREFIX = ""
+    # Page size used when a request does not ask for one
+    PAGE_SIZE = 100
+
+    def __init__(
+        self,
+        scale: int = 10,
+        children: int = 2,
+        sizes: dict[str, int] | None = None,
+        page_size: int | None = None,
+        username: str = "admin",
+        password: str = "password",
+        faults: list["Fault"] | None = None,
+        seed: int = 0,
+    ) -> None:
+        self.scale = scale
+        self.children = children
+        self.sizes = dict(sizes or {})
+        self.page_size = page_size or self.PAGE_SIZE
+        self.username = username
+        self.password = password
+        self.tokens: set[str] = set()
+        # Requests served, by "METHOD path"
+        self.requests: Counter[str] = Counter()
+        self.faults = list(faults or [])
+        # Faults injected, by fault name
+        self.faults_injected: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._collections: dict[str, list[dict[str, Any]]] = {}
+        self._items: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._http: _HTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "MockControllerServer":
+        """Start serving on a free port of the loopback interface."""
+        self._http = _HTTPServer(("127.0.0.1", 0), self)
+        self._thread = threading.Thread(
+            target=self._http.serve_forever,
+            # Shut down promptly when the test is done
+            kwargs={"poll_interval": 0.05},
+            name=type(self).__name__,
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "MockControllerServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        if self._http is None:
+            raise RuntimeError(f"{type(self).__name__} is not running")
+        return int(self._http.server_address[1])
+
+    @property
+    def url(self) -> str:
+        """Root URL of the server."""
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def base_url(self) -> str:
+        """URL to pass to the collector as base_url."""
+        return self.url
+
+    @property
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(self.requests.values())
+
+    def issue_token(self) -> str:
+        """Create a session token accepted until revoke_tokens() is called."""
+        token = secrets.token_hex(16)
+        with self._lock:
+            self.tokens.add(token)
+        return token
+
+    def revoke_tokens(self) -> None:
+        """Invalidate every session token, as if they all expired."""
+        with self._lock:
+            self.tokens.clear()
+
+    def valid_token(self, token: str | None) -> bool:
+        with self._lock:
+            return token is not None and token in self.tokens
+
+    def select_faults(self, request: MockRequest) -> list["Fault"]:
+        """Count a request received and return the faults hitting it."""
+        with self._lock:
+            self.requests[f"{request.method} {request.path}"] += 1
+            faults = [
+                fault for fault in self.faults if fault.matches(request, self._rng)
+            ]
+            self.faults_injected.update(fault.name for fault in faults)
+        return faults
+
+    def dispatch(self, request: MockRequest) -> MockResponse:
+        """Serve one request: authentication, then the API."""
+        response = self.login(request)
+        if response is not None:
+            return response
+        if not self.authorized(request):
+            return MockResponse(401, {"error": "Unauthorized"})
+        if not request.path.startswith(self.API_PREFIX):
+            return MockResponse(404, {"error": "Not Found"})
+        return self.route(request, request.path[len(self.API_PREFIX) :])
+
+    def login(self, request: MockRequest) -> MockResponse | None:
+        """Serve the authentication endpoints, returning None for any other request."""
+        return None
+
+    def authorized(self, request: MockRequest) -> bool:
+        """Return whether a request carries valid credentials."""
+        return True
+
+    def route(self, request: MockRequest, path: str) -> MockResponse:
+        """
+        Serve a request to the API.
+
+        Parameters:
+            request (MockRequest): The request.
+            path (str): Request path relative to API_PREFIX.
+        """
+        segments = [segment for segment in path.split("/") if segment]
+        with self._lock:
+            if segments and segments[-1] in self._items:
+                item = self._items[segments[-1]]
+            else:
+                item = None
+        if item is not None:
+            return self.item_response(request, path, item)
+        return self.collection_response(request, path, self.collection(path))
+
+    def item_response(
+        self, request: MockRequest, path: str, item: dict[str, Any]
+    ) -> MockResponse:
+        """Return the response serving a single item."""
+        return MockResponse(200, item)
+
+    def collection_response(
+        self, request: MockRequest, path: str, items: list[dict[str, Any]]
+    ) -> MockResponse:
+        """Return the response serving a collection, paginated as the controller does."""
+        return MockResponse(200, items)
+
+    def collection(self, path: str) -> list[dict[str, Any]]:
+        """Return the items of the collection at a path, generating them on first use."""
+        key = path.rstrip("/")
+        with self._lock:
+            items = self._collections.get(key)
+            if items is None:
+                segments = [segment for segment in key.split("/") if segment]
+                nested = any(segment in self._items for segment in segments)
+                count = self.collection_size(key, nested)
+                items = [
+                    self.make_item(key, index, self.make_id(key, index))
+                    for index in range(count)
+                ]
+                self._collections[key] = items
+                for item in items:
+                    self._items[str(item["id"])] = item
+            return items
+
+    def collection_size(self, path: str, nested: bool) -> int:
+        """Return the number of items of the collection at a path."""
+        for suffix, size in self.sizes.items():
+            if path.endswith(suffix.rstrip("/")):
+                return size
+        return self.children if nested else self.scale
+
+    def make_id(self, path: str, index: int) -> str:
+        """Return a stable, UUID-shaped id for an item."""
+        digest = hashlib.md5(f"{path}#{index}".encode(), usedforsecurity=False)
+        return str(uuid.UUID(bytes=digest.digest()))
+
+    def make_item(self, path: str, index: int, id_: str) -> dict[str, Any]:
+        """Return the synthetic item at an index of a collection."""
+        name = path.rstrip("/").rsplit("/", 1)[-1] or "item"
+        return {
+            "id": id_,
+            "name": f"{name}_{index}",
+            "description": f"Synthetic {name} {index}",
+        }
+
+
+@contextmanager
+def host_alias(hostname: str, address: str = "127.0.0.1") -> Iterator[None]:
+    """
+    Resolve a hostname to another address within the block.
+
+    Patches socket.getaddrinfo, so it applies to clients resolving names through it,
+    such as httpx and the default (threaded) resolver of aiohttp.
+
+    Parameters:
+        hostname (str): Hostname to redirect.
+        address (str): Address it resolves to. Defaults to the loopback address.
+    """
+    getaddrinfo = socket.getaddrinfo
+
+    def resolve(host: Any, *args: Any, **kwargs: Any) -> Any:
+        if host == hostname:
+            host = address
+        return getaddrinfo(host, *args, **kwargs)
+
+    socket.getaddrinfo = resolve
+    try:
+        yield
+    finally:
+        socket.getaddrinfo = getaddrinfo
@@ -0,0 +1,194 @@
+import time
+
+import pytest
+
+from nac_collector.controller.fmc import CiscoClientFMC
+from nac_collector.controller.ise import CiscoClientISE
+from nac_collector.device.iosxe import CiscoClientIOSXE
+from nac_collector.retry import RetryBudget, RetryPolicy
+
+from . import (
+    ConnectionReset,
+    Latency,
+    MockFMCServer,
+    MockISEServer,
+    RateLimitStorm,
+    ResetListener,
+    SlowBody,
+    TokenExpiry,
+    TruncatedBody,
+    fixed,
+)
+
+pytestmark = pytest.mark.integration
+
+CLIENT_ARGS = {
+    "username": "admin",
+    "password": "password",
+    "max_retries": 5,
+    "retry_after": 0,
+    "timeout": 5,
+    "ssl_verify": False,
+}
+DETAILS = ("/ers/config/networkdevice/",)
+NETWORK_DEVICES = [{"name": "network_device", "endpoint": "/ers/config/networkdevice"}]
+
+
+def fast_retries(client, max_retries=5):
+    """Shorten the backoff of a client so that recovery is measured in milliseconds."""
+    client.retry_policy = RetryPolicy(
+        max_retries, backoff_base=0.01, backoff_max=0.05, budget=RetryBudget(1000)
+    )
+    return client
+
+
+def retries(client, reason):
+    endpoints = client.metrics.snapshot()["endpoints"].values()
+    return sum(entry["retries"].get(reason, 0) for entry in endpoints)
+
+
+def collect_ise(server, **kwargs):
+    client = fast_retries(
+        CiscoClientISE(base_url=server.base_url, **{**CLIENT_ARGS, **kwargs})
+    )
+    assert client.authenticate()
+    start = time.monotonic()
+    result = client.get_from_endpoints_data(NETWORK_DEVICES)
+    return client, result["network_device"], time.monotonic() - start
+
+
+class TestLatency:
+    def test_concurrent_requests_overlap_latency(self):
+        with MockISEServer(scale=60, faults=[Latency(fixed(0.05))]) as server:
+            _, entries, elapsed = collect_ise(server)
+
+        assert len(entries) == 60
+        assert server.faults_injected["latency"] == server.total_requests
+        # 61 requests of 50ms each take 3s one after the other
+        assert elapsed < 1.5
+
+
+class TestRateLimitStorm:
+    def test_recovers_from_bursts(self):
+        storm = RateLimitStorm(every=10, burst=3, retry_after=0, paths=DETAILS)
+        with MockISEServer(scale=40, faults=[storm]) as server:
+            client, entries, _ = collect_ise(server)
+
+        assert len(entries) == 40
+        assert server.faults_injected["429"] > 0
+        assert retries(client, "429") == server.faults_injected["429"]
+
+    def test_honours_retry_after_once(self):
+        storm = RateLimitStorm(every=1000, burst=1, retry_after=1, paths=DETAILS)
+        with MockISEServer(scale=5, faults=[storm]) as server:
+            _, entries, elapsed = collect_ise(server)
+
+        assert len(entries) == 5
+        # Retry-After is honoured as is, not stacked with the exponential backoff
+        assert 1.0 <= elapsed < 2.5
+
+    def test_gives_up_after_max_retries(self):
+        storm = RateLimitStorm(every=1, burst=1, retry_after=0, paths=DETAILS)
+        with MockISEServer(scale=3, faults=[storm]) as server:
+            _, entries, elapsed = collect_ise(server, max_retries=3)
+
+        assert entries == []
+        # Every resource is tried max_retries times, then given up
+        assert server.faults_injected["429"] == 3 * 3
+        assert elapsed < 2
+
+
+class TestTransportFaults:
+    @pytest.mark.parametrize(
+        "fault",
+        [
+            ConnectionReset(rate=0.2, paths=DETAILS),
+            TruncatedBody(rate=0.2, paths=DETAILS),
+        ],
+        ids=["reset", "truncated"],
+    )
+    def test_recovers_from_broken_responses(self, fault):
+        with MockISEServer(scale=40, faults=[fault]) as server:
+            client, entries, _ = collect_ise(server)
+
+        assert len(entries) == 40
+        assert server.faults_injected[fault.name] > 0
+        assert retries(client, "transport") + retries(client, "connect") > 0
+
+    def test_slow_body_is_read_to_the_end(self):
+        fault = SlowBody(chunk_size=64, delay=0.01, paths=DETAILS)
+        with MockISEServer(scale=5, faults=[fault]) as server:
+            _, entries, elapsed = collect_ise(server)
+
+        assert {entry["data"]["name"] for entry in entries} == {
+            f"networkdevice_{index}" for index in range(5)
+        }
+        assert elapsed >= 0.02
+
+    def test_slow_body_times_out(self):
+        fault = SlowBody(chunk_size=16, delay=0.5, paths=DETAILS)
+        with MockISEServer(scale=1, faults=[fault]) as server:
+            _, entries, _ = collect_ise(server, timeout=0.2, max_retries=2)
+
+        assert entries == []
+        assert server.faults_injected["slow"] == 2
+
+
+class TestTokenExpiry:
+    def test_logs_in_again_once_per_expiry(self):
+        expiry = TokenExpiry(every=25, paths=("/api/fmc_config/",))
+        with MockFMCServer(scale=30, children=1, faults=[expiry]) as server:
+            client = fast_retries(
+                CiscoClientFMC(base_url=server.base_url, rate_limit=0, **CLIENT_ARGS)
+            )
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [
+                    {
+                        "name": "device",
+                        "endpoint": "/api/fmc_config/v1/domain/{DOMAIN_UUID}/devices/devicerecords",
+                        "children": [
+                            {
+                                "name": "device_vrf",
+                                "endpoint": "/routing/virtualrouters",
+                            }
+                        ],
+                    }
+                ]
+            )
+
+        assert len(result["device"]) == 30
+        assert all(
+            len(entry["children"]["device_vrf"]) == 1 for entry in result["device"]
+        )
+        assert server.faults_injected["expiry"] > 0
+        # A burst of 401s after an expiry triggers a single login, not one per request
+        logins = server.requests["POST /api/fmc_platform/v1/auth/generatetoken"]
+        assert logins <= 1 + server.faults_injected["expiry"]
+
+
+class TestDeviceSSH:
+    def test_unreachable_device_is_retried_then_failed(self):
+        with ResetListener() as listener:
+            client = CiscoClientIOSXE(
+                devices=[
+                    {
+                        "name": "switch1",
+                        "target": f"127.0.0.1:{listener.port}",
+                        "protocol": "ssh",
+                    }
+                ],
+                default_username="admin",
+                default_password="password",
+                max_retries=3,
+                retry_after=0,
+                timeout=2,
+            )
+            fast_retries(client, max_retries=3)
+            start = time.monotonic()
+            data = client.collect_from_device(client.devices[0])
+            elapsed = time.monotonic() - start
+
+        assert "error" in data
+        assert listener.connections == 3
+        assert elapsed < 2
@@ -0,0 +1,347 @@
+import pytest
+
+from nac_collector.controller.catalystcenter import CiscoClientCATALYSTCENTER
+from nac_collector.controller.fmc import CiscoClientFMC
+from nac_collector.controller.ise import CiscoClientISE
+from nac_collector.controller.meraki import CiscoClientMERAKI
+from nac_collector.controller.ndfc import CiscoClientNDFC
+from nac_collector.controller.ndo import CiscoClientNDO
+from nac_collector.controller.sdwan import CiscoClientSDWAN
+from nac_collector.device.iosxe import CiscoClientIOSXE
+from nac_collector.device.iosxr import CiscoClientIOSXR
+from nac_collector.device.nxos import CiscoClientNXOS
+
+from . import (
+    MockCatalystCenterServer,
+    MockFMCServer,
+    MockIOSXEServer,
+    MockIOSXRServer,
+    MockISEServer,
+    MockMerakiServer,
+    MockNDFCServer,
+    MockNDOServer,
+    MockNXOSServer,
+    MockSDWANServer,
+)
+from .fmc import GLOBAL_DOMAIN
+
+pytestmark = pytest.mark.integration
+
+CLIENT_ARGS = {
+    "username": "admin",
+    "password": "password",
+    "max_retries": 1,
+    "retry_after": 0,
+    "timeout": 5,
+    "ssl_verify": False,
+}
+
+
+def entry_count(data):
+    """Count the collected entries, unwrapping entries whose data is a list."""
+    return sum(
+        len(entry["data"]) if isinstance(entry.get("data"), list) else 1
+        for entry in data
+    )
+
+
+class TestMockISE:
+    def test_collects_paginated_ers_endpoint(self):
+        with MockISEServer(scale=250) as server:
+            client = CiscoClientISE(base_url=server.base_url, **CLIENT_ARGS)
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [{"name": "network_device", "endpoint": "/ers/config/networkdevice"}]
+            )
+
+        assert len(result["network_device"]) == 250
+        assert {entry["data"]["name"] for entry in result["network_device"]} == {
+            f"networkdevice_{index}" for index in range(250)
+        }
+        # Three pages of 100, then one request per resource for its details
+        assert server.requests["GET /ers/config/networkdevice"] == 3
+
+    def test_collects_children(self):
+        with MockISEServer(scale=2, children=3) as server:
+            client = CiscoClientISE(base_url=server.base_url, **CLIENT_ARGS)
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [
+                    {
+                        "name": "policy_set",
+                        "endpoint": "/api/v1/policy/network-access/policy-set",
+                        "children": [
+                            {
+                                "name": "authentication_rule",
+                                "endpoint": "/authentication",
+                            }
+                        ],
+                    }
+                ]
+            )
+
+        assert len(result["policy_set"]) == 2
+        for entry in result["policy_set"]:
+            assert len(entry["children"]["authentication_rule"]) == 3
+
+    def test_rejects_wrong_credentials(self):
+        with MockISEServer(password="secret") as server:
+            client = CiscoClientISE(base_url=server.base_url, **CLIENT_ARGS)
+            assert not client.authenticate()
+
+
+class TestMockCatalystCenter:
+    def test_collects_offset_paginated_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with MockCatalystCenterServer(scale=1200) as server:
+            client = CiscoClientCATALYSTCENTER(
+                base_url=server.base_url, rate_limit=0, **CLIENT_ARGS
+            )
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [{"name": "tag", "endpoint": "/dna/intent/api/v1/tag"}]
+            )
+
+        assert entry_count(result["tag"]) == 1200
+        assert server.requests["GET /dna/intent/api/v1/tag/count"] == 1
+        assert server.requests["GET /dna/intent/api/v1/tag"] == 3
+
+    def test_rejects_wrong_credentials(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with MockCatalystCenterServer(password="secret") as server:
+            client = CiscoClientCATALYSTCENTER(
+                base_url=server.base_url, rate_limit=0, **CLIENT_ARGS
+            )
+            assert not client.authenticate()
+
+
+class TestMockFMC:
+    def test_follows_paging_next_links(self):
+        with MockFMCServer(scale=2500) as server:
+            client = CiscoClientFMC(
+                base_url=server.base_url, rate_limit=0, **CLIENT_ARGS
+            )
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [
+                    {
+                        "name": "network",
+                        "endpoint": "/api/fmc_config/v1/domain/{DOMAIN_UUID}/object/networks",
+                    }
+                ]
+            )
+
+        assert len(result["network"]) == 2500
+        # Three pages of 1000 networks
+        path = f"GET /api/fmc_config/v1/domain/{GLOBAL_DOMAIN}/object/networks"
+        assert server.requests[path] == 3
+
+    def test_collects_children(self):
+        with MockFMCServer(scale=3, children=2) as server:
+            client = CiscoClientFMC(
+                base_url=server.base_url, rate_limit=0, **CLIENT_ARGS
+            )
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [
+                    {
+                        "name": "device",
+                        "endpoint": "/api/fmc_config/v1/domain/{DOMAIN_UUID}/devices/devicerecords",
+                        "children": [
+                            {
+                                "name": "device_vrf",
+                                "endpoint": "/routing/virtualrouters",
+                            }
+                        ],
+                    }
+                ]
+            )
+
+        assert len(result["device"]) == 3
+        for entry in result["device"]:
+            assert len(entry["children"]["device_vrf"]) == 2
+
+    def test_rejects_wrong_credentials(self):
+        with MockFMCServer(password="secret") as server:
+            client = CiscoClientFMC(
+                base_url=server.base_url, rate_limit=0, **CLIENT_ARGS
+            )
+            assert not client.authenticate()
+
+
+class TestMockMeraki:
+    def test_follows_link_header_pagination(self):
+        with MockMerakiServer(scale=2500) as server:
+            client = CiscoClientMERAKI(
+                base_url=server.base_url, rate_limit=0, **CLIENT_ARGS
+            )
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [
+                    {
+                        "name": "organization",
+                        "has_own_id": True,
+                        "endpoint": "/organizations",
+                    }
+                ]
+            )
+
+        assert len(result["organization"]) == 2500
+        # Three pages of 1000 organizations
+        assert server.requests["GET /api/v1/organizations"] == 3
+
+
+class TestMockSDWAN:
+    def test_collects_with_session_and_xsrf_token(self):
+        with MockSDWANServer(scale=5) as server:
+            client = CiscoClientSDWAN(base_url=server.base_url, **CLIENT_ARGS)
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [
+                    {
+                        "name": "class_map_policy_object",
+                        "endpoint": "/template/policy/list/class/",
+                    }
+                ]
+            )
+
+        assert len(result["class_map_policy_object"]) == 5
+        assert server.requests["POST /j_security_check"] == 1
+
+    def test_rejects_wrong_credentials(self):
+        with MockSDWANServer(password="secret") as server:
+            client = CiscoClientSDWAN(base_url=server.base_url, **CLIENT_ARGS)
+            assert not client.authenticate()
+
+
+class TestMockNDO:
+    def test_collects_endpoints(self):
+        with MockNDOServer(scale=4) as server:
+            client = CiscoClientNDO(
+                base_url=server.base_url, domain="DefaultAuth", **CLIENT_ARGS
+            )
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [{"name": "tenants", "endpoint": "/mso/api/v1/tenants"}]
+            )
+
+        assert entry_count(result["tenants"]) >= 1
+        assert server.requests["POST /login"] == 1
+
+    def test_rejects_wrong_domain(self):
+        with MockNDOServer() as server:
+            client = CiscoClientNDO(
+                base_url=server.base_url, domain="radius", **CLIENT_ARGS
+            )
+            assert not client.authenticate()
+
+
+class TestMockNDFC:
+    def test_collects_fabric(self):
+        with MockNDFCServer(
+            sizes={"/inventory": 4, "/policies/pagination": 8}
+        ) as server:
+            client = CiscoClientNDFC(
+                base_url=server.base_url, fabric_name="fabric1", **CLIENT_ARGS
+            )
+            assert client.authenticate()
+            result = client.get_from_endpoints_data(
+                [
+                    {
+                        "name": "Fabric_Configuration",
+                        "endpoint": "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest/control/fabrics/%v",
+                    },
+                    {
+                        "name": "Discovered_Switches",
+                        "endpoint": "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest/control/fabrics/%v/inventory",
+                    },
+                ]
+            )
+
+        assert result["Fabric_Configuration"][0]["data"]["fabricName"] == "fabric1"
+        assert entry_count(result["Discovered_Switches"]) == 4
+
+    def test_rejects_wrong_credentials(self):
+        with MockNDFCServer(password="secret") as server:
+            client = CiscoClientNDFC(
+                base_url=server.base_url, fabric_name="fabric1", **CLIENT_ARGS
+            )
+            assert not client.authenticate()
+
+
+class TestMockDevices:
+    def test_iosxe_restconf(self):
+        with MockIOSXEServer(scale=4) as server:
+            client = CiscoClientIOSXE(
+                devices=[{"name": "switch1", "target": server.base_url}],
+                default_username="admin",
+                default_password="password",
+                max_retries=1,
+                retry_after=0,
+                timeout=5,
+            )
+            data = client.collect_from_device(client.devices[0])
+
+        native = data["Cisco-IOS-XE-native:native"]
+        assert len(native["interface"]["GigabitEthernet"]) == 4
+
+    def test_nxos_rest(self):
+        with MockNXOSServer(scale=4) as server:
+            client = CiscoClientNXOS(
+                devices=[{"name": "switch1", "target": server.base_url}],
+                default_username="admin",
+                default_password="password",
+                max_retries=1,
+                retry_after=0,
+                timeout=5,
+            )
+            device = client.devices[0]
+            assert client.authenticate_device(device)
+            data = client.collect_from_device(device)
+
+        interfaces = data["topSystem"]["children"][0]["interfaceEntity"]["children"]
+        assert len(interfaces) == 4
+        assert server.requests["POST /api/aaaLogin.json"] == 1
+
+    def test_nxos_rejects_wrong_credentials(self):
+        with MockNXOSServer(password="secret") as server:
+            client = CiscoClientNXOS(
+                devices=[{"name": "switch1", "target": server.base_url}],
+                default_username="admin",
+                default_password="password",
+                max_retries=1,
+                retry_after=0,
+                timeout=5,
+            )
+            assert not client.authenticate_device(client.devices[0])
+
+    def test_iosxr_ssh(self):
+        with MockIOSXRServer(scale=4) as server:
+            client = CiscoClientIOSXR(
+                devices=[{"name": "router1", "target": server.base_url}],
+                default_username="admin",
+                default_password="password",
+                max_retries=1,
+                retry_after=0,
+                timeout=5,
+            )
+            data = client.collect_from_device(client.devices[0])
+
+        interfaces = data["data"]["Cisco-IOS-XR-um-interface-cfg:interfaces"]
+        assert len(interfaces["interface"]) == 4
+        assert server.requests[CiscoClientIOSXR.SSH_COMMAND] == 1
+
+    def test_iosxr_rejects_wrong_credentials(self):
+        with MockIOSXRServer(password="secret") as server:
+            client = CiscoClientIOSXR(
+                devices=[{"name": "router1", "target": server.base_url}],
+                default_username="admin",
+                default_password="password",
+                max_retries=1,
+                retry_after=0,
+                timeout=5,
+            )
+            data = client.collect_from_device(client.devices[0])
+
+        assert "authentication failed" in data["error"]
+        assert server.total_requests == 0
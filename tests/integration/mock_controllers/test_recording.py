@@ -0,0 +1,112 @@
+import pytest
+
+from nac_collector.controller.ise import CiscoClientISE
+from nac_collector.device.iosxr import CiscoClientIOSXR
+from nac_collector.device.nxos import CiscoClientNXOS
+from nac_collector.recording import Recording
+from nac_collector.retry import RetryBudget, RetryPolicy
+
+from . import MockISEServer, MockNXOSServer, RateLimitStorm
+
+pytestmark = pytest.mark.integration
+
+CLIENT_ARGS = {
+    "username": "admin",
+    "password": "password",
+    "max_retries": 5,
+    "retry_after": 0,
+    "timeout": 5,
+    "ssl_verify": False,
+}
+NETWORK_DEVICES = [{"name": "network_device", "endpoint": "/ers/config/networkdevice"}]
+DEVICE_ARGS = {
+    "default_username": "admin",
+    "default_password": "password",
+    "max_retries": 1,
+    "retry_after": 0,
+    "timeout": 5,
+}
+
+
+def collect_ise(base_url, recording):
+    client = CiscoClientISE(base_url=base_url, recording=recording, **CLIENT_ARGS)
+    client.retry_policy = RetryPolicy(
+        5, backoff_base=0.01, backoff_max=0.05, budget=RetryBudget(1000)
+    )
+    assert client.authenticate()
+    result = client.get_from_endpoints_data(NETWORK_DEVICES)
+    retries = sum(
+        entry["retries"].get("429", 0)
+        for entry in client.metrics.snapshot()["endpoints"].values()
+    )
+    return result, retries
+
+
+class TestControllerReplay:
+    def test_replays_collection_offline(self, tmp_path):
+        storm = RateLimitStorm(every=10, burst=2, retry_after=0, paths=("/ers/",))
+        with MockISEServer(scale=40, faults=[storm]) as server:
+            base_url = server.base_url
+            with Recording(str(tmp_path)) as recording:
+                recorded, recorded_retries = collect_ise(base_url, recording)
+            requests = server.total_requests
+        assert recording.recorded == requests
+
+        # The server is gone: everything is served from the recording
+        replay = Recording(str(tmp_path), replay=True)
+        replayed, replayed_retries = collect_ise(base_url, replay)
+
+        assert replayed == recorded
+        assert len(replayed["network_device"]) == 40
+        # Rate limiting is replayed as it happened
+        assert replayed_retries == recorded_retries > 0
+        assert replay.snapshot() == {"recorded": 0, "replayed": requests, "misses": 0}
+
+
+class TestDeviceReplay:
+    def test_replays_rest_device_offline(self, tmp_path):
+        with MockNXOSServer(scale=4) as server:
+            devices = [{"name": "switch1", "target": server.base_url}]
+            with Recording(str(tmp_path)) as recording:
+                client = CiscoClientNXOS(
+                    devices=devices,
+                    recording=recording,
+                    **DEVICE_ARGS,
+                )
+                assert client.authenticate_device(client.devices[0])
+                recorded = client.collect_from_device(client.devices[0])
+
+        client = CiscoClientNXOS(
+            devices=devices,
+            recording=Recording(str(tmp_path), replay=True),
+            **DEVICE_ARGS,
+        )
+        assert client.authenticate_device(client.devices[0])
+        assert client.collect_from_device(client.devices[0]) == recorded
+
+    def test_replays_ssh_command(self, tmp_path):
+        with Recording(str(tmp_path)) as recording:
+            recording.record_command(
+                "ssh://192.0.2.1:22",
+                CiscoClientIOSXR.SSH_COMMAND,
+                0,
+                b'Mon Jan 1 00:00:00 UTC\n{"data": {"hostname": "router1"}}',
+                b"",
+            )
+
+        client = CiscoClientIOSXR(
+            devices=[
+                {"name": "router1", "target": "192.0.2.1"},
+                {"name": "router2", "target": "192.0.2.2"},
+            ],
+            recording=Recording(str(tmp_path), replay=True),
+            **DEVICE_ARGS,
+        )
+
+        assert client.collect_from_device(client.devices[0]) == {
+            "data": {"hostname": "router1"}
+        }
+        assert (
+            "not in the recording"
+            in (client.collect_from_device(client.devices[1])["error"])
+        )
@@ -0,0 +1,137 @@
+import pytest
+
+from nac_collector.controller.fmc import CiscoClientFMC
+from nac_collector.controller.ise import CiscoClientISE
+from nac_collector.controller.meraki import CiscoClientMERAKI
+from nac_collector.controller.ndfc import CiscoClientNDFC
+from nac_collector.controller.ndo import CiscoClientNDO
+from nac_collector.controller.results import ResultStore
+from nac_collector.controller.sdwan import CiscoClientSDWAN
+
+from . import (
+    MockFMCServer,
+    MockISEServer,
+    MockMerakiServer,
+    MockNDFCServer,
+    MockNDOServer,
+    MockSDWANServer,
+)
+
+pytestmark = pytest.mark.integration
+
+CLIENT_ARGS = {
+    "username": "admin",
+    "password": "password",
+    "max_retries": 1,
+    "retry_after": 0,
+    "timeout": 5,
+    "ssl_verify": False,
+}
+
+SCENARIOS = {
+    "ise": (
+        lambda: MockISEServer(scale=30, children=2),
+        CiscoClientISE,
+        {},
+        [
+            {"name": "network_device", "endpoint": "/ers/config/networkdevice"},
+            {
+                "name": "policy_set",
+                "endpoint": "/api/v1/policy/network-access/policy-set",
+                "children": [
+                    {"name": "authentication_rule", "endpoint": "/authentication"}
+                ],
+            },
+        ],
+    ),
+    "fmc": (
+        lambda: MockFMCServer(scale=1500, children=2),
+        CiscoClientFMC,
+        {"rate_limit": 0},
+        [
+            {
+                "name": "network",
+                "endpoint": "/api/fmc_config/v1/domain/{DOMAIN_UUID}/object/networks",
+            },
+            {
+                "name": "device",
+                "endpoint": "/api/fmc_config/v1/domain/{DOMAIN_UUID}/devices/devicerecords",
+                "children": [
+                    {"name": "device_vrf", "endpoint": "/routing/virtualrouters"}
+                ],
+            },
+        ],
+    ),
+    "meraki": (
+        lambda: MockMerakiServer(scale=30),
+        CiscoClientMERAKI,
+        {"rate_limit": 0},
+        [{"name": "organization", "has_own_id": True, "endpoint": "/organizations"}],
+    ),
+    "sdwan": (
+        lambda: MockSDWANServer(scale=5),
+        CiscoClientSDWAN,
+        {},
+        [
+            {
+                "name": "class_map_policy_object",
+                "endpoint": "/template/policy/list/class/",
+            }
+        ],
+    ),
+    "ndo": (
+        lambda: MockNDOServer(scale=4),
+        CiscoClientNDO,
+        {"domain": "DefaultAuth"},
+        [{"name": "tenants", "endpoint": "/mso/api/v1/tenants"}],
+    ),
+    "ndfc": (
+        lambda: MockNDFCServer(sizes={"/inventory": 4, "/policies/pagination": 8}),
+        CiscoClientNDFC,
+        {"fabric_name": "fabric1"},
+        [
+            {
+                "name": "Fabric_Configuration",
+                "endpoint": "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest/control/fabrics/%v",
+            },
+            {
+                "name": "Discovered_Switches",
+                "endpoint": "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest/control/fabrics/%v/inventory",
+            },
+            {
+                "name": "Policies",
+                "endpoint": "/appcenter/cisco/ndfc/api/v1/lan-fabric/rest/control/policies/pagination?fabricName=%v",
+            },
+        ],
+    ),
+}
+
+
+@pytest.mark.parametrize("solution", list(SCENARIOS))
+def test_spilled_collection_matches_in_memory(solution):
+    server_factory, client_class, client_args, endpoints = SCENARIOS[solution]
+    results = []
+    with server_factory() as server:
+        for memory_budget in (None, 1):
+            client = client_class(
+                base_url=server.base_url,
+                memory_budget=memory_budget,
+                **client_args,
+                **CLIENT_ARGS,
+            )
+            assert client.authenticate()
+            results.append(client.get_from_endpoints_data(endpoints))
+
+    in_memory, spilled = results
+    assert type(in_memory) is dict
+    assert isinstance(spilled, ResultStore)
+    # Every endpoint went to disk
+    assert spilled.snapshot()["spills"] >= len(spilled) > 0
+    assert list(spilled) == list(in_memory)
+    assert dict(spilled) == in_memory
+    if solution == "ndfc":
+        # Policies are filtered by the switches collected before them
+        (policies,) = spilled["Policies"]
+        assert "error" not in policies
+        assert policies["data"]
+    spilled.close()
@@ -1,5 +1,6 @@
 from unittest.mock import Mock
 
+import httpx
 import pytest
 
 from nac_collector.controller.ise import CiscoClientISE
@@ -23,18 +24,41 @@ def cisco_client():
 def test_authenticate_success(mocker, cisco_client):
     mock_response = Mock()
     mock_response.status_code = 200
-    mocker.patch("httpx.get", return_value=mock_response)
+    mock_get = mocker.patch.object(httpx.Client, "get", return_value=mock_response)
 
     result = cisco_client.authenticate()
     assert result is True
     assert cisco_client.client is not None
+    assert cisco_client.client.auth is not None
+    # The login request went through the client used for collection
+    assert mock_get.call_args.kwargs["auth"] == ("test_user", "test_password")
 
 
 def test_authenticate_failure(mocker, cisco_client):
     mock_response = Mock()
     mock_response.status_code = 401
-    mocker.patch("httpx.get", return_value=mock_response)
+    mocker.patch.object(httpx.Client, "get", return_value=mock_response)
 
     result = cisco_client.authenticate()
     assert result is False
     assert cisco_client.client is None
+
+
+def test_failed_login_again_keeps_the_current_client(cisco_client):
+    statuses = iter([200, 401, 401])
+    clients = []
+
+    def handler(request):
+        return httpx.Response(next(statuses))
+
+    def create():
+        clients.append(httpx.Client(transport=httpx.MockTransport(handler)))
+        return clients[-1]
+
+    cisco_client.create_client = create
+    assert cisco_client.authenticate()
+    assert not cisco_client.authenticate()
+
+    assert cisco_client.client is clients[0]
+    assert not clients[0].is_closed
+    assert clients[1].is_closed
@@ -1,5 +1,4 @@
-from unittest.mock import Mock
-
+import httpx
 import pytest
 
 from nac_collector.controller.ise import CiscoClientISE
@@ -22,20 +21,21 @@ def cisco_client():
 
 def test_process_ers_api_results_no_pagination(mocker, cisco_client):
     # Mocking response when there's no pagination
-    mock_response = mocker.Mock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
-        "SearchResult": {
-            "resources": [
-                {"link": {"href": "https://example.com/api/endpoint/1"}},
-                {"link": {"href": "https://example.com/api/endpoint/2"}},
-            ],
-        }
-    }
+    mock_response = httpx.Response(
+        200,
+        json={
+            "SearchResult": {
+                "resources": [
+                    {"link": {"href": "https://example.com/api/endpoint/1"}},
+                    {"link": {"href": "https://example.com/api/endpoint/2"}},
+                ],
+            }
+        },
+    )
     mocker.patch.object(cisco_client, "get_request", return_value=mock_response)
 
     # Call the method to test
-    data = cisco_client.process_ers_api_results(mock_response.json.return_value)
+    data = cisco_client.process_ers_api_results(mock_response.json())
 
     # Assertions
     assert len(data) == 2  # Total 2 resources without pagination
@@ -99,7 +99,7 @@ def test_process_ers_api_results_with_pagination(mocker, cisco_client):
         }
 
         if url in mock_responses:
-            return Mock(status_code=200, json=lambda: mock_responses[url])
+            return httpx.Response(200, json=mock_responses[url])
         else:
             raise ValueError(f"Unexpected URL in mock_get_request: {url}")
 
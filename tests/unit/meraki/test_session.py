@@ -0,0 +1,41 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from nac_collector.controller.meraki import CiscoClientMERAKI
+
+pytestmark = pytest.mark.unit
+
+
+def _client(base_url):
+    return CiscoClientMERAKI(
+        username="none",
+        password="api_key",
+        base_url=base_url,
+        max_retries=3,
+        retry_after=1,
+        timeout=5,
+        ssl_verify=False,
+    )
+
+
+@pytest.mark.parametrize(
+    "base_url, expected",
+    [
+        ("https://api.meraki.com/api/v1", "https://api.meraki.com/api/v1"),
+        ("https://api.meraki.cn/api/v1/", "https://api.meraki.cn/api/v1"),
+        ("http://127.0.0.1:8080/api/v1", "http://127.0.0.1:8080/api/v1"),
+        # The SDK used to ignore the URL: a host alone still reaches the API
+        ("https://api.meraki.com", "https://api.meraki.com/api/v1"),
+        ("https://api.meraki.com/", "https://api.meraki.com/api/v1"),
+    ],
+)
+def test_session_uses_base_url(base_url, expected):
+    client = _client(base_url)
+
+    with patch("nac_collector.controller.meraki.AsyncRestSession") as session:
+        asyncio.run(client.init_session())
+
+    assert session.call_args.args[1] == "api_key"
+    assert session.call_args.kwargs["base_url"] == expected
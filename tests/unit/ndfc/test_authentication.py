@@ -277,3 +277,22 @@ class TestAuthFailure:
             result = ndfc_client.authenticate()
 
         assert result is False
+
+    def test_failed_login_again_keeps_the_current_client(self, ndfc_client):
+        statuses = iter([200, 401])
+        clients = []
+
+        def handler(request):
+            return httpx.Response(next(statuses), json={"token": "tok"})
+
+        def create():
+            clients.append(httpx.Client(transport=httpx.MockTransport(handler)))
+            return clients[-1]
+
+        with patch.object(ndfc_client, "create_client", side_effect=create):
+            assert ndfc_client.authenticate()
+            assert not ndfc_client.authenticate()
+
+        assert ndfc_client.client is clients[0]
+        assert not clients[0].is_closed
+        assert clients[1].is_closed
@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from nac_collector.controller.sdwan import CiscoClientSDWAN
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def sdwan_client():
+    return CiscoClientSDWAN(
+        username="admin",
+        password="admin_pass",
+        base_url="https://sdwan.example.com",
+        max_retries=3,
+        retry_after=1,
+        timeout=5,
+        ssl_verify=False,
+    )
+
+
+def _manager(requests, accept=True):
+    """Handler of a Manager issuing a new session on every login."""
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path == "/j_security_check":
+            session = sum(path == "/j_security_check" for path in requests)
+            return httpx.Response(
+                200, headers={"Set-Cookie": f"JSESSIONID={session}; Path=/"}
+            )
+        if request.url.path == "/dataservice/client/token":
+            return httpx.Response(200 if accept else 403, text="xsrf")
+        return httpx.Response(200, json={"data": []})
+
+    return handler
+
+
+class TestSessionAuthentication:
+    def test_login_again_keeps_a_single_dataservice_prefix(self, sdwan_client):
+        requests = []
+        handler = _manager(requests)
+
+        with patch.object(
+            sdwan_client,
+            "create_client",
+            side_effect=lambda: httpx.Client(transport=httpx.MockTransport(handler)),
+        ):
+            assert sdwan_client.authenticate()
+            first = sdwan_client.client
+            assert sdwan_client.authenticate()
+
+        assert sdwan_client.base_url == "https://sdwan.example.com/dataservice"
+        assert requests.count("/j_security_check") == 2
+        assert sdwan_client.client is not first
+        assert sdwan_client.client.headers["Cookie"] == "JSESSIONID=2"
+        # Other threads may still be sending through the first client
+        assert not first.is_closed
+
+        sdwan_client.close()
+
+        assert first.is_closed
+
+    def test_failed_login_again_keeps_the_current_client(self, sdwan_client):
+        requests = []
+        accept = iter([True, False])
+        clients = []
+
+        def create():
+            handler = _manager(requests, accept=next(accept))
+            clients.append(httpx.Client(transport=httpx.MockTransport(handler)))
+            return clients[-1]
+
+        with patch.object(sdwan_client, "create_client", side_effect=create):
+            assert sdwan_client.authenticate()
+            assert not sdwan_client.authenticate()
+
+        assert sdwan_client.client is clients[0]
+        assert clients[1].is_closed
+        assert sdwan_client.base_url == "https://sdwan.example.com/dataservice"
+
+    def test_failed_first_login_leaves_no_client(self, sdwan_client):
+        requests = []
+        handler = _manager(requests, accept=False)
+
+        with patch.object(
+            sdwan_client,
+            "create_client",
+            side_effect=lambda: httpx.Client(transport=httpx.MockTransport(handler)),
+        ):
+            assert not sdwan_client.authenticate()
+
+        assert sdwan_client.client is None
+        assert sdwan_client.base_url == "https://sdwan.example.com"
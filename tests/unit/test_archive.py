@@ -0,0 +1,204 @@
+import json
+import threading
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+from nac_collector import archive as archive_module
+from nac_collector.archive import (
+    ArchiveWriter,
+    Compression,
+    ShardedArchiveWriter,
+    iter_json_chunks,
+    read_manifest,
+)
+
+pytestmark = pytest.mark.unit
+
+SAMPLE = {
+    "devices": [
+        {"id": i, "name": f"device-{i}", "tags": ["a", "b"]} for i in range(500)
+    ],
+    "sites": {"name": "Global", "children": []},
+}
+
+
+class TestCompression:
+    @pytest.mark.parametrize(
+        "compression, expected",
+        [
+            (Compression.STORED, (zipfile.ZIP_STORED, None)),
+            (Compression.DEFLATE, (zipfile.ZIP_DEFLATED, None)),
+            (Compression.DEFLATE_1, (zipfile.ZIP_DEFLATED, 1)),
+            (Compression.DEFLATE_9, (zipfile.ZIP_DEFLATED, 9)),
+            (Compression.BZIP2, (zipfile.ZIP_BZIP2, None)),
+            (Compression.LZMA, (zipfile.ZIP_LZMA, None)),
+        ],
+    )
+    def test_zip_method(self, compression, expected):
+        assert compression.zip_method == expected
+
+    def test_zstd_has_no_zip_method(self):
+        with pytest.raises(ValueError):
+            _ = Compression.ZSTD.zip_method
+
+
+class TestIterJsonChunks:
+    def test_chunks_match_json_dumps(self):
+        with patch("nac_collector.archive.WRITE_BUFFER_SIZE", 100):
+            chunks = list(iter_json_chunks(SAMPLE))
+
+        assert len(chunks) > 1
+        assert b"".join(chunks) == json.dumps(SAMPLE, indent=4).encode()
+
+
+class TestArchiveWriter:
+    @pytest.mark.parametrize("workers", [1, 4])
+    @pytest.mark.parametrize(
+        "compression",
+        [
+            Compression.STORED,
+            Compression.DEFLATE,
+            Compression.DEFLATE_1,
+            Compression.BZIP2,
+            Compression.LZMA,
+        ],
+    )
+    def test_members_match_json_dumps(self, tmp_path, compression, workers):
+        output = tmp_path / "out.zip"
+
+        with patch("nac_collector.archive.WRITE_BUFFER_SIZE", 1000):
+            with ArchiveWriter(str(output), compression, workers=workers) as archive:
+                archive.write_json("first.json", SAMPLE)
+                archive.write_json("second.json", [])
+                archive.write_json("third.json", SAMPLE["sites"])
+
+        expected_type, _ = compression.zip_method
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.testzip() is None
+            assert zip_file.namelist() == ["first.json", "second.json", "third.json"]
+            for info in zip_file.infolist():
+                assert info.compress_type == expected_type
+            assert zip_file.read("first.json") == json.dumps(SAMPLE, indent=4).encode()
+            assert zip_file.read("second.json") == b"[]"
+            assert json.loads(zip_file.read("third.json")) == SAMPLE["sites"]
+
+        assert archive.sizes["second.json"][0] == 2
+
+    @pytest.mark.parametrize(
+        "compression", [Compression.DEFLATE_9, Compression.BZIP2, Compression.LZMA]
+    )
+    def test_parallel_members_are_encoded_on_the_pool(self, tmp_path, compression):
+        output = tmp_path / "out.zip"
+        threads = []
+        original = archive_module._spool_json
+
+        def spool_json(data):
+            threads.append(threading.current_thread())
+            return original(data)
+
+        with patch("nac_collector.archive._spool_json", side_effect=spool_json):
+            with ArchiveWriter(str(output), compression, workers=4) as archive:
+                for index in range(10):
+                    archive.write_json(f"members/{index}.json", SAMPLE)
+
+        assert len(threads) == 10
+        assert threading.current_thread() not in threads
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.testzip() is None
+            for index, info in enumerate(zip_file.infolist()):
+                assert info.filename == f"members/{index}.json"
+                assert info.compress_type == compression.zip_method[0]
+                assert archive.sizes[info.filename] == (
+                    info.file_size,
+                    info.compress_size,
+                )
+                assert zip_file.read(info) == json.dumps(SAMPLE, indent=4).encode()
+
+    def test_spooled_members_go_to_disk_above_the_spool_size(self, tmp_path):
+        output = tmp_path / "out.zip"
+
+        with patch("nac_collector.archive.SPOOL_SIZE", 100):
+            with ArchiveWriter(str(output), workers=2) as archive:
+                archive.write_json("first.json", SAMPLE)
+
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.read("first.json") == json.dumps(SAMPLE, indent=4).encode()
+
+    def test_default_is_the_zipfile_writer(self, tmp_path):
+        with patch("nac_collector.archive._spool_json") as mock_spool:
+            with ArchiveWriter(str(tmp_path / "out.zip")) as archive:
+                archive.write_json("first.json", SAMPLE)
+
+        mock_spool.assert_not_called()
+        assert archive.workers == 1
+
+    def test_failed_encoding_is_raised(self, tmp_path):
+        output = tmp_path / "out.zip"
+
+        with pytest.raises(TypeError):
+            with ArchiveWriter(str(output), workers=2) as archive:
+                archive.write_json("first.json", SAMPLE)
+                archive.write_json("second.json", {"not": object()})
+
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.namelist() == ["first.json"]
+
+    def test_utf8_member_names(self, tmp_path):
+        output = tmp_path / "out.zip"
+
+        with ArchiveWriter(str(output), workers=2) as archive:
+            archive.write_json("zürich.json", [])
+
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.namelist() == ["zürich.json"]
+            assert zip_file.getinfo("zürich.json").flag_bits & 0x800
+
+    def test_write_after_close_raises(self, tmp_path):
+        archive = ArchiveWriter(str(tmp_path / "out.zip"))
+
+        with pytest.raises(RuntimeError):
+            archive.write_json("first.json", {})
+
+    def test_zstd_tar(self, tmp_path):
+        zstandard = pytest.importorskip("zstandard")
+        import tarfile
+
+        output = tmp_path / "out.tar.zst"
+
+        with ArchiveWriter(str(output), Compression.ZSTD) as archive:
+            archive.write_json("first.json", SAMPLE)
+
+        with open(output, "rb") as fh:
+            reader = zstandard.ZstdDecompressor().stream_reader(fh)
+            with tarfile.open(fileobj=reader, mode="r|") as tar:
+                member = tar.next()
+                assert member.name == "first.json"
+                content = tar.extractfile(member).read()
+        assert content == json.dumps(SAMPLE, indent=4).encode()
+
+    def test_zstd_without_zstandard(self, tmp_path):
+        with patch("nac_collector.archive.zstandard", None):
+            with pytest.raises(RuntimeError, match="zstandard"):
+                with ArchiveWriter(str(tmp_path / "out.tar.zst"), Compression.ZSTD):
+                    pass
+
+
+class TestShardedArchiveWriter:
+    def test_manifest_reports_compressed_sizes(self, tmp_path):
+        output = tmp_path / "out.zip"
+
+        with ShardedArchiveWriter(
+            str(output), "tech", Compression.DEFLATE_9, workers=2
+        ) as writer:
+            writer.write_endpoint("devices", SAMPLE["devices"])
+
+        with zipfile.ZipFile(output) as zip_file:
+            manifest = read_manifest(zip_file)
+            (member,) = manifest["members"]
+            info = zip_file.getinfo(member["file"])
+        assert manifest["compression"] == "deflate-9"
+        assert member["items"] == 500
+        assert member["size"] == info.file_size
+        assert member["compressed_size"] == info.compress_size < info.file_size
@@ -1,3 +1,7 @@
+import asyncio
+import concurrent.futures
+import json
+import threading
 import zipfile
 from unittest.mock import MagicMock, patch
 
@@ -5,7 +9,13 @@ import httpx
 import pytest
 from ruamel.yaml import YAML
 
+from nac_collector.archive import ArchiveLayout, ArchiveWriter, read_manifest
+from nac_collector.constants import HTTP_KEEPALIVE_EXPIRY
 from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.catalystcenter import CiscoClientCATALYSTCENTER
+from nac_collector.controller.fmc import CiscoClientFMC
+from nac_collector.controller.meraki import CiscoClientMERAKI
+from nac_collector.retry import RetryBudget
 
 pytestmark = pytest.mark.unit
 
@@ -105,7 +115,8 @@ class TestGetRequest:
         cisco_client.client = mock_httpx_client
         mock_httpx_client.get.side_effect = httpx.TimeoutException("Timeout")
 
-        result = cisco_client.get_request("https://example.com/api/test")
+        with patch("time.sleep"):
+            result = cisco_client.get_request("https://example.com/api/test")
 
         assert result is None
         assert mock_httpx_client.get.call_count == cisco_client.max_retries
@@ -124,8 +135,9 @@ class TestGetRequest:
 
         assert result is None
         assert mock_httpx_client.get.call_count == cisco_client.max_retries
-        assert mock_auth.call_count == cisco_client.max_retries
-        assert mock_sleep.call_count == cisco_client.max_retries
+        # Re-authenticate once per request, no sleep after the last attempt
+        assert mock_auth.call_count == 1
+        assert mock_sleep.call_count == cisco_client.max_retries - 1
 
     def test_get_request_transport_error_auth_also_fails_transport_error(
         self, cisco_client, mock_httpx_client, caplog
@@ -180,8 +192,23 @@ class TestGetRequest:
 
         assert result is None
         assert mock_httpx_client.get.call_count == cisco_client.max_retries
-        assert mock_auth.call_count == cisco_client.max_retries
-        assert mock_sleep.call_count == cisco_client.max_retries
+        # Re-authenticate once per request, no sleep after the last attempt
+        assert mock_auth.call_count == 1
+        assert mock_sleep.call_count == cisco_client.max_retries - 1
+
+    def test_get_request_stops_when_retry_budget_is_exhausted(
+        self, cisco_client, mock_httpx_client
+    ):
+        cisco_client.client = mock_httpx_client
+        cisco_client.retry_policy.budget = RetryBudget(1)
+        mock_httpx_client.get.side_effect = httpx.ReadTimeout("Timeout")
+
+        with patch("time.sleep") as mock_sleep:
+            result = cisco_client.get_request("https://example.com/api/test")
+
+        assert result is None
+        assert mock_httpx_client.get.call_count == 2
+        assert mock_sleep.call_count == 1
 
     def test_get_request_rate_limited_with_retry_after_header(
         self, cisco_client, mock_httpx_client
@@ -200,7 +227,8 @@ class TestGetRequest:
             result = cisco_client.get_request("https://example.com/api/test")
 
         assert result == mock_response_200
-        assert cisco_client.retry_after == 5
+        # Retry-After only applies to the throttled request
+        assert cisco_client.retry_after == 1
         mock_sleep.assert_called_once_with(5)
 
     def test_get_request_rate_limited_without_retry_after_header(
@@ -240,6 +268,56 @@ class TestGetRequest:
         assert result == mock_response_200
         mock_auth.assert_called_once()
 
+    def test_concurrent_401s_log_in_once(self, cisco_client):
+        barrier = threading.Barrier(4)
+        logins = []
+
+        def handler(request):
+            if request.headers.get("X-Session") == "new":
+                return httpx.Response(200)
+            # Every thread gets its 401 before any of them logs in again
+            barrier.wait(timeout=5)
+            return httpx.Response(401)
+
+        def login():
+            logins.append(threading.current_thread().name)
+            cisco_client.client.headers["X-Session"] = "new"
+            return True
+
+        cisco_client.client = httpx.Client(transport=httpx.MockTransport(handler))
+        responses = []
+        with patch.object(cisco_client, "authenticate", side_effect=login):
+            threads = [
+                threading.Thread(
+                    target=lambda: responses.append(
+                        cisco_client.get_request("https://example.com/api/test")
+                    )
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(logins) == 1
+        assert [response.status_code for response in responses] == [200] * 4
+
+    def test_replace_client_defers_closing_the_old_one(self, cisco_client):
+        old = httpx.Client()
+        new = httpx.Client()
+        cisco_client.client = old
+
+        cisco_client.replace_client(new)
+
+        assert cisco_client.client is new
+        assert not old.is_closed
+
+        cisco_client.close()
+
+        assert old.is_closed
+        assert new.is_closed
+
     def test_get_request_unexpected_status_code(self, cisco_client, mock_httpx_client):
         cisco_client.client = mock_httpx_client
         mock_response = MagicMock()
@@ -324,13 +402,28 @@ class TestPostRequest:
 
     def test_post_request_timeout_exception(self, cisco_client, mock_httpx_client):
         cisco_client.client = mock_httpx_client
-        mock_httpx_client.post.side_effect = httpx.TimeoutException("Timeout")
+        mock_httpx_client.post.side_effect = httpx.ConnectTimeout("Timeout")
 
-        result = cisco_client.post_request("https://example.com/api/test", {})
+        with patch("time.sleep"):
+            result = cisco_client.post_request("https://example.com/api/test", {})
 
         assert result is None
         assert mock_httpx_client.post.call_count == cisco_client.max_retries
 
+    def test_post_request_read_timeout_is_not_retried(
+        self, cisco_client, mock_httpx_client
+    ):
+        """A POST that timed out reading the response may already have been applied."""
+        cisco_client.client = mock_httpx_client
+        mock_httpx_client.post.side_effect = httpx.ReadTimeout("Timeout")
+
+        with patch("time.sleep") as mock_sleep:
+            result = cisco_client.post_request("https://example.com/api/test", {})
+
+        assert result is None
+        assert mock_httpx_client.post.call_count == 1
+        mock_sleep.assert_not_called()
+
     def test_post_request_connect_error_retries_and_reauthenticates(
         self, cisco_client, mock_httpx_client
     ):
@@ -345,8 +438,9 @@ class TestPostRequest:
 
         assert result is None
         assert mock_httpx_client.post.call_count == cisco_client.max_retries
-        assert mock_auth.call_count == cisco_client.max_retries
-        assert mock_sleep.call_count == cisco_client.max_retries
+        # Re-authenticate once per request, no sleep after the last attempt
+        assert mock_auth.call_count == 1
+        assert mock_sleep.call_count == cisco_client.max_retries - 1
 
     def test_post_request_transport_error_auth_also_fails_transport_error(
         self, cisco_client, mock_httpx_client, caplog
@@ -370,10 +464,10 @@ class TestPostRequest:
         assert result is None
         assert "re-authentication also failed" in caplog.text
 
-    def test_post_request_protocol_error_retries_and_reauthenticates(
+    def test_post_request_protocol_error_is_not_retried(
         self, cisco_client, mock_httpx_client
     ):
-        """Test that ProtocolError (a TransportError subclass) triggers retry logic."""
+        """Test that ProtocolError (a TransportError subclass) does not re-send a POST."""
         cisco_client.client = mock_httpx_client
         mock_httpx_client.post.side_effect = httpx.RemoteProtocolError(
             "Invalid HTTP response"
@@ -384,9 +478,10 @@ class TestPostRequest:
                 result = cisco_client.post_request("https://example.com/api/test", {})
 
         assert result is None
-        assert mock_httpx_client.post.call_count == cisco_client.max_retries
-        assert mock_auth.call_count == cisco_client.max_retries
-        assert mock_sleep.call_count == cisco_client.max_retries
+        # The request may have reached the server before the connection broke
+        assert mock_httpx_client.post.call_count == 1
+        mock_auth.assert_not_called()
+        mock_sleep.assert_not_called()
 
     def test_post_request_rate_limited(self, cisco_client, mock_httpx_client):
         cisco_client.client = mock_httpx_client
@@ -452,7 +547,7 @@ class TestFetchData:
     def test_fetch_data_success(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"key": "value"}
+        mock_response.content = json.dumps({"key": "value"}).encode()
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data("/api/test")
@@ -462,7 +557,7 @@ class TestFetchData:
     def test_fetch_data_list_response(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = ["item1", "item2"]
+        mock_response.content = json.dumps(["item1", "item2"]).encode()
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data("/api/test")
@@ -478,7 +573,7 @@ class TestFetchData:
     def test_fetch_data_json_decode_error(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.side_effect = ValueError("Invalid JSON")
+        mock_response.content = b"Invalid JSON"
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data("/api/test")
@@ -488,7 +583,7 @@ class TestFetchData:
     def test_fetch_data_unknown_type_response(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = "bar"
+        mock_response.content = json.dumps("bar").encode()
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data("/api/test")
@@ -500,7 +595,9 @@ class TestFetchDataPagination:
     def test_fetch_data_pagination_single_page(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"response": [{"id": 1}, {"id": 2}]}
+        mock_response.content = json.dumps(
+            {"response": [{"id": 1}, {"id": 2}]}
+        ).encode()
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data_pagination("/api/test")
@@ -510,15 +607,15 @@ class TestFetchDataPagination:
     def test_fetch_data_pagination_multiple_pages(self, cisco_client):
         mock_response_1 = MagicMock()
         mock_response_1.status_code = 200
-        mock_response_1.json.return_value = {
-            "response": [{"id": i} for i in range(500)]
-        }
+        mock_response_1.content = json.dumps(
+            {"response": [{"id": i} for i in range(500)]}
+        ).encode()
 
         mock_response_2 = MagicMock()
         mock_response_2.status_code = 200
-        mock_response_2.json.return_value = {
-            "response": [{"id": i} for i in range(500, 600)]
-        }
+        mock_response_2.content = json.dumps(
+            {"response": [{"id": i} for i in range(500, 600)]}
+        ).encode()
 
         with patch.object(
             cisco_client, "get_request", side_effect=[mock_response_1, mock_response_2]
@@ -535,7 +632,7 @@ class TestFetchDataPagination:
     def test_fetch_data_pagination_no_response_wrapper(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = [{"id": 1}, {"id": 2}]
+        mock_response.content = json.dumps([{"id": 1}, {"id": 2}]).encode()
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data_pagination("/api/test")
@@ -545,7 +642,9 @@ class TestFetchDataPagination:
     def test_fetch_data_pagination_single_item_response(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"response": {"id": 1, "name": "test"}}
+        mock_response.content = json.dumps(
+            {"response": {"id": 1, "name": "test"}}
+        ).encode()
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data_pagination("/api/test")
@@ -561,7 +660,7 @@ class TestFetchDataPagination:
     def test_fetch_data_pagination_json_decode_error(self, cisco_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.side_effect = ValueError("Invalid JSON")
+        mock_response.content = b"Invalid JSON"
 
         with patch.object(cisco_client, "get_request", return_value=mock_response):
             result = cisco_client.fetch_data_pagination("/api/test")
@@ -570,25 +669,94 @@ class TestFetchDataPagination:
 
 
 class TestWriteToArchive:
-    def test_write_to_archive(self, cisco_client):
+    def test_write_to_archive(self, cisco_client, tmp_path):
         test_data = {"key": "value", "number": 42}
+        output = tmp_path / "test_output.zip"
 
-        with patch("zipfile.ZipFile") as mock_zipfile:
-            mock_zip_instance = mock_zipfile.return_value.__enter__.return_value
-            cisco_client.write_to_archive(test_data, "test_output.zip", "test_tech")
+        cisco_client.write_to_archive(test_data, str(output), "test_tech")
 
-        mock_zipfile.assert_called_once_with(
-            "test_output.zip", "w", zipfile.ZIP_DEFLATED
-        )
-        mock_zip_instance.writestr.assert_called_once()
-
-        # Verify the JSON file name and content
-        call_args = mock_zip_instance.writestr.call_args
-        filename, content = call_args[0]
-        assert filename == "test_tech.json"
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.namelist() == ["test_tech.json"]
+            info = zip_file.getinfo("test_tech.json")
+            assert info.compress_type == zipfile.ZIP_DEFLATED
+            content = zip_file.read("test_tech.json").decode()
         assert "key" in content
         assert "value" in content
 
+    def test_write_to_archive_matches_json_dumps(self, cisco_client, tmp_path):
+        test_data = {
+            "endpoints": [{"id": i, "name": f"caf\u00e9 {i}"} for i in range(2000)],
+            "empty": {},
+            "nested": {"list": [], "value": None, "flag": True, "ratio": 0.5},
+        }
+        output = tmp_path / "test_output.zip"
+
+        with patch("nac_collector.archive.WRITE_BUFFER_SIZE", 1000):
+            cisco_client.write_to_archive(test_data, str(output), "test_tech")
+
+        with zipfile.ZipFile(output) as zip_file:
+            content = zip_file.read("test_tech.json")
+        assert content == json.dumps(test_data, indent=4).encode()
+
+    def test_write_to_archive_sharded(self, cisco_client, tmp_path):
+        test_data = {
+            "devices": [{"id": 1}, {"id": 2}],
+            "site/settings": {"name": "Global"},
+            "site settings": [],
+        }
+        expected = dict(test_data)
+        output = tmp_path / "test_output.zip"
+
+        cisco_client.write_to_archive(
+            test_data, str(output), "test_tech", ArchiveLayout.SHARDED
+        )
+
+        # Endpoints are released once written
+        assert test_data == {}
+        with zipfile.ZipFile(output) as zip_file:
+            manifest = read_manifest(zip_file)
+            assert manifest["solution"] == "test_tech"
+            assert manifest["layout"] == "sharded"
+            members = {m["endpoint"]: m for m in manifest["members"]}
+            assert members["devices"]["file"] == "test_tech/devices.json"
+            assert members["devices"]["items"] == 2
+            assert members["site/settings"]["file"] == "test_tech/site_settings.json"
+            assert members["site settings"]["file"] == "test_tech/site_settings_2.json"
+            for endpoint, member in members.items():
+                content = zip_file.read(member["file"])
+                assert content == json.dumps(expected[endpoint], indent=4).encode()
+                assert member["size"] == len(content)
+
+    @pytest.mark.parametrize(
+        "layout, workers", [(ArchiveLayout.SINGLE, 1), (ArchiveLayout.SHARDED, 4)]
+    )
+    def test_only_sharded_archives_use_archive_workers(
+        self, cisco_client, tmp_path, layout, workers
+    ):
+        cisco_client.archive_workers = 4
+
+        with (
+            patch(
+                "nac_collector.controller.base.ArchiveWriter", wraps=ArchiveWriter
+            ) as mock_writer,
+            patch(
+                "nac_collector.archive.ArchiveWriter", wraps=ArchiveWriter
+            ) as mock_sharded_writer,
+        ):
+            cisco_client.write_to_archive(
+                {"devices": []}, str(tmp_path / "out.zip"), "test_tech", layout
+            )
+
+        (call,) = mock_writer.call_args_list + mock_sharded_writer.call_args_list
+        assert call.args[2] == workers
+
+    def test_read_manifest_single_layout(self, cisco_client, tmp_path):
+        output = tmp_path / "test_output.zip"
+        cisco_client.write_to_archive({"devices": []}, str(output), "test_tech")
+
+        with zipfile.ZipFile(output) as zip_file:
+            assert read_manifest(zip_file) is None
+
 
 class TestCreateEndpointDict:
     def test_create_endpoint_dict(self):
@@ -607,3 +775,634 @@ class TestCreateEndpointDict:
         for endpoint in endpoints:
             result = CiscoClientController.create_endpoint_dict(endpoint)
             assert result == {endpoint["name"]: []}
+
+
+class TestRateLimit:
+    def test_no_rate_limit_by_default(self, cisco_client):
+        assert cisco_client.get_rate_limiter("https://example.com/api") is None
+
+    def test_longest_prefix_wins(self, cisco_client):
+        cisco_client.rate_limits = {"": 10.0, "/api/slow": 1.0}
+
+        fast = cisco_client.get_rate_limiter("https://example.com/api/fast")
+        slow = cisco_client.get_rate_limiter("https://example.com/api/slow/items")
+
+        assert fast.rate == 10.0
+        assert slow.rate == 1.0
+        assert cisco_client.get_rate_limiter("https://example.com/api/fast/x") is fast
+        assert set(cisco_client.rate_limiter_stats()) == {"", "/api/slow"}
+
+    @pytest.mark.parametrize(
+        "rate_limit, expected",
+        [(None, {"": 2.0}), (5.0, {"": 5.0}), (0, {})],
+    )
+    def test_rate_limit_overrides_class_default(self, rate_limit, expected):
+        class RateLimitedClient(ConcreteCiscoClient):
+            RATE_LIMITS = {"": 2.0}
+
+        client = RateLimitedClient(
+            username="user",
+            password="pass",
+            base_url="https://api.example.com",
+            max_retries=3,
+            retry_after=2,
+            timeout=10,
+            rate_limit=rate_limit,
+        )
+
+        assert client.rate_limits == expected
+
+    def test_solution_defaults_stay_under_the_published_limits(self):
+        # 120 requests per minute, 10 requests per second, 100 requests per minute
+        # per Catalyst Center API
+        assert CiscoClientFMC.RATE_LIMITS == {"": pytest.approx(1.8)}
+        assert CiscoClientMERAKI.RATE_LIMITS == {"": pytest.approx(9.0)}
+        assert "" not in CiscoClientCATALYSTCENTER.RATE_LIMITS
+        assert all(
+            limit == pytest.approx(1.5)
+            for limit in CiscoClientCATALYSTCENTER.RATE_LIMITS.values()
+        )
+
+    def test_catalystcenter_apis_have_buckets_of_their_own(self):
+        client = CiscoClientCATALYSTCENTER(
+            username="user",
+            password="pass",
+            base_url="https://dnac.example.com",
+            max_retries=3,
+            retry_after=1,
+            timeout=10,
+            ssl_verify=False,
+        )
+
+        devices = client.get_rate_limiter(
+            "https://dnac.example.com/dna/intent/api/v1/network-device?offset=1"
+        )
+        count = client.get_rate_limiter(
+            "https://dnac.example.com/dna/intent/api/v1/network-device/count"
+        )
+        sites = client.get_rate_limiter(
+            "https://dnac.example.com/dna/intent/api/v2/site"
+        )
+
+        assert devices is count
+        assert sites is not None and sites is not devices
+        assert (
+            client.get_rate_limiter(
+                "https://dnac.example.com/dna/intent/api/v1/business"
+            )
+            is None
+        )
+
+    def test_buckets_do_not_burst(self, cisco_client):
+        cisco_client.rate_limits = {"": 9.0}
+
+        bucket = cisco_client.get_rate_limiter("https://example.com/api/test")
+
+        assert bucket.capacity == 1.0
+
+    def test_get_request_waits_for_token(self, cisco_client, mock_httpx_client):
+        cisco_client.client = mock_httpx_client
+        cisco_client.rate_limits = {"": 1.0}
+        mock_httpx_client.get.return_value = MagicMock(status_code=200)
+
+        with patch("time.sleep") as mock_sleep:
+            cisco_client.get_request("https://example.com/api/test")
+            cisco_client.get_request("https://example.com/api/test")
+
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args[0][0] > 0
+
+
+def _mock_async_client(handler):
+    """Build an AsyncClient routed to a MockTransport handler."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestAsyncEngine:
+    def test_initialization_default_max_concurrency(self, cisco_client):
+        assert cisco_client.max_concurrency == 10
+        assert cisco_client.async_client is None
+
+    def test_max_concurrency_is_at_least_one(self):
+        client = ConcreteCiscoClient(
+            username="user",
+            password="pass",
+            base_url="https://api.example.com",
+            max_retries=3,
+            retry_after=2,
+            timeout=10,
+            max_concurrency=0,
+        )
+        assert client.max_concurrency == 1
+
+    def test_async_get_request_success(self, cisco_client):
+        def handler(request):
+            return httpx.Response(200, json={"key": "value"})
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            response = cisco_client.run_async(
+                lambda: cisco_client.async_get_request("https://example.com/api")
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {"key": "value"}
+        assert cisco_client.async_client is None
+
+    def test_async_get_request_without_session(self, cisco_client):
+        import asyncio
+
+        result = asyncio.run(cisco_client.async_get_request("https://example.com/api"))
+
+        assert result is None
+
+    def test_async_get_request_rate_limited(self, cisco_client):
+        responses = iter(
+            [
+                httpx.Response(429, headers={"Retry-After": "0"}),
+                httpx.Response(200, json={"ok": True}),
+            ]
+        )
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(lambda request: next(responses)),
+        ):
+            response = cisco_client.run_async(
+                lambda: cisco_client.async_get_request("https://example.com/api")
+            )
+
+        assert response.json() == {"ok": True}
+        # A throttled call must not change the default for later retries
+        assert cisco_client.retry_after == 1
+
+    def test_limiter_stats_per_host(self, cisco_client):
+        def handler(request):
+            if request.url.host == "busy.example.com":
+                return httpx.Response(503)
+            return httpx.Response(200, json={})
+
+        async def run():
+            await cisco_client.async_post_request("https://a.example.com/api", {})
+            await cisco_client.async_post_request("https://busy.example.com/api", {})
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            cisco_client.run_async(run)
+
+        stats = cisco_client.limiter_stats()
+        assert set(stats) == {"a.example.com", "busy.example.com"}
+        assert stats["a.example.com"]["successes"] == 1
+        assert stats["a.example.com"]["overloads"] == 0
+        assert stats["busy.example.com"]["overloads"] >= 1
+        assert stats["busy.example.com"]["in_flight"] == 0
+
+    def test_sync_requests_go_through_the_limiter(self, cisco_client):
+        cisco_client.client = httpx.Client(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+        )
+
+        cisco_client.get_request("https://a.example.com/api/items")
+
+        stats = cisco_client.limiter_stats()["a.example.com"]
+        assert stats["requests"] == 1
+        assert stats["successes"] == 1
+        assert stats["in_flight"] == 0
+        assert set(stats["baseline_latency_ms"]) == {"/api/items"}
+
+    def test_async_get_request_unauthorized_reauthenticates(self, cisco_client):
+        responses = iter([httpx.Response(401), httpx.Response(200, json={})])
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(lambda request: next(responses)),
+        ):
+            with patch.object(
+                cisco_client, "authenticate", return_value=True
+            ) as mock_auth:
+                response = cisco_client.run_async(
+                    lambda: cisco_client.async_get_request("https://example.com/api")
+                )
+
+        assert response.status_code == 200
+        mock_auth.assert_called_once()
+
+    def test_async_get_request_404_returns_none(self, cisco_client):
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(
+                lambda request: httpx.Response(404, content=b"{}")
+            ),
+        ):
+            result = cisco_client.run_async(
+                lambda: cisco_client.async_get_request("https://example.com/api")
+            )
+
+        assert result is None
+
+    def test_async_post_request_success(self, cisco_client):
+        def handler(request):
+            assert request.content == b'{"a": 1}'
+            return httpx.Response(201)
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            response = cisco_client.run_async(
+                lambda: cisco_client.async_post_request(
+                    "https://example.com/api", '{"a": 1}'
+                )
+            )
+
+        assert response.status_code == 201
+
+    def test_async_post_request_read_timeout_is_not_retried(self, cisco_client):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            raise httpx.ReadTimeout("Timeout", request=request)
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            response = cisco_client.run_async(
+                lambda: cisco_client.async_post_request("https://example.com/api", {})
+            )
+
+        assert response is None
+        assert len(requests) == 1
+
+    def test_async_fetch_data_pagination_multiple_pages(self, cisco_client):
+        def handler(request):
+            offset = int(request.url.params["offset"])
+            count = 500 if offset == 1 else 100
+            return httpx.Response(
+                200,
+                json={"response": [{"id": offset + i} for i in range(count)]},
+            )
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            result = cisco_client.run_async(
+                lambda: cisco_client.async_fetch_data_pagination("/api/test")
+            )
+
+        assert len(result["response"]) == 600
+
+    def test_concurrency_is_bounded(self, cisco_client):
+        import asyncio
+
+        cisco_client.max_concurrency = 2
+        in_flight = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json={"path": request.url.path})
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            results = cisco_client.run_async(
+                lambda: cisco_client.gather_bounded(
+                    [cisco_client.async_fetch_data(f"/api/{i}") for i in range(8)]
+                )
+            )
+
+        assert peak == 2
+        assert [r["path"] for r in results] == [f"/api/{i}" for i in range(8)]
+
+    def test_gather_bounded_runs_at_most_max_concurrency(self, cisco_client):
+        import asyncio
+
+        cisco_client.max_concurrency = 3
+        running = 0
+        peak = 0
+
+        async def work(i):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return i
+
+        results = cisco_client.run_async(
+            lambda: cisco_client.gather_bounded([work(i) for i in range(10)])
+        )
+
+        assert peak == 3
+        assert results == list(range(10))
+
+    def test_gather_bounded_raises_and_closes_unstarted(self, cisco_client):
+        cisco_client.max_concurrency = 1
+        started = []
+
+        async def work(i):
+            started.append(i)
+            if i == 1:
+                raise ValueError("boom")
+            return i
+
+        with pytest.raises(ValueError):
+            cisco_client.run_async(
+                lambda: cisco_client.gather_bounded([work(i) for i in range(5)])
+            )
+
+        assert started == [0, 1]
+
+
+class TestFetchMany:
+    def test_fetch_many_sequential_without_client(self, cisco_client):
+        with patch.object(
+            cisco_client, "fetch_data", side_effect=lambda e: {"e": e}
+        ) as mock_fetch:
+            result = cisco_client.fetch_many(["/a", "/b"])
+
+        assert result == [{"e": "/a"}, {"e": "/b"}]
+        assert mock_fetch.call_count == 2
+
+    def test_fetch_many_sequential_when_concurrency_disabled(self, cisco_client):
+        cisco_client.client = httpx.Client()
+        cisco_client.max_concurrency = 1
+
+        with patch.object(
+            cisco_client, "fetch_data_pagination", side_effect=lambda e: [e]
+        ):
+            result = cisco_client.fetch_many(["/a", "/b"], paginated=True)
+
+        assert result == [["/a"], ["/b"]]
+
+    def test_fetch_many_concurrent_preserves_order(self, cisco_client):
+        cisco_client.client = httpx.Client()
+
+        def handler(request):
+            return httpx.Response(200, json={"path": request.url.path})
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            result = cisco_client.fetch_many([f"/api/{i}" for i in range(5)])
+
+        assert result == [{"path": f"/api/{i}"} for i in range(5)]
+
+    def test_get_many_concurrent(self, cisco_client):
+        cisco_client.client = httpx.Client()
+
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(
+                lambda request: httpx.Response(200, text=request.url.path)
+            ),
+        ):
+            result = cisco_client.get_many(
+                ["https://example.com/x", "https://example.com/y"]
+            )
+
+        assert [r.text for r in result] == ["/x", "/y"]
+
+    def test_create_async_client_mirrors_sync_client(self, cisco_client):
+        cisco_client.client = httpx.Client(headers={"X-Auth": "token"})
+
+        async_client = cisco_client.create_async_client()
+
+        assert async_client.headers["X-Auth"] == "token"
+
+    def test_run_async_keeps_the_event_loop_and_client(self, cisco_client):
+        def handler(request):
+            return httpx.Response(200, text=request.headers.get("X-Auth", ""))
+
+        clients = []
+
+        def create():
+            clients.append(_mock_async_client(handler))
+            return clients[-1]
+
+        cisco_client.client = httpx.Client(headers={"X-Auth": "first"})
+        with patch.object(cisco_client, "create_async_client", side_effect=create):
+            first = cisco_client.run_async(
+                lambda: cisco_client.async_get_request("https://example.com/a")
+            )
+            # A login of the synchronous client between two calls is picked up
+            cisco_client.client.headers["X-Auth"] = "second"
+            second = cisco_client.run_async(
+                lambda: cisco_client.async_get_request("https://example.com/b")
+            )
+
+        assert (first.text, second.text) == ("first", "second")
+        assert len(clients) == 1
+        assert not clients[0].is_closed
+        [(loop, _)] = cisco_client._idle_loops
+
+        cisco_client.close()
+
+        assert clients[0].is_closed
+        assert loop.is_closed()
+        assert cisco_client.client.is_closed
+
+    def test_event_loops_are_bounded_by_concurrent_calls(self, cisco_client):
+        clients = []
+
+        def create():
+            clients.append(_mock_async_client(lambda request: httpx.Response(200)))
+            return clients[-1]
+
+        barrier = threading.Barrier(2)
+
+        def run(_):
+            # Both workers of a pool hold a loop at the same time
+            barrier.wait()
+            cisco_client.run_async(
+                lambda: cisco_client.async_get_request("https://example.com/a")
+            )
+            barrier.wait()
+
+        # A short-lived pool per endpoint, as the children of an endpoint are fetched
+        with patch.object(cisco_client, "create_async_client", side_effect=create):
+            for _ in range(30):
+                with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                    list(executor.map(run, range(2)))
+
+        assert len(cisco_client._idle_loops) == 2
+        assert len(clients) == 2
+
+        cisco_client.close()
+
+        assert all(client.is_closed for client in clients)
+        assert cisco_client._idle_loops == []
+
+    def test_sessions_outside_run_async_close_their_client(self, cisco_client):
+        client = _mock_async_client(lambda request: httpx.Response(200))
+
+        async def run():
+            async with cisco_client.async_session():
+                return await cisco_client.async_get_request("https://example.com/a")
+
+        with patch.object(cisco_client, "create_async_client", return_value=client):
+            response = asyncio.run(run())
+
+        assert response.status_code == 200
+        assert client.is_closed
+
+
+class TestParallelPagination:
+    @staticmethod
+    def _paged_handler(total, requests, count_path=None):
+        """Serve `total` items in pages of PAGINATION_LIMIT (set to 2 by the tests)."""
+
+        def handler(request):
+            requests.append(request.url.path + "?" + request.url.query.decode())
+            if count_path and request.url.path == count_path:
+                return httpx.Response(200, json={"response": total})
+            offset = int(request.url.params["offset"])
+            items = [{"id": i} for i in range(offset, min(offset + 2, total + 1))]
+            return httpx.Response(200, json={"response": items})
+
+        return handler
+
+    def _run(self, cisco_client, handler, endpoint="/api/items"):
+        cisco_client.client = httpx.Client()
+        cisco_client.PAGINATION_LIMIT = 2
+        with patch.object(
+            cisco_client,
+            "create_async_client",
+            side_effect=lambda: _mock_async_client(handler),
+        ):
+            return cisco_client.fetch_data_pagination(endpoint)
+
+    def test_pages_stitched_in_order_without_count_endpoint(self, cisco_client):
+        requests = []
+
+        result = self._run(cisco_client, self._paged_handler(9, requests))
+
+        assert result == {"response": [{"id": i} for i in range(1, 10)]}
+        # First page, then waves of 2 and 4 pages; the last wave stops at offset 9
+        offsets = sorted(int(r.rsplit("=", 1)[1]) for r in requests)
+        assert offsets == [1, 3, 5, 7, 9, 11, 13]
+
+    def test_count_endpoint_requests_remaining_pages_at_once(self, cisco_client):
+        requests = []
+        cisco_client.pagination_count_endpoint = lambda e: "/api/items/count"
+        handler = self._paged_handler(8, requests, count_path="/api/items/count")
+
+        result = self._run(cisco_client, handler)
+
+        assert result == {"response": [{"id": i} for i in range(1, 9)]}
+        page_requests = [r for r in requests if "offset" in r]
+        # Offsets 3, 5 and 7 cover the count; the full last page needs one more probe
+        assert len(page_requests) == 6
+        assert "/api/items/count?" in requests
+
+    def test_single_page_makes_one_request(self, cisco_client):
+        requests = []
+
+        result = self._run(cisco_client, self._paged_handler(1, requests))
+
+        assert result == {"response": [{"id": 1}]}
+        assert requests == ["/api/items?offset=1"]
+
+    def test_failed_page_returns_none(self, cisco_client):
+        def handler(request):
+            if request.url.params["offset"] == "3":
+                return httpx.Response(500)
+            return httpx.Response(200, json=[{"id": 1}, {"id": 2}])
+
+        assert self._run(cisco_client, handler) is None
+
+    def test_sequential_when_concurrency_disabled(self, cisco_client):
+        cisco_client.max_concurrency = 1
+        requests = []
+
+        with patch.object(cisco_client, "run_async") as mock_run_async:
+            cisco_client.client = httpx.Client(
+                transport=httpx.MockTransport(self._paged_handler(3, requests))
+            )
+            cisco_client.PAGINATION_LIMIT = 2
+            result = cisco_client.fetch_data_pagination("/api/items")
+
+        mock_run_async.assert_not_called()
+        assert result == {"response": [{"id": 1}, {"id": 2}, {"id": 3}]}
+        assert requests == ["/api/items?offset=1", "/api/items?offset=3"]
+
+
+class TestClientFactory:
+    def _client(self, **kwargs):
+        return ConcreteCiscoClient(
+            username="user",
+            password="pass",
+            base_url="https://api.example.com",
+            max_retries=3,
+            retry_after=2,
+            timeout=10,
+            **kwargs,
+        )
+
+    def test_default_pool_follows_max_concurrency(self):
+        limits = self._client(max_concurrency=7).client_options()["limits"]
+
+        assert limits.max_connections == 7
+        assert limits.max_keepalive_connections == 7
+        assert limits.keepalive_expiry == HTTP_KEEPALIVE_EXPIRY
+
+    def test_explicit_pool_limits(self):
+        limits = self._client(
+            max_connections=20, max_keepalive_connections=5
+        ).client_options()["limits"]
+
+        assert limits.max_connections == 20
+        assert limits.max_keepalive_connections == 5
+
+    def test_keepalive_disabled(self):
+        limits = self._client(keepalive=False).client_options()["limits"]
+
+        assert limits.max_keepalive_connections == 0
+
+    def test_clients_share_ssl_context(self):
+        client = self._client()
+        client.client = client.create_client(headers={"X-Auth": "token"})
+
+        async_client = client.create_async_client()
+
+        assert client.client_options()["verify"] is client.client_options()["verify"]
+        assert async_client.headers["X-Auth"] == "token"
+        assert client.client_options()["timeout"] == 10
+
+    def test_http2_falls_back_without_h2(self, caplog):
+        with patch("nac_collector.controller.base.HTTP2_AVAILABLE", False):
+            client = self._client(http2=True)
+
+        assert client.http2 is False
+        assert client.client_options()["http2"] is False
+        assert "h2 package" in caplog.text
+
+    def test_http2_enabled(self):
+        with patch("nac_collector.controller.base.HTTP2_AVAILABLE", True):
+            client = self._client(http2=True)
+
+        assert client.client_options()["http2"] is True
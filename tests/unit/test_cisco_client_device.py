@@ -5,7 +5,9 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from nac_collector.archive import Compression
 from nac_collector.device.base import CiscoClientDevice
+from nac_collector.metrics import DEVICE_METRICS_FILENAME
 
 pytestmark = pytest.mark.unit
 
@@ -170,11 +172,16 @@ class TestCollectWithErrorHandling:
             client_device._collect_with_error_handling(device)
 
 
+def _read_archive(path):
+    """Return {member name: parsed JSON} of a ZIP archive."""
+    with zipfile.ZipFile(path) as zip_file:
+        return {name: json.loads(zip_file.read(name)) for name in zip_file.namelist()}
+
+
 class TestCollectAndWriteToArchive:
-    @patch("zipfile.ZipFile")
     @patch("concurrent.futures.ThreadPoolExecutor")
     def test_successful_collection_all_devices(
-        self, mock_executor, mock_zipfile, client_device
+        self, mock_executor, client_device, tmp_path
     ):
         # Mock successful futures
         mock_future1 = MagicMock()
@@ -191,54 +198,42 @@ class TestCollectAndWriteToArchive:
             mock_future2,
             mock_future3,
         ]
+        output = tmp_path / "test_output.zip"
 
         # Mock as_completed to return futures in order
         with patch("concurrent.futures.as_completed") as mock_as_completed:
             mock_as_completed.return_value = [mock_future1, mock_future2, mock_future3]
 
-            # Mock zipfile
-            mock_zip_instance = mock_zipfile.return_value.__enter__.return_value
-
             # Run the method
-            client_device.collect_and_write_to_archive("test_output.zip")
-
-            # Verify zipfile was created correctly
-            mock_zipfile.assert_called_once_with(
-                "test_output.zip", "w", zipfile.ZIP_DEFLATED
+            client_device.collect_and_write_to_archive(str(output))
+
+        # Verify JSON files were written, deflated, in completion order
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.namelist() == [
+                "Device1.json",
+                "Device2.json",
+                "Device3.json",
+            ]
+            assert all(
+                info.compress_type == zipfile.ZIP_DEFLATED
+                for info in zip_file.infolist()
             )
+        members = _read_archive(output)
+
+        # First device - successful
+        assert members["Device1.json"]["device"] == "Device1"
+        assert members["Device1.json"]["config"] == "data1"
+
+        # Second device - successful
+        assert members["Device2.json"]["device"] == "Device2"
+        assert members["Device2.json"]["config"] == "data2"
+
+        # Third device - auth failure
+        assert "error" in members["Device3.json"]
+        assert "authentication or connection error" in members["Device3.json"]["error"]
 
-            # Verify JSON files were written
-            assert mock_zip_instance.writestr.call_count == 3
-
-            # Check the calls
-            calls = mock_zip_instance.writestr.call_args_list
-
-            # First device - successful
-            filename1, content1 = calls[0][0]
-            assert filename1 == "Device1.json"
-            data1 = json.loads(content1)
-            assert data1["device"] == "Device1"
-            assert data1["config"] == "data1"
-
-            # Second device - successful
-            filename2, content2 = calls[1][0]
-            assert filename2 == "Device2.json"
-            data2 = json.loads(content2)
-            assert data2["device"] == "Device2"
-            assert data2["config"] == "data2"
-
-            # Third device - auth failure
-            filename3, content3 = calls[2][0]
-            assert filename3 == "Device3.json"
-            data3 = json.loads(content3)
-            assert "error" in data3
-            assert "authentication or connection error" in data3["error"]
-
-    @patch("zipfile.ZipFile")
     @patch("concurrent.futures.ThreadPoolExecutor")
-    def test_collection_with_exceptions(
-        self, mock_executor, mock_zipfile, client_device
-    ):
+    def test_collection_with_exceptions(self, mock_executor, client_device, tmp_path):
         # Mock future that raises exception
         mock_future = MagicMock()
         mock_future.result.side_effect = Exception("Network timeout")
@@ -246,28 +241,23 @@ class TestCollectAndWriteToArchive:
         # Setup executor mock
         mock_executor_instance = mock_executor.return_value.__enter__.return_value
         mock_executor_instance.submit.return_value = mock_future
+        output = tmp_path / "test_output.zip"
 
         # Mock as_completed
         with patch("concurrent.futures.as_completed") as mock_as_completed:
             mock_as_completed.return_value = [mock_future]
 
-            # Mock zipfile
-            mock_zip_instance = mock_zipfile.return_value.__enter__.return_value
-
             # Run with single device to simplify test
             client_device.devices = [{"name": "ErrorDevice"}]
-            client_device.collect_and_write_to_archive("test_output.zip")
-
-            # Verify error was written to JSON
-            mock_zip_instance.writestr.assert_called_once()
-            filename, content = mock_zip_instance.writestr.call_args[0]
-            assert filename == "ErrorDevice.json"
+            client_device.collect_and_write_to_archive(str(output))
 
-            data = json.loads(content)
-            assert data["device"] == "ErrorDevice"
-            assert data["error"] == "Network timeout"
+        # Verify error was written to JSON
+        members = _read_archive(output)
+        assert list(members) == ["ErrorDevice.json"]
+        assert members["ErrorDevice.json"]["device"] == "ErrorDevice"
+        assert members["ErrorDevice.json"]["error"] == "Network timeout"
 
-    def test_empty_device_list(self):
+    def test_empty_device_list(self, tmp_path):
         client = ConcreteCiscoClientDevice(
             devices=[],
             default_username="user",
@@ -276,22 +266,16 @@ class TestCollectAndWriteToArchive:
             retry_after=1,
             timeout=30,
         )
+        output = tmp_path / "empty_output.zip"
 
-        with patch("zipfile.ZipFile") as mock_zipfile:
-            mock_zip_instance = mock_zipfile.return_value.__enter__.return_value
+        client.collect_and_write_to_archive(str(output))
 
-            client.collect_and_write_to_archive("empty_output.zip")
+        # Should create empty ZIP file
+        assert _read_archive(output) == {}
 
-            # Should create empty ZIP file
-            mock_zipfile.assert_called_once_with(
-                "empty_output.zip", "w", zipfile.ZIP_DEFLATED
-            )
-            mock_zip_instance.writestr.assert_not_called()
-
-    @patch("zipfile.ZipFile")
     @patch("concurrent.futures.ThreadPoolExecutor")
     def test_filename_sanitization_in_archive(
-        self, mock_executor, mock_zipfile, client_device
+        self, mock_executor, client_device, tmp_path
     ):
         # Mock successful future with device that has invalid filename characters
         mock_future = MagicMock()
@@ -300,27 +284,46 @@ class TestCollectAndWriteToArchive:
         # Setup executor mock
         mock_executor_instance = mock_executor.return_value.__enter__.return_value
         mock_executor_instance.submit.return_value = mock_future
+        output = tmp_path / "test_output.zip"
 
         # Mock as_completed
         with patch("concurrent.futures.as_completed") as mock_as_completed:
             mock_as_completed.return_value = [mock_future]
 
-            # Mock zipfile
-            mock_zip_instance = mock_zipfile.return_value.__enter__.return_value
-
             # Run with device that has invalid filename characters
             client_device.devices = [{"name": "Switch/Core:1"}]
-            client_device.collect_and_write_to_archive("test_output.zip")
+            client_device.collect_and_write_to_archive(str(output))
+
+        # Verify sanitized filename was used
+        members = _read_archive(output)
+        assert list(members) == ["Switch_Core_1.json"]  # Should be sanitized
+        assert (
+            members["Switch_Core_1.json"]["device"] == "Switch/Core:1"
+        )  # Original name preserved in content
+
+    def test_collection_with_lzma_compression(self, client_device, tmp_path):
+        output = tmp_path / "test_output.zip"
+        client_device.devices = [{"name": "Device1"}]
+
+        client_device.collect_and_write_to_archive(str(output), Compression.LZMA)
+
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.getinfo("Device1.json").compress_type == zipfile.ZIP_LZMA
+        assert _read_archive(output)["Device1.json"]["device"] == "Device1"
+
+    def test_metrics_do_not_replace_a_device_named_metrics(
+        self, client_device, tmp_path
+    ):
+        output = tmp_path / "test_output.zip"
+        client_device.devices = [{"name": "metrics"}]
+        client_device.metrics.record_request("ssh://metrics:22", 0.1, 200, 10)
 
-            # Verify sanitized filename was used
-            mock_zip_instance.writestr.assert_called_once()
-            filename, content = mock_zip_instance.writestr.call_args[0]
-            assert filename == "Switch_Core_1.json"  # Should be sanitized
+        client_device.collect_and_write_to_archive(str(output))
 
-            data = json.loads(content)
-            assert (
-                data["device"] == "Switch/Core:1"
-            )  # Original name preserved in content
+        members = _read_archive(output)
+        assert set(members) == {"metrics.json", DEVICE_METRICS_FILENAME}
+        assert members["metrics.json"]["device"] == "metrics"
+        assert members[DEVICE_METRICS_FILENAME]["endpoints"]
 
 
 class TestAbstractMethods:
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import httpx
@@ -83,13 +84,15 @@ class TestCollectViaRestconf:
         # Setup mock response with config data
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "Cisco-IOS-XE-native:native": {
-                "version": "17.3",
-                "hostname": "TestDevice",
-                "interface": {"GigabitEthernet": [{"name": "0/0/1"}]},
+        mock_response.content = json.dumps(
+            {
+                "Cisco-IOS-XE-native:native": {
+                    "version": "17.3",
+                    "hostname": "TestDevice",
+                    "interface": {"GigabitEthernet": [{"name": "0/0/1"}]},
+                }
             }
-        }
+        ).encode()
 
         # Setup mock client
         mock_client = MagicMock()
@@ -142,18 +145,43 @@ class TestCollectViaRestconf:
 
         device = {"name": "TestDevice", "target": "https://test.example.com"}
 
-        result = iosxe_client.collect_via_restconf(device)
+        with patch("time.sleep") as mock_sleep:
+            result = iosxe_client.collect_via_restconf(device)
 
         assert result is not None
         assert "error" in result
         assert "Collection failed - Request timeout" in result["error"]
+        # GET is idempotent: timeouts are retried up to max_retries attempts
+        assert mock_client.get.call_count == iosxe_client.max_retries
+        assert mock_sleep.call_count == iosxe_client.max_retries - 1
+
+    @patch("httpx.Client")
+    def test_collection_recovers_from_transient_error(
+        self, mock_client_class, iosxe_client
+    ):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = b'{"data": {}}'
+        mock_client = MagicMock()
+        mock_client.get.side_effect = [httpx.ConnectError("refused"), mock_response]
+        mock_client_class.return_value.__enter__.return_value = mock_client
+
+        device = {"name": "TestDevice", "target": "https://test.example.com"}
+
+        with patch("time.sleep"):
+            result = iosxe_client.collect_via_restconf(device)
+
+        assert result == {"data": {}}
+        label = "test.example.com/restconf/data/Cisco-IOS-XE-native:native"
+        endpoints = iosxe_client.metrics.snapshot()["endpoints"]
+        assert endpoints[label]["retries"] == {"connect": 1}
 
     @patch("httpx.Client")
     def test_uses_ssl_verify_setting(self, mock_client_class, iosxe_client):
         # Setup mock response
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"config": "data"}
+        mock_response.content = json.dumps({"config": "data"}).encode()
 
         # Setup mock client
         mock_client = MagicMock()
@@ -182,9 +210,9 @@ class TestIntegration:
 
         mock_collect_response = MagicMock()
         mock_collect_response.status_code = 200
-        mock_collect_response.json.return_value = {
-            "Cisco-IOS-XE-native:native": {"hostname": "Switch1"}
-        }
+        mock_collect_response.content = json.dumps(
+            {"Cisco-IOS-XE-native:native": {"hostname": "Switch1"}}
+        ).encode()
 
         # Setup mock client to return different responses for different URLs
         mock_client = MagicMock()
@@ -420,11 +448,15 @@ class TestCollectViaSSH:
 
         device = {"name": "TestDevice", "target": "switch1.example.com"}
 
-        result = iosxe_client.collect_via_ssh(device)
+        with patch("time.sleep") as mock_sleep:
+            result = iosxe_client.collect_via_ssh(device)
 
         assert result is not None
         assert "error" in result
         assert "SSH connection error" in result["error"]
+        # Transient connection errors are retried up to max_retries attempts
+        assert mock_ssh_client.connect.call_count == iosxe_client.max_retries
+        assert mock_sleep.call_count == iosxe_client.max_retries - 1
         mock_ssh_client.close.assert_called_once()
 
     def test_ssh_collection_invalid_target(self, iosxe_client):
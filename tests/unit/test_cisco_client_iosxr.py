@@ -265,11 +265,15 @@ class TestCollectViaSSH:
 
         device = {"name": "TestDevice", "target": "router1.example.com"}
 
-        result = iosxr_client.collect_via_ssh(device)
+        with patch("time.sleep") as mock_sleep:
+            result = iosxr_client.collect_via_ssh(device)
 
         assert result is not None
         assert "error" in result
         assert "SSH connection error" in result["error"]
+        # Transient connection errors are retried up to max_retries attempts
+        assert mock_ssh_client.connect.call_count == iosxr_client.max_retries
+        assert mock_sleep.call_count == iosxr_client.max_retries - 1
         mock_ssh_client.close.assert_called_once()
 
     def test_ssh_collection_invalid_target(self, iosxr_client):
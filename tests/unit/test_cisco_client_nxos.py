@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import httpx
@@ -145,6 +146,47 @@ class TestAuthenticateDevice:
         assert "TestDevice" not in nxos_client._authenticated_clients
         mock_client.close.assert_called_once()
 
+    @patch("httpx.Client")
+    def test_authenticate_device_does_not_retry_login_read_timeout(
+        self, mock_client_class, nxos_client
+    ):
+        # The login may have been processed: a POST that timed out is not sent again
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+        mock_client.post.side_effect = httpx.ReadTimeout("read timeout")
+
+        device = {"name": "TestDevice", "target": "https://switch.example.com"}
+
+        with patch("time.sleep") as mock_sleep:
+            result = nxos_client.authenticate_device(device)
+
+        assert result is False
+        mock_client.post.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    @patch("httpx.Client")
+    def test_authenticate_device_retries_login_connect_error(
+        self, mock_client_class, nxos_client
+    ):
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+        mock_auth_response = MagicMock()
+        mock_auth_response.status_code = 200
+        mock_auth_response.json.return_value = {"imdata": []}
+        mock_client.post.side_effect = [
+            httpx.ConnectError("refused"),
+            mock_auth_response,
+        ]
+
+        device = {"name": "TestDevice", "target": "https://switch.example.com"}
+
+        with patch("time.sleep") as mock_sleep:
+            result = nxos_client.authenticate_device(device)
+
+        assert result is True
+        assert mock_client.post.call_count == 2
+        mock_sleep.assert_called_once()
+
     @patch("httpx.Client")
     def test_authenticate_device_auto_adds_https(self, mock_client_class, nxos_client):
         # Setup mock HTTP client
@@ -190,7 +232,7 @@ class TestCollectViaRest:
                 {"topSystem": {"attributes": {"name": "switch1", "serial": "ABC123"}}}
             ]
         }
-        mock_config_response.json.return_value = config_data
+        mock_config_response.content = json.dumps(config_data).encode()
         mock_client.get.return_value = mock_config_response
 
         device = {
@@ -217,7 +259,7 @@ class TestCollectViaRest:
         # Setup mock configuration response
         mock_config_response = MagicMock()
         mock_config_response.status_code = 200
-        mock_config_response.json.return_value = {"imdata": []}
+        mock_config_response.content = json.dumps({"imdata": []}).encode()
         mock_client.get.return_value = mock_config_response
 
         device = {
@@ -270,7 +312,7 @@ class TestCollectViaRest:
         # Setup configuration response with invalid JSON
         mock_config_response = MagicMock()
         mock_config_response.status_code = 200
-        mock_config_response.json.side_effect = Exception("Invalid JSON")
+        mock_config_response.content = b"Invalid JSON"
         mock_config_response.text = "Invalid JSON response"
         mock_client.get.return_value = mock_config_response
 
@@ -307,6 +349,23 @@ class TestCollectViaRest:
         assert "error" in result
         assert "REST connection error" in result["error"]
 
+    def test_rest_collection_retries_read_timeout(self, nxos_client):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = b'{"imdata": [{"topSystem": {}}]}'
+        mock_client = MagicMock()
+        mock_client.get.side_effect = [httpx.ReadTimeout("read timeout"), mock_response]
+        nxos_client._authenticated_clients["TestDevice"] = mock_client
+
+        device = {"name": "TestDevice", "target": "https://switch1.example.com"}
+
+        with patch("time.sleep") as mock_sleep:
+            result = nxos_client.collect_via_rest(device)
+
+        assert result == {"topSystem": {}}
+        assert mock_client.get.call_count == 2
+        mock_sleep.assert_called_once()
+
 
 class TestCollectFromDevice:
     def test_collect_from_device_routes_to_rest(self, nxos_client):
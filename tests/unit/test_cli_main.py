@@ -5,7 +5,9 @@ from unittest.mock import MagicMock, patch
 import pytest
 import typer
 
+from nac_collector.archive import ArchiveLayout, Compression
 from nac_collector.cli.main import LogLevel, Solution, main
+from nac_collector.profiling import Profiler
 
 pytestmark = pytest.mark.unit
 
@@ -33,7 +35,7 @@ def sample_devices_yaml():
 
 
 class TestDeviceBasedSolutions:
-    @patch("nac_collector.cli.main.CiscoClientIOSXE")
+    @patch("nac_collector.device.iosxe.CiscoClientIOSXE")
     @patch("nac_collector.cli.main.load_devices_from_file")
     def test_iosxe_solution_with_devices_file(
         self, mock_load_devices, mock_iosxe_class, sample_devices_yaml
@@ -80,14 +82,16 @@ class TestDeviceBasedSolutions:
             retry_after=60,
             timeout=30,
             ssl_verify=False,
+            recording=None,
+            archive_workers=1,
         )
 
         # Verify collection was called with default output file
         mock_client.collect_and_write_to_archive.assert_called_once_with(
-            "nac-collector.zip"
+            "nac-collector.zip", Compression.DEFLATE
         )
 
-    @patch("nac_collector.cli.main.CiscoClientIOSXE")
+    @patch("nac_collector.device.iosxe.CiscoClientIOSXE")
     @patch("nac_collector.cli.main.load_devices_from_file")
     def test_iosxe_solution_with_custom_output(
         self, mock_load_devices, mock_iosxe_class, sample_devices_yaml
@@ -121,7 +125,7 @@ class TestDeviceBasedSolutions:
 
         # Verify collection was called with custom output file
         mock_client.collect_and_write_to_archive.assert_called_once_with(
-            "custom_output.zip"
+            "custom_output.zip", Compression.DEFLATE
         )
 
     @patch("nac_collector.cli.main.load_devices_from_file")
@@ -170,7 +174,7 @@ class TestDeviceBasedSolutions:
         assert exc_info.value.exit_code == 1
         mock_load_devices.assert_called_once_with(sample_devices_yaml)
 
-    @patch("nac_collector.cli.main.CiscoClientIOSXE")
+    @patch("nac_collector.device.iosxe.CiscoClientIOSXE")
     @patch("nac_collector.cli.main.load_devices_from_file")
     @patch("nac_collector.cli.main.console")
     def test_iosxe_solution_ignores_endpoints_file_with_warning(
@@ -210,7 +214,7 @@ class TestDeviceBasedSolutions:
         assert len(warning_calls) > 0
         assert "endpoints-file is ignored" in str(warning_calls[0])
 
-    @patch("nac_collector.cli.main.CiscoClientIOSXR")
+    @patch("nac_collector.device.iosxr.CiscoClientIOSXR")
     @patch("nac_collector.cli.main.load_devices_from_file")
     def test_iosxr_solution_with_devices_file(
         self, mock_load_devices, mock_iosxr_class, sample_devices_yaml
@@ -257,11 +261,13 @@ class TestDeviceBasedSolutions:
             retry_after=60,
             timeout=30,
             ssl_verify=False,
+            recording=None,
+            archive_workers=1,
         )
 
         # Verify collection was called with default output file
         mock_client.collect_and_write_to_archive.assert_called_once_with(
-            "nac-collector.zip"
+            "nac-collector.zip", Compression.DEFLATE
         )
 
     @patch("nac_collector.cli.main.load_devices_from_file")
@@ -287,7 +293,7 @@ class TestDeviceBasedSolutions:
 
 
 class TestControllerBasedSolutions:
-    @patch("nac_collector.cli.main.CiscoClientISE")
+    @patch("nac_collector.controller.ise.CiscoClientISE")
     @patch("nac_collector.cli.main.EndpointResolver.resolve_endpoint_data")
     def test_ise_solution_still_works(self, mock_resolver, mock_ise_class):
         # Setup mocks
@@ -335,13 +341,29 @@ class TestControllerBasedSolutions:
             retry_after=60,
             timeout=30,
             ssl_verify=False,
+            max_concurrency=10,
+            rate_limit=None,
+            cache_dir=None,
+            since=None,
+            http2=False,
+            keepalive=True,
+            max_connections=None,
+            max_keepalive_connections=None,
+            trace=False,
+            recording=None,
+            memory_budget=None,
+            archive_workers=1,
         )
 
         # Verify authentication and collection
         mock_client.authenticate.assert_called_once()
         mock_client.get_from_endpoints_data.assert_called_once_with(mock_endpoints_data)
         mock_client.write_to_archive.assert_called_once_with(
-            {"test": "data"}, "nac-collector.zip", "ise"
+            {"test": "data"},
+            "nac-collector.zip",
+            "ise",
+            ArchiveLayout.SINGLE,
+            Compression.DEFLATE,
         )
 
     @patch("nac_collector.cli.main.EndpointResolver.resolve_endpoint_data")
@@ -366,7 +388,7 @@ class TestControllerBasedSolutions:
 
         assert exc_info.value.exit_code == 1
 
-    @patch("nac_collector.cli.main.CiscoClientISE")
+    @patch("nac_collector.controller.ise.CiscoClientISE")
     @patch("nac_collector.cli.main.EndpointResolver.resolve_endpoint_data")
     def test_controller_solution_authentication_failure(
         self, mock_resolver, mock_ise_class
@@ -419,7 +441,80 @@ class TestSpecialCases:
 
         assert exc_info.value.exit_code == 1
 
-    @patch("nac_collector.cli.main.CiscoClientIOSXE")
+    @pytest.mark.parametrize(
+        "solution, options",
+        [
+            (Solution.ISE, {"record": "rec", "replay": "rec"}),
+            (Solution.ISE, {"replay": "missing-recording"}),
+            (Solution.MERAKI, {"record": "rec"}),
+        ],
+        ids=["record-and-replay", "replay-missing", "meraki"],
+    )
+    def test_record_replay_rejected(self, solution, options, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with pytest.raises(typer.Exit) as exc_info:
+            main(
+                solution=solution,
+                username="user",
+                password="pass",
+                url="https://controller.example.com",
+                **options,
+            )
+
+        assert exc_info.value.exit_code == 1
+        assert not (tmp_path / "rec").exists()
+
+    @patch("nac_collector.controller.ise.CiscoClientISE")
+    @patch("nac_collector.cli.main.EndpointResolver.resolve_endpoint_data")
+    def test_profile(self, mock_resolver, mock_ise_class, tmp_path):
+        mock_resolver.return_value = [{"name": "test", "endpoint": "/test"}]
+        mock_client = MagicMock()
+        mock_client.authenticate.return_value = True
+        mock_client.get_from_endpoints_data.return_value = {"test": "data"}
+        mock_ise_class.return_value = mock_client
+
+        with pytest.raises(typer.Exit) as exc_info:
+            main(
+                solution=Solution.ISE,
+                username="user",
+                password="pass",
+                url="https://ise-server.com",
+                output=str(tmp_path / "archive.zip"),
+                profile=True,
+            )
+
+        assert exc_info.value.exit_code == 0
+        (profiler,) = mock_client.tracer.add_listener.call_args.args
+        assert isinstance(profiler, Profiler)
+        assert (tmp_path / "ise-profile.folded").exists()
+        assert "Endpoint" in (tmp_path / "ise-profile.txt").read_text()
+
+    @patch("nac_collector.controller.ise.CiscoClientISE")
+    @patch("nac_collector.cli.main.EndpointResolver.resolve_endpoint_data")
+    def test_profile_written_when_collection_fails(
+        self, mock_resolver, mock_ise_class, tmp_path
+    ):
+        mock_resolver.return_value = [{"name": "test", "endpoint": "/test"}]
+        mock_client = MagicMock()
+        mock_client.authenticate.return_value = True
+        mock_client.get_from_endpoints_data.side_effect = RuntimeError("collection")
+        mock_ise_class.return_value = mock_client
+
+        with pytest.raises(RuntimeError):
+            main(
+                solution=Solution.ISE,
+                username="user",
+                password="pass",
+                url="https://ise-server.com",
+                output=str(tmp_path / "archive.zip"),
+                profile=True,
+            )
+
+        mock_client.close.assert_called_once()
+        assert (tmp_path / "ise-profile.folded").exists()
+        assert (tmp_path / "ise-profile.txt").exists()
+
+    @patch("nac_collector.device.iosxe.CiscoClientIOSXE")
     @patch("nac_collector.cli.main.load_devices_from_file")
     @patch("nac_collector.cli.main.time.time")
     @patch("nac_collector.cli.main.logger")
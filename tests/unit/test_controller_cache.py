@@ -0,0 +1,211 @@
+import os
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.cache import ResponseCache
+
+pytestmark = pytest.mark.unit
+
+URL = "https://controller.example.com/api/v1/devices"
+
+
+def _response(status_code=200, content=b'{"items": [1, 2]}', headers=None):
+    return httpx.Response(
+        status_code,
+        content=content,
+        headers=headers,
+        request=httpx.Request("GET", URL),
+    )
+
+
+class ConcreteCiscoClient(CiscoClientController):
+    def authenticate(self):
+        return True
+
+    def get_from_endpoints_data(self, endpoints_data):
+        return {}
+
+
+class ConditionalServer:
+    """Serves one body with an ETag and answers matching If-None-Match with 304."""
+
+    def __init__(self, body=b'{"items": [1, 2]}', etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(
+            200,
+            content=self.body,
+            headers={"ETag": self.etag, "Content-Type": "application/json"},
+        )
+
+
+class TestResponseCache:
+    def test_not_cached_url_has_no_validators(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+
+        assert cache.request_headers(URL) == {}
+
+    def test_stores_response_with_validators(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+
+        cache.resolve(
+            URL,
+            _response(
+                headers={
+                    "ETag": '"abc"',
+                    "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+                }
+            ),
+        )
+
+        assert cache.request_headers(URL) == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+        }
+        assert cache.snapshot()["stores"] == 1
+
+    @pytest.mark.parametrize(
+        "headers",
+        [{}, {"ETag": '"abc"', "Cache-Control": "no-store"}],
+    )
+    def test_uncacheable_responses_are_not_stored(self, tmp_path, headers):
+        cache = ResponseCache(str(tmp_path))
+
+        assert cache.store(URL, _response(headers=headers)) is False
+        assert cache.request_headers(URL) == {}
+
+    def test_not_modified_is_served_from_cache(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        cache.resolve(URL, _response(headers={"ETag": '"abc"'}))
+
+        response = cache.resolve(URL, _response(304, b"", {"ETag": '"abc"'}))
+
+        assert response.status_code == 200
+        assert response.json() == {"items": [1, 2]}
+        assert cache.snapshot()["hits"] == 1
+        assert cache.snapshot()["bytes_saved"] == len(b'{"items": [1, 2]}')
+
+    def test_corrupt_body_is_dropped(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        cache.resolve(URL, _response(headers={"ETag": '"abc"'}))
+        with open(tmp_path / f"{cache.key(URL)}.body", "wb") as f:
+            f.write(b"tampered")
+
+        assert cache.resolve(URL, _response(304, b"")) is None
+        assert cache.request_headers(URL) == {}
+        assert os.listdir(tmp_path) == []
+
+    def test_scope_separates_keys(self, tmp_path):
+        first = ResponseCache(str(tmp_path), scope="admin@https://a")
+        second = ResponseCache(str(tmp_path), scope="admin@https://b")
+
+        first.resolve(URL, _response(headers={"ETag": '"abc"'}))
+
+        assert second.request_headers(URL) == {}
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        # Room for three entries of about 380 bytes (body and metadata)
+        cache = ResponseCache(str(tmp_path), max_size=1300)
+        body = b"x" * 200
+        for name in ("a", "b", "c"):
+            cache.resolve(
+                f"{URL}/{name}", _response(content=body, headers={"ETag": name})
+            )
+        # Serving "a" makes "b" the least recently used entry
+        cache.resolve(f"{URL}/a", _response(304, b""))
+
+        cache.resolve(f"{URL}/d", _response(content=body, headers={"ETag": "d"}))
+
+        assert cache.request_headers(f"{URL}/b") == {}
+        assert cache.request_headers(f"{URL}/a") == {"If-None-Match": "a"}
+        assert cache.snapshot()["evictions"] == 1
+        assert cache.snapshot()["size"] <= 1300
+
+    def test_index_is_reloaded_from_disk(self, tmp_path):
+        ResponseCache(str(tmp_path)).resolve(URL, _response(headers={"ETag": '"abc"'}))
+
+        cache = ResponseCache(str(tmp_path))
+
+        assert cache.request_headers(URL) == {"If-None-Match": '"abc"'}
+        assert cache.snapshot()["entries"] == 1
+
+
+class TestControllerCache:
+    def _client(self, tmp_path, handler):
+        client = ConcreteCiscoClient(
+            username="admin",
+            password="secret",
+            base_url="https://controller.example.com",
+            max_retries=3,
+            retry_after=1,
+            timeout=5,
+            cache_dir=str(tmp_path),
+        )
+        client.client = httpx.Client(transport=httpx.MockTransport(handler))
+        return client
+
+    def test_cache_disabled_by_default(self):
+        client = ConcreteCiscoClient(
+            username="admin",
+            password="secret",
+            base_url="https://controller.example.com",
+            max_retries=3,
+            retry_after=1,
+            timeout=5,
+        )
+
+        assert client.cache is None
+        assert client.cache_stats() is None
+
+    def test_get_request_revalidates_across_runs(self, tmp_path):
+        server = ConditionalServer()
+
+        first = self._client(tmp_path, server)
+        assert first.get_request(URL).json() == {"items": [1, 2]}
+
+        second = self._client(tmp_path, server)
+        response = second.get_request(URL)
+
+        assert response.status_code == 200
+        assert response.json() == {"items": [1, 2]}
+        assert server.requests[1].headers["If-None-Match"] == '"v1"'
+        assert second.cache_stats()["hits"] == 1
+
+    def test_lost_entry_is_fetched_again(self, tmp_path):
+        server = ConditionalServer()
+        client = self._client(tmp_path, server)
+        client.get_request(URL)
+        os.remove(tmp_path / f"{client.cache.key(URL)}.body")
+
+        response = client.get_request(URL)
+
+        assert response.json() == {"items": [1, 2]}
+        assert "If-None-Match" not in server.requests[-1].headers
+        assert len(server.requests) == 3
+
+    def test_async_get_request_revalidates(self, tmp_path):
+        server = ConditionalServer()
+        client = self._client(tmp_path, server)
+        client.get_request(URL)
+
+        with patch.object(
+            client,
+            "create_async_client",
+            side_effect=lambda: httpx.AsyncClient(
+                transport=httpx.MockTransport(server)
+            ),
+        ):
+            response = client.run_async(lambda: client.async_get_request(URL))
+
+        assert response.status_code == 200
+        assert response.json() == {"items": [1, 2]}
+        assert server.requests[-1].headers["If-None-Match"] == '"v1"'
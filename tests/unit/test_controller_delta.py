@@ -0,0 +1,424 @@
+import zipfile
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from nac_collector.archive import ArchiveLayout
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.delta import (
+    DELTA_FILENAME,
+    DeltaTracker,
+    PreviousArchive,
+    change_marker,
+    item_digest,
+    item_key,
+)
+from nac_collector.controller.fmc import CiscoClientFMC
+from nac_collector.controller.ise import CiscoClientISE
+from nac_collector.controller.sdwan import CiscoClientSDWAN
+from nac_collector.metrics import METRICS_FILENAME
+
+pytestmark = pytest.mark.unit
+
+CLIENT_KWARGS = {
+    "username": "admin",
+    "password": "secret",
+    "base_url": "https://controller.example.com",
+    "max_retries": 3,
+    "retry_after": 1,
+    "timeout": 5,
+}
+
+
+class ConcreteCiscoClient(CiscoClientController):
+    def authenticate(self):
+        return True
+
+    def get_from_endpoints_data(self, endpoints_data):
+        return {}
+
+
+def _item(endpoint, data, children=None):
+    item = {"data": data, "endpoint": endpoint}
+    if children is not None:
+        item["children"] = children
+    return item
+
+
+def _previous_archive(tmp_path, final_dict, layout=ArchiveLayout.SINGLE):
+    path = str(tmp_path / "previous.zip")
+    ConcreteCiscoClient(**CLIENT_KWARGS).write_to_archive(
+        dict(final_dict), path, "fmc", layout
+    )
+    return path
+
+
+class TestChangeMarker:
+    def test_top_level_timestamp(self):
+        assert change_marker({"lastUpdatedOn": 1700000000}) == change_marker(
+            {"lastUpdatedOn": 1700000000, "name": "other"}
+        )
+        assert change_marker({"lastUpdatedOn": 1}) != change_marker(
+            {"lastUpdatedOn": 2}
+        )
+
+    def test_fmc_metadata(self):
+        data = {"metadata": {"timestamp": 1, "lastUser": {"name": "admin"}}}
+        other_user = {"metadata": {"timestamp": 1, "lastUser": {"name": "ops"}}}
+
+        assert change_marker(data) is not None
+        assert change_marker(data) != change_marker(other_user)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"name": "no marker"},
+            {"metadata": {"lastUser": {"name": "admin"}}},
+            ["not", "an", "object"],
+            None,
+        ],
+    )
+    def test_no_marker(self, data):
+        assert change_marker(data) is None
+
+
+class TestItemKey:
+    def test_qualified_by_id(self):
+        assert item_key(_item("/api/objects", {"id": "1", "name": "a"})) == (
+            "/api/objects#1"
+        )
+
+    def test_endpoint_only_without_id(self):
+        assert item_key(_item("/api/settings", {"enabled": True})) == "/api/settings"
+
+
+class TestPreviousArchive:
+    FINAL_DICT = {
+        "hosts": [_item("/hosts/1", {"id": "1"})],
+        "networks": [_item("/networks/2", {"id": "2"})],
+    }
+
+    @pytest.mark.parametrize("layout", list(ArchiveLayout))
+    def test_both_layouts(self, tmp_path, layout):
+        path = _previous_archive(tmp_path, self.FINAL_DICT, layout)
+
+        archive = PreviousArchive(path)
+
+        assert archive.items == {
+            "hosts": {"/hosts/1#1": (None, item_digest(self.FINAL_DICT["hosts"][0]))},
+            "networks": {
+                "/networks/2#2": (None, item_digest(self.FINAL_DICT["networks"][0]))
+            },
+        }
+        assert archive.load("hosts") == self.FINAL_DICT["hosts"]
+        assert archive.load("networks") == self.FINAL_DICT["networks"]
+        assert archive.load("missing") is None
+        assert archive.delta is None
+
+    @pytest.mark.parametrize("layout", list(ArchiveLayout))
+    def test_delta_run_adds_summary(self, tmp_path, layout):
+        first = _previous_archive(tmp_path, self.FINAL_DICT)
+        output = str(tmp_path / "next.zip")
+        final_dict = {
+            "hosts": [_item("/hosts/1", {"id": "1"}), _item("/hosts/3", {"id": "3"})],
+        }
+
+        ConcreteCiscoClient(**CLIENT_KWARGS, since=first).write_to_archive(
+            final_dict, output, "fmc", layout
+        )
+
+        archive = PreviousArchive(output)
+        assert archive.load("hosts") == [
+            _item("/hosts/1", {"id": "1"}),
+            _item("/hosts/3", {"id": "3"}),
+        ]
+        delta = archive.delta
+        assert delta["since"] == first
+        assert delta["totals"]["added"] == 1
+        assert delta["totals"]["removed"] == 1
+        assert delta["endpoints"]["networks"]["removed"] == ["/networks/2#2"]
+        with zipfile.ZipFile(output) as zip_file:
+            assert DELTA_FILENAME in zip_file.namelist()
+
+    @pytest.mark.parametrize("layout", list(ArchiveLayout))
+    def test_metrics_member_is_not_an_endpoint(self, tmp_path, layout):
+        path = str(tmp_path / "previous.zip")
+        client = ConcreteCiscoClient(**CLIENT_KWARGS)
+        client.metrics.record_request("/hosts", 0.1, 200, 10)
+        client.write_to_archive(dict(self.FINAL_DICT), path, "fmc", layout)
+        with zipfile.ZipFile(path) as zip_file:
+            assert METRICS_FILENAME in zip_file.namelist()
+
+        archive = PreviousArchive(path)
+
+        assert set(archive.items) == {"hosts", "networks"}
+        assert archive.load("endpoints") is None
+
+    def test_no_summary_without_since(self, tmp_path):
+        path = _previous_archive(tmp_path, self.FINAL_DICT)
+
+        with zipfile.ZipFile(path) as zip_file:
+            assert DELTA_FILENAME not in zip_file.namelist()
+
+
+class TestDeltaTracker:
+    def test_lookup_falls_back_on_item_marker(self):
+        previous = _item("/hosts/1", {"id": "1", "lastUpdated": 5}, {"ports": []})
+        tracker = DeltaTracker({"hosts": [previous]})
+
+        assert tracker.lookup("hosts", "/hosts/1#1", change_marker({"lastUpdated": 5}))
+        assert (
+            tracker.lookup("hosts", "/hosts/1#1", change_marker({"lastUpdated": 6}))
+            is None
+        )
+        assert tracker.lookup("hosts", "/hosts/1#1", None) is None
+        assert tracker.reused == 1
+
+    def test_lookup_uses_index(self):
+        previous = _item("/templates/1", {"templateId": "1"})
+        marker = change_marker({"lastUpdatedOn": 5})
+        index = {
+            "templates": {
+                "/list/1": {"marker": marker, "items": ["/templates/1#1"]},
+            }
+        }
+        tracker = DeltaTracker({"templates": [previous]}, {"index": index})
+
+        assert tracker.lookup("templates", "/list/1", marker) == [previous]
+        assert tracker.lookup("templates", "/list/2", marker) is None
+
+    def test_lookup_needs_every_indexed_item(self):
+        marker = change_marker({"lastUpdatedOn": 5})
+        index = {"templates": {"/list/1": {"marker": marker, "items": ["/gone"]}}}
+        tracker = DeltaTracker({"templates": []}, {"index": index})
+
+        assert tracker.lookup("templates", "/list/1", marker) is None
+
+    def test_from_archive_reads_only_reused_endpoints(self, tmp_path):
+        path = _previous_archive(
+            tmp_path,
+            {
+                "hosts": [_item("/hosts/1", {"id": "1", "lastUpdated": 5})],
+                "networks": [_item("/networks/2", {"id": "2"})],
+            },
+        )
+
+        with patch.object(
+            PreviousArchive, "load", autospec=True, side_effect=PreviousArchive.load
+        ) as mock_load:
+            tracker = DeltaTracker.from_archive(path)
+            mock_load.assert_not_called()
+
+            marker = change_marker({"lastUpdated": 5})
+            assert tracker.lookup("hosts", "/hosts/1#1", marker)
+            assert tracker.lookup("hosts", "/hosts/1#1", marker)
+
+        assert [call.args[1] for call in mock_load.call_args_list] == ["hosts"]
+
+    def test_summary(self):
+        tracker = DeltaTracker(
+            {
+                "hosts": [
+                    _item("/hosts/1", {"id": "1", "v": 1}),
+                    _item("/hosts/2", {"id": "2", "v": 1}),
+                    _item("/hosts/3", {"id": "3", "v": 1}),
+                ]
+            }
+        )
+        tracker.record("hosts", "/hosts/1#1", "m1", [_item("/hosts/1", {"id": "1"})])
+
+        summary = tracker.summary(
+            {
+                "hosts": [
+                    _item("/hosts/1", {"id": "1", "v": 1}),
+                    _item("/hosts/2", {"id": "2", "v": 2}),
+                    _item("/hosts/4", {"id": "4", "v": 1}),
+                ]
+            }
+        )
+
+        assert summary["totals"] == {
+            "added": 1,
+            "changed": 1,
+            "removed": 1,
+            "unchanged": 1,
+            "reused": 0,
+        }
+        assert summary["endpoints"]["hosts"] == {
+            "added": ["/hosts/4#4"],
+            "changed": ["/hosts/2#2"],
+            "removed": ["/hosts/3#3"],
+        }
+        assert summary["index"] == {
+            "hosts": {"/hosts/1#1": {"marker": "m1", "items": ["/hosts/1#1"]}}
+        }
+
+
+class TestFMCChildren:
+    ENDPOINT = {
+        "name": "access_policy",
+        "endpoint": "/policy/accesspolicies",
+        "children": [{"name": "access_rule", "endpoint": "/accessrules"}],
+    }
+
+    def _parent(self, id_, timestamp, children=None):
+        return _item(
+            f"/policy/accesspolicies/{id_}",
+            {"id": id_, "metadata": {"timestamp": timestamp}},
+            children,
+        )
+
+    def test_unchanged_parents_keep_previous_children(self, tmp_path):
+        rules = {"access_rule": [_item("/rules/r1", {"id": "r1"})]}
+        path = _previous_archive(
+            tmp_path,
+            {
+                "access_policy": [
+                    self._parent("p1", 1, rules),
+                    self._parent("p2", 1, rules),
+                ]
+            },
+        )
+        client = CiscoClientFMC(**CLIENT_KWARGS, ssl_verify=False, since=path)
+        endpoint_dict = {
+            "access_policy": [self._parent("p1", 1), self._parent("p2", 2)]
+        }
+
+        with patch.object(
+            client, "fetch_many", return_value=[{"items": []}]
+        ) as mock_fetch:
+            client.process_children(self.ENDPOINT, endpoint_dict)
+
+        mock_fetch.assert_called_once_with(["/policy/accesspolicies/p2/accessrules"])
+        assert endpoint_dict["access_policy"][0]["children"] == rules
+        assert endpoint_dict["access_policy"][1]["children"] == {"access_rule": []}
+        assert client.delta.reused == 1
+
+    def test_without_since_every_parent_is_fetched(self):
+        client = CiscoClientFMC(**CLIENT_KWARGS, ssl_verify=False)
+        endpoint_dict = {"access_policy": [self._parent("p1", 1)]}
+
+        with patch.object(
+            client, "fetch_many", return_value=[{"items": []}]
+        ) as mock_fetch:
+            client.process_children(self.ENDPOINT, endpoint_dict)
+
+        mock_fetch.assert_called_once_with(["/policy/accesspolicies/p1/accessrules"])
+
+
+class TestSDWANFeatureTemplates:
+    ENDPOINT = {
+        "name": "cisco_system",
+        "endpoint": "/template/feature/object/%i",
+    }
+
+    def _client(self, since=None):
+        return CiscoClientSDWAN(**CLIENT_KWARGS, ssl_verify=False, since=since)
+
+    def _response(self, body):
+        return httpx.Response(200, json=body)
+
+    def _collect(self, client, summaries, details):
+        listing = self._response({"data": summaries})
+        with (
+            patch.object(client, "get_request", return_value=listing),
+            patch.object(
+                client,
+                "get_many",
+                side_effect=lambda urls: [
+                    self._response(details[url.rsplit("/", 1)[1]]) for url in urls
+                ],
+            ) as mock_get_many,
+            patch.object(client, "log_response"),
+        ):
+            endpoint_dict = client.get_feature_templates(
+                self.ENDPOINT, {"cisco_system": []}
+            )
+        return endpoint_dict, mock_get_many
+
+    def test_second_delta_run_reuses_unchanged_templates(self, tmp_path):
+        summaries = [
+            {"templateId": "t1", "lastUpdatedOn": 1},
+            {"templateId": "t2", "lastUpdatedOn": 1},
+        ]
+        details = {
+            "t1": {"templateId": "t1", "templateName": "one"},
+            "t2": {"templateId": "t2", "templateName": "two"},
+        }
+        first, _ = self._collect(self._client(), summaries, details)
+        full = _previous_archive(tmp_path, first)
+
+        # The first incremental run builds the index of listed templates
+        client = self._client(since=full)
+        indexed, mock_get_many = self._collect(client, summaries, details)
+        assert len(mock_get_many.call_args.args[0]) == 2
+        delta_path = str(tmp_path / "delta.zip")
+        client.write_to_archive(dict(indexed), delta_path, "sdwan")
+
+        summaries[1] = {"templateId": "t2", "lastUpdatedOn": 2}
+        details["t2"] = {"templateId": "t2", "templateName": "two, edited"}
+        client = self._client(since=delta_path)
+        endpoint_dict, mock_get_many = self._collect(client, summaries, details)
+
+        mock_get_many.assert_called_once_with(
+            ["https://controller.example.com/template/feature/object/t2"]
+        )
+        assert [item["data"] for item in endpoint_dict["cisco_system"]] == [
+            details["t1"],
+            details["t2"],
+        ]
+        summary = client.delta.summary(endpoint_dict)
+        assert summary["endpoints"]["cisco_system"]["changed"] == [
+            "/template/feature/object/t2#t2"
+        ]
+        assert summary["totals"]["reused"] == 1
+
+
+class TestISEERSDetails:
+    ENDPOINT = {"name": "network_device", "endpoint": "/ers/config/networkdevice"}
+
+    def _client(self, since=None):
+        return CiscoClientISE(**CLIENT_KWARGS, ssl_verify=False, since=since)
+
+    def _collect(self, client, resources, details):
+        listing = {"SearchResult": {"resources": resources}}
+        with patch.object(
+            client,
+            "get_many",
+            side_effect=lambda urls: [
+                httpx.Response(200, json={"NetworkDevice": details[url[-2:]]})
+                for url in urls
+            ],
+        ) as mock_get_many:
+            endpoint_dict = client.process_endpoint_data(
+                self.ENDPOINT, {"network_device": []}, listing
+            )
+        return endpoint_dict, mock_get_many
+
+    def test_second_delta_run_reuses_unchanged_details(self, tmp_path):
+        base = "https://controller.example.com/ers/config/networkdevice/"
+        resources = [
+            {"id": "d1", "lastUpdated": 1, "link": {"href": base + "d1"}},
+            {"id": "d2", "lastUpdated": 1, "link": {"href": base + "d2"}},
+        ]
+        details = {"d1": {"id": "d1", "name": "one"}, "d2": {"id": "d2", "name": "two"}}
+        first, _ = self._collect(self._client(), resources, details)
+        full = _previous_archive(tmp_path, first)
+
+        client = self._client(since=full)
+        indexed, _ = self._collect(client, resources, details)
+        delta_path = str(tmp_path / "delta.zip")
+        client.write_to_archive(dict(indexed), delta_path, "ise")
+
+        resources[1] = {"id": "d2", "lastUpdated": 2, "link": {"href": base + "d2"}}
+        details["d2"] = {"id": "d2", "name": "two, edited"}
+        client = self._client(since=delta_path)
+        endpoint_dict, mock_get_many = self._collect(client, resources, details)
+
+        mock_get_many.assert_called_once_with([base + "d2"])
+        assert endpoint_dict["network_device"] == [
+            {"data": details["d1"], "endpoint": "/ers/config/networkdevice/d1"},
+            {"data": details["d2"], "endpoint": "/ers/config/networkdevice/d2"},
+        ]
+        assert client.delta.reused == 1
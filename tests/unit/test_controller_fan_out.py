@@ -0,0 +1,169 @@
+from unittest.mock import patch
+
+import pytest
+
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.catalystcenter import CiscoClientCATALYSTCENTER
+from nac_collector.controller.fmc import CiscoClientFMC
+
+pytestmark = pytest.mark.unit
+
+CLIENT_KWARGS = {
+    "username": "admin",
+    "password": "secret",
+    "base_url": "https://controller.example.com",
+    "max_retries": 3,
+    "retry_after": 1,
+    "timeout": 5,
+    "ssl_verify": False,
+}
+
+
+class ConcreteCiscoClient(CiscoClientController):
+    def authenticate(self):
+        return True
+
+    def get_from_endpoints_data(self, endpoints_data):
+        return {}
+
+
+def _entry(id_):
+    return {"data": {"id": id_}, "endpoint": "/parents"}
+
+
+class TestFanOutChildren:
+    def test_index_entries(self):
+        entries = [_entry("a"), _entry("b"), _entry("a"), {"data": {}}]
+
+        index = CiscoClientController.index_entries(
+            entries, lambda entry: entry["data"].get("id")
+        )
+
+        assert index == {"a": [entries[0], entries[2]], "b": [entries[1]]}
+
+    def test_children_attached_to_every_matching_parent(self):
+        client = ConcreteCiscoClient(**CLIENT_KWARGS)
+        entries = [_entry("a"), _entry("b"), _entry("a")]
+        index = client.index_entries(entries, lambda entry: entry["data"]["id"])
+
+        with patch.object(
+            client, "fetch_many", return_value=[{"items": [1]}, {"items": [2]}]
+        ) as mock_fetch:
+            attached = client.fan_out_children(
+                index,
+                ["a", "b"],
+                {"name": "rules"},
+                ["/parents/a/rules", "/parents/b/rules"],
+                lambda children_endpoint, parent_id, data: [parent_id, *data["items"]],
+            )
+
+        mock_fetch.assert_called_once_with(["/parents/a/rules", "/parents/b/rules"])
+        assert [entry["children"]["rules"] for entry in entries] == [
+            ["a", 1],
+            ["b", 2],
+            ["a", 1],
+        ]
+        assert attached == [
+            (entries[0], "/parents/a/rules"),
+            (entries[2], "/parents/a/rules"),
+            (entries[1], "/parents/b/rules"),
+        ]
+
+    def test_paginated(self):
+        client = ConcreteCiscoClient(**CLIENT_KWARGS)
+
+        with patch.object(client, "fetch_many", return_value=[None]) as mock_fetch:
+            client.fan_out_children(
+                {}, ["a"], {"name": "rules"}, ["/a"], lambda *args: [], paginated=True
+            )
+
+        mock_fetch.assert_called_once_with(["/a"], paginated=True)
+
+
+class TestFMCChildren:
+    ENDPOINT = {
+        "name": "access_policy",
+        "endpoint": "/policy/accesspolicies",
+        "children": [
+            {
+                "name": "access_rule",
+                "endpoint": "/accessrules",
+                "children": [{"name": "comment", "endpoint": "/comments"}],
+            }
+        ],
+    }
+
+    def test_nested_children_use_the_full_path(self):
+        client = CiscoClientFMC(**CLIENT_KWARGS)
+        endpoint_dict = {"access_policy": [_entry("p1"), _entry("p2")]}
+        responses = {
+            "/policy/accesspolicies/p1/accessrules": {"items": [{"id": "r1"}]},
+            "/policy/accesspolicies/p2/accessrules": {"items": []},
+            "/policy/accesspolicies/p1/accessrules/r1/comments": {
+                "items": [{"id": "c1"}]
+            },
+        }
+
+        with patch.object(
+            client,
+            "fetch_many",
+            side_effect=lambda urls: [responses[url] for url in urls],
+        ):
+            client.process_children(self.ENDPOINT, endpoint_dict)
+
+        p1, p2 = endpoint_dict["access_policy"]
+        rule = p1["children"]["access_rule"][0]
+        assert rule["data"]["id"] == "r1"
+        assert rule["children"]["comment"][0]["data"] == {"id": "c1"}
+        assert p2["children"]["access_rule"] == []
+
+
+class TestCatalystCenterChildren:
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        return CiscoClientCATALYSTCENTER(**CLIENT_KWARGS)
+
+    def _process(self, client, endpoint, data):
+        with (
+            patch.object(client, "fetch_data_pagination", return_value=data),
+            patch.object(
+                client,
+                "fetch_many",
+                return_value=[{"response": {"a": 1}}, {"response": {"a": 2}}],
+            ) as mock_fetch,
+        ):
+            endpoint_dict = client.process_endpoint(endpoint)
+        return endpoint_dict[endpoint["name"]], mock_fetch
+
+    def test_children_attached_by_id(self, client):
+        endpoint = {
+            "name": "credentials_cli",
+            "endpoint": "/credentials",
+            "children": [{"name": "settings", "endpoint": "/settings"}],
+        }
+        data = {"response": {"cliCredential": [{"id": "c1"}, {"id": "c2"}]}}
+
+        entries, mock_fetch = self._process(client, endpoint, data)
+
+        mock_fetch.assert_called_once_with(
+            ["/credentials/c1/settings", "/credentials/c2/settings"], paginated=True
+        )
+        assert [entry["children"]["settings"][0]["id"] for entry in entries] == [
+            "c1",
+            "c2",
+        ]
+
+    def test_list_entries_collect_every_parent(self, client):
+        endpoint = {
+            "name": "site",
+            "endpoint": "/site",
+            "children": [{"name": "settings", "endpoint": "/settings"}],
+        }
+        data = {"response": [{"id": "s1", "name": "Global"}, {"id": "s2"}]}
+
+        entries, _ = self._process(client, endpoint, data)
+
+        # The whole response is one entry holding every parent
+        children = entries[0]["children"]["settings"]
+        assert [child[0]["id"] for child in children] == ["s1", "s2"]
@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from nac_collector.controller.limiter import AdaptiveConcurrencyLimiter, TokenBucket
+
+pytestmark = pytest.mark.unit
+
+
+def _complete(
+    limiter, count, latency=0.1, status_code=200, timed_out=False, endpoint=""
+):
+    """Run `count` acquire/release cycles against the limiter."""
+
+    async def run():
+        for _ in range(count):
+            await limiter.acquire()
+            limiter.release(latency, status_code, timed_out, endpoint)
+
+    asyncio.run(run())
+
+
+class TestAdaptiveConcurrencyLimiter:
+    def test_initial_window_is_clamped(self):
+        assert AdaptiveConcurrencyLimiter(max_limit=10).window == 4
+        assert AdaptiveConcurrencyLimiter(max_limit=2).window == 2
+        assert AdaptiveConcurrencyLimiter(max_limit=0).window == 1
+
+    def test_window_grows_while_latency_is_flat(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10)
+
+        _complete(limiter, 50)
+
+        assert limiter.window > 4
+        assert limiter.successes == 50
+        assert limiter.decreases == 0
+
+    def test_window_never_exceeds_max_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=6)
+
+        _complete(limiter, 500)
+
+        assert limiter.window == 6
+
+    @pytest.mark.parametrize("status_code", [429, 503])
+    def test_overload_status_cuts_window(self, status_code):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=8)
+        _complete(limiter, 8)
+        window = limiter.window
+
+        _complete(limiter, 1, status_code=status_code)
+
+        assert limiter.window == window // 2
+        assert limiter.overloads == 1
+        assert limiter.decreases == 1
+
+    def test_timeout_cuts_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=8)
+        _complete(limiter, 8)
+
+        _complete(limiter, 1, latency=None, timed_out=True)
+
+        assert limiter.window < 8
+        assert limiter.overloads == 1
+
+    def test_burst_of_overloads_cuts_once_per_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=8)
+        _complete(limiter, 8)
+
+        _complete(limiter, 3, status_code=429)
+
+        assert limiter.window == 4
+        assert limiter.decreases == 1
+        assert limiter.overloads == 3
+
+    def test_window_never_drops_below_min_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=2)
+
+        _complete(limiter, 20, status_code=429)
+
+        assert limiter.window == 1
+
+    def test_rising_latency_cuts_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=8)
+        _complete(limiter, 8, latency=0.1)
+
+        _complete(limiter, 20, latency=1.0)
+
+        assert limiter.latency_backoffs >= 1
+        assert limiter.window < 8
+
+    def test_slow_endpoint_is_not_compared_with_a_fast_one(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10)
+        _complete(limiter, 20, latency=0.01, endpoint="/fast")
+        grown = limiter.window
+
+        # Steadily ten times slower than /fast, interleaved with it
+        for _ in range(10):
+            _complete(limiter, 5, latency=0.1, endpoint="/slow")
+            _complete(limiter, 5, latency=0.01, endpoint="/fast")
+
+        assert limiter.latency_backoffs == 0
+        assert limiter.window > grown
+        assert limiter.baseline_latency == {"/fast": 0.01, "/slow": 0.1}
+
+    def test_rising_latency_of_one_endpoint_cuts_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=8)
+        _complete(limiter, 8, latency=0.01, endpoint="/fast")
+        _complete(limiter, 8, latency=0.1, endpoint="/slow")
+
+        _complete(limiter, 20, latency=1.0, endpoint="/slow")
+
+        assert limiter.latency_backoffs >= 1
+        assert limiter.window < 8
+
+    def test_failed_request_does_not_change_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10)
+
+        _complete(limiter, 5, latency=None, status_code=None)
+
+        assert limiter.window == 4
+        assert limiter.successes == 0
+        assert limiter.in_flight == 0
+
+    def test_in_flight_bounded_by_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=3)
+        active = 0
+        peak = 0
+
+        async def task():
+            nonlocal active, peak
+            await limiter.acquire()
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            limiter.release()
+
+        async def run():
+            await asyncio.gather(*(task() for _ in range(12)))
+
+        asyncio.run(run())
+
+        assert peak == 3
+        assert limiter.requests == 12
+        assert limiter.in_flight == 0
+
+    def test_blocking_acquire_bounds_threads_by_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=3)
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def task():
+            nonlocal active, peak
+            limiter.acquire_blocking()
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            limiter.release()
+
+        threads = [threading.Thread(target=task) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak == 3
+        assert limiter.requests == 12
+        assert limiter.in_flight == 0
+
+    def test_snapshot(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=10)
+        _complete(limiter, 2, latency=0.05)
+
+        snapshot = limiter.snapshot()
+
+        assert snapshot["window"] == limiter.window
+        assert snapshot["max_limit"] == 10
+        assert snapshot["min_limit"] == 1
+        assert snapshot["requests"] == 2
+        assert snapshot["successes"] == 2
+        assert snapshot["overloads"] == 0
+        assert snapshot["in_flight"] == 0
+        assert snapshot["baseline_latency_ms"] == {"": 50.0}
+
+
+class TestTokenBucket:
+    def test_rate_must_be_positive(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_burst_up_to_capacity_without_waiting(self):
+        bucket = TokenBucket(rate=5, capacity=5)
+
+        with patch("time.sleep") as mock_sleep:
+            delays = [bucket.acquire() for _ in range(5)]
+
+        assert delays == [0.0] * 5
+        mock_sleep.assert_not_called()
+
+    def test_requests_are_evenly_spaced_by_default(self):
+        with patch("time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=5)
+            delays = [bucket.reserve() for _ in range(3)]
+
+        assert bucket.capacity == 1.0
+        assert delays == pytest.approx([0.0, 0.2, 0.4])
+
+    def test_requests_beyond_capacity_are_paced(self):
+        with patch("time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, capacity=1)
+            delays = [bucket.reserve() for _ in range(3)]
+
+        assert delays == [0.0, 0.5, 1.0]
+        snapshot = bucket.snapshot()
+        assert snapshot["requests"] == 3
+        assert snapshot["delayed"] == 2
+        assert snapshot["total_wait_s"] == 1.5
+
+    def test_tokens_refill_over_time(self):
+        with patch("time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, capacity=1)
+            bucket.reserve()
+        with patch("time.monotonic", return_value=100.5):
+            assert bucket.reserve() == 0.0
+
+    def test_async_acquire_sleeps_for_delay(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        bucket.reserve()
+
+        with patch("asyncio.sleep") as mock_sleep:
+            delay = asyncio.run(bucket.async_acquire())
+
+        assert delay > 0
+        mock_sleep.assert_called_once_with(delay)
@@ -0,0 +1,167 @@
+import json
+import os
+import pickle
+import zipfile
+
+import pytest
+
+from nac_collector.archive import ArchiveLayout, read_manifest
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.results import ResultStore
+
+pytestmark = pytest.mark.unit
+
+DATA = {
+    "devices": [{"id": i, "name": f"device {i}"} for i in range(200)],
+    "sites": [{"id": i} for i in range(10)],
+    "settings": {"name": "Global", "empty": {}},
+    "interfaces": [{"id": i, "mtu": 9216} for i in range(300)],
+}
+
+
+class ConcreteCiscoClient(CiscoClientController):
+    def authenticate(self):
+        return True
+
+    def get_from_endpoints_data(self, endpoints_data):
+        return {}
+
+
+def pickled_size(value):
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def spill_files(store):
+    return os.listdir(store._tmpdir.name) if store._tmpdir is not None else []
+
+
+@pytest.fixture
+def client():
+    return ConcreteCiscoClient(
+        username="admin",
+        password="secret",
+        base_url="https://controller.example.com",
+        max_retries=3,
+        retry_after=1,
+        timeout=5,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(
+        pickled_size(DATA["devices"]) + pickled_size(DATA["sites"]),
+        directory=str(tmp_path),
+    )
+    yield store
+    store.close()
+
+
+class TestResultStore:
+    def test_values_beyond_the_budget_are_spilled(self, store):
+        store.update(DATA)
+
+        assert dict(store) == DATA
+        assert list(store) == list(DATA)
+        snapshot = store.snapshot()
+        assert snapshot["resident_bytes"] <= snapshot["memory_budget"]
+        assert snapshot["spills"] == 2
+        assert snapshot["spilled_bytes"] == pickled_size(
+            DATA["settings"]
+        ) + pickled_size(DATA["interfaces"])
+        assert len(spill_files(store)) == 2
+
+    def test_spilled_values_are_read_back_as_copies(self, store):
+        store.update(DATA)
+
+        value = store["interfaces"]
+        value.append({"id": -1})
+
+        assert store["interfaces"] == DATA["interfaces"]
+        assert store.snapshot()["spills"] == 2
+
+    def test_overwrite_keeps_position_and_releases_the_old_value(self, store):
+        store.update(DATA)
+
+        store["interfaces"] = []
+        store["devices"] = store["devices"] + [{"id": 200}]
+
+        assert list(store) == list(DATA)
+        assert store["interfaces"] == []
+        assert len(store["devices"]) == 201
+        # The old files are removed; the budget is still full, so both are spilled
+        assert len(spill_files(store)) == 3
+        assert store.snapshot()["spilled_bytes"] == pickled_size(
+            DATA["settings"]
+        ) + pickled_size([]) + pickled_size(store["devices"])
+        assert store.snapshot()["resident_bytes"] == pickled_size(DATA["sites"])
+
+    def test_delete(self, store):
+        store.update(DATA)
+
+        del store["interfaces"]
+        assert store.pop("devices") == DATA["devices"]
+
+        assert list(store) == ["sites", "settings"]
+        assert len(spill_files(store)) == 1
+        with pytest.raises(KeyError):
+            del store["interfaces"]
+
+    def test_close_removes_the_files(self, store):
+        store.update(DATA)
+        directory = store._tmpdir.name
+
+        store.close()
+
+        assert len(store) == 0
+        assert not os.path.exists(directory)
+
+    def test_nothing_is_written_within_the_budget(self, tmp_path):
+        store = ResultStore(10 * 1024 * 1024, directory=str(tmp_path))
+        store.update(DATA)
+
+        assert store.snapshot()["spills"] == 0
+        assert os.listdir(tmp_path) == []
+
+
+class TestControllerResultStore:
+    def test_create_result_store(self, client):
+        assert client.create_result_store() == {}
+        assert type(client.create_result_store()) is dict
+
+        client.memory_budget = 1024
+        store = client.create_result_store()
+        assert isinstance(store, ResultStore)
+        assert store.memory_budget == 1024
+
+    def test_write_to_archive_matches_dict(self, client, store, tmp_path):
+        store.update(DATA)
+
+        client.write_to_archive(store, str(tmp_path / "store.zip"), "test_tech")
+        client.write_to_archive(dict(DATA), str(tmp_path / "dict.zip"), "test_tech")
+
+        with (
+            zipfile.ZipFile(tmp_path / "store.zip") as from_store,
+            zipfile.ZipFile(tmp_path / "dict.zip") as from_dict,
+        ):
+            content = from_store.read("test_tech.json")
+            assert content == from_dict.read("test_tech.json")
+        assert content == json.dumps(DATA, indent=4).encode()
+
+    def test_write_to_archive_sharded(self, client, store, tmp_path):
+        store.update(DATA)
+        output = tmp_path / "store.zip"
+
+        client.write_to_archive(store, str(output), "test_tech", ArchiveLayout.SHARDED)
+
+        # Endpoints and their files are released once written
+        assert len(store) == 0
+        assert spill_files(store) == []
+        with zipfile.ZipFile(output) as zip_file:
+            members = read_manifest(zip_file)["members"]
+            assert [member["endpoint"] for member in members] == list(DATA)
+            for member in members:
+                assert (
+                    zip_file.read(member["file"])
+                    == json.dumps(DATA[member["endpoint"]], indent=4).encode()
+                )
@@ -0,0 +1,319 @@
+import threading
+import weakref
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.ndfc import CiscoClientNDFC
+from nac_collector.controller.ndo import CiscoClientNDO
+from nac_collector.controller.scheduler import EndpointScheduler
+
+pytestmark = pytest.mark.unit
+
+CLIENT_KWARGS = {
+    "username": "admin",
+    "password": "secret",
+    "base_url": "https://controller.example.com",
+    "max_retries": 3,
+    "retry_after": 1,
+    "timeout": 5,
+}
+
+
+class ConcreteCiscoClient(CiscoClientController):
+    ENDPOINT_DEPENDENCIES = {"policies": ["switches", "not_collected"]}
+
+    def authenticate(self):
+        return True
+
+    def get_from_endpoints_data(self, endpoints_data):
+        return {}
+
+
+def _recorder(calls, key, value=None):
+    def run(dependencies):
+        calls.append((key, dependencies))
+        return value if value is not None else key
+
+    return run
+
+
+class TestEndpointScheduler:
+    def test_single_worker_keeps_insertion_order(self):
+        calls = []
+        scheduler = EndpointScheduler()
+        scheduler.add("a", _recorder(calls, "a"))
+        scheduler.add("b", _recorder(calls, "b"), depends_on=["c"])
+        scheduler.add("c", _recorder(calls, "c"))
+        scheduler.add("d", _recorder(calls, "d"))
+
+        results = scheduler.run()
+
+        assert [key for key, _ in calls] == ["a", "c", "b", "d"]
+        assert dict(calls)["b"] == {"c": "c"}
+        assert list(results) == ["a", "b", "c", "d"]
+
+    def test_order(self):
+        scheduler = EndpointScheduler()
+        scheduler.add("child", Mock(), depends_on=["parent"])
+        scheduler.add("parent", Mock())
+
+        assert scheduler.order() == ["parent", "child"]
+
+    def test_unknown_dependency(self):
+        scheduler = EndpointScheduler()
+        scheduler.add("a", Mock(), depends_on=["missing"])
+
+        with pytest.raises(ValueError, match="unknown task 'missing'"):
+            scheduler.run()
+
+    def test_cycle(self):
+        scheduler = EndpointScheduler()
+        scheduler.add("a", Mock(), depends_on=["b"])
+        scheduler.add("b", Mock(), depends_on=["a"])
+        scheduler.add("c", Mock())
+
+        with pytest.raises(ValueError, match=r"cycle between tasks: \['a', 'b'\]"):
+            scheduler.run()
+
+    def test_duplicate(self):
+        scheduler = EndpointScheduler()
+        scheduler.add("a", Mock())
+
+        with pytest.raises(ValueError, match="Duplicate"):
+            scheduler.add("a", Mock())
+
+    def test_independent_tasks_run_concurrently(self):
+        # Both tasks must be running at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        scheduler = EndpointScheduler(max_workers=2)
+        scheduler.add("a", lambda _: barrier.wait())
+        scheduler.add("b", lambda _: barrier.wait())
+        scheduler.add("c", lambda deps: sorted(deps), depends_on=["a", "b"])
+        done = []
+
+        results = scheduler.run(on_done=done.append)
+
+        assert results["c"] == ["a", "b"]
+        assert sorted(done) == ["a", "b", "c"]
+        assert done[-1] == "c"
+
+    def test_failure_stops_scheduling(self):
+        calls = []
+
+        def fail(_):
+            raise RuntimeError("boom")
+
+        scheduler = EndpointScheduler(max_workers=2)
+        scheduler.add("a", fail)
+        scheduler.add("b", _recorder(calls, "b"), depends_on=["a"])
+
+        with pytest.raises(RuntimeError, match="boom"):
+            scheduler.run()
+        assert calls == []
+
+    def test_on_result_in_insertion_order(self):
+        # b finishes first, but is handed over after a
+        b_done = threading.Event()
+        scheduler = EndpointScheduler(max_workers=2)
+        scheduler.add("a", lambda _: b_done.wait(5) and "a")
+        scheduler.add("b", lambda _: "b")
+        scheduler.add("c", lambda deps: sorted(deps.values()), depends_on=["a", "b"])
+        done = []
+        handed = []
+
+        def on_done(key):
+            done.append(key)
+            if key == "b":
+                b_done.set()
+
+        results = scheduler.run(
+            on_done=on_done, on_result=lambda key, r: handed.append((key, r))
+        )
+
+        assert results == {}
+        assert done == ["b", "a", "c"]
+        assert handed == [("a", "a"), ("b", "b"), ("c", ["a", "b"])]
+
+    def test_on_result_results_are_released(self):
+        class Result:
+            pass
+
+        refs = {}
+        alive = []
+
+        def task(key):
+            def run(_):
+                result = Result()
+                refs[key] = weakref.ref(result)
+                return result
+
+            return run
+
+        scheduler = EndpointScheduler(max_workers=1)
+        scheduler.add("parent", task("parent"))
+        scheduler.add("other", task("other"))
+        scheduler.add("child", task("child"), depends_on=["parent"])
+
+        scheduler.run(
+            on_result=lambda key, _: alive.append(
+                sorted(k for k, ref in refs.items() if ref() is not None)
+            )
+        )
+
+        # parent is held until child has started, other as soon as it is handed over
+        assert alive == [["parent"], ["other", "parent"], ["child"]]
+
+    def test_on_result_dependency_values(self):
+        handed = {}
+        scheduler = EndpointScheduler(max_workers=1)
+        scheduler.add("child", lambda deps: deps["parent"] + 1, depends_on=["parent"])
+        scheduler.add("parent", lambda _: 1)
+
+        scheduler.run(on_result=handed.__setitem__)
+
+        assert list(handed.items()) == [("child", 2), ("parent", 1)]
+
+
+class TestCollectEndpoints:
+    ENDPOINTS = [
+        {"name": "policies", "endpoint": "/policies"},
+        {"name": "switches", "endpoint": "/switches"},
+        {"name": "templates", "endpoint": "/templates/%v"},
+    ]
+
+    def test_dependencies(self):
+        client = ConcreteCiscoClient(**CLIENT_KWARGS, max_concurrency=4)
+        calls = []
+
+        def fetch(endpoint, dependencies):
+            calls.append(endpoint["name"])
+            return {endpoint["name"]: sorted(dependencies)}
+
+        results = client.collect_endpoints(
+            self.ENDPOINTS,
+            fetch,
+            depends_on=lambda e: ["switches"] if "%v" in e["endpoint"] else [],
+        )
+
+        assert results == [
+            {"policies": ["switches"]},
+            {"switches": []},
+            {"templates": ["switches"]},
+        ]
+        assert calls[0] == "switches"
+
+    def test_sequential(self):
+        client = ConcreteCiscoClient(**CLIENT_KWARGS)
+        threads = set()
+
+        def fetch(endpoint, dependencies):
+            threads.add(threading.get_ident())
+            return endpoint["name"]
+
+        on_done = Mock()
+        results = client.collect_endpoints(
+            self.ENDPOINTS, fetch, parallel=False, on_done=on_done
+        )
+
+        assert results == ["policies", "switches", "templates"]
+        assert threads == {threading.get_ident()}
+        assert on_done.call_count == 3
+
+    def test_unknown_dependency(self):
+        client = ConcreteCiscoClient(**CLIENT_KWARGS)
+
+        with pytest.raises(ValueError, match="unknown endpoints"):
+            client.collect_endpoints(
+                self.ENDPOINTS, Mock(), depends_on=lambda e: ["missing"]
+            )
+
+
+class TestNDO:
+    ENDPOINTS = [
+        {"name": "templates", "endpoint": "/mso/api/v1/templates/%v"},
+        {"name": "template_summary", "endpoint": "/mso/api/v1/templates/summaries"},
+        {"name": "tenants", "endpoint": "/mso/api/v1/tenants"},
+    ]
+
+    def _response(self, body):
+        return httpx.Response(200, json=body)
+
+    def test_templates_wait_for_their_parent(self):
+        client = CiscoClientNDO(**CLIENT_KWARGS, ssl_verify=False, domain="DefaultAuth")
+        bodies = {
+            "/mso/api/v1/templates/summaries": [{"templateId": "t1"}],
+            "/mso/api/v1/tenants": {"tenants": [{"id": "1"}]},
+        }
+
+        with (
+            patch.object(
+                client,
+                "get_request",
+                side_effect=lambda url: self._response(
+                    bodies[url.removeprefix(client.base_url)]
+                ),
+            ),
+            patch.object(
+                client,
+                "get_many",
+                side_effect=lambda urls: [self._response({"url": u}) for u in urls],
+            ),
+        ):
+            final_dict = client.get_from_endpoints_data(self.ENDPOINTS)
+
+        assert list(final_dict) == ["templates", "template_summary", "tenants"]
+        assert final_dict["templates"] == [
+            {"url": "https://controller.example.com/mso/api/v1/templates/t1"}
+        ]
+        assert final_dict["tenants"] == [{"id": "1"}]
+
+    def test_parent_endpoint_names(self):
+        names = [
+            CiscoClientNDO.parent_endpoint_names(endpoint, self.ENDPOINTS)
+            for endpoint in self.ENDPOINTS
+        ]
+
+        assert names == [["template_summary"], [], []]
+
+    def test_templates_matching_each_other_do_not_form_a_cycle(self):
+        endpoints = [
+            {"name": "schema", "endpoint": "/mso/api/v1/schemas/%v"},
+            {"name": "schema_policy", "endpoint": "/mso/api/v1/schemas/%v/policy"},
+        ]
+        client = CiscoClientNDO(**CLIENT_KWARGS, ssl_verify=False, domain="DefaultAuth")
+
+        names = [
+            CiscoClientNDO.parent_endpoint_names(endpoint, endpoints)
+            for endpoint in endpoints
+        ]
+        with patch.object(client, "get_many") as get_many:
+            final_dict = client.get_from_endpoints_data(endpoints)
+
+        # Only the template listed first can be a parent
+        assert names == [[], ["schema"]]
+        # Neither has a parent that collected anything: both are skipped
+        assert dict(final_dict) == {}
+        get_many.assert_not_called()
+
+
+class TestNDFC:
+    def test_policies_run_after_discovered_switches(self):
+        client = CiscoClientNDFC(**CLIENT_KWARGS, fabric_name="fabric1")
+        order = []
+        endpoints = [
+            {"name": "Policies", "endpoint": "/policies"},
+            {"name": "Discovered_Switches", "endpoint": "/switches"},
+        ]
+
+        with patch.object(
+            client,
+            "_process_endpoint_single_site",
+            side_effect=lambda endpoint, result: order.append(endpoint["name"]),
+        ):
+            result = client.get_from_endpoints_data(endpoints)
+
+        assert order == ["Discovered_Switches", "Policies"]
+        assert set(result) == {"Policies", "Discovered_Switches"}
@@ -0,0 +1,153 @@
+import json
+from collections.abc import Mapping
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from nac_collector import json_codec
+
+pytestmark = pytest.mark.unit
+
+BACKENDS = ["json"] + (["orjson"] if json_codec.orjson is not None else [])
+
+SAMPLE = {
+    "imdata": [
+        {
+            "topSystem": {
+                "attributes": {"name": "switch1", "descr": "Zürich 🚀", "mtu": 9216},
+                "children": [{"l1PhysIf": {"attributes": {"id": "eth1/1"}}}],
+            }
+        }
+    ],
+    "empty": {"list": [], "dict": {}},
+    "scalars": [None, True, False, 0.5, -3, "line\nbreak", 'quote "x"'],
+    "count": 2,
+}
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    with patch.object(json_codec, "BACKEND", request.param):
+        yield request.param
+
+
+class TestLoads:
+    def test_loads(self, backend):
+        data = json.dumps(SAMPLE).encode()
+
+        assert json_codec.loads(data) == SAMPLE
+        assert json_codec.loads(data.decode()) == SAMPLE
+        assert json_codec.loads(memoryview(data)) == SAMPLE
+
+    def test_falls_back_for_documents_native_backends_refuse(self, backend):
+        result = json_codec.loads(b'{"value": NaN}')
+
+        assert result["value"] != result["value"]
+
+    @pytest.mark.parametrize("value", [2**64, -(2**70), 123456789012345678901234567890])
+    def test_integers_wider_than_64_bits_stay_integers(self, backend, value):
+        result = json_codec.loads(json.dumps({"id": value}).encode())
+
+        assert result == {"id": value}
+        assert type(result["id"]) is int
+
+    def test_invalid_json_raises_json_decode_error(self, backend):
+        with pytest.raises(json.JSONDecodeError):
+            json_codec.loads(b"not json")
+
+    def test_response_json(self, backend):
+        response = httpx.Response(200, json=SAMPLE)
+
+        assert json_codec.response_json(response) == SAMPLE
+
+
+class TestDumps:
+    def test_dumps_round_trips(self, backend):
+        assert json.loads(json_codec.dumps(SAMPLE)) == SAMPLE
+
+    def test_dumps_converts_non_string_keys(self, backend):
+        assert json.loads(json_codec.dumps({1: "a"})) == {"1": "a"}
+
+    @pytest.mark.parametrize(
+        "data", [[float("nan"), float("inf")], {"x": [1e16, 1.5e-05, 0.5]}]
+    )
+    def test_floats_match_json_dumps(self, backend, data):
+        assert json_codec.dumps(data) == json.dumps(data, separators=(",", ":"))
+
+
+class TestIterEncode:
+    @pytest.mark.parametrize(
+        "data",
+        [
+            SAMPLE,
+            [SAMPLE, SAMPLE],
+            {"deep": [[[[{"x": [1, [2, {"y": {}}]]}]]]]},
+            {},
+            [],
+            "scalar",
+            42,
+        ],
+    )
+    def test_matches_json_dumps(self, backend, data):
+        encoded = b"".join(json_codec.iter_encode(data, indent=4, chunk_size=64))
+
+        assert encoded == json.dumps(data, indent=4).encode()
+
+    def test_falls_back_for_values_native_backends_refuse(self, backend):
+        data = {"endpoint": [{1: "int key"}, {"big": 2**80}]}
+
+        encoded = b"".join(json_codec.iter_encode(data))
+
+        assert encoded == json.dumps(data, indent=4).encode()
+
+    @pytest.mark.parametrize(
+        "value", [float("nan"), float("-inf"), 1e16, 1e-07, 1.5e-05, -2.5e300]
+    )
+    def test_floats_the_native_backends_format_differently(self, backend, value):
+        data = {"endpoint": [{"value": value}, {"value": 0.5}]}
+
+        encoded = b"".join(json_codec.iter_encode(data))
+
+        assert encoded == json.dumps(data, indent=4).encode()
+
+    def test_plain_floats_use_the_native_backend(self, backend):
+        data = {"endpoint": [{"value": 0.1}, {"value": 12345.678}]}
+        expected = json.dumps(data, indent=4).encode()
+
+        with patch.object(json_codec.json, "dumps", wraps=json.dumps) as dumps:
+            encoded = b"".join(json_codec.iter_encode(data))
+
+        assert encoded == expected
+        dumps.assert_not_called()
+
+    def test_large_lists_are_encoded_in_batches(self, backend):
+        data = {"endpoint": [{"id": i} for i in range(95)], "other": list(range(25))}
+
+        with patch.object(json_codec, "STREAM_BATCH", 10):
+            chunks = list(json_codec.iter_encode(data, chunk_size=100))
+
+        assert len(chunks) > 10
+        assert all(len(chunk) < 1000 for chunk in chunks)
+        assert b"".join(chunks) == json.dumps(data, indent=4).encode()
+
+    def test_mappings_match_json_dumps_of_a_dict(self, backend):
+        class Store(Mapping):
+            def __init__(self, data):
+                self.data = data
+
+            def __getitem__(self, key):
+                return self.data[key]
+
+            def __iter__(self):
+                return iter(self.data)
+
+            def __len__(self):
+                return len(self.data)
+
+        for data in [SAMPLE, {}]:
+            encoded = b"".join(
+                json_codec.iter_encode(Store(data), indent=4, chunk_size=64)
+            )
+
+            assert encoded == json.dumps(data, indent=4).encode()
@@ -0,0 +1,199 @@
+import json
+import zipfile
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.metrics import METRICS_FILENAME, MetricsRecorder, endpoint_label
+
+pytestmark = pytest.mark.unit
+
+
+class ConcreteCiscoClient(CiscoClientController):
+    PAGINATION_LIMIT = 2
+
+    def authenticate(self):
+        return True
+
+    def get_from_endpoints_data(self, endpoints_data):
+        return {}
+
+
+@pytest.fixture
+def cisco_client():
+    return ConcreteCiscoClient(
+        username="admin",
+        password="secret",
+        base_url="https://controller.example.com",
+        max_retries=3,
+        retry_after=1,
+        timeout=5,
+        max_concurrency=1,
+    )
+
+
+class TestEndpointLabel:
+    @pytest.mark.parametrize(
+        ("url", "label"),
+        [
+            ("https://fmc/api/v1/policies?offset=1", "/api/v1/policies"),
+            (
+                "https://fmc/api/v1/policies/005056B8-0B56-0ed3-0000-000000000001/rules",
+                "/api/v1/policies/{id}/rules",
+            ),
+            ("https://ise/ers/config/node/42", "/ers/config/node/{id}"),
+            ("https://dnac/api/v1/site/5f3a9b2c4d1e6f7a8b9c0d1e", "/api/v1/site/{id}"),
+            ("https://nd/api/v1/fabrics/site1", "/api/v1/fabrics/site1"),
+        ],
+    )
+    def test_ids_are_folded(self, url, label):
+        assert endpoint_label(url) == label
+
+    def test_with_host(self):
+        assert (
+            endpoint_label("https://10.0.0.1:8443/api/mo/sys.json", host=True)
+            == "10.0.0.1:8443/api/mo/sys.json"
+        )
+
+
+class TestMetricsRecorder:
+    def test_snapshot(self):
+        metrics = MetricsRecorder(buckets=(0.1, 1.0))
+        metrics.record_request("/a", 0.05, 200, 100)
+        metrics.record_request("/a", 0.5, 200, 50)
+        metrics.record_request("/a", 2.0, error="read")
+        metrics.record_retry("/a", "429", 3.0)
+        metrics.record_retry("/a", "read", 1.0)
+        metrics.record_pages("/a", 4)
+        metrics.record_pages("/a", 1)
+
+        snapshot = metrics.snapshot()
+
+        entry = snapshot["endpoints"]["/a"]
+        assert entry["requests"] == 3
+        assert entry["errors"] == 1
+        assert entry["status"] == {"200": 2, "read": 1}
+        assert entry["bytes"] == 150
+        assert entry["retries"] == {"429": 1, "read": 1}
+        assert entry["rate_limit_waits"] == 1
+        assert entry["rate_limit_wait_seconds"] == 3.0
+        assert entry["max_pages"] == 4
+        assert entry["pages"] == 5
+        assert entry["latency"]["buckets"] == [1, 1, 1]
+        assert entry["latency"]["max"] == 2.0
+        assert entry["latency"]["p50"] == 1.0
+        assert entry["latency"]["p95"] == 2.0
+        assert snapshot["totals"]["requests"] == 3
+        assert snapshot["totals"]["retries"] == 2
+        json.dumps(snapshot)
+
+    def test_endpoints_sorted_by_total_time(self):
+        metrics = MetricsRecorder()
+        metrics.record_request("/fast", 0.1, 200)
+        metrics.record_request("/slow", 5.0, 200)
+
+        assert list(metrics.snapshot()["endpoints"]) == ["/slow", "/fast"]
+
+    def test_empty(self):
+        metrics = MetricsRecorder()
+        assert metrics.empty
+        metrics.record_request("/a", 0.1, 200)
+        assert not metrics.empty
+
+    def test_time_request_records_errors(self):
+        metrics = MetricsRecorder()
+
+        def send():
+            raise httpx.ConnectError("refused")
+
+        with pytest.raises(httpx.ConnectError):
+            metrics.time_request("/a", send)
+
+        assert metrics.snapshot()["endpoints"]["/a"]["status"] == {"connect": 1}
+
+    def test_prometheus_text(self):
+        metrics = MetricsRecorder(buckets=(0.1, 1.0))
+        metrics.record_request('/a"b', 0.5, 200, 10)
+        metrics.record_retry('/a"b', "429", 2.0)
+
+        text = metrics.prometheus_text("fmc")
+
+        labels = 'solution="fmc",endpoint="/a\\"b"'
+        assert "# TYPE nac_collector_request_duration_seconds histogram" in text
+        assert f'nac_collector_requests_total{{{labels},status="200"}} 1' in text
+        assert (
+            f'nac_collector_request_duration_seconds_bucket{{{labels},le="0.1"}} 0'
+            in text
+        )
+        assert (
+            f'nac_collector_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1'
+            in text
+        )
+        assert f"nac_collector_response_bytes_total{{{labels}}} 10" in text
+        assert f'nac_collector_retries_total{{{labels},reason="429"}} 1' in text
+        assert 'nac_collector_run_duration_seconds{solution="fmc"}' in text
+        assert text.endswith("\n")
+
+    def test_write_prometheus(self, tmp_path):
+        metrics = MetricsRecorder()
+        metrics.record_request("/a", 0.5, 200)
+        path = tmp_path / "nac_collector.prom"
+
+        metrics.write_prometheus(str(path), "ise")
+
+        text = path.read_text()
+        assert text.startswith("# HELP nac_collector_requests_total")
+        assert (
+            'nac_collector_requests_total{solution="ise",endpoint="/a",status="200"} 1'
+            in text
+        )
+        assert [p.name for p in tmp_path.iterdir()] == ["nac_collector.prom"]
+
+
+class TestControllerMetrics:
+    def test_retries_and_statuses_are_recorded(self, cisco_client):
+        responses = iter(
+            [
+                httpx.Response(429, headers={"Retry-After": "2"}),
+                httpx.Response(200, content=b'{"ok": true}'),
+            ]
+        )
+        cisco_client.client = httpx.Client(
+            transport=httpx.MockTransport(lambda request: next(responses))
+        )
+
+        with patch("time.sleep"):
+            cisco_client.get_request("https://controller.example.com/api/items/17")
+
+        entry = cisco_client.metrics.snapshot()["endpoints"]["/api/items/{id}"]
+        assert entry["status"] == {"429": 1, "200": 1}
+        assert entry["retries"] == {"429": 1}
+        assert entry["rate_limit_wait_seconds"] == 2
+        assert entry["bytes"] == len(b'{"ok": true}')
+
+    def test_pagination_depth_is_recorded(self, cisco_client):
+        def handler(request):
+            offset = int(request.url.params["offset"])
+            items = [{"id": i} for i in range(offset, min(offset + 2, 6))]
+            return httpx.Response(200, json={"response": items})
+
+        cisco_client.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+        cisco_client.fetch_data_pagination("/api/items")
+
+        entry = cisco_client.metrics.snapshot()["endpoints"]["/api/items"]
+        assert entry["max_pages"] == 3
+        assert entry["requests"] == 3
+
+    def test_metrics_member_in_archive(self, cisco_client, tmp_path):
+        cisco_client.metrics.record_request("/api/items", 0.1, 200, 10)
+        output = str(tmp_path / "out.zip")
+
+        cisco_client.write_to_archive({"items": []}, output, "ise")
+
+        with zipfile.ZipFile(output) as zip_file:
+            assert zip_file.namelist() == ["ise.json", METRICS_FILENAME]
+            metrics = json.loads(zip_file.read(METRICS_FILENAME))
+        assert metrics["endpoints"]["/api/items"]["requests"] == 1
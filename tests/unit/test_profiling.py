@@ -0,0 +1,127 @@
+import concurrent.futures
+import time
+
+import pytest
+
+from nac_collector.profiling import NO_ENDPOINT, Profiler
+from nac_collector.tracing import Tracer
+
+pytestmark = pytest.mark.unit
+
+MIB = 1024 * 1024
+
+
+def burn(seconds):
+    """Keep the CPU busy for about the given thread CPU time."""
+    end = time.thread_time() + seconds
+    total = 0
+    while time.thread_time() < end:
+        total += sum(range(1000))
+    return total
+
+
+@pytest.fixture
+def profiled():
+    profiler = Profiler(interval=0.001)
+    tracer = Tracer()
+    tracer.add_listener(profiler)
+    yield profiler, tracer
+    profiler.stop()
+
+
+class TestProfiler:
+    def test_cpu_is_attributed_to_the_endpoint(self, profiled):
+        profiler, tracer = profiled
+        profiler.start()
+
+        with tracer.span("devices", "endpoint"):
+            with tracer.span("GET /devices", "http"):
+                burn(0.2)
+        with tracer.span("sites", "endpoint"):
+            time.sleep(0.2)
+        profiler.stop()
+
+        devices = profiler.endpoints["devices"]
+        assert devices.cpu >= 0.15
+        assert devices.samples > 0
+        assert devices.runs == 1
+        # Waiting takes no CPU
+        assert profiler.endpoints["sites"].cpu < 0.05
+        assert profiler.idle_samples > 0
+        stacks = [line for line in profiler.folded() if line.startswith("devices;")]
+        assert any("burn (test_profiling.py" in line for line in stacks)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in profiler.folded())
+
+    def test_endpoints_are_followed_into_worker_threads(self, profiled):
+        profiler, tracer = profiled
+        profiler.start()
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            futures = [
+                executor.submit(tracer.wrap(burn, name, "endpoint"), 0.1)
+                for name in ("policies", "switches")
+            ]
+            for future in futures:
+                future.result()
+        profiler.stop()
+
+        summary = profiler.summary()
+        assert sorted(summary["endpoints"]) == ["policies", "switches"]
+        for stats in summary["endpoints"].values():
+            assert stats["cpu"] >= 0.08
+            assert stats["samples"] > 0
+        assert not any(
+            line.startswith(NO_ENDPOINT) and "burn" in line
+            for line in profiler.folded()
+        )
+
+    def test_allocation_peaks_and_retained_memory(self, profiled):
+        profiler, tracer = profiled
+        profiler.start()
+        kept = []
+
+        with tracer.span("inventory", "endpoint"):
+            kept.append(bytearray(4 * MIB))
+        with tracer.span("interfaces", "endpoint"):
+            scratch = bytearray(16 * MIB)
+            # Let the sampler see the temporary allocation
+            time.sleep(0.05)
+            del scratch
+        profiler.stop()
+
+        inventory = profiler.endpoints["inventory"]
+        assert inventory.retained >= 4 * MIB
+        interfaces = profiler.endpoints["interfaces"]
+        assert interfaces.peak >= 16 * MIB
+        assert interfaces.retained < MIB
+        assert profiler.memory_peak >= 20 * MIB
+
+    def test_without_allocation_tracing(self, profiled):
+        profiler, tracer = profiled
+        profiler.trace_malloc = False
+        profiler.start()
+
+        with tracer.span("devices", "endpoint"):
+            bytearray(4 * MIB)
+        profiler.stop()
+
+        assert profiler.endpoints["devices"].peak == 0
+        assert profiler.memory_peak == 0
+
+    def test_write(self, profiled, tmp_path):
+        profiler, tracer = profiled
+        profiler.start()
+        with tracer.span("devices", "endpoint"):
+            burn(0.05)
+        profiler.stop()
+
+        folded_path, table_path = profiler.write(str(tmp_path), "ise")
+
+        assert folded_path == str(tmp_path / "ise-profile.folded")
+        assert (tmp_path / "ise-profile.folded").read_text().splitlines() == (
+            profiler.folded()
+        )
+        table = (tmp_path / "ise-profile.txt").read_text()
+        assert "Endpoint" in table
+        assert "\ndevices " in table
+        assert "burn (test_profiling.py" in table
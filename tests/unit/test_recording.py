@@ -0,0 +1,196 @@
+import asyncio
+import gzip
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from nac_collector.recording import INDEX_FILENAME, Recording
+
+pytestmark = pytest.mark.unit
+
+
+def serve(*responses):
+    """Patch the network transports to answer with the given responses, in turn."""
+    remaining = list(responses)
+
+    def handler(request):
+        response = remaining.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return (
+        patch(
+            "nac_collector.recording.httpx.HTTPTransport",
+            return_value=httpx.MockTransport(handler),
+        ),
+        patch(
+            "nac_collector.recording.httpx.AsyncHTTPTransport",
+            return_value=httpx.MockTransport(handler),
+        ),
+    )
+
+
+def record(directory, *responses, requests=None):
+    """Record the given responses to GET https://host/a, returning the bodies received."""
+    sync_patch, async_patch = serve(*responses)
+    received = []
+    with sync_patch, async_patch, Recording(str(directory)) as recording:
+        with httpx.Client(transport=recording.transport()) as client:
+            for method, url, kwargs in requests or [
+                ("GET", "https://host/a", {})
+            ] * len(responses):
+                try:
+                    received.append(client.request(method, url, **kwargs).content)
+                except httpx.TransportError as e:
+                    received.append(e)
+    return received
+
+
+def index(directory):
+    with open(directory / INDEX_FILENAME, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestRecording:
+    def test_replays_responses_in_recorded_order(self, tmp_path):
+        record(
+            tmp_path,
+            httpx.Response(429, headers={"Retry-After": "1"}),
+            httpx.Response(200, json={"page": 1}),
+        )
+
+        recording = Recording(str(tmp_path), replay=True)
+        with httpx.Client(transport=recording.transport()) as client:
+            responses = [client.get("https://host/a") for _ in range(3)]
+
+        assert [response.status_code for response in responses] == [429, 200, 200]
+        assert responses[0].headers["Retry-After"] == "1"
+        assert responses[2].json() == {"page": 1}
+        assert recording.snapshot() == {"recorded": 0, "replayed": 3, "misses": 0}
+
+    def test_keyed_by_method_and_url(self, tmp_path):
+        record(
+            tmp_path,
+            httpx.Response(200, json={"path": "a"}),
+            httpx.Response(200, json={"path": "b"}),
+            httpx.Response(200, json={"method": "POST"}),
+            requests=[
+                ("GET", "https://host/a", {}),
+                ("GET", "https://host/b?offset=1", {}),
+                ("POST", "https://host/a", {}),
+            ],
+        )
+
+        recording = Recording(str(tmp_path), replay=True)
+        with httpx.Client(transport=recording.transport()) as client:
+            assert client.post("https://host/a").json() == {"method": "POST"}
+            assert client.get("https://host/b?offset=1").json() == {"path": "b"}
+            assert client.get("https://host/a").json() == {"path": "a"}
+
+    def test_unrecorded_request_is_not_found(self, tmp_path):
+        record(tmp_path, httpx.Response(200, json={}))
+
+        recording = Recording(str(tmp_path), replay=True)
+        with httpx.Client(transport=recording.transport()) as client:
+            response = client.get("https://host/other")
+
+        assert response.status_code == 404
+        assert recording.misses == 1
+
+    def test_transport_errors_are_replayed(self, tmp_path):
+        received = record(
+            tmp_path,
+            httpx.ReadTimeout("timed out"),
+            httpx.Response(200, json={}),
+        )
+        assert isinstance(received[0], httpx.ReadTimeout)
+
+        recording = Recording(str(tmp_path), replay=True)
+        with httpx.Client(transport=recording.transport()) as client:
+            with pytest.raises(httpx.ReadTimeout, match="timed out"):
+                client.get("https://host/a")
+            assert client.get("https://host/a").status_code == 200
+
+    def test_bodies_are_stored_decoded(self, tmp_path):
+        body = json.dumps({"name": "device"}).encode()
+        received = record(
+            tmp_path,
+            httpx.Response(
+                200,
+                headers={"Content-Encoding": "gzip"},
+                content=gzip.compress(body),
+            ),
+        )
+        assert received == [body]
+        (exchange,) = index(tmp_path)
+        assert (tmp_path / "bodies" / exchange["body"]).read_bytes() == body
+        assert "content-encoding" not in dict(exchange["headers"])
+
+        recording = Recording(str(tmp_path), replay=True)
+        with httpx.Client(transport=recording.transport()) as client:
+            assert client.get("https://host/a").content == body
+
+    def test_request_credentials_are_not_stored(self, tmp_path):
+        record(
+            tmp_path,
+            httpx.Response(200, json={"token": "abc"}),
+            requests=[
+                (
+                    "POST",
+                    "https://host/login",
+                    {"json": {"password": "secret"}, "auth": ("admin", "secret")},
+                )
+            ],
+        )
+
+        contents = (tmp_path / INDEX_FILENAME).read_text(encoding="utf-8")
+        assert "secret" not in contents
+        assert "admin" not in contents
+
+    def test_identical_bodies_are_stored_once(self, tmp_path):
+        record(
+            tmp_path,
+            httpx.Response(200, json={"same": True}),
+            httpx.Response(200, json={"same": True}),
+        )
+
+        assert len(index(tmp_path)) == 2
+        assert len(list((tmp_path / "bodies").iterdir())) == 1
+
+    def test_async_transport(self, tmp_path):
+        sync_patch, async_patch = serve(httpx.Response(200, json={"async": True}))
+
+        async def fetch(recording):
+            async with httpx.AsyncClient(
+                transport=recording.async_transport()
+            ) as client:
+                return (await client.get("https://host/a")).json()
+
+        with sync_patch, async_patch, Recording(str(tmp_path)) as recording:
+            assert asyncio.run(fetch(recording)) == {"async": True}
+            assert recording.recorded == 1
+
+        assert asyncio.run(fetch(Recording(str(tmp_path), replay=True))) == {
+            "async": True
+        }
+
+    def test_ssh_commands(self, tmp_path):
+        with Recording(str(tmp_path)) as recording:
+            recording.record_command("ssh://r1:22", "show run", 0, b"{}", b"")
+            recording.record_command("ssh://r2:22", "show run", 1, b"", b"denied")
+
+        recording = Recording(str(tmp_path), replay=True)
+        assert recording.replay_command("ssh://r1:22", "show run") == (0, b"{}", b"")
+        assert recording.replay_command("ssh://r2:22", "show run") == (
+            1,
+            b"",
+            b"denied",
+        )
+        assert recording.replay_command("ssh://r1:22", "show version") is None
+
+    def test_replay_without_recording(self, tmp_path):
+        with pytest.raises(ValueError, match="No recording found"):
+            Recording(str(tmp_path / "missing"), replay=True)
@@ -0,0 +1,294 @@
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+from unittest.mock import MagicMock, patch
+
+import pytest
+import typer
+
+from nac_collector import registry
+from nac_collector.cli.main import Solution, main
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.controller.fmc import CiscoClientCDFMC, CiscoClientFMC
+from nac_collector.controller.ise import CiscoClientISE
+from nac_collector.controller.ndo import CiscoClientNDO
+from nac_collector.controller.sdwan import CiscoClientSDWAN
+from nac_collector.device.base import CiscoClientDevice
+from nac_collector.registry import CLIENTS, ENTRY_POINT_GROUP, load_client, solutions
+
+pytestmark = pytest.mark.unit
+
+# Dependencies of some clients only
+HEAVY_MODULES = ("meraki", "paramiko", "tinydb", "git")
+
+
+def loaded_modules(code):
+    """Run code in a fresh interpreter, returning which of HEAVY_MODULES it imported."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys\n{code}\n"
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.split()
+
+
+class CiscoClientBULK(CiscoClientISE):
+    """Collector plugin with an option of its own."""
+
+    CLI_OPTIONS = {"domain": "global"}
+
+    def __init__(self, domain, **kwargs):
+        super().__init__(**kwargs)
+        self.domain = domain
+
+
+class CiscoClientTUNED(CiscoClientBULK):
+    """Collector plugin with options only given through --client-option."""
+
+    CLI_OPTIONS = {"domain": "global", "page_size": 500, "bulk": False, "region": ""}
+
+    def __init__(self, page_size, bulk, region, **kwargs):
+        super().__init__(**kwargs)
+
+
+@pytest.fixture
+def plugins():
+    """Install the given entry points as collector plugins."""
+
+    def install(**entry_points):
+        solutions.cache_clear()
+        patcher = patch.object(
+            registry,
+            "entry_points",
+            return_value=[
+                EntryPoint(name=name, value=value, group=ENTRY_POINT_GROUP)
+                for name, value in entry_points.items()
+            ],
+        )
+        patcher.start()
+        patchers.append(patcher)
+
+    patchers = []
+    yield install
+    for patcher in patchers:
+        patcher.stop()
+    solutions.cache_clear()
+
+
+def run_main(solution, **options):
+    """Run the CLI on stub endpoints, returning its exit code."""
+    with patch(
+        "nac_collector.cli.main.EndpointResolver.resolve_endpoint_data",
+        return_value=[{"name": "test", "endpoint": "/test"}],
+    ):
+        with pytest.raises(typer.Exit) as exc_info:
+            main(
+                solution=solution,
+                username="user",
+                password="pass",
+                url="https://controller.example.com",
+                **options,
+            )
+    return exc_info.value.exit_code
+
+
+def mock_client_class(client_class):
+    """A mock of a client class declaring the same CLI options."""
+    mock_class = MagicMock(
+        CLI_OPTIONS=client_class.CLI_OPTIONS,
+        CLI_EMPTY_AS_DEFAULT=client_class.CLI_EMPTY_AS_DEFAULT,
+    )
+    mock_class.return_value.authenticate.return_value = True
+    mock_class.return_value.get_from_endpoints_data.return_value = {}
+    return mock_class
+
+
+class TestRegistry:
+    def test_every_solution_has_a_client(self):
+        assert sorted(CLIENTS) == sorted(solution.value for solution in Solution)
+
+    @pytest.mark.parametrize("solution", list(Solution))
+    def test_load_client(self, solution):
+        client = load_client(solution.value)
+
+        assert issubclass(client, (CiscoClientController, CiscoClientDevice))
+        assert client.__name__ == CLIENTS[solution.value].rpartition(":")[2]
+
+    def test_cdfmc_client(self):
+        assert issubclass(load_client("CDFMC"), CiscoClientFMC)
+
+        client = CiscoClientCDFMC(
+            username="admin",
+            password="token",
+            base_url="https://cdfmc.example.com",
+            max_retries=1,
+            retry_after=0,
+            timeout=5,
+            ssl_verify=False,
+        )
+
+        assert client.cdfmc
+        assert client.password == "token"
+
+    def test_unsupported_solution(self):
+        with pytest.raises(ValueError, match="Unsupported solution: ACI"):
+            load_client("ACI")
+
+    def test_cli_imports_only_the_selected_client(self):
+        assert loaded_modules("import nac_collector.cli.main") == []
+        assert (
+            loaded_modules(
+                "import nac_collector.cli.main\n"
+                "from nac_collector.registry import load_client\n"
+                "load_client('ISE')"
+            )
+            == []
+        )
+        assert loaded_modules(
+            "import nac_collector.cli.main\n"
+            "from nac_collector.registry import load_client\n"
+            "load_client('MERAKI')"
+        ) == ["meraki"]
+
+    def test_cli_import_does_not_scan_entry_points(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import importlib.metadata\n"
+                "def fail(**kwargs):\n"
+                "    raise AssertionError('entry points scanned')\n"
+                "importlib.metadata.entry_points = fail\n"
+                "import nac_collector.cli.main",
+            ],
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 0, result.stderr
+
+
+class TestPlugins:
+    def test_entry_points_add_solutions(self, plugins):
+        plugins(ise_bulk="tests.unit.test_registry:CiscoClientBULK")
+
+        assert solutions()["ISE_BULK"] == "tests.unit.test_registry:CiscoClientBULK"
+        assert load_client("ise_bulk") is CiscoClientBULK
+
+    def test_plugin_classes_are_resolved_by_solution(self, plugins):
+        # Same class name as the built-in ISE client
+        plugins(myise="tests.unit.test_registry:CiscoClientISE")
+
+        with patch("tests.unit.test_registry.CiscoClientISE", CiscoClientBULK):
+            assert load_client("MYISE") is CiscoClientBULK
+            assert load_client("ISE") is not CiscoClientBULK
+
+    def test_built_in_solutions_cannot_be_replaced(self, plugins, caplog):
+        plugins(ise="tests.unit.test_registry:CiscoClientBULK")
+
+        assert load_client("ISE") is CiscoClientISE
+        assert "Ignoring plugin tests.unit.test_registry:CiscoClientBULK" in caplog.text
+
+    def test_plugins_are_imported_when_selected(self, plugins):
+        plugins(missing="in_house_collectors.missing:CiscoClientMISSING")
+
+        # Listing the solutions only reads the entry point metadata
+        assert "MISSING" in solutions()
+        assert load_client("ISE") is CiscoClientISE
+        with pytest.raises(ModuleNotFoundError, match="in_house_collectors"):
+            load_client("MISSING")
+
+    def test_cli_runs_a_plugin(self, plugins):
+        plugins(ise_bulk="tests.unit.test_registry:CiscoClientBULK")
+        mock_class = mock_client_class(CiscoClientBULK)
+
+        with patch("tests.unit.test_registry.CiscoClientBULK", mock_class):
+            assert run_main("ise_bulk") == 0
+
+        assert mock_class.call_args.kwargs["domain"] == "global"
+        mock_class.return_value.write_to_archive.assert_called_once()
+        assert mock_class.return_value.write_to_archive.call_args.args[2] == "ise_bulk"
+
+    def test_cli_rejects_unknown_solutions(self):
+        with pytest.raises(typer.BadParameter, match="'ACI' is not one of"):
+            main(solution="ACI")
+
+
+class TestClientOptions:
+    @pytest.mark.parametrize(
+        ("solution", "client", "options", "expected"),
+        [
+            ("NDO", CiscoClientNDO, {}, {"domain": "DefaultAuth"}),
+            ("NDO", CiscoClientNDO, {"domain": "radius"}, {"domain": "radius"}),
+            ("NDFC", load_client("NDFC"), {}, {"domain": "local"}),
+            # As before CLI_OPTIONS, an empty NDFC domain falls back to the default
+            # while an empty NDO domain is passed on
+            ("NDFC", load_client("NDFC"), {"domain": ""}, {"domain": "local"}),
+            ("NDO", CiscoClientNDO, {"domain": ""}, {"domain": ""}),
+            ("SDWAN", CiscoClientSDWAN, {"api_token": "abc"}, {"api_token": "abc"}),
+            ("SDWAN", CiscoClientSDWAN, {}, {"api_token": ""}),
+            ("ISE", CiscoClientISE, {"domain": "ignored"}, {}),
+        ],
+    )
+    def test_declared_options_are_passed(self, solution, client, options, expected):
+        mock_class = mock_client_class(client)
+
+        with patch(f"{client.__module__}.{client.__name__}", mock_class):
+            assert run_main(solution, **options) == 0
+
+        kwargs = mock_class.call_args.kwargs
+        assert {name: kwargs[name] for name in client.CLI_OPTIONS} == expected
+        assert "domain" not in kwargs or "domain" in expected
+        assert kwargs["username"] == "user"
+
+    def test_api_token_needs_client_support(self):
+        with patch("nac_collector.controller.ise.CiscoClientISE") as mock_class:
+            mock_class.CLI_OPTIONS = CiscoClientISE.CLI_OPTIONS
+            assert run_main("ISE", api_token="abc") == 1
+
+        mock_class.assert_not_called()
+
+    def test_plugin_options(self, plugins):
+        plugins(ise_bulk="tests.unit.test_registry:CiscoClientTUNED")
+        mock_class = mock_client_class(CiscoClientTUNED)
+
+        with patch("tests.unit.test_registry.CiscoClientTUNED", mock_class):
+            assert (
+                run_main(
+                    "ise_bulk",
+                    client_option=["page_size=5000", "bulk=yes", "region=eu"],
+                )
+                == 0
+            )
+
+        kwargs = mock_class.call_args.kwargs
+        assert kwargs["page_size"] == 5000
+        assert kwargs["bulk"] is True
+        assert kwargs["region"] == "eu"
+        assert kwargs["domain"] == "global"
+
+    @pytest.mark.parametrize(
+        "option",
+        ["unknown=1", "page_size=many", "bulk=maybe", "page_size"],
+    )
+    def test_invalid_plugin_options_are_rejected(self, plugins, option):
+        plugins(ise_bulk="tests.unit.test_registry:CiscoClientTUNED")
+        mock_class = mock_client_class(CiscoClientTUNED)
+
+        with patch("tests.unit.test_registry.CiscoClientTUNED", mock_class):
+            assert run_main("ise_bulk", client_option=[option]) == 1
+
+        mock_class.assert_not_called()
+
+    def test_options_not_declared_by_built_in_clients_are_rejected(self):
+        with patch("nac_collector.controller.ise.CiscoClientISE") as mock_class:
+            mock_class.CLI_OPTIONS = CiscoClientISE.CLI_OPTIONS
+            assert run_main("ISE", client_option=["domain=x"]) == 1
+
+        mock_class.assert_not_called()
@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+import httpx
+import paramiko
+import pytest
+
+from nac_collector.retry import RetryBudget, RetryPolicy, classify_error
+
+pytestmark = pytest.mark.unit
+
+
+class TestClassifyError:
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (None, "response"),
+            (httpx.PoolTimeout("pool"), "pool"),
+            (httpx.ConnectTimeout("connect"), "connect"),
+            (httpx.ConnectError("refused"), "connect"),
+            (ConnectionResetError("reset"), "connect"),
+            (httpx.ReadTimeout("read"), "read"),
+            (httpx.WriteTimeout("write"), "read"),
+            (httpx.TimeoutException("timeout"), "timeout"),
+            (TimeoutError("timeout"), "timeout"),
+            (httpx.RemoteProtocolError("protocol"), "transport"),
+            (paramiko.SSHException("ssh"), "transport"),
+        ],
+    )
+    def test_classify_error(self, error, expected):
+        assert classify_error(error) == expected
+
+
+class TestRetryBudget:
+    def test_consume_until_exhausted(self):
+        budget = RetryBudget(2)
+
+        assert budget.consume() is True
+        assert budget.consume() is True
+        assert budget.consume() is False
+        assert budget.remaining == 0
+        assert budget.denied == 1
+
+    def test_exhaustion_logged_once(self, caplog):
+        budget = RetryBudget(0)
+
+        budget.consume()
+        budget.consume()
+
+        assert caplog.text.count("Retry budget of 0 exhausted") == 1
+
+
+class TestRetryPolicy:
+    def test_backoff_bounds_grow_exponentially_up_to_max(self):
+        policy = RetryPolicy(max_retries=10, backoff_base=1.0, backoff_max=5.0)
+
+        with patch("random.uniform", side_effect=lambda low, high: high):
+            bounds = [policy.backoff(attempt) for attempt in range(5)]
+
+        assert bounds == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+    def test_backoff_is_jittered(self):
+        policy = RetryPolicy(max_retries=10, backoff_base=1.0, backoff_max=5.0)
+
+        delays = {policy.backoff(3) for _ in range(20)}
+
+        assert len(delays) > 1
+        assert all(0 <= delay <= 5.0 for delay in delays)
+
+    def test_gives_up_after_last_attempt(self):
+        policy = RetryPolicy(max_retries=3)
+
+        assert policy.next_delay(1, httpx.ReadTimeout("read")) is not None
+        assert policy.next_delay(2, httpx.ReadTimeout("read")) is None
+        assert policy.budget.used == 1
+
+    def test_retry_after_is_honoured(self):
+        policy = RetryPolicy(max_retries=3)
+
+        assert policy.next_delay(0, retry_after=7) == 7
+
+    def test_pool_timeout_retries_immediately_without_budget(self):
+        policy = RetryPolicy(max_retries=3, budget=RetryBudget(0))
+
+        assert policy.next_delay(0, httpx.PoolTimeout("pool")) == 0.0
+
+    def test_exhausted_budget_fails_fast(self):
+        budget = RetryBudget(1)
+        first = RetryPolicy(max_retries=5, budget=budget)
+        second = RetryPolicy(max_retries=5, budget=budget)
+
+        assert first.next_delay(0, httpx.ConnectError("refused")) is not None
+        assert second.next_delay(0, httpx.ConnectError("refused")) is None
+
+    def test_non_idempotent_request_only_retries_connect_failures(self):
+        policy = RetryPolicy(max_retries=3)
+
+        assert (
+            policy.next_delay(0, httpx.ConnectTimeout("connect"), idempotent=False)
+            is not None
+        )
+        assert policy.next_delay(0, httpx.ReadTimeout("read"), idempotent=False) is None
+        assert (
+            policy.next_delay(0, httpx.RemoteProtocolError("reset"), idempotent=False)
+            is None
+        )
+        assert policy.budget.used == 1
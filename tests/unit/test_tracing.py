@@ -0,0 +1,300 @@
+import asyncio
+import json
+import threading
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+from nac_collector.controller.base import CiscoClientController
+from nac_collector.tracing import SpanListener, TraceFormat, Tracer
+
+pytestmark = pytest.mark.unit
+
+
+class ConcreteCiscoClient(CiscoClientController):
+    def authenticate(self):
+        return True
+
+    def get_from_endpoints_data(self, endpoints_data):
+        return {}
+
+
+def _by_name(tracer):
+    return {span.name: span for span in tracer.spans}
+
+
+class TestTracer:
+    def test_disabled_records_nothing(self):
+        tracer = Tracer()
+
+        with tracer.span("endpoint") as span:
+            span.set("key", "value")
+        endpoints = list(tracer.each_endpoint([{"name": "a"}]))
+
+        assert endpoints == [{"name": "a"}]
+        assert tracer.spans == []
+
+    def test_nesting(self):
+        tracer = Tracer(enabled=True)
+
+        with tracer.span("root"):
+            with tracer.span("child", "fan-out", requests=2) as span:
+                span.set("status", 200)
+            with tracer.span("sibling"):
+                pass
+
+        spans = _by_name(tracer)
+        assert spans["root"].parent_id is None
+        assert spans["child"].parent_id == spans["root"].span_id
+        assert spans["sibling"].parent_id == spans["root"].span_id
+        assert spans["child"].attributes == {"requests": 2, "status": 200}
+        assert spans["child"].category == "fan-out"
+
+    def test_error_is_recorded(self):
+        tracer = Tracer(enabled=True)
+
+        with pytest.raises(ValueError), tracer.span("failing"):
+            raise ValueError("boom")
+
+        assert tracer.spans[0].error == "ValueError"
+        assert tracer.spans[0].end is not None
+
+    def test_asyncio_tasks_inherit_the_open_span(self):
+        tracer = Tracer(enabled=True)
+
+        async def request(name):
+            with tracer.span(name, "http"):
+                await asyncio.sleep(0)
+
+        async def fan_out():
+            await asyncio.gather(request("a"), request("b"))
+
+        with tracer.span("fan-out"):
+            asyncio.run(fan_out())
+
+        spans = _by_name(tracer)
+        assert spans["a"].parent_id == spans["fan-out"].span_id
+        assert spans["b"].parent_id == spans["fan-out"].span_id
+
+    def test_each_endpoint(self):
+        tracer = Tracer(enabled=True)
+        endpoints = [
+            {"name": "hosts", "endpoint": "/hosts"},
+            {"name": "networks", "endpoint": "/networks"},
+        ]
+
+        for endpoint in tracer.each_endpoint(endpoints):
+            with tracer.span(f"GET {endpoint['endpoint']}", "http"):
+                pass
+
+        spans = _by_name(tracer)
+        assert spans["hosts"].attributes == {"endpoint": "/hosts"}
+        assert spans["GET /hosts"].parent_id == spans["hosts"].span_id
+        assert spans["GET /networks"].parent_id == spans["networks"].span_id
+        assert spans["networks"].parent_id is None
+
+    def test_each_endpoint_left_early(self):
+        tracer = Tracer(enabled=True)
+
+        for _ in tracer.each_endpoint([{"name": "a"}, {"name": "b"}]):
+            break
+
+        with tracer.span("after"):
+            pass
+
+        spans = _by_name(tracer)
+        assert spans["a"].error is None
+        assert spans["after"].parent_id is None
+
+    def test_wrap_links_threads(self):
+        tracer = Tracer(enabled=True)
+        results = []
+
+        def work(value):
+            with tracer.span(f"inner {value}"):
+                results.append(value)
+
+        with tracer.span("root"):
+            wrapped = tracer.wrap(work, "worker", "endpoint")
+            threads = [threading.Thread(target=wrapped, args=(i,)) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        spans = tracer.spans
+        root = _by_name(tracer)["root"]
+        workers = [span for span in spans if span.name == "worker"]
+        assert sorted(results) == [0, 1]
+        assert [span.parent_id for span in workers] == [root.span_id] * 2
+        assert {_by_name(tracer)[f"inner {i}"].parent_id for i in range(2)} == {
+            span.span_id for span in workers
+        }
+
+    def test_listeners_see_spans_of_a_disabled_tracer(self):
+        tracer = Tracer()
+        listener = Mock(spec=SpanListener)
+        tracer.add_listener(listener)
+
+        for _ in tracer.each_endpoint([{"name": "hosts"}]):
+            with tracer.span("GET /hosts", "http"):
+                wrapped = tracer.wrap(lambda: None, "child", "fan-out")
+                thread = threading.Thread(target=wrapped)
+                thread.start()
+                thread.join()
+
+        started = [call.args[0] for call in listener.span_started.call_args_list]
+        ended = [call.args[0] for call in listener.span_ended.call_args_list]
+        assert [span.name for span in started] == ["hosts", "GET /hosts", "child"]
+        assert [span.name for span in ended] == ["child", "GET /hosts", "hosts"]
+        # Spans belong to the endpoint they were opened in, across threads
+        assert {span.endpoint for span in started} == {"hosts"}
+        assert tracer.spans == []
+
+    def test_span_endpoint(self):
+        tracer = Tracer(enabled=True)
+
+        with tracer.span("collection", "collection"):
+            with tracer.span("hosts", "endpoint"):
+                with tracer.span("GET /hosts", "http"):
+                    pass
+
+        spans = _by_name(tracer)
+        assert spans["collection"].endpoint is None
+        assert spans["hosts"].endpoint == "hosts"
+        assert spans["GET /hosts"].endpoint == "hosts"
+
+    def test_critical_path(self):
+        tracer = Tracer(enabled=True)
+
+        with tracer.span("root"):
+            with tracer.span("short"):
+                pass
+            with tracer.span("slow"), tracer.span("leaf"):
+                pass
+
+        assert [span.name for span in tracer.critical_path()] == [
+            "root",
+            "slow",
+            "leaf",
+        ]
+
+    def test_chrome_trace_lanes(self):
+        tracer = Tracer(enabled=True)
+
+        async def request(name):
+            with tracer.span(name, "http", url=f"/{name}"):
+                await asyncio.sleep(0.01)
+
+        async def fan_out():
+            await asyncio.gather(request("a"), request("b"))
+
+        with tracer.span("root"):
+            asyncio.run(fan_out())
+
+        events = {
+            event["name"]: event
+            for event in tracer.chrome_trace()["traceEvents"]
+            if event["ph"] == "X"
+        }
+        # Concurrent requests cannot share a lane, the first nests in its parent
+        assert events["a"]["tid"] == events["root"]["tid"]
+        assert events["b"]["tid"] != events["a"]["tid"]
+        assert events["a"]["args"]["url"] == "/a"
+        assert events["a"]["cat"] == "http"
+        assert events["root"]["args"]["critical_path"] is True
+        assert events["root"]["dur"] >= events["a"]["dur"] > 0
+
+    def test_otlp(self):
+        tracer = Tracer(enabled=True)
+
+        with tracer.span("root"), tracer.span("GET /a", "http", status=200):
+            pass
+
+        document = tracer.otlp()
+
+        resource_spans = document["resourceSpans"][0]
+        assert resource_spans["resource"]["attributes"] == [
+            {"key": "service.name", "value": {"stringValue": "nac-collector"}}
+        ]
+        spans = {s["name"]: s for s in resource_spans["scopeSpans"][0]["spans"]}
+        assert spans["GET /a"]["kind"] == 3
+        assert spans["root"]["kind"] == 1
+        assert spans["GET /a"]["parentSpanId"] == spans["root"]["spanId"]
+        assert spans["root"]["parentSpanId"] == ""
+        assert {"key": "status", "value": {"intValue": "200"}} in spans["GET /a"][
+            "attributes"
+        ]
+        assert len(spans["root"]["traceId"]) == 32
+        assert int(spans["root"]["endTimeUnixNano"]) >= int(
+            spans["root"]["startTimeUnixNano"]
+        )
+
+    @pytest.mark.parametrize("trace_format", list(TraceFormat))
+    def test_write(self, tmp_path, trace_format):
+        tracer = Tracer(enabled=True)
+        with tracer.span("root"):
+            pass
+        path = tmp_path / "trace.json"
+
+        tracer.write(str(path), trace_format)
+
+        document = json.loads(path.read_text())
+        key = "traceEvents" if trace_format == TraceFormat.CHROME else "resourceSpans"
+        assert key in document
+
+
+class TestControllerTracing:
+    def test_fan_out_call_tree(self):
+        client = ConcreteCiscoClient(
+            username="admin",
+            password="secret",
+            base_url="https://controller.example.com",
+            max_retries=3,
+            retry_after=1,
+            timeout=5,
+            max_concurrency=4,
+            trace=True,
+        )
+        client.client = httpx.Client(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, json={"response": []})
+            )
+        )
+        client.create_async_client = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, json={"response": []})
+            )
+        )
+
+        client.fetch_many(["/api/items/1", "/api/items/2"])
+
+        fan_out = _by_name(client.tracer)["fetch_many /api/items/{id}"]
+        requests = [span for span in client.tracer.spans if span.category == "http"]
+        assert fan_out.attributes == {"requests": 2}
+        assert sorted(span.attributes["url"] for span in requests) == [
+            "https://controller.example.com/api/items/1",
+            "https://controller.example.com/api/items/2",
+        ]
+        assert {span.name for span in requests} == {"GET /api/items/{id}"}
+        assert {span.parent_id for span in requests} == {fan_out.span_id}
+        assert {span.attributes["status"] for span in requests} == {200}
+
+    def test_disabled_by_default(self):
+        client = ConcreteCiscoClient(
+            username="admin",
+            password="secret",
+            base_url="https://controller.example.com",
+            max_retries=3,
+            retry_after=1,
+            timeout=5,
+        )
+        client.client = httpx.Client(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200))
+        )
+
+        client.get_request("https://controller.example.com/api/items")
+
+        assert not client.tracer.enabled
+        assert client.tracer.spans == []
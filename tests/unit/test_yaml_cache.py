@@ -0,0 +1,131 @@
+import marshal
+from unittest.mock import patch
+
+import pytest
+from ruamel.yaml import YAMLError
+
+from nac_collector import yaml_cache
+from nac_collector.device_inventory import load_devices_from_file
+from nac_collector.endpoint_resolver import EndpointResolver
+from nac_collector.resource_manager import ResourceManager
+from nac_collector.yaml_cache import CACHE_DIR_ENV, cache_dir, cache_key
+
+pytestmark = pytest.mark.unit
+
+DOCUMENT = """
+- name: network_device
+  endpoint: /ers/config/networkdevice
+  children:
+    - name: interface
+      endpoint: /interface
+      id: 10
+"""
+
+
+def entries(directory):
+    return sorted(path.name for path in directory.iterdir())
+
+
+class TestYamlCache:
+    def test_cache_dir(self, monkeypatch, tmp_path):
+        monkeypatch.delenv(CACHE_DIR_ENV)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert cache_dir() == tmp_path / "nac-collector" / "yaml"
+
+        monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "custom"))
+        assert cache_dir() == tmp_path / "custom"
+
+        monkeypatch.setenv(CACHE_DIR_ENV, "")
+        assert cache_dir() is None
+
+    def test_second_load_is_served_from_the_cache(self, yaml_cache_dir):
+        parsed = yaml_cache.load(DOCUMENT)
+        assert entries(yaml_cache_dir) == [f"{cache_key(DOCUMENT.encode())}.marshal"]
+
+        with patch.object(yaml_cache, "parse") as mock_parse:
+            cached = yaml_cache.load(DOCUMENT.encode())
+
+        mock_parse.assert_not_called()
+        assert cached == parsed == yaml_cache.parse(DOCUMENT)
+        assert cached[0]["children"][0]["id"] == 10
+        # Each load returns its own copy
+        assert cached is not yaml_cache.load(DOCUMENT)
+
+    def test_changed_documents_are_parsed_again(self, yaml_cache_dir):
+        yaml_cache.load(DOCUMENT)
+        changed = DOCUMENT.replace("id: 10", "id: 11")
+
+        assert yaml_cache.load(changed)[0]["children"][0]["id"] == 11
+        assert len(entries(yaml_cache_dir)) == 2
+
+    def test_disabled(self, monkeypatch, yaml_cache_dir):
+        monkeypatch.setenv(CACHE_DIR_ENV, "")
+
+        assert yaml_cache.load(DOCUMENT)[0]["name"] == "network_device"
+        assert entries(yaml_cache_dir) == []
+
+    def test_unreadable_entries_are_replaced(self, yaml_cache_dir):
+        entry = yaml_cache_dir / f"{cache_key(DOCUMENT.encode())}.marshal"
+        entry.write_bytes(b"\x00garbage")
+
+        assert yaml_cache.load(DOCUMENT) == yaml_cache.parse(DOCUMENT)
+        assert marshal.loads(entry.read_bytes()) == yaml_cache.parse(DOCUMENT)
+
+    def test_values_marshal_cannot_store_are_not_cached(self, yaml_cache_dir):
+        parsed = yaml_cache.load("updated: 2024-01-01 10:00:00\n")
+
+        assert parsed["updated"].year == 2024
+        assert entries(yaml_cache_dir) == []
+
+    def test_unwritable_cache_is_ignored(self, monkeypatch, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        monkeypatch.setenv(CACHE_DIR_ENV, str(blocker / "cache"))
+
+        assert yaml_cache.load(DOCUMENT)[0]["name"] == "network_device"
+
+    def test_invalid_yaml_is_not_cached(self, yaml_cache_dir):
+        with pytest.raises(YAMLError):
+            yaml_cache.load("key: [unclosed")
+        assert entries(yaml_cache_dir) == []
+
+
+class TestCachedLoaders:
+    def test_endpoints_file(self, yaml_cache_dir, tmp_path):
+        endpoints_file = tmp_path / "endpoints.yaml"
+        endpoints_file.write_text(DOCUMENT)
+
+        first = EndpointResolver._load_from_file(str(endpoints_file))
+        with patch.object(yaml_cache, "parse") as mock_parse:
+            second = EndpointResolver._load_from_file(str(endpoints_file))
+
+        mock_parse.assert_not_called()
+        assert first == second
+        assert first[0]["endpoint"] == "/ers/config/networkdevice"
+
+    def test_devices_file(self, yaml_cache_dir, tmp_path):
+        devices_file = tmp_path / "devices.yaml"
+        devices_file.write_text("- name: Switch1\n  target: 10.0.0.1\n")
+
+        assert load_devices_from_file(devices_file) == [
+            {"name": "Switch1", "target": "10.0.0.1"}
+        ]
+        with patch.object(yaml_cache, "parse") as mock_parse:
+            assert load_devices_from_file(devices_file)[0]["name"] == "Switch1"
+        mock_parse.assert_not_called()
+
+    def test_packaged_resources(self, yaml_cache_dir):
+        endpoints = ResourceManager.get_packaged_endpoint_data("ise")
+        lookups = ResourceManager.get_packaged_lookup_content("catalystcenter")
+        overrides = ResourceManager.get_packaged_endpoint_overrides("meraki")
+
+        with patch.object(yaml_cache, "parse") as mock_parse:
+            assert ResourceManager.get_packaged_endpoint_data("ise") == endpoints
+            assert (
+                ResourceManager.get_packaged_lookup_content("catalystcenter") == lookups
+            )
+            assert (
+                ResourceManager.get_packaged_endpoint_overrides("meraki") == overrides
+            )
+        mock_parse.assert_not_called()
+        assert len(entries(yaml_cache_dir)) == 3